@@ -37,4 +37,6 @@ class CommunityListSerializer(serializers.ModelSerializer):
                   'building_count', 'created_at', 'updated_at']
 
     def get_building_count(self, obj):
-        return obj.buildings.count()
+        # 列表接口由视图集 annotate(building_count=Count('buildings'))，不再逐行计数
+        count = getattr(obj, 'building_count', None)
+        return obj.buildings.count() if count is None else count
@@ -10,22 +10,31 @@ from django.shortcuts import get_object_or_404
 from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.contrib.auth.decorators import login_required
+from django.db.models import Count, Prefetch
 from .forms import CommunityForm, BuildingForm
 
 from .models import Community, Building
 from .serializers import CommunitySerializer, CommunityListSerializer, BuildingSerializer
 from apps.core.permissions import IsAdminUser, IsReceptionistUser
+from apps.core.relations import SerializerRelationsMixin
+from apps.core.search import IndexedSearchFilter
 
 
-class CommunityViewSet(viewsets.ModelViewSet):
+class CommunityViewSet(SerializerRelationsMixin, viewsets.ModelViewSet):
     """小区管理视图集"""
     queryset = Community.objects.all()
     permission_classes = [IsAuthenticated]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, IndexedSearchFilter, filters.OrderingFilter]
     filterset_fields = ['name']
     search_fields = ['name', 'address']
     ordering_fields = ['name', 'created_at']
     ordering = ['name']
+    serializer_relations = {
+        CommunityListSerializer: {'annotate': {'building_count': Count('buildings')}},
+        CommunitySerializer: {
+            'prefetch_related': [Prefetch('buildings', queryset=Building.objects.select_related('community'))],
+        },
+    }
 
     def get_serializer_class(self):
         if self.action == 'list':
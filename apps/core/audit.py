@@ -0,0 +1,133 @@
+"""
+操作日志异步批量写入
+
+请求中只把日志条目放入进程内队列，由后台线程每累计 AUDIT_LOG_BATCH_SIZE 条
+或每隔 AUDIT_LOG_FLUSH_INTERVAL_MS 毫秒用 bulk_create 批量写入；进程退出时写入剩余条目。
+队列已满时丢弃新条目并计数，不阻塞请求。
+"""
+import atexit
+import logging
+import queue
+import threading
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+
+logger = logging.getLogger(__name__)
+
+
+class AuditLogWriter:
+    """操作日志批量写入器"""
+
+    def __init__(self, batch_size=None, flush_interval_ms=None, max_queue_size=None, autostart=True):
+        self.batch_size = batch_size or getattr(settings, 'AUDIT_LOG_BATCH_SIZE', 100)
+        self.flush_interval = (flush_interval_ms or getattr(settings, 'AUDIT_LOG_FLUSH_INTERVAL_MS', 500)) / 1000
+        self.autostart = autostart
+        self._queue = queue.Queue(maxsize=max_queue_size or getattr(settings, 'AUDIT_LOG_MAX_QUEUE_SIZE', 10000))
+        self._flush_lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._stats_lock = threading.Lock()
+        self._stats = {'enqueued': 0, 'written': 0, 'dropped': 0, 'failed': 0}
+
+    def _count(self, name, amount=1):
+        with self._stats_lock:
+            self._stats[name] += amount
+
+    def stats(self):
+        """
+        本进程的写入统计
+
+        Returns:
+            dict: enqueued, written, dropped（队列满丢弃）, failed（写入失败）, pending
+        """
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats['pending'] = self._queue.qsize()
+        return stats
+
+    def enqueue(self, entry):
+        """放入一条日志（OperationLog 字段字典），不等待写入"""
+        try:
+            self._queue.put_nowait(entry)
+        except queue.Full:
+            self._count('dropped')
+            return False
+        self._count('enqueued')
+        if self.autostart:
+            self._ensure_started()
+        return True
+
+    def _ensure_started(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self._run, name='audit-log-writer', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        try:
+            while not self._stop_event.is_set():
+                self._stop_event.wait(self.flush_interval)
+                self.flush()
+        finally:
+            connection.close()
+
+    def flush(self):
+        """写入队列中的全部条目，返回写入条数"""
+        from .models import OperationLog
+
+        written = 0
+        with self._flush_lock:
+            close_old_connections()
+            while True:
+                batch = self._drain(self.batch_size)
+                if not batch:
+                    return written
+                try:
+                    OperationLog.objects.bulk_create([OperationLog(**entry) for entry in batch])
+                except Exception as e:
+                    self._count('failed', len(batch))
+                    logger.error(f'批量写入操作日志失败（{len(batch)}条）: {str(e)}')
+                    continue
+                self._count('written', len(batch))
+                written += len(batch)
+
+    def _drain(self, limit):
+        batch = []
+        while len(batch) < limit:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def stop(self, timeout=5):
+        """停止后台线程并写入剩余条目"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self.flush()
+
+
+audit_writer = AuditLogWriter()
+atexit.register(audit_writer.stop)
+
+
+def record_operation(entry):
+    """
+    记录一条操作日志
+
+    AUDIT_LOG_ASYNC 关闭时同步写入；否则放入写入队列。
+    处于事务中时在提交后入队：写入线程使用独立的数据库连接，需要看到已提交的操作人等数据，
+    回滚的操作也不会留下日志
+    """
+    if not getattr(settings, 'AUDIT_LOG_ASYNC', True):
+        from .models import OperationLog
+        OperationLog.objects.create(**entry)
+        return
+    transaction.on_commit(lambda: audit_writer.enqueue(entry))
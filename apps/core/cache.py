@@ -0,0 +1,162 @@
+"""
+两级缓存后端
+
+进程内 LRU（LocMemCache）在前，共享缓存（Redis，或开发/测试环境中的任意 Django 缓存）在后：
+读取先查本地，未命中再查共享缓存并回填本地；写入、删除同时作用于两级。
+本地条目的有效期不超过 LOCAL_TIMEOUT 秒，其他进程写入共享缓存后，本进程最多在该时间内读到旧值。
+
+配置示例：
+    CACHES = {
+        'default': {
+            'BACKEND': 'apps.core.cache.TieredCache',
+            'OPTIONS': {'REMOTE': 'shared', 'LOCAL_MAX_ENTRIES': 1000, 'LOCAL_TIMEOUT': 5},
+        },
+        'shared': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': REDIS_URL},
+    }
+"""
+import threading
+import time
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.core.cache.backends.locmem import LocMemCache
+
+_MISSING = object()
+
+# 命中统计按缓存位置在进程内共享（Django 为每个线程创建独立的缓存实例）
+_stats = {}
+_stats_lock = threading.Lock()
+
+
+class TieredCache(BaseCache):
+    """进程内 LRU + 共享缓存的两级缓存，带命中/未命中计数"""
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._remote_alias = options.get('REMOTE', 'shared')
+        self.local_timeout = options.get('LOCAL_TIMEOUT', 5)
+        self._local = LocMemCache(f'tiered-cache-{location}', {
+            'TIMEOUT': self.local_timeout,
+            'OPTIONS': {'MAX_ENTRIES': options.get('LOCAL_MAX_ENTRIES', 1000), 'CULL_FREQUENCY': 4},
+        })
+        self._stats_key = location
+        with _stats_lock:
+            _stats.setdefault(location, {'local_hits': 0, 'remote_hits': 0, 'misses': 0})
+
+    @property
+    def remote(self):
+        return caches[self._remote_alias]
+
+    def _count(self, name, amount=1):
+        with _stats_lock:
+            _stats[self._stats_key][name] += amount
+
+    def _local_timeout(self, timeout):
+        """本地条目有效期：不超过 LOCAL_TIMEOUT"""
+        timeout = self.get_backend_timeout(timeout)
+        if timeout is None:
+            return self.local_timeout
+        return min(timeout - time.time(), self.local_timeout)
+
+    def stats(self):
+        """
+        本进程的命中统计
+
+        Returns:
+            dict: local_hits, remote_hits, misses, hit_rate
+        """
+        with _stats_lock:
+            stats = dict(_stats[self._stats_key])
+        total = sum(stats.values())
+        stats['hit_rate'] = round((stats['local_hits'] + stats['remote_hits']) / total, 4) if total else 0
+        return stats
+
+    def reset_stats(self):
+        with _stats_lock:
+            _stats[self._stats_key] = dict.fromkeys(_stats[self._stats_key], 0)
+
+    def get(self, key, default=None, version=None):
+        value = self._local.get(key, _MISSING, version=version)
+        if value is not _MISSING:
+            self._count('local_hits')
+            return value
+        value = self.remote.get(key, _MISSING, version=version)
+        if value is _MISSING:
+            self._count('misses')
+            return default
+        self._count('remote_hits')
+        self._local.set(key, value, version=version)
+        return value
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        found = {}
+        for key in keys:
+            value = self._local.get(key, _MISSING, version=version)
+            if value is not _MISSING:
+                found[key] = value
+        self._count('local_hits', len(found))
+
+        remaining = [key for key in keys if key not in found]
+        if remaining:
+            remote_found = self.remote.get_many(remaining, version=version)
+            self._count('remote_hits', len(remote_found))
+            self._count('misses', len(remaining) - len(remote_found))
+            self._local.set_many(remote_found, version=version)
+            found.update(remote_found)
+        return found
+
+    def has_key(self, key, version=None):
+        return self._local.has_key(key, version=version) or self.remote.has_key(key, version=version)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.remote.set(key, value, timeout=timeout, version=version)
+        self._set_local(key, value, timeout, version)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        added = self.remote.add(key, value, timeout=timeout, version=version)
+        if added:
+            self._set_local(key, value, timeout, version)
+        else:
+            # 其他进程已写入，丢弃可能过期的本地值
+            self._local.delete(key, version=version)
+        return added
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        failed = self.remote.set_many(data, timeout=timeout, version=version)
+        for key, value in data.items():
+            if key not in failed:
+                self._set_local(key, value, timeout, version)
+        return failed
+
+    def _set_local(self, key, value, timeout, version):
+        local_timeout = self._local_timeout(timeout)
+        if local_timeout > 0:
+            self._local.set(key, value, timeout=local_timeout, version=version)
+        else:
+            self._local.delete(key, version=version)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        self._local.delete(key, version=version)
+        return self.remote.touch(key, timeout=timeout, version=version)
+
+    def incr(self, key, delta=1, version=None):
+        self._local.delete(key, version=version)
+        return self.remote.incr(key, delta, version=version)
+
+    def delete(self, key, version=None):
+        self._local.delete(key, version=version)
+        return self.remote.delete(key, version=version)
+
+    def delete_many(self, keys, version=None):
+        keys = list(keys)
+        self._local.delete_many(keys, version=version)
+        self.remote.delete_many(keys, version=version)
+
+    def clear(self):
+        self._local.clear()
+        self.remote.clear()
+
+    def close(self, **kwargs):
+        self.remote.close(**kwargs)
@@ -0,0 +1,9 @@
+"""
+模板上下文处理器
+"""
+from django.conf import settings
+
+
+def live_events(request):
+    """页面是否连接实时事件流（需部署 ASGI 的事件服务，见 config/asgi.py）"""
+    return {'live_events_enabled': settings.EVENTS_STREAM_ENABLED}
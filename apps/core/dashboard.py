@@ -0,0 +1,145 @@
+"""
+仪表盘统计聚合
+收缴数据读取按（小区, 账期, 费用类型）维护的收缴快照，
+其余统计使用少量分组查询，查询次数固定，不随小区数量增长
+"""
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+
+def _month_range(now):
+    """返回当前月份的起止时间 [start, end)"""
+    start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    end = (start + timedelta(days=32)).replace(day=1)
+    return start, end
+
+
+def _rate(paid, billed):
+    """计算收缴率（百分比，保留1位小数）"""
+    if not billed or billed <= 0:
+        return 0
+    return round(paid / billed * 100, 1)
+
+
+def get_dashboard_stats(now=None):
+    """
+    计算仪表盘统计数据
+
+    Args:
+        now: 当前时间（默认 timezone.now()，便于测试）
+
+    Returns:
+        dict: 统计卡片、各小区收缴率、报事类别统计和最近报事
+    """
+    from apps.community.models import Community, Building
+    from apps.property.models import Property
+    from apps.payment.models import CollectionSnapshot, PaymentBill, PaymentRecord
+    from apps.maintenance.models import MaintenanceRequest
+
+    from apps.payment.periods import period_range_q
+
+    now = timezone.localtime(now or timezone.now())
+    month_start, month_end = _month_range(now)
+
+    # 基础统计数据
+    total_communities = Community.objects.count()
+    total_buildings = Building.objects.count()
+    total_households = Property.objects.count()
+
+    # 本月应缴/实收金额（读取账期首日在本月的收缴快照，按小区分组）
+    snapshots_by_community = {
+        row['community_id']: row
+        for row in CollectionSnapshot.objects.filter(
+            period_range_q(month_start.date(), month_end.date())
+        ).values('community_id').annotate(
+            billed=Sum('billed_amount'),
+            collected=Sum('collected_amount'),
+            bills_count=Sum('bill_count'),
+        ).order_by()
+    }
+
+    # 本月到账金额
+    monthly_records = PaymentRecord.objects.filter(
+        payment_time__gte=month_start,
+        payment_time__lt=month_end,
+    ).aggregate(total=Sum('amount'))['total'] or Decimal('0')
+
+    monthly_bills = sum((row['billed'] for row in snapshots_by_community.values()), Decimal('0'))
+    monthly_collected = sum((row['collected'] for row in snapshots_by_community.values()), Decimal('0'))
+    collection_rate = _rate(monthly_collected, monthly_bills)
+
+    # 待处理报事
+    maintenance_counts = MaintenanceRequest.objects.aggregate(
+        pending=Count('id', filter=Q(status='pending')),
+        urgent=Count('id', filter=Q(status='pending', priority='high')),
+    )
+
+    # 逾期统计（金额取自快照；户数需跨快照去重，直接统计账单）
+    overdue_amount = CollectionSnapshot.objects.aggregate(
+        total=Sum('overdue_amount')
+    )['total'] or Decimal('0')
+    overdue_households = PaymentBill.objects.filter(
+        due_date__lt=now.date(),
+        status__in=['unpaid', 'partial', 'overdue']
+    ).aggregate(households=Count('owner', distinct=True))['households']
+
+    # 各小区收缴率
+    community_stats = []
+    for community in Community.objects.values('id', 'name'):
+        row = snapshots_by_community.get(community['id'], {})
+        community_stats.append({
+            'name': community['name'],
+            'rate': _rate(row.get('collected'), row.get('billed')),
+            'bills_count': row.get('bills_count', 0),
+        })
+
+    # 本月报事统计（按类别）
+    category_counts = dict(
+        MaintenanceRequest.objects.filter(
+            created_at__gte=month_start,
+            created_at__lt=month_end,
+        ).values_list('category').annotate(count=Count('id')).order_by()
+    )
+    requests_by_category = [
+        {
+            'category': category_name,
+            'count': category_counts.get(category_key, 0),
+            'key': category_key,
+        }
+        for category_key, category_name in MaintenanceRequest.CATEGORY_CHOICES
+    ]
+
+    # 最近报事
+    recent_requests = list(
+        MaintenanceRequest.objects.select_related(
+            'property', 'property__community', 'property__building'
+        ).order_by('-created_at')[:5]
+    )
+
+    return {
+        'total_communities': total_communities,
+        'total_buildings': total_buildings,
+        'total_households': total_households,
+        'monthly_revenue': monthly_records,
+        'monthly_bills': monthly_bills,
+        'collection_rate': collection_rate,
+        'pending_requests': maintenance_counts['pending'],
+        'urgent_requests': maintenance_counts['urgent'],
+        'overdue_amount': overdue_amount,
+        'overdue_households': overdue_households,
+        'community_stats': community_stats,
+        'requests_by_category': requests_by_category,
+        'recent_requests': recent_requests,
+    }
+
+
+def publish_revenue_delta(records, now=None):
+    """推送新增缴费记录带来的本月到账金额变化（只计入本月到账的记录）"""
+    from .events import publish_dashboard_delta
+
+    start, end = _month_range(now or timezone.now())
+    amount = sum((r.amount for r in records if r.payment_time and start <= r.payment_time < end), Decimal('0'))
+    publish_dashboard_delta(monthly_revenue=amount)
@@ -0,0 +1,260 @@
+"""
+通知渠道发送
+
+待发送的通知按批认领（SELECT ... FOR UPDATE SKIP LOCKED），认领时标记为发送中并设置租约，
+随即提交事务释放行锁，多个 Worker 并行认领互不重复；Worker 异常退出时租约到期后可被重新认领。
+认领到的通知按渠道交给各自的线程池并发发送，每个渠道用令牌桶限制发送速率以符合服务商配额。
+某个渠道发送失败时按指数退避重新排期，超过 max_retries 后标记为发送失败；
+已成功的渠道记录在 channel_status 中，重试时不再重复发送。
+
+渠道配置（settings.NOTIFICATION_CHANNELS）：
+    'sms': {'PROVIDER': 'apps.core.delivery.LogProvider', 'RATE': 20, 'BURST': 20, 'WORKERS': 4}
+RATE 为每秒发送条数上限，BURST 为令牌桶容量（允许的瞬时突发条数），WORKERS 为该渠道的并发数。
+限速按进程计算，部署多个 Worker 进程时 RATE 应为服务商配额除以进程数。
+"""
+import logging
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .events import publish, user_channel
+from .models import Notification
+from .unread import adjust_unread_notifications
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHANNELS = {
+    'sms': {'PROVIDER': 'apps.core.delivery.LogProvider', 'RATE': 20, 'BURST': 20, 'WORKERS': 4},
+    'wechat': {'PROVIDER': 'apps.core.delivery.LogProvider', 'RATE': 50, 'BURST': 50, 'WORKERS': 8},
+    'email': {'PROVIDER': 'apps.core.delivery.LogProvider', 'RATE': 10, 'BURST': 10, 'WORKERS': 2},
+}
+
+CHANNEL_LABELS = {'sms': '短信', 'wechat': '微信推送', 'email': '邮件'}
+
+# 首次重试间隔（秒），之后每次翻倍，最长 RETRY_MAX_DELAY
+RETRY_BASE_DELAY = 60
+RETRY_MAX_DELAY = 3600
+# 认领后的租约（秒）：超过该时间仍为发送中的通知视为 Worker 已退出，可被重新认领
+CLAIM_LEASE = 300
+CLAIM_BATCH_SIZE = 200
+
+
+class DeliveryError(Exception):
+    """渠道发送失败"""
+
+
+class LogProvider:
+    """
+    占位服务商：只记录日志
+
+    接入短信、微信模板消息、邮件服务时，实现同样的 send(notification, address) 方法并在
+    NOTIFICATION_CHANNELS 中替换 PROVIDER；发送失败时抛出异常
+    """
+
+    def __init__(self, channel):
+        self.channel = channel
+
+    def send(self, notification, address):
+        logger.info(f"发送{CHANNEL_LABELS.get(self.channel, self.channel)}到 {address}: {notification.title}")
+
+
+class TokenBucket:
+    """线程安全的令牌桶：每秒补充 rate 个令牌，最多积累 capacity 个"""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """取一个令牌，没有可用令牌时等待"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+def channel_address(notification, channel):
+    """通知在该渠道的接收地址，无地址时返回 None"""
+    if channel == 'sms':
+        return notification.recipient_phone or None
+    if channel == 'wechat':
+        return notification.recipient_openid or None
+    if channel == 'email':
+        return (notification.recipient.email if notification.recipient_id else None) or None
+    return None
+
+
+def retry_delay(retry_count):
+    """第 retry_count 次失败后的重试间隔（秒）"""
+    return min(RETRY_BASE_DELAY * 2 ** (retry_count - 1), RETRY_MAX_DELAY)
+
+
+class DeliveryEngine:
+    """按渠道并发、限速发送通知"""
+
+    def __init__(self, channels=None):
+        channels = channels or getattr(settings, 'NOTIFICATION_CHANNELS', DEFAULT_CHANNELS)
+        self.providers = {}
+        self.buckets = {}
+        self.executors = {}
+        for channel, options in channels.items():
+            self.providers[channel] = import_string(options['PROVIDER'])(channel)
+            self.buckets[channel] = TokenBucket(options['RATE'], options.get('BURST', options['RATE']))
+            self.executors[channel] = ThreadPoolExecutor(
+                max_workers=options.get('WORKERS', 4), thread_name_prefix=f'notify-{channel}'
+            )
+
+    def _send(self, channel, notification, address):
+        self.buckets[channel].acquire()
+        self.providers[channel].send(notification, address)
+
+    def deliver(self, notifications):
+        """
+        发送一批通知（recipient 需已 select_related），结果一次 bulk_update 写回
+
+        Returns:
+            int: 全部渠道发送成功的通知数量
+        """
+        jobs = []
+        for notification in notifications:
+            for channel, enabled in notification.send_channels.items():
+                if not enabled or channel not in self.providers:
+                    continue
+                if notification.channel_status.get(channel) == 'sent':
+                    continue
+                address = channel_address(notification, channel)
+                if not address:
+                    continue
+                jobs.append((notification, channel, self.executors[channel].submit(
+                    self._send, channel, notification, address
+                )))
+
+        errors = {}
+        for notification, channel, future in jobs:
+            try:
+                future.result()
+            except Exception as e:
+                notification.channel_status[channel] = 'failed'
+                errors.setdefault(notification.pk, []).append(f"{CHANNEL_LABELS.get(channel, channel)}: {str(e)}")
+            else:
+                notification.channel_status[channel] = 'sent'
+
+        now = timezone.now()
+        sent = 0
+        for notification in notifications:
+            if notification.pk not in errors:
+                notification.status = 'sent'
+                notification.sent_at = now
+                notification.error_message = None
+                notification.next_retry_at = None
+                sent += 1
+                continue
+
+            notification.retry_count += 1
+            notification.error_message = '; '.join(errors[notification.pk])
+            if notification.retry_count >= notification.max_retries:
+                notification.status = 'failed'
+                notification.next_retry_at = None
+            else:
+                notification.status = 'pending'
+                notification.next_retry_at = now + timedelta(seconds=retry_delay(notification.retry_count))
+
+        Notification.objects.bulk_update(
+            notifications,
+            ['status', 'sent_at', 'error_message', 'retry_count', 'next_retry_at', 'channel_status']
+        )
+
+        # 发送成功后站内可见，计入接收人的未读数
+        deltas = Counter(n.recipient_id for n in notifications if n.status == 'sent' and n.recipient_id)
+        adjust_unread_notifications(deltas)
+        for notification in notifications:
+            if notification.status == 'sent' and notification.recipient_id:
+                publish(user_channel(notification.recipient_id), 'notification', {
+                    'id': notification.pk,
+                    'title': notification.title,
+                    'type': notification.notification_type,
+                })
+        return sent
+
+
+def claim_notifications(batch_size=CLAIM_BATCH_SIZE, ids=None):
+    """
+    认领一批到期的待发送通知（含租约已过期的发送中通知）
+
+    Args:
+        ids: 只在这些通知中认领
+
+    Returns:
+        list: 已标记为发送中的 Notification 列表
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        queryset = Notification.objects.select_for_update(skip_locked=True, of=('self',)).filter(
+            Q(next_retry_at__isnull=True) | Q(next_retry_at__lte=now),
+            status__in=['pending', 'sending'],
+        )
+        if ids is not None:
+            queryset = queryset.filter(pk__in=ids)
+        notifications = list(queryset.select_related('recipient').order_by('created_at')[:batch_size])
+        if notifications:
+            lease_until = now + timedelta(seconds=CLAIM_LEASE)
+            Notification.objects.filter(pk__in=[n.pk for n in notifications]).update(
+                status='sending', next_retry_at=lease_until
+            )
+    return notifications
+
+
+def deliver_pending(batch_size=CLAIM_BATCH_SIZE, ids=None):
+    """
+    循环认领并发送，直到没有到期的通知
+
+    Returns:
+        dict: claimed, sent
+    """
+    engine = get_delivery_engine()
+    claimed = sent = 0
+    while True:
+        notifications = claim_notifications(batch_size, ids)
+        if not notifications:
+            break
+        claimed += len(notifications)
+        sent += engine.deliver(notifications)
+    return {'claimed': claimed, 'sent': sent}
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_delivery_engine():
+    """获取进程内共享的发送引擎（各渠道的线程池和令牌桶在进程内共用）"""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = DeliveryEngine()
+    return _engine
+
+
+def _reset_delivery_engine():
+    """丢弃共享的发送引擎（渠道配置变更后使用）"""
+    global _engine
+    with _engine_lock:
+        _engine = None
@@ -0,0 +1,259 @@
+"""
+实时事件推送
+
+业务代码调用 publish() 发布事件，事件在事务提交后经消息代理广播，
+各 Web 进程的事件流视图（event_stream，Server-Sent Events）把订阅到的事件推送给已连接的管理端浏览器，
+页面据此更新角标和统计卡片，无需轮询。
+
+消息代理：
+- 配置 EVENTS_REDIS_URL 时使用 Redis 发布/订阅，多个进程（含 Celery Worker）发布的事件都能送达
+- 未配置时使用进程内的 LocalBroker，只能送达同一进程内的连接，适用于开发和测试；
+  开启 EVENTS_STREAM_ENABLED（事件流由单独的 ASGI 服务处理）时必须配置，否则 get_broker() 报错
+
+频道：
+- user:<用户ID>  发给单个用户：新通知
+- staff          发给所有管理端连接：报事状态变化、仪表盘计数变化、系统公告
+
+连接关闭：Django 4.2 的 ASGIHandler 在流式响应期间不监听 http.disconnect，
+由 DisconnectWatcher（config/asgi.py 挂载）在请求体读完后接管 receive()，客户端断开时通知事件流结束；
+另外每个连接最长保持 STREAM_MAX_AGE 秒后主动结束，浏览器的 EventSource 会自动重连。
+"""
+import asyncio
+import json
+import logging
+import threading
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+STAFF_CHANNEL = 'staff'
+REDIS_CHANNEL_PREFIX = 'events:'
+# 没有事件时发送保活注释行的间隔（秒）
+HEARTBEAT_INTERVAL = 15
+# 单个连接积压的事件上限，浏览器处理不过来时丢弃最早的事件
+SUBSCRIPTION_QUEUE_SIZE = 100
+# 单个连接的最长保持时间（秒），到期后结束响应由浏览器重连，兜底释放未检测到断开的连接
+STREAM_MAX_AGE = 10 * 60
+# ASGI scope 中的客户端断开标志（asyncio.Event），由 DisconnectWatcher 设置
+DISCONNECT_SCOPE_KEY = 'events.disconnected'
+# wait_for_event 在客户端断开时的返回值
+DISCONNECTED = object()
+
+
+def user_channel(user_id):
+    return f'user:{user_id}'
+
+
+class LocalSubscription:
+    """进程内订阅"""
+
+    def __init__(self, broker, channels):
+        self.broker = broker
+        self.channels = channels
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=SUBSCRIPTION_QUEUE_SIZE)
+
+    def _put(self, message):
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(message)
+
+    async def get(self, timeout):
+        """等待下一条事件，超时返回 None"""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    async def close(self):
+        self.broker._unsubscribe(self)
+
+
+class LocalBroker:
+    """进程内消息代理，可在任意线程发布"""
+
+    def __init__(self):
+        self._subscriptions = {}
+        self._lock = threading.Lock()
+
+    def publish(self, channel, message):
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(channel, ()))
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription._put, message)
+            except RuntimeError:
+                # 连接所在的事件循环已关闭
+                self._unsubscribe(subscription)
+        return len(subscriptions)
+
+    async def subscribe(self, channels):
+        subscription = LocalSubscription(self, channels)
+        with self._lock:
+            for channel in channels:
+                self._subscriptions.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def _unsubscribe(self, subscription):
+        with self._lock:
+            for channel in subscription.channels:
+                self._subscriptions.get(channel, set()).discard(subscription)
+
+
+class RedisSubscription:
+    """Redis 订阅，每个连接使用独立的 Redis 连接"""
+
+    def __init__(self, url, channels):
+        from redis import asyncio as aioredis
+
+        self.client = aioredis.from_url(url)
+        self.pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        self.channels = [REDIS_CHANNEL_PREFIX + channel for channel in channels]
+
+    async def get(self, timeout):
+        message = await self.pubsub.get_message(timeout=timeout)
+        if message is None:
+            return None
+        data = message['data']
+        return data.decode('utf-8') if isinstance(data, bytes) else data
+
+    async def close(self):
+        await self.pubsub.aclose()
+        await self.client.aclose()
+
+
+class RedisBroker:
+    """Redis 发布/订阅"""
+
+    def __init__(self, url):
+        import redis
+
+        self.url = url
+        self.client = redis.Redis.from_url(url)
+
+    def publish(self, channel, message):
+        return self.client.publish(REDIS_CHANNEL_PREFIX + channel, message)
+
+    async def subscribe(self, channels):
+        subscription = RedisSubscription(self.url, channels)
+        await subscription.pubsub.subscribe(*subscription.channels)
+        return subscription
+
+
+async def wait_for_event(subscription, timeout, disconnected=None):
+    """
+    等待订阅的下一条事件
+
+    Args:
+        disconnected: 客户端断开标志（asyncio.Event），为 None 时不检测
+
+    Returns:
+        事件消息；超时返回 None，客户端已断开返回 DISCONNECTED
+    """
+    if disconnected is None:
+        return await subscription.get(timeout)
+    if disconnected.is_set():
+        return DISCONNECTED
+    getter = asyncio.ensure_future(subscription.get(timeout))
+    waiter = asyncio.ensure_future(disconnected.wait())
+    try:
+        done, _ = await asyncio.wait({getter, waiter}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        getter.cancel()
+        waiter.cancel()
+    return getter.result() if getter in done else DISCONNECTED
+
+
+class DisconnectWatcher:
+    """
+    ASGI 中间件：请求体读完后在后台等待 http.disconnect，
+    通过 scope[DISCONNECT_SCOPE_KEY]（asyncio.Event）通知流式响应客户端已断开
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            return await self.app(scope, receive, send)
+
+        disconnected = asyncio.Event()
+        watcher = None
+
+        async def watch():
+            while (await receive())['type'] != 'http.disconnect':
+                pass
+            disconnected.set()
+
+        async def receive_body():
+            nonlocal watcher
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                disconnected.set()
+            elif not message.get('more_body', False) and watcher is None:
+                # 应用不会再读取 receive()，改由后台任务等待断开
+                watcher = asyncio.ensure_future(watch())
+            return message
+
+        try:
+            await self.app(dict(scope, **{DISCONNECT_SCOPE_KEY: disconnected}), receive_body, send)
+        finally:
+            if watcher is not None:
+                watcher.cancel()
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    """获取进程内共享的消息代理"""
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                url = getattr(settings, 'EVENTS_REDIS_URL', '')
+                if not url and getattr(settings, 'EVENTS_STREAM_ENABLED', False):
+                    raise ImproperlyConfigured(
+                        '事件流由单独的 ASGI 服务处理，需配置 EVENTS_REDIS_URL 才能收到其他进程发布的事件'
+                    )
+                _broker = RedisBroker(url) if url else LocalBroker()
+    return _broker
+
+
+def _reset_broker():
+    """丢弃共享的消息代理（配置变更后使用）"""
+    global _broker
+    with _broker_lock:
+        _broker = None
+
+
+def publish(channel, event_type, data):
+    """
+    发布事件（事务提交后发送；发送失败只记录日志，不影响业务）
+
+    Args:
+        channel: 频道，见 user_channel() / STAFF_CHANNEL
+        event_type: 事件类型，如 notification、maintenance、dashboard
+        data: 可 JSON 序列化的事件数据
+    """
+    message = json.dumps({'type': event_type, 'data': data}, cls=DjangoJSONEncoder, ensure_ascii=False)
+
+    def send():
+        try:
+            get_broker().publish(channel, message)
+        except Exception as e:
+            logger.warning(f'发布实时事件失败: {event_type} {str(e)}')
+
+    transaction.on_commit(send)
+
+
+def publish_dashboard_delta(**deltas):
+    """发布仪表盘计数变化，键与 get_dashboard_stats 的返回值一致（如 pending_requests=1）"""
+    deltas = {key: value for key, value in deltas.items() if value}
+    if deltas:
+        publish(STAFF_CHANNEL, 'dashboard', deltas)
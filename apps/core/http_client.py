@@ -0,0 +1,125 @@
+"""
+对外 HTTP 客户端
+
+所有访问微信、微信支付等外部接口的请求共用一个 requests.Session：
+- 按主机维护连接池并保持长连接，避免每次请求重新进行 TCP+TLS 握手
+- 统一的连接/读取超时
+- 有限次数的重试（指数退避）：连接失败对所有请求重试，读取失败和 502/503/504 仅对幂等方法重试
+- 按接口统计调用次数、失败次数和耗时
+"""
+import logging
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_OPTIONS = {
+    'CONNECT_TIMEOUT': 3,
+    'READ_TIMEOUT': 10,
+    'RETRIES': 2,
+    'BACKOFF_FACTOR': 0.3,
+    'POOL_CONNECTIONS': 10,
+    'POOL_MAXSIZE': 20,
+}
+
+
+class HttpClient:
+    """带连接池、超时、重试和耗时统计的 HTTP 客户端"""
+
+    def __init__(self, **options):
+        self.options = {**DEFAULT_OPTIONS, **getattr(settings, 'HTTP_CLIENT', {}), **options}
+        self.timeout = (self.options['CONNECT_TIMEOUT'], self.options['READ_TIMEOUT'])
+
+        retry = Retry(
+            total=self.options['RETRIES'],
+            connect=self.options['RETRIES'],
+            read=self.options['RETRIES'],
+            status=self.options['RETRIES'],
+            backoff_factor=self.options['BACKOFF_FACTOR'],
+            status_forcelist=(502, 503, 504),
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(
+            pool_connections=self.options['POOL_CONNECTIONS'],
+            pool_maxsize=self.options['POOL_MAXSIZE'],
+            max_retries=retry,
+        )
+        self.session = requests.Session()
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+        self._stats_lock = threading.Lock()
+        self._stats = {}
+
+    def request(self, method, url, **kwargs):
+        """发送请求，未指定 timeout 时使用默认的 (连接超时, 读取超时)"""
+        kwargs.setdefault('timeout', self.timeout)
+        endpoint = self._endpoint(method, url)
+        started = time.monotonic()
+        try:
+            response = self.session.request(method, url, **kwargs)
+        except requests.RequestException:
+            self._record(endpoint, time.monotonic() - started, failed=True)
+            raise
+        self._record(endpoint, time.monotonic() - started, failed=response.status_code >= 500)
+        return response
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    @staticmethod
+    def _endpoint(method, url):
+        parts = urlsplit(url)
+        return f'{method} {parts.netloc}{parts.path}'
+
+    def _record(self, endpoint, elapsed, failed):
+        elapsed_ms = elapsed * 1000
+        with self._stats_lock:
+            stats = self._stats.setdefault(endpoint, {'count': 0, 'errors': 0, 'total_ms': 0.0, 'max_ms': 0.0})
+            stats['count'] += 1
+            stats['errors'] += int(failed)
+            stats['total_ms'] += elapsed_ms
+            stats['max_ms'] = max(stats['max_ms'], elapsed_ms)
+        if failed:
+            logger.warning(f'外部接口调用失败: {endpoint} ({elapsed_ms:.0f}ms)')
+
+    def stats(self):
+        """
+        本进程各接口的调用统计
+
+        Returns:
+            dict: {接口: {count, errors, avg_ms, max_ms}}
+        """
+        with self._stats_lock:
+            return {
+                endpoint: {
+                    'count': stats['count'],
+                    'errors': stats['errors'],
+                    'avg_ms': round(stats['total_ms'] / stats['count'], 1),
+                    'max_ms': round(stats['max_ms'], 1),
+                }
+                for endpoint, stats in self._stats.items()
+            }
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_http_client():
+    """获取进程内共享的 HTTP 客户端"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = HttpClient()
+    return _client
@@ -0,0 +1,204 @@
+"""
+Django管理命令：账单、报事热点查询的索引基准测试
+
+使用方法：
+    python manage.py benchmark_indexes --bills 100000 --requests 50000
+
+在一个事务中生成测试数据，先删除账单、报事模型上声明的索引（恢复小区外键的单列索引）执行一遍热点查询，
+再重建索引执行一遍，输出每条查询前后的耗时和执行计划；结束时回滚事务，不保留任何数据和改动。
+删除索引会锁表，请在测试库执行；DEBUG 关闭时需加 --force。
+"""
+import random
+import statistics
+import time
+import uuid
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, models, transaction
+from django.db.models import Count
+from django.utils import timezone
+
+BATCH_SIZE = 1000
+
+
+def hot_queries(today, community_id, billing_period):
+    """热点查询（与仪表盘、提醒任务、管理端列表的查询条件一致）"""
+    from apps.maintenance.models import MaintenanceRequest
+    from apps.payment.models import PaymentBill
+    from apps.payment.periods import last_months, period_range_q, quarter_range
+
+    month_start = timezone.make_aware(datetime(today.year, today.month, 1))
+    return [
+        ('缴费提醒：7天内到期的未缴账单', PaymentBill.objects.filter(
+            status__in=['unpaid', 'partial'], due_date__gte=today, due_date__lte=today + timedelta(days=7)
+        ).order_by()),
+        ('仪表盘：逾期户数', PaymentBill.objects.filter(
+            status__in=['unpaid', 'partial', 'overdue'], due_date__lt=today
+        ).values('owner').distinct().order_by()),
+        ('账单列表：按状态筛选', PaymentBill.objects.filter(status='overdue').order_by('due_date')[:20]),
+        ('收缴快照：小区+账期', PaymentBill.objects.filter(
+            community_id=community_id, billing_period=billing_period
+        ).order_by()),
+        ('账单列表：首页', PaymentBill.objects.order_by('-created_at', '-id')[:20]),
+        ('报表：本季度账单按小区汇总', PaymentBill.objects.filter(
+            period_range_q(*quarter_range(today))
+        ).values('community_id').annotate(count=Count('id')).order_by()),
+        ('报表：近3个月未缴账单', PaymentBill.objects.filter(
+            period_range_q(*last_months(3, today)), status='unpaid'
+        ).order_by()),
+        ('仪表盘：紧急待处理报事', MaintenanceRequest.objects.filter(status='pending', priority='high').order_by()),
+        ('报事列表：按类别筛选', MaintenanceRequest.objects.filter(category='plumbing').order_by('-created_at')[:20]),
+        ('仪表盘：本月报事按类别统计', MaintenanceRequest.objects.filter(
+            created_at__gte=month_start
+        ).values('category').annotate(count=Count('id')).order_by()),
+        ('报事看板：未完成报事', MaintenanceRequest.objects.filter(
+            status__in=['pending', 'assigned', 'processing']
+        ).order_by('-created_at')[:50]),
+    ]
+
+
+class Command(BaseCommand):
+    help = '生成测试数据，对比账单、报事索引建立前后热点查询的耗时和执行计划（事务回滚，不保留数据）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--bills', type=int, default=50000, help='生成的账单数（默认50000）')
+        parser.add_argument('--requests', type=int, default=20000, help='生成的报事数（默认20000）')
+        parser.add_argument('--repeat', type=int, default=5, help='每条查询执行次数，取中位数（默认5）')
+        parser.add_argument('--seed', type=int, default=42, help='随机数种子')
+        parser.add_argument('--force', action='store_true', help='DEBUG 关闭时仍然执行')
+
+    def handle(self, *args, **options):
+        """执行命令"""
+        if not settings.DEBUG and not options['force']:
+            raise CommandError('基准测试会在事务中删除并重建索引（期间锁表），请在测试库执行，或加 --force')
+
+        self.rng = random.Random(options['seed'])
+        self.repeat = max(options['repeat'], 1)
+        today = timezone.localdate()
+
+        with transaction.atomic():
+            started = time.perf_counter()
+            community_id, billing_period = self.generate(options['bills'], options['requests'], today)
+            self.stdout.write(f'测试数据生成完成，耗时 {time.perf_counter() - started:.1f} 秒')
+
+            queries = hot_queries(today, community_id, billing_period)
+            self.toggle_indexes(enabled=False)
+            before = [self.measure(queryset) for _, queryset in queries]
+            self.toggle_indexes(enabled=True)
+            after = [self.measure(queryset) for _, queryset in queries]
+
+            for (label, _), (before_ms, before_plan), (after_ms, after_plan) in zip(queries, before, after):
+                self.stdout.write(self.style.MIGRATE_HEADING(f'\n{label}'))
+                self.stdout.write(f'  无索引: {before_ms:.2f} ms')
+                self.stdout.write('    ' + before_plan.replace('\n', '\n    '))
+                self.stdout.write(self.style.SUCCESS(f'  有索引: {after_ms:.2f} ms'))
+                self.stdout.write('    ' + after_plan.replace('\n', '\n    '))
+
+            transaction.set_rollback(True)
+        self.stdout.write(self.style.SUCCESS('\n✓ 基准测试完成，测试数据已回滚'))
+
+    def generate(self, bill_count, request_count, today):
+        """生成小区、房产、业主、账单和报事，返回用于“小区+账期”查询的小区ID和账期"""
+        from apps.community.models import Building, Community
+        from apps.maintenance.models import MaintenanceRequest
+        from apps.payment.models import PaymentBill
+        from apps.property.models import Owner, Property
+
+        rng = self.rng
+        tag = uuid.uuid4().hex[:6]
+        periods = []
+        year, month = today.year, today.month
+        for _ in range(12):
+            periods.append(date(year, month, 1))
+            year, month = (year, month - 1) if month > 1 else (year - 1, 12)
+        fee_types = ['property', 'water']
+        property_count = max(-(-bill_count // (len(periods) * len(fee_types))), 1)
+
+        communities = Community.objects.bulk_create([
+            Community(name=f'压测小区{tag}-{index}', address=f'压测路{index}号') for index in range(10)
+        ])
+        buildings = Building.objects.bulk_create([
+            Building(community=community, name='1号楼') for community in communities
+        ])
+        properties = Property.objects.bulk_create([
+            Property(
+                community=buildings[index % len(buildings)].community, building=buildings[index % len(buildings)],
+                floor=index // 10 + 1, room_number=f'{index % 10:02d}', area=Decimal('90.00'),
+            )
+            for index in range(property_count)
+        ], batch_size=BATCH_SIZE)
+        owners = Owner.objects.bulk_create([
+            Owner(name=f'压测业主{index}', phone=f'139{index:08d}') for index in range(property_count)
+        ], batch_size=BATCH_SIZE)
+
+        bills = []
+        for index, (property_obj, owner) in enumerate(zip(properties, owners)):
+            for period in periods:
+                for fee_type in fee_types:
+                    if len(bills) >= bill_count:
+                        break
+                    due_date = (period + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+                    status = rng.choices(['paid', 'unpaid', 'partial', 'overdue'], [80, 10, 3, 7])[0]
+                    bills.append(PaymentBill(
+                        bill_number=f'BENCH{tag}{len(bills):08d}', community_id=property_obj.community_id,
+                        property_unit=property_obj, owner=owner, fee_type=fee_type,
+                        billing_period=period.strftime('%Y-%m'), period_start=period, amount=Decimal('100.00'),
+                        paid_amount=Decimal('100.00') if status == 'paid' else Decimal('0'),
+                        status=status, due_date=due_date,
+                    ))
+        PaymentBill.objects.bulk_create(bills, batch_size=BATCH_SIZE)
+
+        now = timezone.now()
+        requests = MaintenanceRequest.objects.bulk_create([
+            MaintenanceRequest(
+                request_number=f'BENCH{tag}{index:08d}', community_id=properties[index % len(properties)].community_id,
+                property=properties[index % len(properties)], reporter='压测', reporter_phone='13900000000',
+                category=rng.choice(MaintenanceRequest.CATEGORY_CHOICES)[0], description='压测报事',
+                status=rng.choices(['pending', 'assigned', 'processing', 'completed', 'closed'], [3, 2, 5, 70, 20])[0],
+                priority=rng.choices(['low', 'medium', 'high'], [80, 15, 5])[0],
+            )
+            for index in range(request_count)
+        ], batch_size=BATCH_SIZE)
+
+        # 创建时间由 auto_now_add 统一写入，改为分布在最近一年内
+        for obj in bills:
+            obj.created_at = now - timedelta(seconds=rng.randrange(365 * 86400))
+        for obj in requests:
+            obj.created_at = now - timedelta(seconds=rng.randrange(365 * 86400))
+        PaymentBill.objects.bulk_update(bills, ['created_at'], batch_size=BATCH_SIZE)
+        MaintenanceRequest.objects.bulk_update(requests, ['created_at'], batch_size=BATCH_SIZE)
+        return communities[0].pk, periods[1].strftime('%Y-%m')
+
+    def toggle_indexes(self, enabled):
+        """删除或重建账单、报事模型声明的索引；删除时恢复小区外键原有的单列索引"""
+        from apps.maintenance.models import MaintenanceRequest
+        from apps.payment.models import PaymentBill
+
+        # 不进入 schema_editor 上下文（SQLite 不允许在事务中进入），只用它生成 DDL
+        editor = connection.schema_editor()
+        community_index = models.Index(fields=['community'], name='bill_community_bench_idx')
+        statements = []
+        for model in (PaymentBill, MaintenanceRequest):
+            for index in model._meta.indexes:
+                statements.append(index.create_sql(model, editor) if enabled else index.remove_sql(model, editor))
+        statements.append(
+            community_index.remove_sql(PaymentBill, editor) if enabled
+            else community_index.create_sql(PaymentBill, editor)
+        )
+        with connection.cursor() as cursor:
+            for statement in statements:
+                cursor.execute(str(statement))
+            for model in (PaymentBill, MaintenanceRequest):
+                cursor.execute(f'ANALYZE {connection.ops.quote_name(model._meta.db_table)}')
+
+    def measure(self, queryset):
+        """执行查询 repeat 次，返回耗时中位数（毫秒）和执行计划"""
+        timings = []
+        for _ in range(self.repeat):
+            started = time.perf_counter()
+            list(queryset.all())
+            timings.append((time.perf_counter() - started) * 1000)
+        return statistics.median(timings), queryset.explain()
@@ -0,0 +1,20 @@
+# Generated by Django 4.2.7 on 2026-10-18 05:58
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0003_notification"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="operationlog",
+            name="created_at",
+            field=models.DateTimeField(
+                default=django.utils.timezone.now, editable=False, verbose_name="创建时间"
+            ),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 4.2.7 on 2026-10-18 06:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0004_operationlog_created_at_default"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="notification",
+            name="notification_type",
+            field=models.CharField(
+                choices=[
+                    ("payment_reminder", "缴费提醒"),
+                    ("payment_overdue", "逾期催缴"),
+                    ("payment_success", "缴费成功"),
+                    ("maintenance_assigned", "报事派单"),
+                    ("maintenance_processing", "报事处理中"),
+                    ("maintenance_completed", "报事完成"),
+                    ("maintenance_closed", "报事关闭"),
+                    ("system_announcement", "系统公告"),
+                ],
+                max_length=50,
+                verbose_name="通知类型",
+            ),
+        ),
+    ]
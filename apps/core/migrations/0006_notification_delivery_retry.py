@@ -0,0 +1,44 @@
+# Generated by Django 4.2.7 on 2026-10-18 06:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0005_notification_payment_success"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="notification",
+            name="channel_status",
+            field=models.JSONField(blank=True, default=dict, verbose_name="各渠道发送结果"),
+        ),
+        migrations.AddField(
+            model_name="notification",
+            name="next_retry_at",
+            field=models.DateTimeField(blank=True, null=True, verbose_name="下次发送时间"),
+        ),
+        migrations.AlterField(
+            model_name="notification",
+            name="status",
+            field=models.CharField(
+                choices=[
+                    ("pending", "待发送"),
+                    ("sending", "发送中"),
+                    ("sent", "已发送"),
+                    ("failed", "发送失败"),
+                    ("read", "已读"),
+                ],
+                default="pending",
+                max_length=20,
+                verbose_name="状态",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="notification",
+            index=models.Index(
+                fields=["status", "next_retry_at"], name="notificatio_status_5034f4_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,147 @@
+# Generated by Django 4.2.7 on 2026-10-18 06:12
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0006_notification_delivery_retry"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Announcement",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                ("title", models.CharField(max_length=200, verbose_name="标题")),
+                ("content", models.TextField(verbose_name="内容")),
+                ("all_roles", models.BooleanField(default=True, verbose_name="面向全部角色")),
+                (
+                    "created_at",
+                    models.DateTimeField(auto_now_add=True, verbose_name="发布时间"),
+                ),
+                (
+                    "created_by",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="announcements",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="发布人",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "系统公告",
+                "verbose_name_plural": "系统公告",
+                "db_table": "announcement",
+                "ordering": ["-created_at"],
+            },
+        ),
+        migrations.CreateModel(
+            name="AnnouncementRole",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "role",
+                    models.CharField(
+                        choices=[
+                            ("super_admin", "超级管理员"),
+                            ("admin", "管理员"),
+                            ("finance", "财务"),
+                            ("receptionist", "前台"),
+                            ("engineering", "工程部"),
+                            ("owner", "业主"),
+                            ("tenant", "租户"),
+                        ],
+                        max_length=20,
+                        verbose_name="角色",
+                    ),
+                ),
+                (
+                    "announcement",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="roles",
+                        to="core.announcement",
+                        verbose_name="公告",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "公告目标角色",
+                "verbose_name_plural": "公告目标角色",
+                "db_table": "announcement_role",
+                "unique_together": {("role", "announcement")},
+            },
+        ),
+        migrations.CreateModel(
+            name="AnnouncementReceipt",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "read_at",
+                    models.DateTimeField(auto_now_add=True, verbose_name="阅读时间"),
+                ),
+                (
+                    "announcement",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="receipts",
+                        to="core.announcement",
+                        verbose_name="公告",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="announcement_receipts",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="用户",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "公告阅读回执",
+                "verbose_name_plural": "公告阅读回执",
+                "db_table": "announcement_receipt",
+                "unique_together": {("user", "announcement")},
+            },
+        ),
+        migrations.AddIndex(
+            model_name="announcement",
+            index=models.Index(
+                fields=["all_roles", "-created_at"],
+                name="announcemen_all_rol_5d1d86_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-18 15:10
+
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+from apps.core.search import CreateSearchIndex
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0007_announcement"),
+    ]
+
+    operations = [
+        # pg_trgm 扩展（只在 PostgreSQL 上执行；扩展已存在时跳过，无需 CREATE EXTENSION 权限）
+        TrigramExtension(),
+        CreateSearchIndex("OperationLog", ["description"]),
+    ]
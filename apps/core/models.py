@@ -4,6 +4,7 @@ Core Models - User and Operation Log
 import uuid
 from django.contrib.auth.models import AbstractUser
 from django.db import models
+from django.utils import timezone
 
 
 class User(AbstractUser):
@@ -66,7 +67,8 @@ class OperationLog(models.Model):
     description = models.TextField(verbose_name='操作描述')
     ip_address = models.GenericIPAddressField(verbose_name='IP地址')
     user_agent = models.TextField(blank=True, null=True, verbose_name='用户代理')
-    created_at = models.DateTimeField(auto_now_add=True, verbose_name='创建时间')
+    # 使用默认值而非 auto_now_add：日志批量写入时保留操作发生的时间
+    created_at = models.DateTimeField(default=timezone.now, editable=False, verbose_name='创建时间')
 
     class Meta:
         db_table = 'core_operation_log'
@@ -213,6 +215,7 @@ class Notification(models.Model):
     NOTIFICATION_TYPE_CHOICES = [
         ('payment_reminder', '缴费提醒'),
         ('payment_overdue', '逾期催缴'),
+        ('payment_success', '缴费成功'),
         ('maintenance_assigned', '报事派单'),
         ('maintenance_processing', '报事处理中'),
         ('maintenance_completed', '报事完成'),
@@ -222,6 +225,7 @@ class Notification(models.Model):
 
     STATUS_CHOICES = [
         ('pending', '待发送'),
+        ('sending', '发送中'),
         ('sent', '已发送'),
         ('failed', '发送失败'),
         ('read', '已读'),
@@ -244,6 +248,7 @@ class Notification(models.Model):
     # 发送状态
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending', verbose_name='状态')
     send_channels = models.JSONField(default=dict, verbose_name='发送渠道')  # {'email': true, 'sms': true, 'wechat': true}
+    channel_status = models.JSONField(default=dict, blank=True, verbose_name='各渠道发送结果')  # {'sms': 'sent', 'wechat': 'failed'}
     sent_at = models.DateTimeField(auto_now_add=True, verbose_name='发送时间')
     read_at = models.DateTimeField(null=True, blank=True, verbose_name='阅读时间')
 
@@ -251,6 +256,7 @@ class Notification(models.Model):
     error_message = models.TextField(blank=True, null=True, verbose_name='错误信息')
     retry_count = models.IntegerField(default=0, verbose_name='重试次数')
     max_retries = models.IntegerField(default=3, verbose_name='最大重试次数')
+    next_retry_at = models.DateTimeField(null=True, blank=True, verbose_name='下次发送时间')
 
     created_at = models.DateTimeField(auto_now_add=True, verbose_name='创建时间')
     updated_at = models.DateTimeField(auto_now=True, verbose_name='更新时间')
@@ -263,6 +269,7 @@ class Notification(models.Model):
         indexes = [
             models.Index(fields=['recipient', 'status']),
             models.Index(fields=['notification_type', 'status']),
+            models.Index(fields=['status', 'next_retry_at']),
             models.Index(fields=['-created_at']),
         ]
 
@@ -272,6 +279,71 @@ class Notification(models.Model):
     def mark_as_read(self):
         """标记为已读"""
         from django.utils import timezone
+        from .unread import adjust_unread_notifications
+        was_unread = self.status == 'sent'
         self.status = 'read'
         self.read_at = timezone.now()
         self.save(update_fields=['status', 'read_at'])
+        if was_unread and self.recipient_id:
+            adjust_unread_notifications({self.recipient_id: -1})
+
+
+class Announcement(models.Model):
+    """
+    系统公告
+    公告只保存一份，按角色确定可见范围；用户的阅读状态在阅读时写入 AnnouncementReceipt
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    title = models.CharField(max_length=200, verbose_name='标题')
+    content = models.TextField(verbose_name='内容')
+    all_roles = models.BooleanField(default=True, verbose_name='面向全部角色')
+    created_by = models.ForeignKey('User', on_delete=models.SET_NULL, null=True, blank=True, related_name='announcements', verbose_name='发布人')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='发布时间')
+
+    class Meta:
+        db_table = 'announcement'
+        verbose_name = '系统公告'
+        verbose_name_plural = verbose_name
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['all_roles', '-created_at']),
+        ]
+
+    def __str__(self):
+        return self.title
+
+
+class AnnouncementRole(models.Model):
+    """
+    公告的目标角色（仅 all_roles 为 False 的公告）
+    """
+    announcement = models.ForeignKey(Announcement, on_delete=models.CASCADE, related_name='roles', verbose_name='公告')
+    role = models.CharField(max_length=20, choices=RolePermission.ROLE_CHOICES, verbose_name='角色')
+
+    class Meta:
+        db_table = 'announcement_role'
+        verbose_name = '公告目标角色'
+        verbose_name_plural = verbose_name
+        unique_together = [['role', 'announcement']]
+
+    def __str__(self):
+        return f"{self.announcement.title} - {self.get_role_display()}"
+
+
+class AnnouncementReceipt(models.Model):
+    """
+    公告阅读回执
+    用户阅读公告时写入，没有回执的可见公告即为未读
+    """
+    announcement = models.ForeignKey(Announcement, on_delete=models.CASCADE, related_name='receipts', verbose_name='公告')
+    user = models.ForeignKey('User', on_delete=models.CASCADE, related_name='announcement_receipts', verbose_name='用户')
+    read_at = models.DateTimeField(auto_now_add=True, verbose_name='阅读时间')
+
+    class Meta:
+        db_table = 'announcement_receipt'
+        verbose_name = '公告阅读回执'
+        verbose_name_plural = verbose_name
+        unique_together = [['user', 'announcement']]
+
+    def __str__(self):
+        return f"{self.user} - {self.announcement.title}"
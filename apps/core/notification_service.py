@@ -3,41 +3,34 @@
 支持多种渠道的消息推送：站内消息、短信、微信推送
 """
 import logging
+from decimal import Decimal
 from typing import Dict, List, Optional
 from django.utils import timezone
-from django.db.models import Q
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q, Subquery
 from django.conf import settings
 
-from .models import Notification, User
+from .events import STAFF_CHANNEL, publish
+from .exports import iter_chunks
+from .models import Announcement, AnnouncementReceipt, AnnouncementRole, Notification, User
+from .unread import adjust_unread_announcements, announcements_changed, get_unread_count
 
 logger = logging.getLogger(__name__)
 
+# 批量生成通知时每批写入的条数
+FANOUT_BATCH_SIZE = 1000
+# 每个发送任务处理的通知条数
+DELIVERY_BATCH_SIZE = 500
+
 
 class NotificationService:
     """消息推送服务类"""
 
     @staticmethod
-    def send_payment_reminder(bill, days_before_due: int = 7) -> Notification:
-        """
-        发送缴费提醒
-
-        Args:
-            bill: PaymentBill实例
-            days_before_due: 提前天数（默认7天）
-
-        Returns:
-            Notification实例
-        """
-        try:
-            # 获取房产的业主
-            owner = bill.property.owners.first()
-            if not owner:
-                logger.warning(f"房产 {bill.property} 没有业主，无法发送缴费提醒")
-                return None
-
-            # 构建通知内容
-            title = f"缴费提醒 - {bill.bill_number}"
-            content = f"""
+    def _payment_reminder(bill, owner) -> Notification:
+        """构建缴费提醒（不保存）"""
+        title = f"缴费提醒 - {bill.bill_number}"
+        content = f"""
 尊敬的{owner.name}：
 
 您本月的物业费账单已生成：
@@ -49,23 +42,78 @@ class NotificationService:
 请您及时缴纳，以免产生滞纳金。
 
 如有疑问，请联系物业管理处。
-            """.strip()
+        """.strip()
+
+        return Notification(
+            notification_type='payment_reminder',
+            title=title,
+            content=content,
+            recipient_id=owner.user_id,
+            recipient_phone=owner.phone,
+            recipient_openid=owner.wechat_openid,
+            related_bill=bill,
+            status='pending',
+            send_channels={
+                'email': True,
+                'sms': True,
+                'wechat': bool(owner.wechat_openid)
+            }
+        )
 
-            # 创建通知记录
-            notification = Notification.objects.create(
-                notification_type='payment_reminder',
-                title=title,
-                content=content,
-                recipient_id=owner.user_id if owner.user else None,
-                recipient_phone=owner.phone,
-                related_bill=bill,
-                status='pending',
-                send_channels={
-                    'email': True,
-                    'sms': True,
-                    'wechat': bool(owner.wechat_openid)
-                }
-            )
+    @staticmethod
+    def _overdue_notice(bill, owner, overdue_days: int) -> Notification:
+        """构建逾期催缴通知（不保存）"""
+        # 计算滞纳金（假设每天0.05%）
+        late_fee = bill.amount * Decimal('0.0005') * overdue_days
+
+        title = f"逾期催缴 - {bill.bill_number}"
+        content = f"""
+尊敬的{owner.name}：
+
+您的物业费账单已逾期{overdue_days}天：
+- 账单编号：{bill.bill_number}
+- 应缴金额：¥{bill.amount}
+- 逾期天数：{overdue_days}天
+- 滞纳金：¥{late_fee:.2f}
+- 合计应付：¥{bill.amount + late_fee:.2f}
+
+请您尽快缴纳，以免产生更多滞纳金。
+如已缴费，请忽略此通知。
+
+如有疑问，请联系物业管理处。
+        """.strip()
+
+        return Notification(
+            notification_type='payment_overdue',
+            title=title,
+            content=content,
+            recipient_id=owner.user_id,
+            recipient_phone=owner.phone,
+            recipient_openid=owner.wechat_openid,
+            related_bill=bill,
+            status='pending',
+            send_channels={
+                'email': True,
+                'sms': True,
+                'wechat': bool(owner.wechat_openid)
+            }
+        )
+
+    @staticmethod
+    def send_payment_reminder(bill, days_before_due: int = 7) -> Notification:
+        """
+        发送缴费提醒
+
+        Args:
+            bill: PaymentBill实例
+            days_before_due: 提前天数（默认7天）
+
+        Returns:
+            Notification实例
+        """
+        try:
+            notification = NotificationService._payment_reminder(bill, bill.owner)
+            notification.save()
 
             # 尝试发送通知
             NotificationService._send_notification(notification)
@@ -89,42 +137,57 @@ class NotificationService:
             Notification实例
         """
         try:
-            owner = bill.property.owners.first()
-            if not owner:
-                logger.warning(f"房产 {bill.property} 没有业主，无法发送逾期通知")
-                return None
+            notification = NotificationService._overdue_notice(bill, bill.owner, overdue_days)
+            notification.save()
+
+            NotificationService._send_notification(notification)
+
+            return notification
+
+        except Exception as e:
+            logger.error(f"发送逾期催缴失败: {str(e)}")
+            return None
 
-            # 计算滞纳金（假设每天0.05%）
-            late_fee = bill.amount * 0.0005 * overdue_days
+    @staticmethod
+    def send_payment_success(record) -> Notification:
+        """
+        发送缴费成功通知
+
+        Args:
+            record: PaymentRecord实例
+
+        Returns:
+            Notification实例
+        """
+        try:
+            bill = record.bill
+            owner = bill.owner
 
-            title = f"逾期催缴 - {bill.bill_number}"
+            title = f"缴费成功 - {bill.bill_number}"
             content = f"""
 尊敬的{owner.name}：
 
-您的物业费账单已逾期{overdue_days}天：
+您已成功缴纳物业费用：
 - 账单编号：{bill.bill_number}
-- 应缴金额：¥{bill.amount}
-- 逾期天数：{overdue_days}天
-- 滞纳金：¥{late_fee:.2f}
-- 合计应付：¥{bill.amount + late_fee:.2f}
-
-请您尽快缴纳，以免产生更多滞纳金。
-如已缴费，请忽略此通知。
+- 缴费周期：{bill.billing_period}
+- 本次缴费：¥{record.amount}
+- 交易单号：{record.transaction_id}
 
-如有疑问，请联系物业管理处。
+感谢您的支持！
             """.strip()
 
             notification = Notification.objects.create(
-                notification_type='payment_overdue',
+                notification_type='payment_success',
                 title=title,
                 content=content,
-                recipient_id=owner.user_id if owner.user else None,
+                recipient_id=owner.user_id,
                 recipient_phone=owner.phone,
+                recipient_openid=owner.wechat_openid,
                 related_bill=bill,
                 status='pending',
                 send_channels={
-                    'email': True,
-                    'sms': True,
+                    'email': False,
+                    'sms': False,
                     'wechat': bool(owner.wechat_openid)
                 }
             )
@@ -134,7 +197,7 @@ class NotificationService:
             return notification
 
         except Exception as e:
-            logger.error(f"发送逾期催缴失败: {str(e)}")
+            logger.error(f"发送缴费成功通知失败: {str(e)}")
             return None
 
     @staticmethod
@@ -210,149 +273,202 @@ class NotificationService:
             return None
 
     @staticmethod
-    def send_system_announcement(title: str, content: str, target_roles: List[str] = None) -> List[Notification]:
+    def send_system_announcement(title: str, content: str, target_roles: List[str] = None,
+                                 created_by: User = None) -> Announcement:
         """
-        发送系统公告
+        发布系统公告
+
+        公告只保存一份，不为每个用户生成通知：指定目标角色时另批量写入角色记录，
+        用户是否已读由阅读回执决定（见 get_user_announcements）
 
         Args:
             title: 公告标题
             content: 公告内容
             target_roles: 目标角色列表（None表示所有用户）
+            created_by: 发布人
 
         Returns:
-            Notification实例列表
+            Announcement实例
         """
-        try:
-            # 获取目标用户
+        with transaction.atomic():
+            announcement = Announcement.objects.create(
+                title=title,
+                content=content,
+                all_roles=not target_roles,
+                created_by=created_by
+            )
             if target_roles:
-                users = User.objects.filter(role__in=target_roles, is_active=True)
-            else:
-                users = User.objects.filter(is_active=True)
-
-            notifications = []
-            for user in users:
-                notification = Notification.objects.create(
-                    notification_type='system_announcement',
-                    title=title,
-                    content=content,
-                    recipient=user,
-                    status='pending',
-                    send_channels={
-                        'email': False,
-                        'sms': False,
-                        'wechat': False
-                    }
-                )
-                notifications.append(notification)
-
-            # 批量标记为已发送（站内消息）
-            Notification.objects.filter(id__in=[n.id for n in notifications]).update(status='sent', sent_at=timezone.now())
-
-            return notifications
+                AnnouncementRole.objects.bulk_create([
+                    AnnouncementRole(announcement=announcement, role=role) for role in set(target_roles)
+                ])
+            announcements_changed()
+            publish(STAFF_CHANNEL, 'announcement', {
+                'id': announcement.pk,
+                'title': announcement.title,
+                'roles': sorted(set(target_roles)) if target_roles else None,
+            })
+        return announcement
 
-        except Exception as e:
-            logger.error(f"发送系统公告失败: {str(e)}")
-            return []
+    @staticmethod
+    def visible_announcements(user: User):
+        """用户可见的公告：面向全部角色或目标角色包含用户角色，且在用户注册之后发布"""
+        return Announcement.objects.filter(
+            Q(all_roles=True) | Q(Exists(AnnouncementRole.objects.filter(announcement=OuterRef('pk'), role=user.role))),
+            created_at__gte=user.date_joined
+        )
+
+    @staticmethod
+    def get_user_announcements(user: User, unread_only: bool = False, limit: int = 50):
+        """
+        获取用户可见的公告列表
+
+        Returns:
+            Announcement列表，read_at 为用户的阅读时间（未读为 None）
+        """
+        queryset = NotificationService.visible_announcements(user).annotate(
+            read_at=Subquery(
+                AnnouncementReceipt.objects.filter(announcement=OuterRef('pk'), user=user).values('read_at')[:1]
+            )
+        )
+        if unread_only:
+            queryset = queryset.filter(read_at__isnull=True)
+        return queryset.order_by('-created_at')[:limit]
+
+    @staticmethod
+    def unread_announcements(user: User):
+        """用户未读的公告"""
+        return NotificationService.visible_announcements(user).filter(
+            ~Exists(AnnouncementReceipt.objects.filter(announcement=OuterRef('pk'), user=user))
+        )
+
+    @staticmethod
+    def mark_announcements_read(user: User, announcement_ids: List = None) -> int:
+        """
+        标记公告为已读（写入阅读回执）
+
+        Args:
+            announcement_ids: 公告ID列表（None表示全部可见公告）
+
+        Returns:
+            新标记的数量
+        """
+        queryset = NotificationService.unread_announcements(user)
+        if announcement_ids is not None:
+            queryset = queryset.filter(pk__in=announcement_ids)
+        ids = list(queryset.values_list('pk', flat=True))
+        AnnouncementReceipt.objects.bulk_create(
+            [AnnouncementReceipt(announcement_id=pk, user=user) for pk in ids],
+            ignore_conflicts=True
+        )
+        adjust_unread_announcements(user.pk, -len(ids))
+        return len(ids)
 
     @staticmethod
     def _send_notification(notification: Notification) -> bool:
         """
-        实际发送通知到各个渠道
+        发送通知到各个渠道
+
+        不在当前请求中发送：事务提交后交给后台任务，由发送引擎按渠道限速发送并负责失败重试
 
         Args:
-            notification: Notification实例
+            notification: Notification实例（已保存）
 
         Returns:
-            发送是否成功
+            是否已提交发送
+        """
+        NotificationService.schedule_delivery([notification.id])
+        return True
+
+    @staticmethod
+    def deliver(notifications: List[Notification]) -> int:
         """
-        success = True
-        errors = []
+        批量发送通知到各个渠道（见 apps.core.delivery）
 
-        channels = notification.send_channels
+        Args:
+            notifications: Notification实例列表（recipient 需已 select_related）
 
-        # 站内消息（总是启用）
-        try:
-            # 站内消息直接标记为已发送
-            pass
-        except Exception as e:
-            errors.append(f"站内消息: {str(e)}")
-            success = False
-
-        # 短信通知
-        if channels.get('sms') and notification.recipient_phone:
-            try:
-                # TODO: 集成短信服务商API
-                # 示例：阿里云、腾讯云短信服务
-                logger.info(f"发送短信到 {notification.recipient_phone}: {notification.title}")
-            except Exception as e:
-                errors.append(f"短信: {str(e)}")
-                success = False
-
-        # 微信推送
-        if channels.get('wechat') and notification.recipient_openid:
-            try:
-                # TODO: 集成微信模板消息API
-                logger.info(f"发送微信推送到 {notification.recipient_openid}: {notification.title}")
-            except Exception as e:
-                errors.append(f"微信推送: {str(e)}")
-                success = False
-
-        # 邮件通知
-        if channels.get('email') and notification.recipient:
-            try:
-                # TODO: 集成邮件发送服务
-                # 示例：Django SendMail + SMTP
-                logger.info(f"发送邮件到 {notification.recipient.email}: {notification.title}")
-            except Exception as e:
-                errors.append(f"邮件: {str(e)}")
-                success = False
-
-        # 更新通知状态
-        if success:
-            notification.status = 'sent'
-            notification.sent_at = timezone.now()
-        else:
-            notification.status = 'failed'
-            notification.error_message = '; '.join(errors)
-            notification.retry_count += 1
-
-        notification.save()
-
-        return success
+        Returns:
+            发送成功的数量
+        """
+        from .delivery import get_delivery_engine
+
+        return get_delivery_engine().deliver(notifications)
+
+    @staticmethod
+    def schedule_delivery(notification_ids: List) -> None:
+        """
+        事务提交后把待发送的通知分批交给后台任务
+
+        消息队列不可用时在当前进程发送
+        """
+        from .tasks import deliver_notifications
+
+        def dispatch():
+            for start in range(0, len(notification_ids), DELIVERY_BATCH_SIZE):
+                chunk = [str(pk) for pk in notification_ids[start:start + DELIVERY_BATCH_SIZE]]
+                try:
+                    deliver_notifications.delay(chunk)
+                except Exception as e:
+                    logger.error(f"提交通知发送任务失败，改为同步发送: {str(e)}")
+                    deliver_notifications(chunk)
+
+        transaction.on_commit(dispatch)
+
+    @staticmethod
+    def bulk_send(notifications: List[Notification]) -> int:
+        """
+        批量保存通知并交给后台任务发送
+
+        Args:
+            notifications: 未保存的Notification实例（可迭代，逐批写入）
+
+        Returns:
+            创建的通知数量
+        """
+        count = 0
+        for batch in iter_chunks(notifications, FANOUT_BATCH_SIZE):
+            Notification.objects.bulk_create(batch)
+            NotificationService.schedule_delivery([notification.id for notification in batch])
+            count += len(batch)
+        return count
+
+    @staticmethod
+    def _notified_today(notification_type: str, today):
+        """今天已发送过该类型通知的账单（用于 ~Exists 过滤）"""
+        return Exists(Notification.objects.filter(
+            related_bill=OuterRef('pk'),
+            notification_type=notification_type,
+            created_at__date=today
+        ))
 
     @staticmethod
     def check_and_send_payment_reminders():
         """
         检查并发送待缴费提醒
 
-        定时任务：每天检查即将到期（7天内）的未缴账单
+        定时任务：每天检查即将到期（7天内）的未缴账单。
+        当天已提醒的账单在同一条查询中排除，业主随账单一并读取，
+        通知在内存中生成后批量写入，各渠道的发送交给后台任务
         """
-        from django.utils import timezone
         from datetime import timedelta
         from apps.payment.models import PaymentBill
 
-        today = timezone.now().date()
+        today = timezone.localdate()
         due_date_threshold = today + timedelta(days=7)
 
-        # 查找7天内到期的未缴账单
+        # 查找7天内到期、今天尚未提醒的未缴账单
         upcoming_bills = PaymentBill.objects.filter(
             status__in=['unpaid', 'partial'],
             due_date__lte=due_date_threshold,
             due_date__gte=today
-        ).select_related('property__community')
+        ).filter(
+            ~NotificationService._notified_today('payment_reminder', today)
+        ).select_related('owner').order_by()
 
-        count = 0
-        for bill in upcoming_bills:
-            # 检查是否已发送过提醒
-            existing = Notification.objects.filter(
-                related_bill=bill,
-                notification_type='payment_reminder',
-                created_at__date=today
-            ).exists()
-
-            if not existing:
-                NotificationService.send_payment_reminder(bill)
-                count += 1
+        count = NotificationService.bulk_send(
+            NotificationService._payment_reminder(bill, bill.owner)
+            for bill in upcoming_bills.iterator(chunk_size=FANOUT_BATCH_SIZE)
+        )
 
         logger.info(f"缴费提醒发送完成，共发送 {count} 条")
         return count
@@ -362,35 +478,29 @@ class NotificationService:
         """
         检查并发送逾期催缴通知
 
-        定时任务：每天检查已逾期的未缴账单
+        定时任务：每天检查已逾期的未缴账单，逾期天数为7的倍数时发送；
+        查询和写入方式同 check_and_send_payment_reminders
         """
-        from django.utils import timezone
         from apps.payment.models import PaymentBill
 
-        today = timezone.now().date()
+        today = timezone.localdate()
 
-        # 查找已逾期的未缴账单
+        # 查找已逾期、今天尚未催缴的未缴账单
         overdue_bills = PaymentBill.objects.filter(
             status__in=['unpaid', 'partial'],
             due_date__lt=today
-        ).select_related('property__community')
+        ).filter(
+            ~NotificationService._notified_today('payment_overdue', today)
+        ).select_related('owner').order_by()
 
-        count = 0
-        for bill in overdue_bills:
-            overdue_days = (today - bill.due_date).days
-
-            # 每隔7天发送一次逾期通知
-            if overdue_days % 7 == 0:
-                # 检查今天是否已发送
-                existing = Notification.objects.filter(
-                    related_bill=bill,
-                    notification_type='payment_overdue',
-                    created_at__date=today
-                ).exists()
-
-                if not existing:
-                    NotificationService.send_overdue_notice(bill, overdue_days)
-                    count += 1
+        def notices():
+            for bill in overdue_bills.iterator(chunk_size=FANOUT_BATCH_SIZE):
+                overdue_days = (today - bill.due_date).days
+                # 每隔7天发送一次逾期通知
+                if overdue_days % 7 == 0:
+                    yield NotificationService._overdue_notice(bill, bill.owner, overdue_days)
+
+        count = NotificationService.bulk_send(notices())
 
         logger.info(f"逾期催缴发送完成，共发送 {count} 条")
         return count
@@ -416,17 +526,14 @@ class NotificationService:
         return queryset.order_by('-created_at')[:limit]
 
     @staticmethod
-    def get_unread_count(user_id: str) -> int:
+    def get_unread_count(user: User) -> int:
         """
-        获取用户未读通知数量
+        获取用户未读数量（通知 + 公告），读取缓存中的计数器（见 apps.core.unread）
 
         Args:
-            user_id: 用户ID
+            user: 用户
 
         Returns:
             未读数量
         """
-        return Notification.objects.filter(
-            recipient_id=user_id,
-            status='sent'
-        ).count()
+        return get_unread_count(user)
@@ -0,0 +1,331 @@
+"""
+键集（游标）分页
+
+按上一页末行的排序字段值定位下一页：
+    WHERE (created_at, id) < (上一页末行的值) ORDER BY created_at DESC, id DESC LIMIT n
+不执行 OFFSET，翻到任意深度的查询成本都与第一页相同；上一页、末页按反向排序查询后再倒序。
+
+排序字段取查询集的排序（未指定时取模型默认排序），末尾自动补主键保证顺序唯一；
+排序字段必须是非空字段（可以跨关联，如 community__name）；按外键排序时按外键列比较（building → building_id）。
+总数使用估算值：PostgreSQL 取执行计划的行数估计，估计值较小或其他数据库时精确计数。
+"""
+import base64
+import binascii
+import json
+import math
+from collections.abc import Sequence
+from datetime import date, datetime, time
+from decimal import Decimal
+from uuid import UUID
+
+from django.core.exceptions import ValidationError
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+# 估算行数低于该值时改为精确计数（精确计数的成本可以接受）
+ESTIMATE_EXACT_THRESHOLD = 10000
+
+
+class InvalidCursor(Exception):
+    """游标无法解析或与当前排序不匹配"""
+
+
+def estimate_count(queryset):
+    """
+    估算查询集的行数
+
+    Returns:
+        tuple: (行数, 是否为估算值)
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return queryset.count(), False
+
+    sql, params = queryset.order_by().query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute('EXPLAIN (FORMAT JSON) ' + sql, params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    rows = int(plan[0]['Plan']['Plan Rows'])
+    if rows < ESTIMATE_EXACT_THRESHOLD:
+        return queryset.count(), False
+    return rows, True
+
+
+def _ordering(queryset):
+    """查询集的排序字段，末尾补主键"""
+    model = queryset.model
+    ordering = list(queryset.query.order_by or model._meta.ordering)
+    pk_name = model._meta.pk.name
+    terms = []
+    for term in ordering:
+        if not isinstance(term, str) or term.lstrip('-') in ('', '?'):
+            raise ValueError('键集分页只支持按字段名排序')
+        name = term.lstrip('-')
+        if name == 'pk':
+            term = term.replace('pk', pk_name)
+        else:
+            field = _field_path(model, name)
+            if field.is_relation and name.split('__')[-1] == field.name:
+                # 按外键排序时 Django 会展开为关联模型的默认排序，与游标比较的外键值不一致，改为按外键列排序
+                term = f'{term[:len(term) - len(field.name)]}{field.attname}'
+        terms.append(term)
+    if not any(term.lstrip('-') == pk_name for term in terms):
+        terms.append(f'-{pk_name}' if terms and terms[-1].startswith('-') else pk_name)
+    return terms
+
+
+def _field_path(model, path):
+    """排序路径末端的模型字段"""
+    parts = path.split('__')
+    for part in parts[:-1]:
+        model = model._meta.get_field(part).related_model
+    return model._meta.get_field(parts[-1])
+
+
+def _field(model, path):
+    """排序路径对应的字段；外键取关联的目标字段"""
+    field = _field_path(model, path)
+    return field.target_field if field.is_relation else field
+
+
+def _value(obj, path):
+    """取对象在排序路径上的值（外键取主键值）"""
+    parts = path.split('__')
+    for part in parts[:-1]:
+        obj = getattr(obj, part)
+    return getattr(obj, obj._meta.get_field(parts[-1]).attname)
+
+
+def _dump(value):
+    # 时间保留到微秒（DjangoJSONEncoder 会截断到毫秒，导致同一毫秒内的行被跳过）
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    if isinstance(value, (UUID, Decimal)):
+        return str(value)
+    return value
+
+
+class KeysetPage(Sequence):
+    """一页数据，接口与 django.core.paginator.Page 相近，翻页使用游标"""
+
+    def __init__(self, object_list, paginator, offset, has_previous, has_next):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.offset = offset
+        self._has_previous = has_previous
+        self._has_next = has_next
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def __repr__(self):
+        return f'<KeysetPage {self.number}>'
+
+    @property
+    def number(self):
+        return self.offset // self.paginator.per_page + 1
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_previous or self._has_next
+
+    def start_index(self):
+        return self.offset + 1 if self.object_list else 0
+
+    def end_index(self):
+        return self.offset + len(self.object_list)
+
+    @property
+    def next_cursor(self):
+        if not self._has_next:
+            return None
+        return self.paginator.encode(self.object_list[-1], False, self.end_index())
+
+    @property
+    def previous_cursor(self):
+        if not self._has_previous:
+            return None
+        return self.paginator.encode(self.object_list[0], True, max(self.offset - self.paginator.per_page, 0))
+
+    @property
+    def last_cursor(self):
+        return self.paginator.encode(None, True, None)
+
+
+class KeysetPaginator:
+    """
+    键集分页器
+
+    Args:
+        queryset: 已排序的查询集
+        per_page: 每页条数
+        estimate: 总数是否允许使用估算值
+    """
+
+    def __init__(self, queryset, per_page, estimate=True):
+        self.queryset = queryset
+        self.per_page = int(per_page)
+        self.estimate = estimate
+        self.ordering = _ordering(queryset)
+        self.fields = [_field(queryset.model, term.lstrip('-')) for term in self.ordering]
+
+    @cached_property
+    def _count(self):
+        if self.estimate:
+            return estimate_count(self.queryset)
+        return self.queryset.count(), False
+
+    @property
+    def count(self):
+        """总条数（可能为估算值）"""
+        return self._count[0]
+
+    @property
+    def count_is_estimate(self):
+        return self._count[1]
+
+    @property
+    def num_pages(self):
+        return max(math.ceil(self.count / self.per_page), 1)
+
+    def encode(self, obj, reverse, offset):
+        """生成游标：从 obj 之后（reverse 时为之前）开始的一页；obj 为 None 表示从末尾开始"""
+        position = {'r': reverse, 'o': offset}
+        if obj is not None:
+            position['v'] = [_dump(_value(obj, term.lstrip('-'))) for term in self.ordering]
+        data = json.dumps(position, separators=(',', ':')).encode('utf-8')
+        return base64.urlsafe_b64encode(data).decode('ascii').rstrip('=')
+
+    def decode(self, cursor):
+        try:
+            data = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+            position = json.loads(data)
+            values = position.get('v')
+            if values is not None:
+                if len(values) != len(self.fields):
+                    raise InvalidCursor(cursor)
+                values = [field.to_python(value) for field, value in zip(self.fields, values)]
+            offset = position.get('o')
+            return values, bool(position.get('r')), None if offset is None else max(int(offset), 0)
+        except (binascii.Error, ValueError, TypeError, AttributeError, ValidationError):
+            raise InvalidCursor(cursor)
+
+    def _after(self, values, reverse):
+        """排在 values 之后（reverse 时为之前）的行"""
+        condition = Q()
+        for index, term in enumerate(self.ordering):
+            name = term.lstrip('-')
+            descending = term.startswith('-') != reverse
+            step = Q(**{f"{name}__{'lt' if descending else 'gt'}": values[index]})
+            for previous, value in zip(self.ordering[:index], values):
+                step &= Q(**{previous.lstrip('-'): value})
+            condition |= step
+        return condition
+
+    def page(self, cursor=None):
+        """
+        取游标对应的一页，cursor 为空时取第一页
+
+        Raises:
+            InvalidCursor: 游标无效
+        """
+        values, reverse, offset = self.decode(cursor) if cursor else (None, False, 0)
+        queryset = self.queryset
+        if values is not None:
+            queryset = queryset.filter(self._after(values, reverse))
+        ordering = self.ordering
+        limit = self.per_page
+        if reverse:
+            ordering = [term[1:] if term.startswith('-') else f'-{term}' for term in ordering]
+            if values is None:
+                # 末页只取余数部分，与向后翻页的分页边界对齐
+                offset = (self.num_pages - 1) * self.per_page
+                limit = min(max(self.count - offset, 1), self.per_page)
+        rows = list(queryset.order_by(*ordering)[:limit + 1])
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+
+        if not reverse:
+            return KeysetPage(rows, self, offset, values is not None, has_more)
+        rows.reverse()
+        return KeysetPage(rows, self, offset if has_more else 0, has_more, values is not None)
+
+    def get_page(self, cursor=None):
+        """取一页，游标无效时返回第一页（与 Paginator.get_page 一致）"""
+        try:
+            return self.page(cursor)
+        except InvalidCursor:
+            return self.page()
+
+
+class KeysetPagination(BasePagination):
+    """
+    REST 接口的键集分页
+
+    参数：cursor 游标、page_size 每页条数、with_count=1 时返回总数（可能为估算值）
+    """
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    count_query_param = 'with_count'
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(page_size, 1), self.max_page_size)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.paginator = KeysetPaginator(queryset, self.get_page_size(request))
+        try:
+            self.page = self.paginator.page(request.query_params.get(self.cursor_query_param))
+        except InvalidCursor:
+            raise NotFound('无效的游标')
+        return list(self.page)
+
+    def _link(self, cursor):
+        if cursor is None:
+            return None
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, cursor)
+
+    def get_paginated_response(self, data):
+        payload = {
+            'next': self._link(self.page.next_cursor),
+            'previous': self._link(self.page.previous_cursor),
+        }
+        if self.request.query_params.get(self.count_query_param) in ('1', 'true'):
+            payload['count'] = self.paginator.count
+            payload['count_is_estimate'] = self.paginator.count_is_estimate
+        payload['results'] = data
+        return Response(payload)
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'count': {'type': 'integer'},
+                'count_is_estimate': {'type': 'boolean'},
+                'results': schema,
+            },
+        }
@@ -1,11 +1,111 @@
 """
 权限验证工具
+
+各角色的权限矩阵只编译一次并缓存在进程内，权限检查为纯字典查找。
+矩阵带有版本号，版本号保存在共享缓存中：权限配置变化时（信号或批量更新）更新版本号，
+各进程最多每隔 PERMISSION_VERSION_CHECK_INTERVAL 秒比对一次版本号，不一致时重新编译
 """
+import threading
+import time
+import uuid
 from functools import wraps
+from django.core.cache import cache
 from django.core.exceptions import PermissionDenied
 from django.contrib.auth.decorators import login_required
+from django.db import transaction
 from .models import RolePermission, Permission
 
+PERMISSION_VERSION_CACHE_KEY = 'core:permission_matrix_version'
+# 比对共享版本号的最短间隔（秒）
+PERMISSION_VERSION_CHECK_INTERVAL = 5
+
+PERMISSION_ACTIONS = ('view', 'create', 'edit', 'delete', 'export')
+ALL_ACTIONS = dict.fromkeys(PERMISSION_ACTIONS, True)
+
+_matrix = None
+_matrix_lock = threading.Lock()
+
+
+class PermissionMatrix:
+    """
+    编译后的权限矩阵
+
+    Attributes:
+        permissions: [(code, name, module), ...]，按模块、代码排序
+        roles: {role: {code: {action: bool}}}
+    """
+
+    def __init__(self, version, permissions, roles):
+        self.version = version
+        self.permissions = permissions
+        self.roles = roles
+        self.checked_at = time.monotonic()
+
+    def allows(self, role, permission_code, action):
+        return self.roles.get(role, {}).get(permission_code, {}).get(action, False)
+
+
+def _shared_version():
+    """读取共享缓存中的版本号，缺失时（首次使用或被淘汰）生成一个新版本号"""
+    version = cache.get(PERMISSION_VERSION_CACHE_KEY)
+    if version is None:
+        cache.add(PERMISSION_VERSION_CACHE_KEY, uuid.uuid4().hex, timeout=None)
+        version = cache.get(PERMISSION_VERSION_CACHE_KEY)
+    return version
+
+
+def _compile_matrix(version):
+    """从数据库编译权限矩阵（两次查询）"""
+    permissions = list(Permission.objects.values_list('code', 'name', 'module'))
+    roles = {}
+    for role, code, *flags in RolePermission.objects.order_by(
+        'role', 'permission__module', 'permission__code'
+    ).values_list(
+        'role', 'permission__code', 'can_view', 'can_create', 'can_edit', 'can_delete', 'can_export'
+    ):
+        roles.setdefault(role, {})[code] = dict(zip(PERMISSION_ACTIONS, flags))
+    return PermissionMatrix(version, permissions, roles)
+
+
+def get_permission_matrix():
+    """
+    获取当前进程的权限矩阵
+
+    在检查间隔内直接返回进程内矩阵，不访问数据库和缓存
+    """
+    global _matrix
+    matrix = _matrix
+    now = time.monotonic()
+    if matrix is not None and now - matrix.checked_at < PERMISSION_VERSION_CHECK_INTERVAL:
+        return matrix
+
+    version = _shared_version()
+    if matrix is not None and matrix.version == version:
+        matrix.checked_at = now
+        return matrix
+
+    with _matrix_lock:
+        if _matrix is None or _matrix.version != version:
+            _matrix = _compile_matrix(version)
+        return _matrix
+
+
+def _reset_permission_matrix():
+    """更新共享版本号并丢弃本进程的矩阵"""
+    global _matrix
+    cache.set(PERMISSION_VERSION_CACHE_KEY, uuid.uuid4().hex, timeout=None)
+    _matrix = None
+
+
+def invalidate_permission_matrix():
+    """权限配置变化后使所有进程的权限矩阵失效（在事务提交后生效，同一事务内只登记一次）"""
+    connection = transaction.get_connection()
+    if connection.in_atomic_block and any(
+        callback is _reset_permission_matrix for _, callback, *_ in connection.run_on_commit
+    ):
+        return
+    transaction.on_commit(_reset_permission_matrix)
+
 
 def has_permission(user, permission_code, action='view'):
     """
@@ -23,27 +123,7 @@ def has_permission(user, permission_code, action='view'):
     if user.is_superuser or user.role == 'super_admin':
         return True
 
-    # 获取该角色的权限配置
-    try:
-        permission = Permission.objects.get(code=permission_code)
-        role_permission = RolePermission.objects.get(
-            role=user.role,
-            permission=permission
-        )
-
-        # 根据操作类型检查权限
-        action_map = {
-            'view': role_permission.can_view,
-            'create': role_permission.can_create,
-            'edit': role_permission.can_edit,
-            'delete': role_permission.can_delete,
-            'export': role_permission.can_export,
-        }
-
-        return action_map.get(action, False)
-
-    except (Permission.DoesNotExist, RolePermission.DoesNotExist):
-        return False
+    return get_permission_matrix().allows(user.role, permission_code, action)
 
 
 def permission_required(permission_code, action='view'):
@@ -73,43 +153,20 @@ def get_user_permissions(user):
     Returns:
         dict: 按模块分组的权限字典
     """
-    if user.is_superuser or user.role == 'super_admin':
-        # 超级管理员返回所有权限
-        all_permissions = Permission.objects.all()
-        result = {}
-        for perm in all_permissions:
-            if perm.module not in result:
-                result[perm.module] = []
-            result[perm.module].append({
-                'code': perm.code,
-                'name': perm.name,
-                'can_view': True,
-                'can_create': True,
-                'can_edit': True,
-                'can_delete': True,
-                'can_export': True,
-            })
-        return result
-
-    # 获取该角色的权限配置
-    role_permissions = RolePermission.objects.select_related('permission').filter(
-        role=user.role
-    )
+    matrix = get_permission_matrix()
+    is_super_admin = user.is_superuser or user.role == 'super_admin'
+    # 超级管理员返回所有权限
+    role_permissions = {} if is_super_admin else matrix.roles.get(user.role, {})
 
     result = {}
-    for rp in role_permissions:
-        module = rp.permission.module
-        if module not in result:
-            result[module] = []
-
-        result[module].append({
-            'code': rp.permission.code,
-            'name': rp.permission.name,
-            'can_view': rp.can_view,
-            'can_create': rp.can_create,
-            'can_edit': rp.can_edit,
-            'can_delete': rp.can_delete,
-            'can_export': rp.can_export,
+    for code, name, module in matrix.permissions:
+        actions = ALL_ACTIONS if is_super_admin else role_permissions.get(code)
+        if actions is None:
+            continue
+        result.setdefault(module, []).append({
+            'code': code,
+            'name': name,
+            **{f'can_{action}': allowed for action, allowed in actions.items()},
         })
 
     return result
@@ -0,0 +1,56 @@
+"""
+序列化器关联预加载
+
+视图集按序列化器声明它要读取的关联，get_queryset 自动加上 select_related / prefetch_related / annotate，
+列表接口的查询次数不随每页条数增长（避免 N+1）：
+
+    class PaymentBillViewSet(SerializerRelationsMixin, viewsets.ModelViewSet):
+        serializer_relations = {
+            PaymentBillListSerializer: {
+                'select_related': ['community', 'owner', 'property_unit__community', 'property_unit__building'],
+            },
+            PaymentBillSerializer: {
+                'select_related': [...],
+                'prefetch_related': ['payment_records'],
+            },
+        }
+
+声明的键与 QuerySet 方法同名：select_related、prefetch_related（列表）、annotate（{别名: 表达式}），
+序列化器中的计数字段优先读取 annotate 的别名。
+只在 list / retrieve / update / partial_update 时自动应用（导出等 values_list 查询不受影响），
+自定义动作用 with_relations(queryset, serializer_class) 显式应用。
+"""
+
+# 自动应用关联声明的动作（返回序列化器输出的标准动作）
+RELATION_ACTIONS = {'list', 'retrieve', 'update', 'partial_update'}
+
+
+def apply_relations(queryset, relations):
+    """按关联声明优化查询集"""
+    if not relations:
+        return queryset
+    if relations.get('select_related'):
+        queryset = queryset.select_related(*relations['select_related'])
+    if relations.get('prefetch_related'):
+        queryset = queryset.prefetch_related(*relations['prefetch_related'])
+    if relations.get('annotate'):
+        queryset = queryset.annotate(**relations['annotate'])
+    return queryset
+
+
+class SerializerRelationsMixin:
+    """按 serializer_relations 声明自动预加载序列化器用到的关联"""
+
+    # {序列化器类: {'select_related': [...], 'prefetch_related': [...], 'annotate': {...}}}
+    serializer_relations = {}
+
+    def with_relations(self, queryset, serializer_class=None):
+        """按序列化器（默认当前动作的序列化器）的关联声明优化查询集"""
+        serializer_class = serializer_class or self.get_serializer_class()
+        return apply_relations(queryset, self.serializer_relations.get(serializer_class))
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action in RELATION_ACTIONS:
+            queryset = self.with_relations(queryset)
+        return queryset
@@ -0,0 +1,279 @@
+"""
+全文搜索后端
+
+业主姓名/电话、小区名称/地址、报事描述、操作日志描述的模糊搜索（包含匹配）不再直接 icontains 全表扫描，
+而是交给按数据库选择的搜索后端：
+- PostgreSQL：pg_trgm 三元组 GIN 索引（UPPER(列) gin_trgm_ops），icontains 生成的 UPPER(列) LIKE 直接走索引
+- SQLite：FTS5 trigram 分词的外部内容虚拟表（<表名>_fts），由插入/更新/删除触发器同步，MATCH 短语即子串匹配
+- 其他数据库，或 SQLite 低于 3.34 / 未编译 FTS5（不支持 trigram 分词）：icontains，迁移不建全文表
+中文和电话号码片段（如“3800138”）都按三元组匹配，不依赖分词。搜索词少于 3 个字符时三元组无法过滤，退回 icontains。
+
+索引由各应用的迁移创建：core 的迁移创建 pg_trgm 扩展（TrigramExtension），
+各模型的迁移使用 CreateSearchIndex 操作按当前数据库的搜索后端建索引（不改变模型状态）。
+SQLite 重建表（ALTER 字段）时触发器随旧表删除、rowid 重新分配，
+修改 SEARCH_INDEXES 中模型字段的迁移需在末尾再执行一次 CreateSearchIndex（补建缺失的触发器并重建全文索引）。
+可通过 settings.SEARCH_BACKEND 指定后端类的路径替换默认选择。
+"""
+import logging
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.migrations.operations.base import Operation
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Upper
+from django.utils.module_loading import import_string
+from rest_framework import filters
+
+logger = logging.getLogger(__name__)
+
+# 建立搜索索引的字段：{模型标签: (字段名, ...)}，需与各应用迁移中的 CreateSearchIndex 一致
+SEARCH_INDEXES = {
+    'property.Owner': ('name', 'phone'),
+    'community.Community': ('name', 'address'),
+    'maintenance.MaintenanceRequest': ('description',),
+    'core.OperationLog': ('description',),
+}
+
+# 三元组索引可用的最短搜索词
+MIN_TERM_LENGTH = 3
+
+
+def _quote(name):
+    return '"%s"' % name.replace('"', '""')
+
+
+def _columns(model, fields):
+    return [model._meta.get_field(field).column for field in fields]
+
+
+class SearchBackend:
+    """默认后端：icontains"""
+
+    @classmethod
+    def is_available(cls, connection):
+        """数据库是否支持该后端"""
+        return True
+
+    def match(self, model, fields, term):
+        """任一字段包含 term 的查询条件"""
+        condition = Q()
+        for field in fields:
+            condition |= Q(**{f'{field}__icontains': term})
+        return condition
+
+    def create_indexes(self, schema_editor, model, fields):
+        """创建模型字段的搜索索引（已存在的部分跳过）"""
+
+    def drop_indexes(self, schema_editor, model, fields):
+        """删除模型字段的搜索索引"""
+
+
+class PostgresSearchBackend(SearchBackend):
+    """PostgreSQL：pg_trgm GIN 索引加速 icontains（需先创建 pg_trgm 扩展）"""
+
+    def indexes(self, model, fields):
+        from django.contrib.postgres.indexes import GinIndex, OpClass
+
+        table = model._meta.db_table
+        # 表达式与 icontains 生成的 UPPER("列"::text) 一致，查询才能使用该索引
+        return [
+            GinIndex(OpClass(Upper(field), name='gin_trgm_ops'), name=f'{table}_{column}_trgm')
+            for field, column in zip(fields, _columns(model, fields))
+        ]
+
+    def create_indexes(self, schema_editor, model, fields):
+        with schema_editor.connection.cursor() as cursor:
+            existing = schema_editor.connection.introspection.get_constraints(cursor, model._meta.db_table)
+        for index in self.indexes(model, fields):
+            if index.name not in existing:
+                schema_editor.add_index(model, index)
+
+    def drop_indexes(self, schema_editor, model, fields):
+        for index in self.indexes(model, fields):
+            schema_editor.execute(f'DROP INDEX IF EXISTS {_quote(index.name)}')
+
+
+class SQLiteSearchBackend(SearchBackend):
+    """SQLite：FTS5 trigram 外部内容表"""
+
+    # trigram 分词器自 SQLite 3.34 起提供
+    MIN_SQLITE_VERSION = (3, 34, 0)
+
+    @classmethod
+    def is_available(cls, connection):
+        if connection.Database.sqlite_version_info < cls.MIN_SQLITE_VERSION:
+            return False
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA compile_options')
+            options = {row[0] for row in cursor.fetchall()}
+        return 'ENABLE_FTS5' in options
+
+    def fts_table(self, model):
+        return f'{model._meta.db_table}_fts'
+
+    def match(self, model, fields, term):
+        if len(term) < MIN_TERM_LENGTH:
+            return super().match(model, fields, term)
+        table = model._meta.db_table
+        fts = self.fts_table(model)
+        columns = ' '.join(_quote(column) for column in _columns(model, fields))
+        expression = '{%s} : %s' % (columns, _quote(term))
+        return Q(pk__in=RawSQL(
+            f'SELECT {_quote(model._meta.pk.column)} FROM {_quote(table)} WHERE rowid IN '
+            f'(SELECT rowid FROM {_quote(fts)} WHERE {_quote(fts)} MATCH %s)',
+            [expression],
+        ))
+
+    def create_indexes(self, schema_editor, model, fields):
+        table = model._meta.db_table
+        fts = self.fts_table(model)
+        columns = _columns(model, fields)
+        column_list = ', '.join(_quote(column) for column in columns)
+        new_values = ', '.join(f'new.{_quote(column)}' for column in columns)
+        old_values = ', '.join(f'old.{_quote(column)}' for column in columns)
+        delete_old = (
+            f'INSERT INTO {_quote(fts)}({_quote(fts)}, rowid, {column_list}) '
+            f"VALUES ('delete', old.rowid, {old_values});"
+        )
+        insert_new = f'INSERT INTO {_quote(fts)}(rowid, {column_list}) VALUES (new.rowid, {new_values});'
+        statements = {
+            fts: (
+                f'CREATE VIRTUAL TABLE {_quote(fts)} USING fts5({column_list}, '
+                f"content={_quote(table)}, content_rowid='rowid', tokenize='trigram')"
+            ),
+            f'{fts}_ai': f'CREATE TRIGGER {_quote(fts + "_ai")} AFTER INSERT ON {_quote(table)} BEGIN {insert_new} END',
+            f'{fts}_ad': f'CREATE TRIGGER {_quote(fts + "_ad")} AFTER DELETE ON {_quote(table)} BEGIN {delete_old} END',
+            f'{fts}_au': (
+                f'CREATE TRIGGER {_quote(fts + "_au")} AFTER UPDATE ON {_quote(table)} '
+                f'BEGIN {delete_old} {insert_new} END'
+            ),
+        }
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT name FROM sqlite_master WHERE name IN (%s)" % ', '.join(['%s'] * len(statements)),
+                list(statements),
+            )
+            existing = {row[0] for row in cursor.fetchall()}
+        if len(existing) == len(statements):
+            return
+        for name, sql in statements.items():
+            if name not in existing:
+                schema_editor.execute(sql, None)
+        # 新建或触发器缺失期间的变更未同步，从原表重建
+        schema_editor.execute(f"INSERT INTO {_quote(fts)}({_quote(fts)}) VALUES ('rebuild')", None)
+        logger.info(f'已重建全文索引: {fts}')
+
+    def drop_indexes(self, schema_editor, model, fields):
+        fts = self.fts_table(model)
+        for suffix in ('_ai', '_ad', '_au'):
+            schema_editor.execute(f'DROP TRIGGER IF EXISTS {_quote(fts + suffix)}', None)
+        schema_editor.execute(f'DROP TABLE IF EXISTS {_quote(fts)}', None)
+
+
+BACKENDS = {
+    'postgresql': PostgresSearchBackend,
+    'sqlite': SQLiteSearchBackend,
+}
+
+_backends = {}
+
+
+def get_search_backend(using=DEFAULT_DB_ALIAS):
+    """获取数据库对应的搜索后端"""
+    if using not in _backends:
+        connection = connections[using]
+        path = getattr(settings, 'SEARCH_BACKEND', '')
+        backend_class = import_string(path) if path else BACKENDS.get(connection.vendor, SearchBackend)
+        if not backend_class.is_available(connection):
+            logger.warning(f'数据库 {using} 不支持搜索后端 {backend_class.__name__}，搜索退回 icontains')
+            backend_class = SearchBackend
+        _backends[using] = backend_class()
+    return _backends[using]
+
+
+def search_q(model, fields, term, using=DEFAULT_DB_ALIAS):
+    """
+    任一字段包含 term 的查询条件；SEARCH_INDEXES 中的字段经搜索后端匹配，其余字段 icontains
+
+    Args:
+        fields: 字段名列表（可以跨关联，如 operator__username）
+    """
+    indexed = [field for field in fields if field in SEARCH_INDEXES.get(model._meta.label, ())]
+    condition = Q()
+    if indexed:
+        condition |= get_search_backend(using).match(model, indexed, term)
+    for field in fields:
+        if field not in indexed:
+            condition |= Q(**{f'{field}__icontains': term})
+    return condition
+
+
+class CreateSearchIndex(Operation):
+    """
+    迁移操作：按当前数据库的搜索后端为模型字段创建搜索索引（模型状态不变）
+
+    可重复执行：已存在的索引、全文表和触发器跳过；SQLite 上有缺失部分时补建并重建全文索引
+    """
+    reversible = True
+    reduces_to_sql = False
+
+    def __init__(self, model_name, fields):
+        self.model_name = model_name
+        self.fields = tuple(fields)
+
+    def deconstruct(self):
+        return self.__class__.__name__, [self.model_name, list(self.fields)], {}
+
+    def state_forwards(self, app_label, state):
+        pass
+
+    def _model(self, app_label, state):
+        return state.apps.get_model(app_label, self.model_name)
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        model = self._model(app_label, to_state)
+        if self.allow_migrate_model(schema_editor.connection.alias, model):
+            get_search_backend(schema_editor.connection.alias).create_indexes(schema_editor, model, self.fields)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        model = self._model(app_label, from_state)
+        if self.allow_migrate_model(schema_editor.connection.alias, model):
+            get_search_backend(schema_editor.connection.alias).drop_indexes(schema_editor, model, self.fields)
+
+    def describe(self):
+        return f'Create search index on {self.model_name} ({", ".join(self.fields)})'
+
+    @property
+    def migration_name_fragment(self):
+        return f'{self.model_name.lower()}_search_index'
+
+
+class IndexedSearchFilter(filters.SearchFilter):
+    """
+    REST 接口搜索：search_fields 中无前缀的字段经 search_q 匹配（建有搜索索引的字段走搜索后端），
+    带前缀的字段（=、^、$、@）按 DRF 原有方式匹配
+    """
+
+    def search_condition(self, queryset, search_fields, term):
+        """单个搜索词的查询条件"""
+        search_fields = [str(field) for field in search_fields]
+        plain = [field for field in search_fields if field[0] not in self.lookup_prefixes]
+        condition = search_q(queryset.model, plain, term, using=queryset.db)
+        for field in search_fields:
+            if field[0] in self.lookup_prefixes:
+                condition |= Q(**{self.construct_search(field): term})
+        return condition
+
+    def filter_queryset(self, request, queryset, view):
+        search_fields = self.get_search_fields(view, request)
+        search_terms = self.get_search_terms(request)
+        if not search_fields or not search_terms:
+            return queryset
+
+        base = queryset
+        for term in search_terms:
+            queryset = queryset.filter(self.search_condition(base, search_fields, term))
+        if self.must_call_distinct(base, search_fields):
+            queryset = queryset.distinct()
+        return queryset
@@ -1,10 +1,13 @@
 """
 Core Signals
 """
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 from django.contrib.auth import get_user_model
 
+from .models import Permission, RolePermission
+from .permissions_utils import invalidate_permission_matrix
+
 User = get_user_model()
 
 
@@ -16,3 +19,12 @@ def create_user_profile(sender, instance, created, **kwargs):
     if created:
         # 可以在这里添加用户创建后的额外处理逻辑
         pass
+
+
+@receiver([post_save, post_delete], sender=Permission)
+@receiver([post_save, post_delete], sender=RolePermission)
+def permission_changed(sender, **kwargs):
+    """
+    权限配置变化时使权限矩阵失效
+    """
+    invalidate_permission_matrix()
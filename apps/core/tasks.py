@@ -0,0 +1,35 @@
+"""
+Core Tasks - 系统后台任务
+"""
+import logging
+
+from celery import shared_task
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def deliver_notifications(notification_ids):
+    """
+    发送一批通知到短信、微信、邮件等渠道
+
+    先认领再发送：已被其他 Worker 认领或已发送的通知会被跳过，任务重复执行不会重复发送
+    """
+    from .delivery import deliver_pending
+
+    result = deliver_pending(ids=notification_ids)
+    if result['sent'] < result['claimed']:
+        logger.warning(f"通知发送失败 {result['claimed'] - result['sent']} 条，已安排重试")
+    return result
+
+
+@shared_task
+def deliver_due_notifications():
+    """
+    发送所有到期的待发送通知（定时执行）
+
+    包括到了重试时间的失败通知，以及 Worker 异常退出后租约已过期的通知
+    """
+    from .delivery import deliver_pending
+
+    return deliver_pending()
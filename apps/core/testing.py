@@ -0,0 +1,39 @@
+"""
+测试辅助：列表接口的 N+1 查询检测
+"""
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+class QueryCountMixin:
+    """TestCase 混入：断言列表接口的查询次数不随返回条数增长"""
+
+    def assertListQueriesConstant(self, urls, make_row, sizes=(2, 6)):
+        """
+        依次补建数据到 sizes 中的每个行数，以 page_size=行数 请求各列表接口，比较各次的查询次数
+
+        Args:
+            urls: 列表接口地址（需已登录）
+            make_row: make_row(index)，为每个接口各创建一行数据
+            sizes: 递增的行数，均不超过接口的每页条数上限
+        """
+        # 预热：首次请求会加载权限矩阵等缓存，不计入比较
+        for url in urls:
+            self.client.get(url)
+
+        counts = {url: [] for url in urls}
+        created = 0
+        for size in sizes:
+            while created < size:
+                make_row(created)
+                created += 1
+            for url in urls:
+                with CaptureQueriesContext(connection) as context:
+                    response = self.client.get(url, {'page_size': size})
+                self.assertEqual(response.status_code, 200, url)
+                self.assertEqual(len(response.json()['results']), size, url)
+                counts[url].append(len(context.captured_queries))
+
+        growing = {url: dict(zip(sizes, values)) for url, values in counts.items() if len(set(values)) > 1}
+        if growing:
+            self.fail(f'查询次数随返回条数增长（N+1）: {growing}')
@@ -0,0 +1,1017 @@
+"""
+核心模块单元测试
+"""
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from apps.community.models import Community, Building
+from apps.property.models import Property, Owner, OwnerProperty, Tenant
+from apps.payment.models import PaymentBill, PaymentRecord
+from apps.maintenance.models import MaintenanceRequest
+from .audit import AuditLogWriter
+from .cache import TieredCache
+from .http_client import HttpClient
+from .dashboard import get_dashboard_stats
+from .models import Notification, OperationLog, Permission, RolePermission
+from .notification_service import NotificationService
+from .testing import QueryCountMixin
+from . import permissions_utils
+from .permissions_utils import has_permission, get_user_permissions
+
+User = get_user_model()
+
+
+def create_community_with_bill(index, amount=Decimal('100.00'), paid=Decimal('0')):
+    """创建带一张本月账单的小区（可选带缴费记录）"""
+    now = timezone.now()
+    community = Community.objects.create(name=f'测试小区{index}', address='测试地址')
+    building = Building.objects.create(community=community, name='1号楼')
+    property_obj = Property.objects.create(
+        community=community, building=building, floor=1, room_number='01', area=Decimal('100.00')
+    )
+    owner = Owner.objects.create(name=f'业主{index}', phone=f'1380000{index:04d}')
+    OwnerProperty.objects.create(owner=owner, property=property_obj, is_primary=True)
+    bill = PaymentBill.objects.create(
+        bill_number=f'BILL{index:06d}',
+        community=community,
+        property_unit=property_obj,
+        owner=owner,
+        fee_type='property',
+        billing_period=now.strftime('%Y-%m'),
+        amount=amount,
+        paid_amount=paid,
+        status='paid' if paid >= amount else 'unpaid',
+        due_date=now.date(),
+    )
+    if paid:
+        PaymentRecord.objects.create(
+            bill=bill,
+            transaction_id=f'TXN{index:06d}',
+            out_trade_no=f'ORD{index:06d}',
+            payer=owner.name,
+            amount=paid,
+            payment_time=now,
+        )
+    return community
+
+
+class DashboardStatsTest(TestCase):
+    """仪表盘统计聚合测试"""
+
+    def create_community_with_bill(self, *args, **kwargs):
+        """创建测试数据并执行提交后的快照刷新"""
+        with self.captureOnCommitCallbacks(execute=True):
+            return create_community_with_bill(*args, **kwargs)
+
+    def test_collection_rate(self):
+        """测试收缴率计算"""
+        self.create_community_with_bill(1, amount=Decimal('100.00'), paid=Decimal('100.00'))
+        self.create_community_with_bill(2, amount=Decimal('100.00'))
+
+        stats = get_dashboard_stats()
+
+        self.assertEqual(stats['total_communities'], 2)
+        self.assertEqual(stats['monthly_revenue'], Decimal('100.00'))
+        self.assertEqual(stats['collection_rate'], 50.0)
+        rates = {item['name']: item['rate'] for item in stats['community_stats']}
+        self.assertEqual(rates, {'测试小区1': 100.0, '测试小区2': 0})
+        self.assertTrue(all(item['bills_count'] == 1 for item in stats['community_stats']))
+
+    def test_category_breakdown(self):
+        """测试报事类别统计"""
+        community = self.create_community_with_bill(1)
+        property_obj = Property.objects.get(community=community)
+        for category in ['electric', 'electric', 'plumbing']:
+            MaintenanceRequest.objects.create(
+                community=community,
+                property=property_obj,
+                reporter='张三',
+                reporter_phone='13800138000',
+                category=category,
+                description='测试'
+            )
+
+        stats = get_dashboard_stats()
+
+        counts = {item['key']: item['count'] for item in stats['requests_by_category']}
+        self.assertEqual(counts['electric'], 2)
+        self.assertEqual(counts['plumbing'], 1)
+        self.assertEqual(counts['other'], 0)
+        self.assertEqual(stats['pending_requests'], 3)
+
+    def test_query_count_is_constant(self):
+        """测试查询次数不随小区数量增长"""
+        self.create_community_with_bill(1, paid=Decimal('50.00'))
+        with CaptureQueriesContext(connection) as small:
+            get_dashboard_stats()
+
+        for index in range(2, 12):
+            self.create_community_with_bill(index, paid=Decimal('50.00'))
+        with CaptureQueriesContext(connection) as large:
+            stats = get_dashboard_stats()
+
+        self.assertEqual(len(stats['community_stats']), 11)
+        self.assertEqual(len(small), len(large))
+        with self.assertNumQueries(11):
+            get_dashboard_stats()
+
+    def test_dashboard_stats_api(self):
+        """测试仪表盘统计API"""
+        self.create_community_with_bill(1, paid=Decimal('100.00'))
+        user = User.objects.create_user(username='admin', password='admin123', role='admin')
+        self.client.force_login(user)
+
+        response = self.client.get('/admin/api/dashboard/stats/')
+
+        self.assertEqual(response.status_code, 200)
+        data = response.json()['data']
+        self.assertEqual(float(data['collection_rate']), 100.0)
+        self.assertEqual(Decimal(data['monthly_revenue']), Decimal('100.00'))
+        self.assertEqual(len(data['requests_by_category']), 7)
+
+
+class PermissionMatrixTest(TestCase):
+    """权限矩阵缓存测试"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.view_perm = Permission.objects.create(name='查看房产', code='property.view', module='房产管理')
+        self.export_perm = Permission.objects.create(name='导出账单', code='payment.export', module='缴费管理')
+        RolePermission.objects.create(role='finance', permission=self.export_perm, can_export=True)
+        self.user = User.objects.create_user(username='finance', password='finance123', role='finance')
+        permissions_utils._reset_permission_matrix()
+
+    def test_checks_are_dictionary_lookups(self):
+        """测试矩阵编译后权限检查不再查询数据库"""
+        has_permission(self.user, 'payment.export', 'export')
+
+        with self.assertNumQueries(0):
+            self.assertTrue(has_permission(self.user, 'payment.export', 'export'))
+            self.assertFalse(has_permission(self.user, 'payment.export', 'delete'))
+            self.assertFalse(has_permission(self.user, 'property.view'))
+            permissions = get_user_permissions(self.user)
+
+        self.assertEqual(list(permissions), ['缴费管理'])
+        self.assertTrue(permissions['缴费管理'][0]['can_export'])
+
+    def test_super_admin_has_all_permissions(self):
+        """测试超级管理员拥有所有权限"""
+        admin = User.objects.create_user(username='root', password='root123', role='super_admin')
+
+        self.assertTrue(has_permission(admin, 'property.view', 'delete'))
+        self.assertEqual(sorted(get_user_permissions(admin)), ['房产管理', '缴费管理'])
+
+
+class PermissionMatrixInvalidationTest(TransactionTestCase):
+    """权限矩阵失效测试（需要真实提交事务以触发 on_commit）"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.view_perm = Permission.objects.create(name='查看房产', code='property.view', module='房产管理')
+        self.export_perm = Permission.objects.create(name='导出账单', code='payment.export', module='缴费管理')
+        RolePermission.objects.create(role='finance', permission=self.export_perm, can_export=True)
+        self.user = User.objects.create_user(username='finance', password='finance123', role='finance')
+
+    def test_signal_invalidates_matrix(self):
+        """测试权限配置变化后矩阵失效"""
+        self.assertFalse(has_permission(self.user, 'property.view'))
+
+        RolePermission.objects.create(role='finance', permission=self.view_perm)
+        RolePermission.objects.filter(permission=self.export_perm).delete()
+
+        self.assertTrue(has_permission(self.user, 'property.view'))
+        self.assertFalse(has_permission(self.user, 'payment.export', 'export'))
+
+    def test_bulk_update_refreshes_once(self):
+        """测试批量更新角色权限后只刷新一次矩阵"""
+        from unittest import mock
+        from rest_framework.test import APIClient
+
+        admin = User.objects.create_user(username='admin', password='admin123', role='admin')
+        client = APIClient()
+        client.force_authenticate(user=admin)
+        has_permission(self.user, 'property.view')
+
+        with mock.patch.object(
+            permissions_utils, '_reset_permission_matrix', wraps=permissions_utils._reset_permission_matrix
+        ) as reset:
+            response = client.post('/api/auth/role-permissions/bulk_update/', {
+                'role': 'finance',
+                'permissions': [
+                    {'permission': str(self.view_perm.id), 'can_view': True},
+                    {'permission': str(self.export_perm.id), 'can_view': True, 'can_export': True},
+                ],
+            }, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(reset.call_count, 1)
+        self.assertTrue(has_permission(self.user, 'property.view'))
+        self.assertTrue(has_permission(self.user, 'payment.export', 'export'))
+
+
+@override_settings(CACHES={
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'tiered-test-default'},
+    'fake': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'tiered-test-remote'},
+})
+class TieredCacheTest(TestCase):
+    """两级缓存测试（共享缓存由本地内存缓存代替）"""
+
+    def setUp(self):
+        """测试前准备"""
+        from django.core.cache import caches
+
+        self.remote = caches['fake']
+        self.remote.clear()
+        self.cache = TieredCache('test', {'OPTIONS': {'REMOTE': 'fake', 'LOCAL_TIMEOUT': 60}})
+        self.cache.clear()
+        self.cache.reset_stats()
+
+    def test_read_through_and_counters(self):
+        """测试本地未命中时读取共享缓存并回填本地"""
+        self.remote.set('key', 'remote-value')
+
+        self.assertEqual(self.cache.get('key'), 'remote-value')
+        self.assertEqual(self.cache.get('key'), 'remote-value')
+        self.assertIsNone(self.cache.get('missing'))
+
+        stats = self.cache.stats()
+        self.assertEqual((stats['local_hits'], stats['remote_hits'], stats['misses']), (1, 1, 1))
+        self.assertAlmostEqual(stats['hit_rate'], 0.6667)
+
+    def test_write_through_and_delete(self):
+        """测试写入和删除同时作用于两级"""
+        self.cache.set('key', 'value')
+        self.assertEqual(self.remote.get('key'), 'value')
+
+        self.remote.delete('key')
+        # 本地仍然命中（有效期内的跨进程延迟）
+        self.assertEqual(self.cache.get('key'), 'value')
+
+        self.cache.delete('key')
+        self.assertIsNone(self.cache.get('key'))
+
+    def test_get_many_and_incr(self):
+        """测试批量读取与计数器"""
+        self.cache.set('a', 1)
+        self.remote.set('b', 2)
+
+        self.assertEqual(self.cache.get_many(['a', 'b', 'c']), {'a': 1, 'b': 2})
+        self.assertEqual(self.cache.incr('a'), 2)
+        self.assertEqual(self.cache.get('a'), 2)
+
+
+class AuditLogWriterTest(TestCase):
+    """操作日志批量写入测试"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.user = User.objects.create_user(username='admin', password='admin123', role='admin')
+        self.writer = AuditLogWriter(batch_size=2, max_queue_size=3, autostart=False)
+
+    def entry(self, index):
+        return {
+            'operator_id': self.user.pk, 'action': '登录', 'module': '用户管理',
+            'description': f'第{index}次登录', 'ip_address': '127.0.0.1', 'created_at': timezone.now(),
+        }
+
+    def test_flush_in_batches(self):
+        """测试按批次写入"""
+        for index in range(3):
+            self.writer.enqueue(self.entry(index))
+
+        with self.assertNumQueries(2):
+            self.assertEqual(self.writer.flush(), 3)
+
+        self.assertEqual(OperationLog.objects.filter(operator=self.user).count(), 3)
+        self.assertEqual(self.writer.stats()['written'], 3)
+        self.assertEqual(self.writer.stats()['pending'], 0)
+
+    def test_drops_when_queue_full(self):
+        """测试队列已满时丢弃并计数"""
+        results = [self.writer.enqueue(self.entry(index)) for index in range(5)]
+
+        self.assertEqual(results, [True, True, True, False, False])
+        self.assertEqual(self.writer.stats()['dropped'], 2)
+
+    def test_log_operation_is_queued(self):
+        """测试请求中记录日志只入队，不写数据库"""
+        from unittest import mock
+        from django.test import RequestFactory
+        from . import audit
+        from .views import log_operation
+
+        request = RequestFactory().get('/', REMOTE_ADDR='10.0.0.1')
+        request.user = self.user
+        with mock.patch.object(audit, 'audit_writer', self.writer):
+            with self.captureOnCommitCallbacks(execute=True), self.assertNumQueries(0):
+                log_operation(request, '导出', '系统管理', '导出操作日志')
+            self.writer.flush()
+
+        log = OperationLog.objects.get(description='导出操作日志')
+        self.assertEqual(log.operator, self.user)
+        self.assertEqual(log.ip_address, '10.0.0.1')
+
+
+class HttpClientTest(TestCase):
+    """对外 HTTP 客户端测试"""
+
+    def setUp(self):
+        """启动本地 HTTP 服务，记录连接数和请求数"""
+        import threading
+        from http.server import BaseHTTPRequestHandler, HTTPServer
+
+        self.connections = 0
+        self.responses = []
+        test = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def setup(self):
+                test.connections += 1
+                super().setup()
+
+            def do_GET(self):
+                status_code = test.responses.pop(0) if test.responses else 200
+                self.send_response(status_code)
+                self.send_header('Content-Length', '2')
+                self.end_headers()
+                self.wfile.write(b'ok')
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = HTTPServer(('127.0.0.1', 0), Handler)
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        self.addCleanup(self.httpd.server_close)
+        self.addCleanup(self.httpd.shutdown)
+        self.url = f'http://127.0.0.1:{self.httpd.server_port}/cgi-bin/token'
+        self.client = HttpClient(BACKOFF_FACTOR=0)
+        self.addCleanup(self.client.session.close)
+
+    def test_keep_alive_and_stats(self):
+        """测试连接复用和按接口统计"""
+        for _ in range(3):
+            self.assertEqual(self.client.get(self.url).status_code, 200)
+
+        self.assertEqual(self.connections, 1)
+        stats = self.client.stats()[f'GET 127.0.0.1:{self.httpd.server_port}/cgi-bin/token']
+        self.assertEqual((stats['count'], stats['errors']), (3, 0))
+
+    def test_retry_on_unavailable(self):
+        """测试 503 时有限次数重试"""
+        self.responses = [503, 503]
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+
+        self.responses = [503, 503, 503]
+        self.assertEqual(self.client.get(self.url).status_code, 503)
+        self.assertEqual(self.client.stats()[f'GET 127.0.0.1:{self.httpd.server_port}/cgi-bin/token']['errors'], 1)
+
+
+class NotificationFanoutTest(TestCase):
+    """批量缴费提醒测试"""
+
+    def setUp(self):
+        """测试前准备"""
+        for index in range(1, 13):
+            create_community_with_bill(index)
+        self.bills = list(PaymentBill.objects.select_related('owner').order_by('bill_number'))
+
+    def test_reminders_created_in_bulk(self):
+        """测试提醒以固定次数的查询批量生成，当天已提醒的账单不重复生成"""
+        Notification.objects.create(
+            notification_type='payment_reminder', title='已提醒', content='', related_bill=self.bills[0], status='read'
+        )
+
+        with self.captureOnCommitCallbacks() as callbacks, self.assertNumQueries(2):
+            count = NotificationService.check_and_send_payment_reminders()
+
+        self.assertEqual(count, 11)
+        self.assertEqual(Notification.objects.filter(notification_type='payment_reminder', status='pending').count(), 11)
+        reminder = Notification.objects.get(related_bill=self.bills[1])
+        self.assertIn(self.bills[1].bill_number, reminder.title)
+        self.assertEqual(reminder.recipient_phone, self.bills[1].owner.phone)
+
+        # 提交后交给后台任务发送
+        for callback in callbacks:
+            callback()
+        self.assertEqual(Notification.objects.filter(notification_type='payment_reminder', status='sent').count(), 11)
+        self.assertEqual(NotificationService.check_and_send_payment_reminders(), 0)
+
+    def test_overdue_notices_every_seven_days(self):
+        """测试逾期天数为7的倍数时发送催缴"""
+        today = timezone.localdate()
+        PaymentBill.objects.filter(pk=self.bills[0].pk).update(due_date=today - timedelta(days=14))
+        PaymentBill.objects.filter(pk=self.bills[1].pk).update(due_date=today - timedelta(days=10))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            count = NotificationService.check_and_send_overdue_notices()
+
+        self.assertEqual(count, 1)
+        notice = Notification.objects.get(notification_type='payment_overdue')
+        self.assertEqual((notice.related_bill_id, notice.status), (self.bills[0].pk, 'sent'))
+        self.assertIn('滞纳金：¥0.70', notice.content)
+
+
+class StubProvider:
+    """测试用服务商：记录发送的地址，地址在 failing 中时抛出异常"""
+
+    sent = []
+    failing = set()
+
+    def __init__(self, channel):
+        self.channel = channel
+
+    def send(self, notification, address):
+        if address in self.failing:
+            raise ConnectionError('服务商不可用')
+        self.sent.append((self.channel, address))
+
+
+STUB_CHANNELS = {
+    'sms': {'PROVIDER': 'apps.core.tests.StubProvider', 'RATE': 40, 'BURST': 5, 'WORKERS': 4},
+    'wechat': {'PROVIDER': 'apps.core.tests.StubProvider', 'RATE': 1000, 'BURST': 1000, 'WORKERS': 4},
+}
+
+
+@override_settings(NOTIFICATION_CHANNELS=STUB_CHANNELS)
+class NotificationDeliveryTest(TestCase):
+    """通知渠道发送测试"""
+
+    def setUp(self):
+        """测试前准备"""
+        from .delivery import _reset_delivery_engine
+
+        StubProvider.sent = []
+        StubProvider.failing = set()
+        _reset_delivery_engine()
+        self.addCleanup(_reset_delivery_engine)
+
+    def create(self, index, **kwargs):
+        return Notification.objects.create(
+            notification_type='system_announcement', title=f'通知{index}', content='',
+            recipient_phone=f'1380000{index:04d}', recipient_openid=f'openid-{index}',
+            send_channels={'sms': True, 'wechat': True, 'email': False}, **kwargs
+        )
+
+    def test_deliver_with_rate_limit(self):
+        """测试按渠道并发发送，短信按令牌桶限速"""
+        from .delivery import deliver_pending
+
+        for index in range(15):
+            self.create(index)
+
+        started = time.monotonic()
+        result = deliver_pending()
+        elapsed = time.monotonic() - started
+
+        self.assertEqual(result, {'claimed': 15, 'sent': 15})
+        self.assertEqual(len(StubProvider.sent), 30)
+        # 突发 5 条后按每秒 40 条发送其余 10 条
+        self.assertGreaterEqual(elapsed, 0.2)
+        self.assertFalse(Notification.objects.exclude(status='sent').exists())
+
+    def test_failed_channel_retried_with_backoff(self):
+        """测试失败渠道按指数退避重试，成功的渠道不重复发送，超过次数后标记失败"""
+        from .delivery import claim_notifications, deliver_pending
+
+        notification = self.create(1, max_retries=2)
+        StubProvider.failing = {'openid-1'}
+
+        before = timezone.now()
+        deliver_pending()
+        notification.refresh_from_db()
+        self.assertEqual((notification.status, notification.retry_count), ('pending', 1))
+        self.assertEqual(notification.channel_status, {'sms': 'sent', 'wechat': 'failed'})
+        self.assertGreaterEqual(notification.next_retry_at, before + timedelta(seconds=60))
+        self.assertIn('微信推送', notification.error_message)
+        self.assertEqual(claim_notifications(), [])
+
+        Notification.objects.filter(pk=notification.pk).update(next_retry_at=timezone.now())
+        deliver_pending()
+        notification.refresh_from_db()
+        self.assertEqual((notification.status, notification.retry_count), ('failed', 2))
+        self.assertEqual(StubProvider.sent, [('sms', '13800000001')])
+
+    def test_claimed_notifications_not_claimed_again(self):
+        """测试已认领的通知在租约内不会被再次认领，租约过期后可重新认领"""
+        from .delivery import claim_notifications
+
+        notification = self.create(1)
+        self.assertEqual(len(claim_notifications()), 1)
+        self.assertEqual(claim_notifications(), [])
+
+        Notification.objects.filter(pk=notification.pk).update(next_retry_at=timezone.now() - timedelta(seconds=1))
+        self.assertEqual([n.pk for n in claim_notifications()], [notification.pk])
+
+
+class AnnouncementTest(TestCase):
+    """系统公告测试"""
+
+    def setUp(self):
+        """测试前准备"""
+        from django.core.cache import cache
+
+        cache.clear()
+        self.admin = User.objects.create_user(username='admin', password='testpass123', role='admin')
+        self.finance = User.objects.create_user(username='finance', password='testpass123', role='finance')
+        self.owners = [
+            User.objects.create_user(username=f'owner{index}', password='testpass123', role='owner')
+            for index in range(3)
+        ]
+
+    def test_announcement_stored_once(self):
+        """测试发布公告的写入次数与用户数无关"""
+        # 一条 INSERT（另有事务保存点的两条语句）
+        with self.assertNumQueries(3):
+            NotificationService.send_system_announcement('停水通知', '明日停水')
+        with self.assertNumQueries(4):
+            NotificationService.send_system_announcement('财务例会', '周五例会', target_roles=['finance', 'admin'])
+
+        self.assertFalse(Notification.objects.exists())
+        self.assertEqual(NotificationService.get_unread_count(self.owners[0]), 1)
+        self.assertEqual(NotificationService.get_unread_count(self.finance), 2)
+
+    def test_read_state_per_user(self):
+        """测试阅读回执只影响当前用户"""
+        announcement = NotificationService.send_system_announcement('停水通知', '明日停水')
+        self.client.force_login(self.owners[0])
+
+        response = self.client.get(f'/admin/api/notifications/{announcement.id}/mark-read/')
+        self.assertTrue(response.json()['success'])
+        self.assertEqual(self.client.get('/admin/api/notifications/unread-count/').json()['unread_count'], 0)
+        self.assertEqual(NotificationService.get_unread_count(self.owners[1]), 1)
+
+        notifications = self.client.get('/admin/api/notifications/').json()['notifications']
+        self.assertEqual([(item['title'], item['status']) for item in notifications], [('停水通知', 'read')])
+
+    def test_announcements_before_joining_hidden(self):
+        """测试注册前发布的公告不计入未读"""
+        NotificationService.send_system_announcement('停水通知', '明日停水')
+        newcomer = User.objects.create_user(username='newcomer', password='testpass123', role='owner')
+
+        self.assertEqual(NotificationService.get_unread_count(newcomer), 0)
+        self.assertEqual(NotificationService.mark_announcements_read(self.admin), 1)
+        self.assertEqual(NotificationService.get_unread_count(self.admin), 0)
+
+
+class UnreadCounterTest(TestCase):
+    """未读数计数器测试"""
+
+    def setUp(self):
+        """测试前准备"""
+        from django.core.cache import cache
+
+        cache.clear()
+        self.user = User.objects.create_user(username='owner', password='testpass123', role='owner')
+
+    def deliver(self, count):
+        """生成并发送若干条站内通知"""
+        from .delivery import deliver_pending
+
+        for index in range(count):
+            Notification.objects.create(
+                notification_type='payment_reminder', title=f'通知{index}', content='', recipient=self.user
+            )
+        with self.captureOnCommitCallbacks(execute=True):
+            deliver_pending()
+
+    def test_counter_follows_delivery_and_reads(self):
+        """测试发送成功加一、标记已读减一，读取时不查询通知表"""
+        self.assertEqual(NotificationService.get_unread_count(self.user), 0)
+        self.deliver(3)
+        self.assertEqual(NotificationService.get_unread_count(self.user), 3)
+
+        # 绕过计数器的数据库修改不影响读取结果，直到计数器过期
+        Notification.objects.filter(recipient=self.user).update(status='read')
+        self.assertEqual(NotificationService.get_unread_count(self.user), 3)
+        Notification.objects.filter(recipient=self.user).update(status='sent')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Notification.objects.filter(recipient=self.user).first().mark_as_read()
+        self.assertEqual(NotificationService.get_unread_count(self.user), 2)
+
+        self.client.force_login(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.get('/admin/api/notifications/mark-all-read/')
+        self.assertEqual(self.client.get('/admin/api/notifications/unread-count/').json()['unread_count'], 0)
+
+    def test_dashboard_shows_unread_count(self):
+        """测试仪表盘的通知角标显示实际未读数"""
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get('/admin/').context['unread_notifications'], 0)
+        self.deliver(2)
+        self.assertEqual(self.client.get('/admin/').context['unread_notifications'], 2)
+
+    def test_announcement_publish_refreshes_counter(self):
+        """测试发布公告后重新统计未读公告数，阅读后减一"""
+        self.assertEqual(NotificationService.get_unread_count(self.user), 0)
+        with self.captureOnCommitCallbacks(execute=True):
+            announcement = NotificationService.send_system_announcement('停水通知', '明日停水')
+        self.assertEqual(NotificationService.get_unread_count(self.user), 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            NotificationService.mark_announcements_read(self.user, [announcement.id])
+        self.assertEqual(NotificationService.get_unread_count(self.user), 0)
+
+
+class RealtimeEventsTest(TestCase):
+    """实时事件推送测试"""
+
+    def setUp(self):
+        """测试前准备"""
+        from .events import _reset_broker
+
+        _reset_broker()
+        self.addCleanup(_reset_broker)
+        self.staff = User.objects.create_user(username='staff', password='testpass123', role='staff')
+
+    def test_stream_requires_login(self):
+        """测试未登录时返回401"""
+        from asgiref.sync import async_to_sync
+        from django.test import AsyncClient
+
+        async def fetch():
+            return await AsyncClient().get('/admin/api/events/')
+
+        response = async_to_sync(fetch)()
+        self.assertEqual(response.status_code, 401)
+
+    def test_stream_unavailable_under_wsgi(self):
+        """测试 WSGI 下不建立长连接直接返回503，页面默认不连接事件流"""
+        self.client.login(username='staff', password='testpass123')
+        response = self.client.get('/admin/api/events/')
+        self.assertEqual(response.status_code, 503)
+
+        response = self.client.get('/admin/')
+        self.assertFalse(response.context['live_events_enabled'])
+        self.assertNotContains(response, 'data-live-events')
+        with self.settings(EVENTS_STREAM_ENABLED=True):
+            response = self.client.get('/admin/')
+        self.assertContains(response, '<body data-live-events>')
+
+    def test_split_deployment_requires_redis_broker(self):
+        """测试事件流由单独服务处理但未配置 EVENTS_REDIS_URL 时拒绝退回进程内广播"""
+        from django.core.exceptions import ImproperlyConfigured
+        from .events import LocalBroker, get_broker
+
+        with self.settings(EVENTS_REDIS_URL='', EVENTS_STREAM_ENABLED=True):
+            with self.assertRaises(ImproperlyConfigured):
+                get_broker()
+        with self.settings(EVENTS_REDIS_URL='', EVENTS_STREAM_ENABLED=False):
+            self.assertIsInstance(get_broker(), LocalBroker)
+
+    def test_stream_pushes_subscribed_events(self):
+        """测试事件流推送本人通知和管理端事件，并按公告目标角色过滤"""
+        import json
+        from asgiref.sync import async_to_sync
+        from django.test import RequestFactory
+        from .events import STAFF_CHANNEL, get_broker, user_channel
+        from .views import event_stream
+
+        request = RequestFactory().get('/admin/api/events/')
+        request.user = self.staff
+        request.scope = {'type': 'http'}
+
+        def message(event_type, data):
+            return json.dumps({'type': event_type, 'data': data})
+
+        async def read_stream():
+            response = await event_stream(request)
+            chunks = response.streaming_content
+            received = [await chunks.__anext__()]
+            broker = get_broker()
+            broker.publish(user_channel('other'), message('notification', {'title': '他人的通知'}))
+            broker.publish(STAFF_CHANNEL, message('announcement', {'title': '业主公告', 'roles': ['owner']}))
+            broker.publish(user_channel(self.staff.pk), message('notification', {'title': '缴费提醒'}))
+            broker.publish(STAFF_CHANNEL, message('dashboard', {'pending_requests': 1}))
+            received += [await chunks.__anext__(), await chunks.__anext__()]
+            await chunks.aclose()
+            return received, broker._subscriptions[STAFF_CHANNEL]
+
+        received, remaining = async_to_sync(read_stream)()
+        self.assertEqual(received, [
+            b'retry: 5000\n\n',
+            'event: notification\ndata: {"title": "缴费提醒"}\n\n'.encode('utf-8'),
+            b'event: dashboard\ndata: {"pending_requests": 1}\n\n',
+        ])
+        # 连接关闭后取消订阅
+        self.assertEqual(remaining, set())
+
+    def test_stream_ends_when_client_disconnects(self):
+        """测试 DisconnectWatcher 接管 receive() 检测断开，事件流随即结束并取消订阅"""
+        import asyncio
+        from asgiref.sync import async_to_sync
+        from django.test import RequestFactory
+        from .events import DISCONNECT_SCOPE_KEY, DisconnectWatcher, STAFF_CHANNEL, get_broker
+        from .views import event_stream
+
+        async def run():
+            messages = asyncio.Queue()
+            await messages.put({'type': 'http.request', 'body': b'', 'more_body': False})
+            streamed = []
+
+            async def app(scope, receive, send):
+                # 模拟 Django：读完请求体后不再调用 receive()，只发送流式响应
+                self.assertIn(DISCONNECT_SCOPE_KEY, scope)
+                await receive()
+                request = RequestFactory().get('/admin/api/events/')
+                request.user = self.staff
+                request.scope = scope
+                response = await event_stream(request)
+                async for chunk in response.streaming_content:
+                    streamed.append(chunk)
+
+            task = asyncio.ensure_future(DisconnectWatcher(app)({'type': 'http'}, messages.get, None))
+            while not streamed:
+                await asyncio.sleep(0)
+            await messages.put({'type': 'http.disconnect'})
+            await asyncio.wait_for(task, 5)
+            return streamed, get_broker()._subscriptions[STAFF_CHANNEL]
+
+        streamed, remaining = async_to_sync(run)()
+        self.assertEqual(streamed, [b'retry: 5000\n\n'])
+        self.assertEqual(remaining, set())
+
+    def test_maintenance_changes_publish_dashboard_deltas(self):
+        """测试报事新建、派单时推送状态事件和待处理数变化"""
+        from unittest import mock
+
+        published = []
+        broker = mock.Mock(publish=lambda channel, message: published.append((channel, message)))
+        community = create_community_with_bill(1)
+        with mock.patch('apps.core.events.get_broker', return_value=broker):
+            with self.captureOnCommitCallbacks(execute=True):
+                request = MaintenanceRequest.objects.create(
+                    community=community, property=community.properties.first(), reporter='张三',
+                    reporter_phone='13800000000', category='electric', description='停电', priority='high'
+                )
+            with self.captureOnCommitCallbacks(execute=True):
+                request.status = 'assigned'
+                request.save()
+            with self.captureOnCommitCallbacks(execute=True):
+                request.description = '停电（已确认）'
+                request.save()
+
+        import json
+        events = [(channel, json.loads(message)) for channel, message in published]
+        self.assertEqual([event['type'] for _, event in events], ['maintenance', 'dashboard', 'maintenance', 'dashboard'])
+        self.assertEqual(events[1][1]['data'], {'pending_requests': 1, 'urgent_requests': 1})
+        self.assertEqual(events[2][1]['data']['previous_status'], 'pending')
+        self.assertEqual(events[3][1]['data'], {'pending_requests': -1, 'urgent_requests': -1})
+
+
+class KeysetPaginationTest(TestCase):
+    """键集分页测试"""
+
+    def setUp(self):
+        """测试前准备：25条日志，其中10条创建时间相同"""
+        self.admin = User.objects.create_user(username='admin', password='testpass123', role='admin')
+        now = timezone.now()
+        OperationLog.objects.bulk_create([
+            OperationLog(
+                operator=self.admin, action='查看', module='系统管理', description=f'日志{index}',
+                ip_address='127.0.0.1', created_at=now if index < 10 else now - timedelta(seconds=index)
+            )
+            for index in range(25)
+        ])
+        self.expected = list(OperationLog.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+
+    def test_walks_forward_and_backward_without_offset(self):
+        """测试前后翻页覆盖全部记录且不重复，查询不使用 OFFSET"""
+        from .pagination import KeysetPaginator
+
+        paginator = KeysetPaginator(OperationLog.objects.all(), 10)
+        pages = [paginator.page()]
+        with CaptureQueriesContext(connection) as context:
+            while pages[-1].has_next():
+                pages.append(paginator.page(pages[-1].next_cursor))
+        self.assertFalse(any('OFFSET' in query['sql'] for query in context.captured_queries))
+        self.assertEqual([obj.id for page in pages for obj in page], self.expected)
+        self.assertEqual([(page.start_index(), page.end_index()) for page in pages], [(1, 10), (11, 20), (21, 25)])
+
+        last = paginator.page(pages[0].last_cursor)
+        self.assertEqual((last.number, paginator.count, paginator.count_is_estimate), (3, 25, False))
+        previous = paginator.page(last.previous_cursor)
+        self.assertEqual([obj.id for obj in previous], self.expected[10:20])
+        first = paginator.page(previous.previous_cursor)
+        self.assertEqual([obj.id for obj in first], self.expected[:10])
+        self.assertFalse(first.has_previous())
+
+        # 无效游标回到第一页
+        self.assertEqual([obj.id for obj in paginator.get_page('invalid!')], self.expected[:10])
+
+    def test_api_returns_cursor_links(self):
+        """测试接口返回游标链接，按需返回总数"""
+        self.client.force_login(self.admin)
+        response = self.client.get('/api/auth/logs/', {'page_size': 20, 'with_count': 1})
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual((data['count'], data['previous']), (25, None))
+        self.assertEqual(len(data['results']), 20)
+
+        data = self.client.get(data['next']).json()
+        self.assertEqual([row['id'] for row in data['results']], [str(pk) for pk in self.expected[20:]])
+        self.assertIsNone(data['next'])
+
+        response = self.client.get('/api/auth/logs/', {'cursor': 'invalid!'})
+        self.assertEqual(response.status_code, 404)
+
+    def test_property_list_walks_all_properties(self):
+        """测试房产管理页按楼栋排序翻页：楼栋重名、跨多个楼栋时不跳过、不重复"""
+        communities = [Community.objects.create(name=f'测试小区{index}', address='测试地址') for index in range(2)]
+        expected = set()
+        for index in range(6):
+            community = communities[index % 2]
+            building = Building.objects.create(community=community, name=f'{index // 2 + 1}号楼')
+            for floor in range(1, 4):
+                property_obj = Property.objects.create(
+                    community=community, building=building, floor=floor, room_number='01', area=Decimal('90.00')
+                )
+                expected.add(property_obj.id)
+
+        self.client.force_login(self.admin)
+        seen = []
+        page = self.client.get('/admin/property/', {'page_size': 10}).context['properties']
+        seen.extend(obj.id for obj in page)
+        while page.has_next():
+            page = self.client.get('/admin/property/', {'page_size': 10, 'cursor': page.next_cursor}).context['properties']
+            seen.extend(obj.id for obj in page)
+        self.assertEqual(len(seen), len(expected))
+        self.assertEqual(set(seen), expected)
+
+
+class SearchBackendTest(TestCase):
+    """全文搜索后端测试（SQLite FTS5）"""
+
+    def setUp(self):
+        """测试前准备：业主、报事"""
+        self.admin = User.objects.create_user(username='admin', password='testpass123', role='admin')
+        self.zhang = Owner.objects.create(name='张三丰', phone='13800138000')
+        self.li = Owner.objects.create(name='李四', phone='13912345678')
+        community = Community.objects.create(name='阳光花园', address='解放路100号')
+        building = Building.objects.create(community=community, name='1号楼')
+        property_obj = Property.objects.create(
+            community=community, building=building, floor=1, room_number='01', area=Decimal('100.00')
+        )
+        MaintenanceRequest.objects.create(
+            community=community, property=property_obj, reporter='王五', reporter_phone='13700000000',
+            category='plumbing',
+            description='厨房水管漏水，需要更换阀门'
+        )
+
+    def test_fts_matches_chinese_and_phone_fragments(self):
+        """测试中文和电话片段经全文索引匹配，索引随增删改同步"""
+        from .search import search_q
+
+        with CaptureQueriesContext(connection) as context:
+            owners = Owner.objects.filter(search_q(Owner, ['name', 'phone'], '3800138'))
+            names = list(owners.values_list('name', flat=True))
+        self.assertEqual(names, ['张三丰'])
+        self.assertIn('MATCH', context.captured_queries[0]['sql'])
+        self.assertEqual(MaintenanceRequest.objects.filter(search_q(MaintenanceRequest, ['description'], '水管漏')).count(), 1)
+
+        self.li.phone = '13800138999'
+        self.li.save()
+        self.zhang.delete()
+        names = list(Owner.objects.filter(search_q(Owner, ['name', 'phone'], '3800138')).values_list('name', flat=True))
+        self.assertEqual(names, ['李四'])
+
+        # 少于 3 个字符退回 icontains
+        self.assertEqual(Owner.objects.filter(search_q(Owner, ['name'], '李四')).count(), 1)
+
+    def test_old_sqlite_falls_back_to_icontains(self):
+        """测试 SQLite 低于 3.34（无 trigram 分词）时退回 icontains"""
+        from unittest import mock
+        from . import search
+
+        search._backends.clear()
+        self.addCleanup(search._backends.clear)
+        with mock.patch.object(connection.Database, 'sqlite_version_info', (3, 31, 1)):
+            backend = search.get_search_backend()
+        self.assertIs(type(backend), search.SearchBackend)
+
+        with CaptureQueriesContext(connection) as context:
+            names = list(Owner.objects.filter(search.search_q(Owner, ['name', 'phone'], '3800138')).values_list('name', flat=True))
+        self.assertEqual(names, ['张三丰'])
+        self.assertNotIn('MATCH', context.captured_queries[0]['sql'])
+
+    def test_search_index_operation_drops_and_rebuilds(self):
+        """测试迁移操作 CreateSearchIndex 可回滚，重新执行时补建全文表和触发器并从原表重建索引"""
+        from django.apps import apps as django_apps
+        from django.db.migrations.state import ProjectState
+        from .search import CreateSearchIndex, search_q
+
+        def fts_objects():
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT name FROM sqlite_master WHERE name IN "
+                               "('property_owner_fts', 'property_owner_fts_ai', 'property_owner_fts_ad', 'property_owner_fts_au')")
+                return len(cursor.fetchall())
+
+        operation = CreateSearchIndex('Owner', ['name', 'phone'])
+        state = ProjectState.from_apps(django_apps)
+        editor = connection.schema_editor()
+        operation.database_backwards('property', editor, state, state)
+        self.assertEqual(fts_objects(), 0)
+
+        Owner.objects.create(name='赵六', phone='13600136000')
+        operation.database_forwards('property', editor, state, state)
+        self.assertEqual(fts_objects(), 4)
+        names = set(Owner.objects.filter(search_q(Owner, ['name', 'phone'], '00136')).values_list('name', flat=True))
+        self.assertEqual(names, {'赵六'})
+
+    def test_rest_search_fields_route_through_backend(self):
+        """测试接口 search 参数经搜索后端匹配"""
+        self.client.force_login(self.admin)
+        response = self.client.get('/api/property/owners/', {'search': '2345678'})
+        self.assertEqual([row['name'] for row in response.json()['results']], ['李四'])
+
+        response = self.client.get('/api/community/communities/', {'search': '解放路'})
+        self.assertEqual([row['name'] for row in response.json()['results']], ['阳光花园'])
+
+        response = self.client.get('/api/maintenance/requests/', {'search': '更换阀门'})
+        self.assertEqual(len(response.json()['results']), 1)
+
+
+class IndexBenchmarkCommandTest(TestCase):
+    """索引基准测试命令测试"""
+
+    def test_benchmark_reports_plans_and_rolls_back(self):
+        """测试输出索引前后的执行计划，结束后测试数据和索引改动都已回滚"""
+        from io import StringIO
+        from django.core.management import call_command
+
+        out = StringIO()
+        call_command('benchmark_indexes', bills=60, requests=20, repeat=1, force=True, stdout=out)
+        self.assertIn('bill_status_due_idx', out.getvalue())
+        self.assertEqual((PaymentBill.objects.count(), MaintenanceRequest.objects.count()), (0, 0))
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(cursor, PaymentBill._meta.db_table)
+        self.assertIn('bill_open_due_owner_idx', constraints)
+        self.assertNotIn('bill_community_bench_idx', constraints)
+
+
+class SerializerRelationsTest(QueryCountMixin, TestCase):
+    """列表/详情接口按序列化器声明预加载关联（无 N+1）测试"""
+
+    def setUp(self):
+        """测试前准备：管理员登录"""
+        self.admin = User.objects.create_user(username='admin', password='testpass123', role='admin')
+        self.client.force_login(self.admin)
+
+    def make_row(self, index):
+        """每个列表接口各一行：小区、楼栋、房产、业主、账单（create_community_with_bill），报事、租户"""
+        community = create_community_with_bill(index)
+        property_obj = Property.objects.get(community=community)
+        MaintenanceRequest.objects.create(
+            request_number=f'REQ{index:06d}', community=community, property=property_obj,
+            reporter='报事人', reporter_phone='13900000000', category='plumbing', description='水管漏水',
+        )
+        Tenant.objects.create(
+            name=f'租户{index}', phone='13700000000', id_card='110101199001011234', property=property_obj,
+            lease_start=timezone.localdate(), lease_end=timezone.localdate() + timedelta(days=365),
+        )
+
+    def test_list_queries_do_not_grow_with_page_size(self):
+        """测试列表接口的查询次数与返回条数无关"""
+        self.assertListQueriesConstant([
+            '/api/community/communities/',
+            '/api/property/properties/',
+            '/api/property/owners/',
+            '/api/property/tenants/',
+            '/api/payment/bills/',
+            '/api/maintenance/requests/',
+        ], self.make_row)
+
+        data = self.client.get('/api/community/communities/').json()
+        self.assertEqual({row['building_count'] for row in data['results']}, {1})
+        data = self.client.get('/api/property/properties/').json()
+        self.assertIn('业主0', {row['owner_name'] for row in data['results']})
+
+    def test_owner_detail_queries_do_not_grow_with_properties(self):
+        """测试业主详情的查询次数与名下房产数无关"""
+        community = create_community_with_bill(0)
+        owner = Owner.objects.get(name='业主0')
+        building = Building.objects.get(community=community)
+        url = f'/api/property/owners/{owner.pk}/'
+        self.client.get(url)
+
+        counts = []
+        for floor in (2, 3, 4):
+            with CaptureQueriesContext(connection) as context:
+                response = self.client.get(url)
+            counts.append(len(context.captured_queries))
+            self.assertEqual(len(response.json()['properties']), floor - 1)
+            property_obj = Property.objects.create(
+                community=community, building=building, floor=floor, room_number='01', area=Decimal('90.00')
+            )
+            OwnerProperty.objects.create(owner=owner, property=property_obj)
+        self.assertEqual(len(set(counts)), 1, counts)
+        self.assertEqual({row['owner_name'] for row in response.json()['properties']}, {'业主0'})
@@ -0,0 +1,99 @@
+"""
+未读数计数器
+
+每个用户的未读通知数和未读公告数保存在缓存中，顶部角标和未读数轮询直接读取，不再每次 COUNT：
+- 通知发送成功（站内可见）时加一，标记已读时减一
+- 未读公告数按公告版本缓存：发布公告后版本变化，各用户下次读取时重新统计；阅读公告时减一
+- 计数器在 NOTIFICATION_UNREAD_COUNTER_TIMEOUT 秒后过期并从数据库重新统计，
+  以此定期校正漏记（如直接修改数据库、删除通知）造成的偏差
+计数调整都在事务提交后执行，回滚的操作不影响计数。
+"""
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+ANNOUNCEMENT_VERSION_KEY = 'notifications:announcement_version'
+
+
+def _timeout():
+    return getattr(settings, 'NOTIFICATION_UNREAD_COUNTER_TIMEOUT', 600)
+
+
+def _notification_key(user_id):
+    return f'notifications:unread:{user_id}'
+
+
+def _announcement_key(user_id):
+    return f'notifications:unread_announcements:{user_id}:{_announcement_version()}'
+
+
+def _announcement_version():
+    version = cache.get(ANNOUNCEMENT_VERSION_KEY)
+    if version is None:
+        version = uuid.uuid4().hex
+        if not cache.add(ANNOUNCEMENT_VERSION_KEY, version, timeout=None):
+            version = cache.get(ANNOUNCEMENT_VERSION_KEY, version)
+    return version
+
+
+def get_unread_count(user):
+    """
+    获取用户未读数量（通知 + 公告）
+
+    计数器不存在时从数据库统计并写入缓存
+    """
+    from .models import Notification
+    from .notification_service import NotificationService
+
+    key = _notification_key(user.pk)
+    notifications = cache.get(key)
+    if notifications is None:
+        notifications = Notification.objects.filter(recipient_id=user.pk, status='sent').count()
+        cache.set(key, notifications, timeout=_timeout())
+
+    key = _announcement_key(user.pk)
+    announcements = cache.get(key)
+    if announcements is None:
+        announcements = NotificationService.unread_announcements(user).count()
+        cache.set(key, announcements, timeout=_timeout())
+
+    return max(notifications, 0) + max(announcements, 0)
+
+
+def _adjust(key, delta):
+    try:
+        cache.incr(key, delta)
+    except ValueError:
+        # 计数器不存在（未读取过或已过期），下次读取时从数据库统计
+        pass
+
+
+def adjust_unread_notifications(deltas):
+    """
+    调整未读通知数
+
+    Args:
+        deltas: {用户ID: 变化量}
+    """
+    deltas = {user_id: delta for user_id, delta in deltas.items() if user_id and delta}
+    if not deltas:
+        return
+
+    def apply():
+        for user_id, delta in deltas.items():
+            _adjust(_notification_key(user_id), delta)
+
+    transaction.on_commit(apply)
+
+
+def adjust_unread_announcements(user_id, delta):
+    """调整用户的未读公告数"""
+    if delta:
+        transaction.on_commit(lambda: _adjust(_announcement_key(user_id), delta))
+
+
+def announcements_changed():
+    """公告发布后更新公告版本，各用户的未读公告数在下次读取时重新统计"""
+    transaction.on_commit(lambda: cache.set(ANNOUNCEMENT_VERSION_KEY, uuid.uuid4().hex, timeout=None))
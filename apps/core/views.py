@@ -1,6 +1,8 @@
 """
 Core Views
 """
+import logging
+
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
@@ -16,17 +18,20 @@ from .serializers import (
     WeChatPayConfigSerializer, WeChatPayConfigCreateSerializer,
     PermissionSerializer, RolePermissionSerializer, RolePermissionCreateSerializer
 )
+from .pagination import KeysetPagination
 from .permissions import IsAdminUser
 
 User = get_user_model()
+logger = logging.getLogger(__name__)
 
 
-def get_common_context():
+def get_common_context(user=None):
     """获取所有页面共用的上下文数据"""
     from apps.maintenance.models import MaintenanceRequest
+    from .unread import get_unread_count
     return {
         'pending_maintenance_count': MaintenanceRequest.objects.filter(status='pending').count(),
-        'unread_notifications': 3,  # 暂时固定，后续可从Notification表获取
+        'unread_notifications': get_unread_count(user) if user is not None and user.is_authenticated else 0,
     }
 
 
@@ -34,31 +39,32 @@ def log_operation(request, action, module, description):
     """
     记录操作日志
 
+    日志由后台线程批量写入，不占用请求时间（见 apps.core.audit）
+
     Args:
         request: HttpRequest对象
         action: 操作类型（创建、更新、删除、登录、登出等）
         module: 模块名称（用户管理、社区管理、房产管理等）
         description: 操作描述
     """
+    from django.utils import timezone
+    from .audit import record_operation
+
     try:
-        # 获取客户端IP地址
-        ip_address = request.META.get('REMOTE_ADDR', '0.0.0.0')
-
-        # 获取用户代理
-        user_agent = request.META.get('HTTP_USER_AGENT', '')[:500]  # 限制长度
-
-        # 创建日志记录
-        OperationLog.objects.create(
-            operator=request.user if request.user.is_authenticated else None,
-            action=action,
-            module=module,
-            description=description,
-            ip_address=ip_address,
-            user_agent=user_agent
-        )
+        record_operation({
+            'operator_id': request.user.pk if request.user.is_authenticated else None,
+            'action': action,
+            'module': module,
+            'description': description,
+            # 获取客户端IP地址
+            'ip_address': request.META.get('REMOTE_ADDR', '0.0.0.0'),
+            # 获取用户代理
+            'user_agent': request.META.get('HTTP_USER_AGENT', '')[:500],  # 限制长度
+            'created_at': timezone.now(),
+        })
     except Exception as e:
         # 日志记录失败不应影响主业务流程
-        print(f'记录操作日志失败: {str(e)}')
+        logger.error(f'记录操作日志失败: {str(e)}')
 
 
 @csrf_exempt
@@ -167,11 +173,22 @@ class UserViewSet(viewsets.ModelViewSet):
 
 class OperationLogViewSet(viewsets.ReadOnlyModelViewSet):
     """操作日志视图集"""
-    queryset = OperationLog.objects.all()
+    queryset = OperationLog.objects.select_related('operator').order_by('-created_at', '-id')
     serializer_class = OperationLogSerializer
     permission_classes = [IsAdminUser]
+    pagination_class = KeysetPagination
     filterset_fields = ['action', 'module', 'operator']
     search_fields = ['description']
+    # 键集分页的排序字段不能为空值
+    ordering_fields = ['created_at']
+
+    @action(detail=False, methods=['get'])
+    def writer_stats(self, request):
+        """当前工作进程的日志写入统计（含队列满丢弃的条数）"""
+        import os
+        from .audit import audit_writer
+
+        return Response({'pid': os.getpid(), **audit_writer.stats()})
 
 
 class SystemConfigViewSet(viewsets.ModelViewSet):
@@ -181,6 +198,24 @@ class SystemConfigViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAdminUser]
     search_fields = ['key', 'description']
 
+    @action(detail=False, methods=['get'])
+    def cache_stats(self, request):
+        """当前工作进程的缓存命中统计"""
+        import os
+        from django.core.cache import cache
+
+        if not hasattr(cache, 'stats'):
+            return Response({'error': '当前缓存后端不支持命中统计'}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'pid': os.getpid(), **cache.stats()})
+
+    @action(detail=False, methods=['get'])
+    def http_stats(self, request):
+        """当前工作进程调用外部接口的耗时统计"""
+        import os
+        from .http_client import get_http_client
+
+        return Response({'pid': os.getpid(), 'endpoints': get_http_client().stats()})
+
 
 class WeChatPayConfigViewSet(viewsets.ModelViewSet):
     """微信支付配置视图集"""
@@ -246,16 +281,23 @@ class RolePermissionViewSet(viewsets.ModelViewSet):
         if not role:
             return Response({'error': '请提供角色参数'}, status=status.HTTP_400_BAD_REQUEST)
 
-        # 删除该角色的所有权限
-        RolePermission.objects.filter(role=role).delete()
+        from django.db import transaction
+        from .permissions_utils import invalidate_permission_matrix
 
-        # 创建新权限
-        created_permissions = []
-        for perm_data in permissions_data:
-            perm_data['role'] = role
-            serializer = RolePermissionCreateSerializer(data=perm_data)
-            if serializer.is_valid():
-                created_permissions.append(serializer.save())
+        with transaction.atomic():
+            # 删除该角色的所有权限
+            RolePermission.objects.filter(role=role).delete()
+
+            # 创建新权限
+            created_permissions = []
+            for perm_data in permissions_data:
+                perm_data['role'] = role
+                serializer = RolePermissionCreateSerializer(data=perm_data)
+                if serializer.is_valid():
+                    created_permissions.append(serializer.save())
+
+            # 提交后统一刷新权限矩阵
+            invalidate_permission_matrix()
 
         return Response({
             'message': f'已更新角色 {role} 的权限',
@@ -317,104 +359,29 @@ def logout_view(request):
 @login_required
 def dashboard(request):
     """仪表盘 - 数据概览"""
-    from django.utils import timezone
-    from django.db.models import Sum, Count, Q, F
-    from apps.community.models import Community, Building
-    from apps.property.models import Property
-    from apps.payment.models import PaymentBill, PaymentRecord
-    from apps.maintenance.models import MaintenanceRequest
-
-    # 当前时间
-    now = timezone.now()
-    current_month_str = now.strftime('%Y-%m')  # 格式如 "2026-01"
+    from .dashboard import get_dashboard_stats
+    from .unread import get_unread_count
 
-    # 基础统计数据
-    total_communities = Community.objects.count()
-    total_buildings = Building.objects.count()
-    total_households = Property.objects.count()
-
-    # 本月缴费统计
-    from django.db.models.functions import TruncMonth
-    monthly_records = PaymentRecord.objects.filter(
-        payment_time__year=now.year,
-        payment_time__month=now.month
-    ).aggregate(total=Sum('amount'))['total'] or 0
-
-    # 本月应缴金额
-    from decimal import Decimal
-    monthly_bills = PaymentBill.objects.filter(
-        billing_period__startswith=current_month_str
-    ).aggregate(total=Sum('amount'))['total'] or Decimal('0')
-
-    # 收缴率
-    collection_rate = (monthly_records / monthly_bills * 100) if monthly_bills > 0 else 0
-
-    # 待处理报事
-    pending_requests = MaintenanceRequest.objects.filter(status='pending').count()
-    urgent_requests = MaintenanceRequest.objects.filter(
-        status='pending',
-        priority='high'
-    ).count()
-
-    # 逾期统计
-    overdue_bills = PaymentBill.objects.filter(
-        due_date__lt=now.date(),
-        status__in=['unpaid', 'partial']
-    )
-    overdue_amount = overdue_bills.aggregate(total=Sum(F('amount') - F('paid_amount')))['total'] or Decimal('0')
-    overdue_households = overdue_bills.values('owner').distinct().count()
-
-    # 各小区收缴率
-    community_stats = []
-    for community in Community.objects.all():
-        community_bills = PaymentBill.objects.filter(
-            community=community,
-            billing_period__startswith=current_month_str
-        ).aggregate(total=Sum('amount'))['total'] or Decimal('0')
-
-        community_records = PaymentRecord.objects.filter(
-            bill__community=community,
-            payment_time__year=now.year,
-            payment_time__month=now.month
-        ).aggregate(total=Sum('amount'))['total'] or Decimal('0')
-
-        rate = (community_records / community_bills * 100) if community_bills > 0 else 0
-
-        community_stats.append({
-            'name': community.name,
-            'rate': round(rate, 1),
-            'bills_count': PaymentBill.objects.filter(
-                community=community,
-                billing_period__startswith=current_month_str
-            ).count()
-        })
-
-    # 最近报事
-    recent_requests = MaintenanceRequest.objects.select_related(
-        'property', 'property__community', 'property__building'
-    ).order_by('-created_at')[:5]
-
-    # 待派单数量（用于侧边栏）
-    pending_maintenance_count = pending_requests
+    stats = get_dashboard_stats()
 
     context = {
         'page_title': '数据概览',
         # 统计卡片数据
-        'total_communities': total_communities,
-        'total_households': total_households,
-        'monthly_revenue': monthly_records,
-        'collection_rate': round(collection_rate, 1),
-        'pending_requests': pending_requests,
-        'urgent_requests': urgent_requests,
-        'overdue_amount': overdue_amount,
-        'overdue_households': overdue_households,
+        'total_communities': stats['total_communities'],
+        'total_households': stats['total_households'],
+        'monthly_revenue': stats['monthly_revenue'],
+        'collection_rate': stats['collection_rate'],
+        'pending_requests': stats['pending_requests'],
+        'urgent_requests': stats['urgent_requests'],
+        'overdue_amount': stats['overdue_amount'],
+        'overdue_households': stats['overdue_households'],
         # 小区收缴率
-        'community_stats': community_stats,
+        'community_stats': stats['community_stats'],
         # 最近报事
-        'recent_requests': recent_requests,
+        'recent_requests': stats['recent_requests'],
         # 侧边栏数据
-        'pending_maintenance_count': pending_maintenance_count,
-        'unread_notifications': 3,
+        'pending_maintenance_count': stats['pending_requests'],
+        'unread_notifications': get_unread_count(request.user),
     }
     return render(request, 'admin/dashboard_full.html', context)
 
@@ -422,125 +389,25 @@ def dashboard(request):
 @login_required
 def dashboard_stats_api(request):
     """仪表盘统计数据API"""
-    from django.utils import timezone
-    from django.db.models import Sum, Count, Q, F
-    from apps.community.models import Community, Building
-    from apps.property.models import Property
-    from apps.payment.models import PaymentBill, PaymentRecord
-    from apps.maintenance.models import MaintenanceRequest
-
-    # 当前时间
-    now = timezone.now()
-    current_month_str = now.strftime('%Y-%m')
-
-    # 基础统计数据
-    total_communities = Community.objects.count()
-    total_buildings = Building.objects.count()
-    total_households = Property.objects.count()
-
-    # 本月缴费统计
-    monthly_records = PaymentRecord.objects.filter(
-        payment_time__year=now.year,
-        payment_time__month=now.month
-    ).aggregate(total=Sum('amount'))['total'] or 0
-
-    # 本月应缴金额
-    from decimal import Decimal
-    monthly_bills = PaymentBill.objects.filter(
-        billing_period__startswith=current_month_str
-    ).aggregate(total=Sum('amount'))['total'] or Decimal('0')
-
-    # 收缴率
-    collection_rate = (monthly_records / monthly_bills * 100) if monthly_bills > 0 else 0
-
-    # 待处理报事
-    pending_requests = MaintenanceRequest.objects.filter(status='pending').count()
-    urgent_requests = MaintenanceRequest.objects.filter(
-        status='pending',
-        priority='high'
-    ).count()
-
-    # 逾期统计
-    overdue_bills = PaymentBill.objects.filter(
-        due_date__lt=now.date(),
-        status__in=['unpaid', 'partial']
-    )
-    overdue_amount = overdue_bills.aggregate(total=Sum(F('amount') - F('paid_amount')))['total'] or Decimal('0')
-    overdue_households = overdue_bills.values('property__ownerproperty__owner').distinct().count()
-
-    # 各小区收缴率
-    community_stats = []
-    for community in Community.objects.all():
-        community_bills = PaymentBill.objects.filter(
-            community=community,
-            billing_period__startswith=current_month_str
-        ).aggregate(total=Sum('amount'))['total'] or Decimal('0')
-
-        community_records = PaymentRecord.objects.filter(
-            bill__community=community,
-            payment_time__year=now.year,
-            payment_time__month=now.month
-        ).aggregate(total=Sum('amount'))['total'] or Decimal('0')
-
-        rate = (community_records / community_bills * 100) if community_bills > 0 else 0
-
-        community_stats.append({
-            'name': community.name,
-            'rate': round(rate, 1),
-            'bills_count': PaymentBill.objects.filter(
-                community=community,
-                billing_period__startswith=current_month_str
-            ).count()
-        })
+    from .dashboard import get_dashboard_stats
 
-    # 最近报事
-    recent_requests = MaintenanceRequest.objects.select_related(
-        'property', 'property__community', 'property__building'
-    ).order_by('-created_at')[:5]
-
-    # 待派单数量（用于侧边栏）
-    pending_maintenance_count = pending_requests
-
-    # 报事统计（按类别）
-    requests_by_category = []
-    categories = {
-        'electric': '电工',
-        'plumbing': '水工',
-        'civil': '土木',
-        'elevator': '电梯',
-        'cleaning': '清洁',
-        'security': '安保',
-        'other': '其他'
-    }
-
-    for category_key, category_name in categories.items():
-        count = MaintenanceRequest.objects.filter(
-            category=category_key,
-            created_at__month=now.month,
-            created_at__year=now.year
-        ).count()
-
-        requests_by_category.append({
-            'category': category_name,
-            'count': count,
-            'key': category_key
-        })
+    stats = get_dashboard_stats()
 
     return JsonResponse({
         'success': True,
         'data': {
             # 统计卡片数据
-            'total_communities': total_communities,
-            'total_buildings': total_buildings,
-            'total_households': total_households,
-            'monthly_revenue': str(monthly_records),
-            'collection_rate': round(collection_rate, 1),
-            'pending_requests': pending_requests,
-            'urgent_requests': urgent_requests,
-            'overdue_amount': str(overdue_amount),
-            'overdue_households': overdue_households,
+            'total_communities': stats['total_communities'],
+            'total_buildings': stats['total_buildings'],
+            'total_households': stats['total_households'],
+            'monthly_revenue': str(stats['monthly_revenue']),
+            'collection_rate': stats['collection_rate'],
+            'pending_requests': stats['pending_requests'],
+            'urgent_requests': stats['urgent_requests'],
+            'overdue_amount': str(stats['overdue_amount']),
+            'overdue_households': stats['overdue_households'],
             # 小区收缴率
-            'community_stats': community_stats,
+            'community_stats': stats['community_stats'],
             # 最近报事
             'recent_requests': [
                 {
@@ -553,12 +420,12 @@ def dashboard_stats_api(request):
                     'property_address': req.property.full_address if req.property else '',
                     'reporter': req.reporter
                 }
-                for req in recent_requests
+                for req in stats['recent_requests']
             ],
             # 报事类别统计
-            'requests_by_category': requests_by_category,
+            'requests_by_category': stats['requests_by_category'],
             # 侧边栏数据
-            'pending_maintenance_count': pending_maintenance_count,
+            'pending_maintenance_count': stats['pending_requests'],
         }
     })
 
@@ -568,6 +435,7 @@ def community_list(request):
     """小区管理（带搜索和筛选）"""
     from apps.community.models import Community, Building
     from django.db.models import Q
+    from .search import search_q
 
     # 获取搜索和筛选参数
     search_query = request.GET.get('search', '').strip()
@@ -578,10 +446,7 @@ def community_list(request):
     # 小区搜索逻辑：搜索小区名称、地址、开发商、物业公司
     if search_query:
         communities_queryset = communities_queryset.filter(
-            Q(name__icontains=search_query) |
-            Q(address__icontains=search_query) |
-            Q(developer__icontains=search_query) |
-            Q(property_company__icontains=search_query)
+            search_q(Community, ['name', 'address', 'developer', 'property_company'], search_query)
         )
 
     communities = communities_queryset.order_by('created_at')
@@ -603,7 +468,7 @@ def community_list(request):
         'buildings': buildings,
         'search_query': search_query,
     }
-    context.update(get_common_context())
+    context.update(get_common_context(request.user))
     return render(request, 'admin/community.html', context)
 
 
@@ -611,13 +476,13 @@ def community_list(request):
 def property_list(request):
     """房产管理（带分页和搜索）"""
     from apps.property.models import Property, Owner, Tenant
-    from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
     from django.db.models import Q, Prefetch
     from apps.property.models import OwnerProperty
+    from apps.property.search import matching_owner_ids, matching_property_ids
     from apps.community.models import Community
+    from .pagination import KeysetPaginator
 
-    # 获取分页参数
-    page = request.GET.get('page', 1)
+    # 获取分页参数（各列表使用各自的游标）
     page_size = request.GET.get('page_size', 20)
 
     # 验证page_size
@@ -645,76 +510,9 @@ def property_list(request):
         )
     )
 
-    # 搜索逻辑：搜索房号、业主姓名、联系电话
+    # 搜索逻辑：按房产搜索索引匹配房号、楼栋、业主姓名和联系电话（前缀匹配）
     if search_query:
-        # 尝试解析搜索词是否为数字房号（如2704）
-        # 房号格式：floor + room_number（如 27 + 04 = 2704）
-        floor_room_match = None
-        if search_query.isdigit() and len(search_query) >= 3:
-            # 根据数字长度智能解析
-            # 3位数(501): floor=第1位, room=后2位
-            # 4位数(2704): floor=前2位, room=后2位
-            # 5位数(10001): floor=前3位, room=后2位
-            query_len = len(search_query)
-            room_part_len = 2  # 房间号通常是2位数
-
-            if query_len == 3:
-                # 501 → floor=5, room="01"
-                floor_num = int(search_query[0])
-                room_suffix = search_query[1:]
-                floor_room_match = (floor_num, room_suffix)
-            elif query_len == 4:
-                # 2704 → floor=27, room="04"
-                floor_num = int(search_query[:2])
-                room_suffix = search_query[2:]
-                floor_room_match = (floor_num, room_suffix)
-            elif query_len == 5:
-                # 10001 → floor=100, room="01"
-                floor_num = int(search_query[:3])
-                room_suffix = search_query[3:]
-                floor_room_match = (floor_num, room_suffix)
-            # 更多位数的房号可以继续扩展
-
-        # 构建查询条件
-        queries = Q()
-
-        # 1. 搜索楼栋名称（如"4号楼"）
-        queries |= Q(building__name__icontains=search_query)
-
-        # 2. 搜索纯房间号（如"04"）
-        queries |= Q(room_number__icontains=search_query)
-
-        # 3. 如果匹配到楼层+房间号模式（如2704 → floor=27, room_number__startswith="04"）
-        if floor_room_match:
-            floor_num, room_suffix = floor_room_match
-            queries |= Q(floor=floor_num, room_number__startswith=room_suffix)
-
-        # 应用房号查询
-        properties_queryset = properties_queryset.filter(queries)
-
-        # 4. 同时搜索业主姓名和电话
-        owner_ids = Owner.objects.filter(
-            Q(name__icontains=search_query) |
-            Q(phone__icontains=search_query)
-        ).values_list('id', flat=True)
-
-        # 获取这些业主关联的房产ID
-        if owner_ids:
-            property_ids_from_owners = OwnerProperty.objects.filter(
-                owner_id__in=owner_ids
-            ).values_list('property_id', flat=True)
-
-            # 使用OR连接查询：房号匹配 OR 业主匹配
-            properties_queryset = properties_queryset | Property.objects.filter(
-                id__in=property_ids_from_owners
-            ).select_related(
-                'community', 'building'
-            ).prefetch_related(
-                Prefetch(
-                    'owners',
-                    queryset=OwnerProperty.objects.select_related('owner').order_by('-is_primary', '-created_at')
-                )
-            )
+        properties_queryset = properties_queryset.filter(id__in=matching_property_ids(search_query))
 
     # 应用筛选条件
     if filter_community:
@@ -724,15 +522,10 @@ def property_list(request):
     if filter_status:
         properties_queryset = properties_queryset.filter(status=filter_status)
 
-    properties_queryset = properties_queryset.order_by('building', 'floor', 'room_number').distinct()
-    property_paginator = Paginator(properties_queryset, page_size)
-
-    try:
-        properties_page = property_paginator.page(page)
-    except PageNotAnInteger:
-        properties_page = property_paginator.page(1)
-    except EmptyPage:
-        properties_page = property_paginator.page(property_paginator.num_pages)
+    # 楼栋名称可能重名，补楼栋ID保证键集分页的排序与游标比较一致
+    properties_queryset = properties_queryset.order_by('building__name', 'building_id', 'floor', 'room_number')
+    property_paginator = KeysetPaginator(properties_queryset, page_size)
+    properties_page = property_paginator.get_page(request.GET.get('cursor'))
 
     # 业主分页（预加载房产信息）- 添加搜索和筛选
     owners_queryset = Owner.objects.prefetch_related(
@@ -743,50 +536,9 @@ def property_list(request):
     owner_filter_community = request.GET.get('owner_community', '')
     owner_filter_verified = request.GET.get('owner_verified', '')
 
-    # 业主搜索逻辑：搜索姓名、手机号、房产
+    # 业主搜索逻辑：按房产搜索索引匹配姓名、手机号或名下房产的房号
     if search_query:
-        # 搜索业主姓名和手机号
-        owners_queryset = owners_queryset.filter(
-            Q(name__icontains=search_query) |
-            Q(phone__icontains=search_query)
-        )
-
-        # 搜索房产（楼栋、房号）
-        # 先获取匹配的房产ID
-        from django.db.models import Q
-        property_queries = Q(building__name__icontains=search_query) | Q(room_number__icontains=search_query)
-
-        # 尝试解析数字房号
-        if search_query.isdigit() and len(search_query) >= 3:
-            query_len = len(search_query)
-            if query_len == 3:
-                floor_num = int(search_query[0])
-                room_suffix = search_query[1:]
-                property_queries |= Q(floor=floor_num, room_number__startswith=room_suffix)
-            elif query_len == 4:
-                floor_num = int(search_query[:2])
-                room_suffix = search_query[2:]
-                property_queries |= Q(floor=floor_num, room_number__startswith=room_suffix)
-            elif query_len == 5:
-                floor_num = int(search_query[:3])
-                room_suffix = search_query[3:]
-                property_queries |= Q(floor=floor_num, room_number__startswith=room_suffix)
-
-        # 获取匹配的房产ID
-        matching_property_ids = Property.objects.filter(property_queries).values_list('id', flat=True)
-
-        # 获取这些房产关联的业主ID
-        if matching_property_ids:
-            owner_ids_from_properties = OwnerProperty.objects.filter(
-                property_id__in=matching_property_ids
-            ).values_list('owner_id', flat=True)
-
-            # 使用OR连接：姓名/电话匹配 OR 房产匹配
-            owners_queryset = owners_queryset | Owner.objects.filter(
-                id__in=owner_ids_from_properties
-            ).prefetch_related(
-                'owners__property__building'
-            )
+        owners_queryset = owners_queryset.filter(id__in=matching_owner_ids(search_query))
 
     # 应用业主筛选条件
     if owner_filter_community:
@@ -802,15 +554,9 @@ def property_list(request):
         elif owner_filter_verified == 'unverified':
             owners_queryset = owners_queryset.filter(is_verified=False)
 
-    owners_queryset = owners_queryset.order_by('-created_at').distinct()
-    owner_paginator = Paginator(owners_queryset, page_size)
-
-    try:
-        owners_page = owner_paginator.page(page)
-    except PageNotAnInteger:
-        owners_page = owner_paginator.page(1)
-    except EmptyPage:
-        owners_page = owner_paginator.page(owner_paginator.num_pages)
+    owners_queryset = owners_queryset.order_by('-created_at')
+    owner_paginator = KeysetPaginator(owners_queryset, page_size)
+    owners_page = owner_paginator.get_page(request.GET.get('owner_cursor'))
 
     # 获取租户筛选参数
     tenant_filter_community = request.GET.get('tenant_community', '')
@@ -834,59 +580,17 @@ def property_list(request):
             # 已到期：lease_end < 今天
             tenants_queryset = tenants_queryset.filter(lease_end__lt=today)
 
-    # 租户搜索逻辑：搜索姓名、手机号、房产
+    # 租户搜索逻辑：搜索姓名、手机号，或按房产搜索索引匹配租赁房产的房号
     if search_query:
-        # 搜索租户姓名和手机号
         tenants_queryset = tenants_queryset.filter(
             Q(name__icontains=search_query) |
-            Q(phone__icontains=search_query)
+            Q(phone__icontains=search_query) |
+            Q(property_id__in=matching_property_ids(search_query, 'room'))
         )
 
-        # 搜索房产（楼栋、房号）
-        property_queries = Q(property__building__name__icontains=search_query) | Q(property__room_number__icontains=search_query)
-
-        # 尝试解析数字房号
-        if search_query.isdigit() and len(search_query) >= 3:
-            query_len = len(search_query)
-            if query_len == 3:
-                floor_num = int(search_query[0])
-                room_suffix = search_query[1:]
-                property_queries |= Q(property__floor=floor_num, property__room_number__startswith=room_suffix)
-            elif query_len == 4:
-                floor_num = int(search_query[:2])
-                room_suffix = search_query[2:]
-                property_queries |= Q(property__floor=floor_num, property__room_number__startswith=room_suffix)
-            elif query_len == 5:
-                floor_num = int(search_query[:3])
-                room_suffix = search_query[3:]
-                property_queries |= Q(property__floor=floor_num, property__room_number__startswith=room_suffix)
-
-        # 使用OR连接：姓名/电话匹配 OR 房产匹配
-        # 注意：需要再次应用小区和状态筛选
-        base_queryset = tenants_queryset
-        tenants_queryset = tenants_queryset | Tenant.objects.select_related('property__community', 'property__building').filter(property_queries)
-
-        # 如果有小区筛选，需要对合并后的查询集再次应用
-        if tenant_filter_community:
-            tenants_queryset = tenants_queryset.filter(property__community_id=tenant_filter_community)
-        # 如果有状态筛选，需要对合并后的查询集再次应用
-        if tenant_filter_status:
-            from django.utils import timezone
-            today = timezone.now().date()
-            if tenant_filter_status == 'active':
-                tenants_queryset = tenants_queryset.filter(lease_end__gte=today)
-            elif tenant_filter_status == 'expired':
-                tenants_queryset = tenants_queryset.filter(lease_end__lt=today)
-
-    tenants_queryset = tenants_queryset.order_by('-created_at').distinct()
-    tenant_paginator = Paginator(tenants_queryset, page_size)
-
-    try:
-        tenants_page = tenant_paginator.page(page)
-    except PageNotAnInteger:
-        tenants_page = tenant_paginator.page(1)
-    except EmptyPage:
-        tenants_page = tenant_paginator.page(tenant_paginator.num_pages)
+    tenants_queryset = tenants_queryset.order_by('-created_at')
+    tenant_paginator = KeysetPaginator(tenants_queryset, page_size)
+    tenants_page = tenant_paginator.get_page(request.GET.get('tenant_cursor'))
 
     # 获取所有小区用于筛选下拉框
     communities = Community.objects.all().order_by('name')
@@ -909,7 +613,7 @@ def property_list(request):
         'owner_total': owner_paginator.count,
         'tenant_total': tenant_paginator.count,
     }
-    context.update(get_common_context())
+    context.update(get_common_context(request.user))
     return render(request, 'admin/property.html', context)
 
 
@@ -918,10 +622,13 @@ def payment_list(request):
     """缴费管理（带分页和搜索）"""
     from apps.payment.models import PaymentBill, FeeStandard, PaymentRecord
     from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
+    from decimal import Decimal, InvalidOperation
     from django.db.models import Q
     from apps.community.models import Community
+    from apps.property.search import matching_property_ids
+    from .pagination import KeysetPaginator
 
-    # 获取分页参数
+    # 获取分页参数（账单、缴费记录使用游标分页；费用标准数量少，仍按页码分页）
     page = request.GET.get('page', 1)
     page_size = request.GET.get('page_size', 10)
 
@@ -948,57 +655,16 @@ def payment_list(request):
         'property_unit', 'property_unit__community', 'property_unit__building', 'owner', 'community'
     )
 
-    # 账单搜索逻辑 - 增强版：支持房号、业主、账单编号、应缴金额
+    # 账单搜索逻辑：账单编号前缀、应缴金额，或按房产搜索索引匹配房号、楼栋、业主
     if search_query:
-        # 1. 搜索账单编号
-        queries = Q(bill_number__icontains=search_query)
-
-        # 2. 搜索业主姓名
-        queries |= Q(owner__name__icontains=search_query)
-
-        # 3. 搜索应缴金额（尝试将搜索词解析为数字）
+        queries = Q(bill_number__startswith=search_query)
+        queries |= Q(property_unit_id__in=matching_property_ids(search_query))
         try:
-            amount = float(search_query)
+            amount = Decimal(search_query)
+        except InvalidOperation:
+            amount = None
+        if amount is not None and amount.is_finite():
             queries |= Q(amount=amount)
-        except (ValueError, TypeError):
-            pass
-
-        # 4. 搜索房号（智能解析，参考房产管理的实现）
-        # 尝试解析搜索词是否为数字房号（如502, 2704等）
-        if search_query.isdigit() and len(search_query) >= 3:
-            # 房号格式：floor + room_number（如 5 + 02 = 502）
-            floor_room_match = None
-            query_len = len(search_query)
-            room_part_len = 2  # 房间号通常是2位数
-
-            if query_len == 3:
-                # 501 → floor=5, room="01"
-                floor_num = int(search_query[0])
-                room_suffix = search_query[1:]
-                floor_room_match = (floor_num, room_suffix)
-            elif query_len == 4:
-                # 2704 → floor=27, room="04"
-                floor_num = int(search_query[:2])
-                room_suffix = search_query[2:]
-                floor_room_match = (floor_num, room_suffix)
-            elif query_len == 5:
-                # 10001 → floor=100, room="01"
-                floor_num = int(search_query[:3])
-                room_suffix = search_query[3:]
-                floor_room_match = (floor_num, room_suffix)
-
-            # 如果匹配到楼层+房间号模式，添加到查询条件
-            if floor_room_match:
-                floor_num, room_suffix = floor_room_match
-                queries |= Q(property_unit__floor=floor_num, property_unit__room_number__startswith=room_suffix)
-
-        # 5. 搜索纯房间号（如"02"或"502"）
-        queries |= Q(property_unit__room_number__icontains=search_query)
-
-        # 6. 搜索楼栋名称（如"4号楼"）
-        queries |= Q(property_unit__building__name__icontains=search_query)
-
-        # 应用所有查询条件
         bills_queryset = bills_queryset.filter(queries)
 
     # 应用账单筛选条件
@@ -1009,15 +675,10 @@ def payment_list(request):
     if bill_filter_status:
         bills_queryset = bills_queryset.filter(status=bill_filter_status)
 
-    bills_queryset = bills_queryset.order_by('-created_at').distinct()
-    bill_paginator = Paginator(bills_queryset, page_size)
-
-    try:
-        bills_page = bill_paginator.page(page)
-    except PageNotAnInteger:
-        bills_page = bill_paginator.page(1)
-    except EmptyPage:
-        bills_page = bill_paginator.page(bill_paginator.num_pages)
+    # 关联均为多对一，不会产生重复行，无需 distinct
+    bills_queryset = bills_queryset.order_by('-created_at', '-id')
+    bill_paginator = KeysetPaginator(bills_queryset, page_size)
+    bills_page = bill_paginator.get_page(request.GET.get('cursor'))
 
     # ========== 费用标准 ==========
     # 获取费用标准筛选参数
@@ -1053,12 +714,11 @@ def payment_list(request):
         'bill', 'bill__owner', 'bill__property_unit', 'bill__property_unit__community', 'bill__property_unit__building'
     )
 
-    # 缴费记录搜索逻辑
+    # 缴费记录搜索逻辑：交易号前缀，或按房产搜索索引匹配房号、楼栋、业主
     if search_query:
         records_queryset = records_queryset.filter(
-            Q(transaction_id__icontains=search_query) |
-            Q(bill__property_unit__room_number__icontains=search_query) |
-            Q(bill__owner__name__icontains=search_query)
+            Q(transaction_id__startswith=search_query) |
+            Q(bill__property_unit_id__in=matching_property_ids(search_query))
         )
 
     # 应用缴费记录筛选条件
@@ -1067,15 +727,9 @@ def payment_list(request):
     if record_filter_payment_method:
         records_queryset = records_queryset.filter(payment_method=record_filter_payment_method)
 
-    records_queryset = records_queryset.order_by('-payment_time')
-    record_paginator = Paginator(records_queryset, page_size)
-
-    try:
-        records_page = record_paginator.page(page)
-    except PageNotAnInteger:
-        records_page = record_paginator.page(1)
-    except EmptyPage:
-        records_page = record_paginator.page(record_paginator.num_pages)
+    records_queryset = records_queryset.order_by('-payment_time', '-id')
+    record_paginator = KeysetPaginator(records_queryset, page_size)
+    records_page = record_paginator.get_page(request.GET.get('record_cursor'))
 
     # 获取所有小区用于筛选下拉框
     communities = Community.objects.all().order_by('name')
@@ -1094,7 +748,7 @@ def payment_list(request):
         'standard_total': standard_paginator.count,
         'record_total': record_paginator.count,
     }
-    context.update(get_common_context())
+    context.update(get_common_context(request.user))
     return render(request, 'admin/payment.html', context)
 
 
@@ -1105,7 +759,7 @@ def maintenance_list(request):
     from apps.community.models import Community
     from django.db.models import Count, Q
     from django.utils import timezone
-    from django.core.paginator import Paginator
+    from .pagination import KeysetPaginator
 
     # 获取所有小区（用于筛选下拉框）
     communities = Community.objects.all()
@@ -1190,13 +844,12 @@ def maintenance_list(request):
 
     # 分页
     page_size = int(request.GET.get('page_size', 20))
-    page_number = request.GET.get('page', 1)
-    paginator = Paginator(requests, page_size)
-    requests_page = paginator.get_page(page_number)
+    paginator = KeysetPaginator(requests.order_by('-created_at', '-id'), page_size)
+    requests_page = paginator.get_page(request.GET.get('cursor'))
 
     context = {
         'requests': requests_page,
-        'request_total': requests.count(),
+        'request_total': paginator.count,
         'page_size': page_size,
         # 小区列表
         'communities': communities,
@@ -1213,7 +866,7 @@ def maintenance_list(request):
         'priority_stats': priority_stats,
         'total_monthly': total_monthly,
     }
-    context.update(get_common_context())
+    context.update(get_common_context(request.user))
     return render(request, 'admin/maintenance.html', context)
 
 
@@ -1241,7 +894,7 @@ def user_list(request):
         'tenant_count': tenant_count,
         'staff_count': staff_count,
     }
-    context.update(get_common_context())
+    context.update(get_common_context(request.user))
     return render(request, 'admin/users.html', context)
 
 
@@ -1253,14 +906,15 @@ def settings_list(request):
     context = {
         'configs': configs,
     }
-    context.update(get_common_context())
+    context.update(get_common_context(request.user))
     return render(request, 'admin/settings.html', context)
 
 
 @login_required
 def log_list(request):
     """操作日志"""
-    from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
+    from .pagination import KeysetPaginator
+    from .search import search_q
 
     # 获取筛选参数
     search_query = request.GET.get('search', '')
@@ -1274,8 +928,7 @@ def log_list(request):
     # 应用筛选条件
     if search_query:
         logs_queryset = logs_queryset.filter(
-            Q(operator__username__icontains=search_query) |
-            Q(description__icontains=search_query)
+            search_q(OperationLog, ['operator__username', 'description'], search_query)
         )
 
     if module_filter:
@@ -1287,16 +940,9 @@ def log_list(request):
     if date_filter:
         logs_queryset = logs_queryset.filter(created_at__date=date_filter)
 
-    # 分页
-    paginator = Paginator(logs_queryset, 50)  # 每页50条
-    page = request.GET.get('page', 1)
-
-    try:
-        logs = paginator.page(page)
-    except PageNotAnInteger:
-        logs = paginator.page(1)
-    except EmptyPage:
-        logs = paginator.page(paginator.num_pages)
+    # 分页（游标分页，每页50条）
+    paginator = KeysetPaginator(logs_queryset.order_by('-created_at', '-id'), 50)
+    logs = paginator.get_page(request.GET.get('cursor'))
 
     # 计算统计数据
     from django.utils import timezone
@@ -1322,17 +968,15 @@ def log_list(request):
         'date_filter': date_filter,
         'search_query': search_query,
     }
-    context.update(get_common_context())
+    context.update(get_common_context(request.user))
     return render(request, 'admin/logs.html', context)
 
 
 @login_required
 def export_logs(request):
     """导出操作日志为Excel"""
-    import openpyxl
-    from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
-    from django.http import HttpResponse
-    from datetime import datetime
+    from .exports import EXPORT_CHUNK_SIZE, export_response, format_datetime
+    from .search import search_q
 
     # 记录导出操作
     log_operation(request, '导出', '系统管理', '导出操作日志')
@@ -1345,13 +989,12 @@ def export_logs(request):
     date_to = request.GET.get('date_to', '')
 
     # 获取日志数据
-    logs_queryset = OperationLog.objects.select_related('operator').all()
+    logs_queryset = OperationLog.objects.all()
 
     # 应用筛选条件
     if search_query:
         logs_queryset = logs_queryset.filter(
-            Q(operator__username__icontains=search_query) |
-            Q(description__icontains=search_query)
+            search_q(OperationLog, ['operator__username', 'description'], search_query)
         )
 
     if module_filter:
@@ -1366,73 +1009,27 @@ def export_logs(request):
     if date_to:
         logs_queryset = logs_queryset.filter(created_at__date__lte=date_to)
 
-    logs = logs_queryset.order_by('-created_at')[:10000]  # 最多导出10000条
-
-    # 创建Excel工作簿
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = '操作日志'
-
-    # 定义样式
-    header_font = Font(name='微软雅黑', size=11, bold=True, color='FFFFFF')
-    header_fill = PatternFill(start_color='4472C4', end_color='4472C4', fill_type='solid')
-    header_alignment = Alignment(horizontal='center', vertical='center', wrap_text=True)
-
-    thin_border = Border(
-        left=Side(style='thin'),
-        right=Side(style='thin'),
-        top=Side(style='thin'),
-        bottom=Side(style='thin')
-    )
-
-    # 设置列标题
-    headers = ['时间', '操作人', '角色', '操作类型', '模块', '操作描述', 'IP地址', '用户代理']
-    ws.append(headers)
-
-    # 设置列宽
-    ws.column_dimensions['A'].width = 20  # 时间
-    ws.column_dimensions['B'].width = 15  # 操作人
-    ws.column_dimensions['C'].width = 12  # 角色
-    ws.column_dimensions['D'].width = 12  # 操作类型
-    ws.column_dimensions['E'].width = 15  # 模块
-    ws.column_dimensions['F'].width = 40  # 操作描述
-    ws.column_dimensions['G'].width = 15  # IP地址
-    ws.column_dimensions['H'].width = 30  # 用户代理
-
-    # 设置标题行样式
-    for col_num, header in enumerate(headers, 1):
-        cell = ws.cell(row=1, column=col_num)
-        cell.font = header_font
-        cell.fill = header_fill
-        cell.alignment = header_alignment
-        cell.border = thin_border
-
-    # 填充数据
-    for row_num, log in enumerate(logs, 2):
-        ws.cell(row=row_num, column=1, value=log.created_at.strftime('%Y-%m-%d %H:%M:%S'))
-        ws.cell(row=row_num, column=2, value=log.operator.username if log.operator else '系统')
-        ws.cell(row=row_num, column=3, value=log.operator.get_role_display() if log.operator else '-')
-        ws.cell(row=row_num, column=4, value=log.action)
-        ws.cell(row=row_num, column=5, value=log.module)
-        ws.cell(row=row_num, column=6, value=log.description)
-        ws.cell(row=row_num, column=7, value=str(log.ip_address))
-        ws.cell(row=row_num, column=8, value=log.user_agent or '')
-
-        # 设置数据行样式
-        for col_num in range(1, 9):
-            cell = ws.cell(row=row_num, column=col_num)
-            cell.alignment = Alignment(vertical='center', wrap_text=True)
-            cell.border = thin_border
-
-    # 准备响应
-    filename = f'操作日志_{datetime.now().strftime("%Y%m%d_%H%M%S")}.xlsx'
-    response = HttpResponse(
-        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    logs = logs_queryset.order_by('-created_at').values_list(
+        'created_at', 'operator__username', 'operator__role', 'action', 'module',
+        'description', 'ip_address', 'user_agent'
+    ).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+
+    role_map = dict(User._meta.get_field('role').choices)
+    rows = (
+        [
+            format_datetime(created_at),
+            username or '系统',
+            role_map.get(role, role) if username else '-',
+            action, module, description, str(ip_address), user_agent or '',
+        ]
+        for created_at, username, role, action, module, description, ip_address, user_agent in logs
     )
-    response['Content-Disposition'] = f'attachment; filename="{filename}"'
 
-    wb.save(response)
-    return response
+    columns = [
+        ('时间', 20), ('操作人', 15), ('角色', 12), ('操作类型', 12),
+        ('模块', 15), ('操作描述', 40), ('IP地址', 15), ('用户代理', 30),
+    ]
+    return export_response(request, '操作日志', '操作日志', columns, rows)
 
 
 @login_required
@@ -1446,7 +1043,7 @@ def payment_config_list(request):
         'configs': configs,
         'page_title': '支付管理',
     }
-    context.update(get_common_context())
+    context.update(get_common_context(request.user))
     return render(request, 'admin/payment_config.html', context)
 
 
@@ -1479,7 +1076,7 @@ def account_management_list(request):
         'role_stats': role_stats,
         'page_title': '账户管理',
     }
-    context.update(get_common_context())
+    context.update(get_common_context(request.user))
     return render(request, 'admin/account_management.html', context)
 
 
@@ -1498,7 +1095,7 @@ def wechat_pay_config_list(request):
         'configs': configs,
         'page_title': '微信支付配置',
     }
-    context.update(get_common_context())
+    context.update(get_common_context(request.user))
     return render(request, 'admin/wechat_pay_config.html', context)
 
 
@@ -1537,14 +1134,26 @@ def wechat_pay_create_order(request):
         return JsonResponse({'success': False, 'error': str(e)})
 
 
+def _wechat_notify_response(return_code, return_msg='OK', status=200):
+    """微信支付回调应答（XML）"""
+    return HttpResponse(
+        f'<xml><return_code><![CDATA[{return_code}]]></return_code>'
+        f'<return_msg><![CDATA[{return_msg}]]></return_msg></xml>',
+        content_type='application/xml',
+        status=status
+    )
+
+
 @csrf_exempt
 def wechat_pay_notify(request):
-    """微信支付回调通知"""
-    from django.http import HttpResponse
-    from django.views.decorators.http import require_POST
-    from apps.payment.models import PaymentBill, PaymentRecord
+    """
+    微信支付回调通知
+
+    只做验签、去重和入账，尽快应答；重复回调直接返回成功，
+    快照刷新和通知由后台任务处理
+    """
     from apps.core.wechat_pay import WeChatPayService
-    from django.utils import timezone
+    from apps.payment.services import apply_wechat_payment
 
     if request.method != 'POST':
         return HttpResponse('只支持POST请求', status=405)
@@ -1555,41 +1164,27 @@ def wechat_pay_notify(request):
     # 验证回调
     verification = service.verify_notify(request.body)
     if not verification['success']:
-        return HttpResponse('FAIL', status=400)
+        return _wechat_notify_response('FAIL', verification['error'], status=400)
 
     data = verification['data']
-
-    # 查找订单
     out_trade_no = data.get('out_trade_no')
     transaction_id = data.get('transaction_id')
 
-    # 从商户订单号中提取bill_id（格式：PROP{bill_id_hex}_{timestamp}）
-    try:
-        bill_id_hex = out_trade_no.split('_')[0].replace('PROP', '')
-        bill_id = bill_id_hex[:32]
-        bill = PaymentBill.objects.get(id=bill_id)
-
-        # 更新账单状态
-        if data.get('result_code') == 'SUCCESS':
-            # 支付成功
-            total_fee = Decimal(data.get('total_fee', '0')) / 100  # 转换为元
-
-            # 创建缴费记录
-            PaymentRecord.objects.create(
-                bill=bill,
-                amount=total_fee,
-                payment_method='wechat',
-                operator='系统',
-                payment_time=timezone.now(),
-                transaction_id=transaction_id,
-                remark=f'微信支付-{out_trade_no}'
-            )
-
-            return HttpResponse('SUCCESS')
+    # 支付未成功的通知无需处理，应答后微信不再重试
+    if data.get('result_code') != 'SUCCESS':
+        logger.info(f'微信支付未成功: {out_trade_no} {data.get("err_code_des", "")}')
+        return _wechat_notify_response('SUCCESS')
 
+    try:
+        outcome, _ = apply_wechat_payment(out_trade_no, transaction_id, data.get('total_fee', '0'))
     except Exception as e:
-        print(f'处理支付回调异常: {e}')
-        return HttpResponse('FAIL', status=500)
+        logger.error(f'处理支付回调异常: {out_trade_no} {str(e)}')
+        return _wechat_notify_response('FAIL', '处理失败', status=500)
+
+    if outcome == 'bill_not_found':
+        # 重试也无法找到账单，应答成功并记录，由人工核对
+        logger.error(f'支付回调未找到账单: {out_trade_no} {transaction_id}')
+    return _wechat_notify_response('SUCCESS')
 
 
 # ==================== 消息推送视图 ====================
@@ -1629,15 +1224,34 @@ def notification_list(request):
             'related_maintenance_id': str(notif.related_maintenance_id) if notif.related_maintenance_id else None,
         })
 
+    # 系统公告按发布时间与通知合并
+    announcements = NotificationService.get_user_announcements(request.user, unread_only=unread_only, limit=limit)
+    for announcement in announcements:
+        notifications_data.append({
+            'id': str(announcement.id),
+            'type': 'system_announcement',
+            'title': announcement.title,
+            'content': announcement.content,
+            'status': 'read' if announcement.read_at else 'sent',
+            'created_at': announcement.created_at.isoformat(),
+            'read_at': announcement.read_at.isoformat() if announcement.read_at else None,
+            'related_bill_id': None,
+            'related_maintenance_id': None,
+        })
+    notifications_data.sort(key=lambda item: item['created_at'], reverse=True)
+
     return JsonResponse({
         'success': True,
-        'notifications': notifications_data
+        'notifications': notifications_data[:limit]
     })
 
 
 @login_required
 def notification_mark_read(request, notification_id):
-    """标记通知为已读"""
+    """标记通知（或系统公告）为已读"""
+    from .models import Notification
+    from .notification_service import NotificationService
+
     try:
         notification = Notification.objects.get(id=notification_id, recipient=request.user)
         notification.mark_as_read()
@@ -1647,6 +1261,12 @@ def notification_mark_read(request, notification_id):
             'message': '已标记为已读'
         })
     except Notification.DoesNotExist:
+        if NotificationService.visible_announcements(request.user).filter(id=notification_id).exists():
+            NotificationService.mark_announcements_read(request.user, [notification_id])
+            return JsonResponse({
+                'success': True,
+                'message': '已标记为已读'
+            })
         return JsonResponse({
             'success': False,
             'error': '通知不存在或无权访问'
@@ -1658,7 +1278,7 @@ def notification_unread_count(request):
     """获取未读通知数量"""
     from .notification_service import NotificationService
 
-    count = NotificationService.get_unread_count(str(request.user.id))
+    count = NotificationService.get_unread_count(request.user)
 
     return JsonResponse({
         'success': True,
@@ -1668,8 +1288,11 @@ def notification_unread_count(request):
 
 @login_required
 def notification_mark_all_read(request):
-    """标记所有通知为已读"""
+    """标记所有通知和系统公告为已读"""
     from django.utils import timezone
+    from .models import Notification
+    from .notification_service import NotificationService
+    from .unread import adjust_unread_notifications
 
     updated = Notification.objects.filter(
         recipient=request.user,
@@ -1678,6 +1301,8 @@ def notification_mark_all_read(request):
         status='read',
         read_at=timezone.now()
     )
+    adjust_unread_notifications({request.user.pk: -updated})
+    updated += NotificationService.mark_announcements_read(request.user)
 
     return JsonResponse({
         'success': True,
@@ -1685,6 +1310,64 @@ def notification_mark_all_read(request):
     })
 
 
+async def event_stream(request):
+    """
+    实时事件流（Server-Sent Events，需在 ASGI 下运行）
+
+    推送当前用户的新通知；管理端用户另外接收报事状态变化、仪表盘计数变化和系统公告。
+    没有事件时定期发送注释行保持连接；客户端断开或连接超过 STREAM_MAX_AGE 后结束（浏览器自动重连）。
+    在 WSGI 下直接返回503：流式响应会占住一个同步工作进程直到超时
+    """
+    import asyncio
+    import json
+    from asgiref.sync import sync_to_async
+    from django.http import StreamingHttpResponse
+    from .events import (DISCONNECT_SCOPE_KEY, DISCONNECTED, HEARTBEAT_INTERVAL, STAFF_CHANNEL, STREAM_MAX_AGE,
+                         get_broker, user_channel, wait_for_event)
+
+    if not hasattr(request, 'scope'):
+        return JsonResponse({'success': False, 'error': '实时事件服务未启用'}, status=503)
+
+    user = await sync_to_async(lambda: request.user if request.user.is_authenticated else None)()
+    if user is None:
+        return JsonResponse({'success': False, 'error': '请先登录'}, status=401)
+
+    channels = [user_channel(user.pk)]
+    if user.role not in ('owner', 'tenant'):
+        channels.append(STAFF_CHANNEL)
+    subscription = await get_broker().subscribe(channels)
+    disconnected = request.scope.get(DISCONNECT_SCOPE_KEY)
+
+    async def stream():
+        loop = asyncio.get_running_loop()
+        closes_at = loop.time() + STREAM_MAX_AGE
+        try:
+            yield 'retry: 5000\n\n'
+            while True:
+                remaining = closes_at - loop.time()
+                if remaining <= 0:
+                    break
+                message = await wait_for_event(subscription, min(HEARTBEAT_INTERVAL, remaining), disconnected)
+                if message is DISCONNECTED:
+                    break
+                if message is None:
+                    yield ': keepalive\n\n'
+                    continue
+                event = json.loads(message)
+                roles = event['data'].get('roles') if event['type'] == 'announcement' else None
+                if roles and user.role not in roles:
+                    continue
+                yield f"event: {event['type']}\ndata: {json.dumps(event['data'], ensure_ascii=False)}\n\n"
+        finally:
+            await subscription.close()
+
+    response = StreamingHttpResponse(stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # 关闭 Nginx 对该响应的缓冲
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
 @require_http_methods(["POST"])
 @login_required
 def send_test_notification(request):
@@ -1706,10 +1389,10 @@ def send_test_notification(request):
 
     try:
         if notification_type == 'system_announcement':
-            notifications = NotificationService.send_system_announcement(title, content)
+            NotificationService.send_system_announcement(title, content, created_by=request.user)
             return JsonResponse({
                 'success': True,
-                'message': f'已发送 {len(notifications)} 条系统公告'
+                'message': '系统公告已发布'
             })
         else:
             return JsonResponse({
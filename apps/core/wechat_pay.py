@@ -3,13 +3,14 @@
 支持个人账号和企业对公账户的微信支付功能
 """
 import hashlib
-import time
+import hmac
 import uuid
 import xml.etree.ElementTree as ET
 from decimal import Decimal
 from datetime import datetime
 
 from django.conf import settings
+from apps.core.http_client import get_http_client
 from apps.core.models import WeChatPayConfig
 
 
@@ -48,8 +49,12 @@ class WeChatPayService:
             }
 
         try:
-            # 生成商户订单号
-            out_trade_no = f"PROP{bill.id.hex[:16].upper()}_{int(time.time())}"
+            from apps.payment.models import WeChatPayOrder
+            from apps.payment.services import wechat_out_trade_no
+
+            # 生成商户订单号（账单编号_时间戳，回调时据此找到账单）
+            out_trade_no = wechat_out_trade_no(bill)
+            total_fee = int(bill.unpaid_amount * 100)  # 单位：分
 
             # 订单参数
             params = {
@@ -58,7 +63,7 @@ class WeChatPayService:
                 'nonce_str': self._generate_nonce_str(),
                 'body': f'{bill.community.name}-{bill.billing_period}物业费',
                 'out_trade_no': out_trade_no,
-                'total_fee': int(bill.unpaid_amount * 100),  # 单位：分
+                'total_fee': total_fee,
                 'spbill_create_ip': client_ip,
                 'notify_url': self.config.notify_url or '',
                 'trade_type': 'JSAPI',
@@ -72,12 +77,10 @@ class WeChatPayService:
             xml_data = self._dict_to_xml(params)
 
             # 调用统一下单API
-            import requests
-            response = requests.post(
+            response = get_http_client().post(
                 f'{self.api_url}/pay/unifiedorder',
                 data=xml_data.encode('utf-8'),
-                headers={'Content-Type': 'application/xml'},
-                verify=False  # 开发环境可以不验证证书
+                headers={'Content-Type': 'application/xml'}
             )
 
             # 解析返回结果
@@ -88,6 +91,9 @@ class WeChatPayService:
                 code_url = result.get('code_url', '')
                 prepay_id = result.get('prepay_id', '')
 
+                # 记录订单，支付回调丢失时由对账任务按订单号补查
+                WeChatPayOrder.objects.create(bill=bill, out_trade_no=out_trade_no, total_fee=total_fee)
+
                 return {
                     'success': True,
                     'out_trade_no': out_trade_no,
@@ -131,17 +137,21 @@ class WeChatPayService:
 
             xml_data = self._dict_to_xml(params)
 
-            import requests
-            response = requests.post(
+            response = get_http_client().post(
                 f'{self.api_url}/pay/orderquery',
                 data=xml_data.encode('utf-8'),
-                headers={'Content-Type': 'application/xml'},
-                verify=False
+                headers={'Content-Type': 'application/xml'}
             )
 
             result = self._parse_xml_response(response.text)
 
             if result.get('return_code') == 'SUCCESS':
+                # 业务结果（含交易状态、金额）带签名，未通过校验的响应不可信
+                if not self._verify_sign(result):
+                    return {
+                        'success': False,
+                        'error': '签名验证失败'
+                    }
                 trade_state = result.get('trade_state', '')
                 status_map = {
                     'SUCCESS': '支付成功',
@@ -222,6 +232,16 @@ class WeChatPayService:
             result[child.tag] = child.text
         return result
 
+    def _verify_sign(self, result):
+        """
+        校验微信返回数据的签名
+        :param result: 解析后的字典（含 sign）
+        :return: 是否通过
+        """
+        sign = result.get('sign') or ''
+        params = {key: value for key, value in result.items() if key != 'sign'}
+        return bool(sign) and hmac.compare_digest(sign, self._generate_sign(params))
+
     def verify_notify(self, xml_data):
         """
         验证支付回调通知
@@ -232,15 +252,13 @@ class WeChatPayService:
             result = self._parse_xml_response(xml_data)
 
             # 验证签名
-            sign = result.pop('sign', '')
-            calculated_sign = self._generate_sign(result)
-
-            if sign != calculated_sign:
+            if not self._verify_sign(result):
                 return {
                     'success': False,
                     'error': '签名验证失败'
                 }
 
+            result.pop('sign', None)
             return {
                 'success': True,
                 'data': result
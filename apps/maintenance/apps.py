@@ -8,3 +8,6 @@ class MaintenanceConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.maintenance'
     verbose_name = '报事管理'
+
+    def ready(self):
+        import apps.maintenance.signals
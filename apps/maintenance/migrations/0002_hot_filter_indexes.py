@@ -0,0 +1,38 @@
+# Generated by Django 4.2.7 on 2026-10-18 06:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("maintenance", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="maintenancerequest",
+            index=models.Index(
+                fields=["status", "priority"], name="maint_status_priority_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="maintenancerequest",
+            index=models.Index(
+                fields=["category", "-created_at"], name="maint_category_created_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="maintenancerequest",
+            index=models.Index(fields=["-created_at"], name="maint_created_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="maintenancerequest",
+            index=models.Index(
+                condition=models.Q(
+                    ("status__in", ["pending", "assigned", "processing"])
+                ),
+                fields=["-created_at"],
+                name="maint_open_created_idx",
+            ),
+        ),
+    ]
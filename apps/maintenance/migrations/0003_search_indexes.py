@@ -0,0 +1,16 @@
+# Generated by Django 4.2.7 on 2026-10-18 15:10
+
+from django.db import migrations
+
+from apps.core.search import CreateSearchIndex
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0008_search_indexes"),
+        ("maintenance", "0002_hot_filter_indexes"),
+    ]
+
+    operations = [
+        CreateSearchIndex("MaintenanceRequest", ["description"]),
+    ]
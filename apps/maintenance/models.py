@@ -62,6 +62,19 @@ class MaintenanceRequest(models.Model):
         verbose_name = '报事记录'
         verbose_name_plural = verbose_name
         ordering = ['-created_at']
+        indexes = [
+            # 仪表盘待处理/紧急报事计数、列表按状态和优先级筛选
+            models.Index(fields=['status', 'priority'], name='maint_status_priority_idx'),
+            # 列表按类别筛选后按时间排序
+            models.Index(fields=['category', '-created_at'], name='maint_category_created_idx'),
+            # 默认排序、最近报事、本月报事统计
+            models.Index(fields=['-created_at'], name='maint_created_idx'),
+            # 管理端看板只列出未完成的报事（部分索引）
+            models.Index(
+                fields=['-created_at'], name='maint_open_created_idx',
+                condition=models.Q(status__in=['pending', 'assigned', 'processing']),
+            ),
+        ]
 
     def __str__(self):
         return f"{self.request_number} - {self.get_category_display()}"
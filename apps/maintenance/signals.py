@@ -0,0 +1,58 @@
+"""
+Maintenance Signals
+报事状态变化时推送实时事件，并推送仪表盘待处理/紧急报事数的变化
+"""
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from apps.core.events import STAFF_CHANNEL, publish, publish_dashboard_delta
+
+from .models import MaintenanceRequest
+
+
+def _counts(status, priority):
+    """报事在仪表盘待处理数、紧急数中的计数"""
+    pending = status == 'pending'
+    return int(pending), int(pending and priority == 'high')
+
+
+@receiver(pre_save, sender=MaintenanceRequest)
+def remember_request_status(sender, instance, raw=False, **kwargs):
+    """记录报事修改前的状态和优先级"""
+    instance._previous_state = None
+    if raw or instance._state.adding:
+        return
+    instance._previous_state = sender.objects.filter(pk=instance.pk).values_list('status', 'priority').first()
+
+
+@receiver(post_save, sender=MaintenanceRequest)
+def publish_request_change(sender, instance, created=False, raw=False, **kwargs):
+    """新建报事或状态变化后推送事件"""
+    if raw:
+        return
+    previous = getattr(instance, '_previous_state', None)
+    previous_status, previous_priority = previous or (None, None)
+    if not created and previous_status == instance.status and previous_priority == instance.priority:
+        return
+
+    if created or previous_status != instance.status:
+        publish(STAFF_CHANNEL, 'maintenance', {
+            'id': instance.pk,
+            'request_number': instance.request_number,
+            'status': instance.status,
+            'status_display': instance.get_status_display(),
+            'previous_status': previous_status,
+        })
+
+    pending, urgent = _counts(instance.status, instance.priority)
+    if previous:
+        old_pending, old_urgent = _counts(previous_status, previous_priority)
+        pending, urgent = pending - old_pending, urgent - old_urgent
+    publish_dashboard_delta(pending_requests=pending, urgent_requests=urgent)
+
+
+@receiver(post_delete, sender=MaintenanceRequest)
+def publish_request_delete(sender, instance, **kwargs):
+    """删除报事后推送仪表盘计数变化"""
+    pending, urgent = _counts(instance.status, instance.priority)
+    publish_dashboard_delta(pending_requests=-pending, urgent_requests=-urgent)
@@ -9,29 +9,35 @@ from django_filters.rest_framework import DjangoFilterBackend
 from django.utils import timezone
 from django.db.models import Q
 from django.shortcuts import get_object_or_404
-from django.http import JsonResponse, HttpResponse
+from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.contrib.auth.decorators import login_required
-import openpyxl
-from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
-from datetime import datetime
 
 from .models import MaintenanceRequest, MaintenanceLog
 from .serializers import (MaintenanceRequestSerializer, MaintenanceRequestListSerializer,
                            MaintenanceCreateSerializer, MaintenanceAssignSerializer,
                            MaintenanceCompleteSerializer, MaintenanceLogSerializer)
 from apps.core.permissions import IsReceptionistUser, IsAdminUser
+from apps.core.relations import SerializerRelationsMixin
+from apps.core.search import IndexedSearchFilter
 
+# 报事序列化器的 property_address 读取房产的小区和楼栋
+MAINTENANCE_SELECT_RELATED = ['community', 'property__community', 'property__building']
 
-class MaintenanceRequestViewSet(viewsets.ModelViewSet):
+
+class MaintenanceRequestViewSet(SerializerRelationsMixin, viewsets.ModelViewSet):
     """报事管理视图集"""
     queryset = MaintenanceRequest.objects.select_related('community', 'property').all()
     permission_classes = [IsAuthenticated]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, IndexedSearchFilter, filters.OrderingFilter]
     filterset_fields = ['community', 'property', 'category', 'status', 'priority']
     search_fields = ['request_number', 'reporter', 'description']
     ordering_fields = ['created_at', 'priority', 'status']
     ordering = ['-created_at']
+    serializer_relations = {
+        MaintenanceRequestListSerializer: {'select_related': MAINTENANCE_SELECT_RELATED},
+        MaintenanceRequestSerializer: {'select_related': MAINTENANCE_SELECT_RELATED, 'prefetch_related': ['logs']},
+    }
 
     def get_serializer_class(self):
         if self.action == 'list':
@@ -183,7 +189,9 @@ class MaintenanceRequestViewSet(viewsets.ModelViewSet):
                 owner = Owner.objects.get(user=user)
                 # 获取业主所有房产的报事记录
                 properties = [op.property for op in owner.owners.all()]
-                requests = MaintenanceRequest.objects.filter(property__in=properties)
+                requests = self.with_relations(
+                    MaintenanceRequest.objects.filter(property__in=properties), MaintenanceRequestListSerializer
+                )
                 serializer = MaintenanceRequestListSerializer(requests, many=True)
                 return Response(serializer.data)
             except Owner.DoesNotExist:
@@ -192,7 +200,9 @@ class MaintenanceRequestViewSet(viewsets.ModelViewSet):
             from apps.property.models import Tenant
             try:
                 tenant = Tenant.objects.get(user=user, is_active=True)
-                requests = MaintenanceRequest.objects.filter(property=tenant.property)
+                requests = self.with_relations(
+                    MaintenanceRequest.objects.filter(property=tenant.property), MaintenanceRequestListSerializer
+                )
                 serializer = MaintenanceRequestListSerializer(requests, many=True)
                 return Response(serializer.data)
             except Tenant.DoesNotExist:
@@ -271,126 +281,60 @@ class MaintenanceRequestViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def export_excel(self, request):
         """导出报事数据到Excel"""
+        from apps.core.exports import EXPORT_CHUNK_SIZE, export_response
+
         # 获取筛选后的数据
         queryset = self.filter_queryset(self.get_queryset())
-
-        # 创建工作簿
-        wb = openpyxl.Workbook()
-        ws = wb.active
-        ws.title = '报事记录'
-
-        # 定义表头
-        headers = [
-            '报事编号', '小区', '房产地址', '报事类型', '优先级',
-            '状态', '报事人', '联系电话', '详细描述',
-            '指派给', '处理结果', '创建时间', '更新时间'
+        rows = queryset.values(
+            'id', 'request_number', 'community__name', 'property__building__name', 'property__unit',
+            'property__floor', 'property__room_number', 'category', 'priority', 'status',
+            'reporter', 'reporter_phone', 'description', 'assigned_to', 'created_at', 'updated_at'
+        ).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+
+        columns = [
+            ('报事编号', 15), ('小区', 15), ('房产地址', 25), ('报事类型', 12), ('优先级', 10),
+            ('状态', 12), ('报事人', 12), ('联系电话', 15), ('详细描述', 40),
+            ('指派给', 12), ('处理结果', 30), ('创建时间', 18), ('更新时间', 18),
         ]
-
-        # 设置表头样式
-        header_fill = PatternFill(start_color="4472C4", end_color="4472C4", fill_type="solid")
-        header_font = Font(bold=True, color="FFFFFF", size=11)
-        header_alignment = Alignment(horizontal="center", vertical="center", wrap_text=True)
-
-        # 写入表头
-        for col_num, header in enumerate(headers, 1):
-            cell = ws.cell(row=1, column=col_num)
-            cell.value = header
-            cell.fill = header_fill
-            cell.font = header_font
-            cell.alignment = header_alignment
-
-        # 设置列宽
-        column_widths = {
-            'A': 15, 'B': 15, 'C': 25, 'D': 12, 'E': 10,
-            'F': 12, 'G': 12, 'H': 15, 'I': 40,
-            'J': 12, 'K': 30, 'L': 18, 'M': 18
-        }
-        for col, width in column_widths.items():
-            ws.column_dimensions[col].width = width
-
-        # 写入数据
-        data_font = Font(size=10)
-        data_alignment = Alignment(horizontal="left", vertical="center", wrap_text=True)
-
-        for row_num, maintenance in enumerate(queryset, 2):
-            # 获取最新的处理日志
-            latest_log = maintenance.logs.order_by('-created_at').first()
-            result_description = latest_log.description if latest_log and latest_log.action in ['完成', '关闭'] else ''
-
-            # 状态映射
-            status_map = {
-                'pending': '待派单',
-                'assigned': '已派单',
-                'processing': '处理中',
-                'completed': '已完成',
-                'closed': '已关闭'
-            }
-
-            # 优先级映射
-            priority_map = {
-                'low': '低',
-                'medium': '中',
-                'high': '高',
-                'urgent': '紧急'
-            }
-
-            # 报事类型映射
-            category_map = {
-                'plumbing': '水暖',
-                'electrical': '电气',
-                'structural': '结构',
-                'appliance': '家电',
-                'other': '其他'
-            }
-
-            data = [
-                maintenance.request_number,
-                maintenance.community.name if maintenance.community else '',
-                str(maintenance.property) if maintenance.property else '',
-                category_map.get(maintenance.category, maintenance.category),
-                priority_map.get(maintenance.priority, maintenance.priority),
-                status_map.get(maintenance.status, maintenance.status),
-                maintenance.reporter or '',
-                maintenance.reporter_phone or '',
-                maintenance.description or '',
-                maintenance.assigned_to or '',
-                result_description,
-                maintenance.created_at.strftime('%Y-%m-%d %H:%M:%S') if maintenance.created_at else '',
-                maintenance.updated_at.strftime('%Y-%m-%d %H:%M:%S') if maintenance.updated_at else ''
-            ]
-
-            for col_num, value in enumerate(data, 1):
-                cell = ws.cell(row=row_num, column=col_num)
-                cell.value = value
-                cell.font = data_font
-                cell.alignment = data_alignment
-
-        # 设置边框
-        thin_border = Border(
-            left=Side(style='thin'),
-            right=Side(style='thin'),
-            top=Side(style='thin'),
-            bottom=Side(style='thin')
-        )
-
-        # 为所有数据单元格添加边框
-        for row in ws.iter_rows(min_row=1, max_row=ws.max_row, min_col=1, max_col=len(headers)):
-            for cell in row:
-                cell.border = thin_border
-
-        # 冻结首行
-        ws.freeze_panes = 'A2'
-
-        # 生成文件名
-        filename = f'报事记录_{datetime.now().strftime("%Y%m%d_%H%M%S")}.xlsx'
-
-        # 设置响应
-        response = HttpResponse(
-            content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-        )
-        response['Content-Disposition'] = f'attachment; filename="{filename}"'
-        wb.save(response)
-        return response
+        return export_response(request, '报事记录', '报事记录', columns, self._export_rows(rows))
+
+    @staticmethod
+    def _export_rows(rows):
+        """按块查询最新处理日志，生成导出行"""
+        from apps.core.exports import format_datetime, iter_chunks, property_label
+
+        status_map = dict(MaintenanceRequest.STATUS_CHOICES)
+        priority_map = dict(MaintenanceRequest.PRIORITY_CHOICES)
+        category_map = dict(MaintenanceRequest.CATEGORY_CHOICES)
+
+        for chunk in iter_chunks(rows):
+            # 每块一次查询，取每条报事最新的处理日志
+            latest_logs = {}
+            for request_id, log_action, log_description in MaintenanceLog.objects.filter(
+                request_id__in=[row['id'] for row in chunk]
+            ).order_by('request_id', '-created_at').values_list('request_id', 'action', 'description'):
+                latest_logs.setdefault(request_id, (log_action, log_description))
+
+            for row in chunk:
+                log_action, log_description = latest_logs.get(row['id'], (None, ''))
+                yield [
+                    row['request_number'],
+                    row['community__name'] or '',
+                    property_label(
+                        row['property__building__name'], row['property__unit'],
+                        row['property__floor'], row['property__room_number']
+                    ),
+                    category_map.get(row['category'], row['category']),
+                    priority_map.get(row['priority'], row['priority']),
+                    status_map.get(row['status'], row['status']),
+                    row['reporter'] or '',
+                    row['reporter_phone'] or '',
+                    row['description'] or '',
+                    row['assigned_to'] or '',
+                    log_description if log_action in ['完成', '关闭'] else '',
+                    format_datetime(row['created_at']),
+                    format_datetime(row['updated_at']),
+                ]
 
 
 class MaintenanceLogViewSet(viewsets.ReadOnlyModelViewSet):
@@ -2,7 +2,7 @@
 Payment Admin Configuration
 """
 from django.contrib import admin
-from .models import FeeStandard, PaymentBill, PaymentRecord
+from .models import FeeStandard, PaymentBill, PaymentRecord, CollectionSnapshot, BillingRun, BillingRunItem
 
 
 @admin.register(FeeStandard)
@@ -21,8 +21,8 @@ class PaymentBillAdmin(admin.ModelAdmin):
                     'amount', 'paid_amount', 'status', 'due_date']
     list_filter = ['community', 'fee_type', 'status', 'billing_period', 'created_at']
     search_fields = ['bill_number', 'property_unit__room_number', 'owner__name']
-    readonly_fields = ['bill_number', 'created_at', 'updated_at']
-    ordering = ['-billing_period', '-created_at']
+    readonly_fields = ['bill_number', 'period_start', 'period_cycle', 'created_at', 'updated_at']
+    ordering = ['-period_start', '-created_at']
 
 
 @admin.register(PaymentRecord)
@@ -33,3 +33,35 @@ class PaymentRecordAdmin(admin.ModelAdmin):
     search_fields = ['transaction_id', 'out_trade_no', 'payer']
     readonly_fields = ['transaction_id', 'created_at']
     ordering = ['-payment_time']
+
+
+@admin.register(CollectionSnapshot)
+class CollectionSnapshotAdmin(admin.ModelAdmin):
+    """收缴快照管理"""
+    list_display = ['community', 'billing_period', 'fee_type', 'bill_count', 'billed_amount',
+                    'collected_amount', 'overdue_amount', 'updated_at']
+    list_filter = ['community', 'fee_type', 'billing_period']
+    readonly_fields = ['period_start', 'updated_at']
+    ordering = ['-period_start', 'community', 'fee_type']
+
+
+class BillingRunItemInline(admin.TabularInline):
+    """批量出账明细"""
+    model = BillingRunItem
+    extra = 0
+    readonly_fields = ['community', 'status', 'created_count', 'skipped_count', 'failed_count',
+                       'started_at', 'finished_at']
+    exclude = ['errors']
+
+
+@admin.register(BillingRun)
+class BillingRunAdmin(admin.ModelAdmin):
+    """批量出账任务管理"""
+    list_display = ['billing_period', 'status', 'completed_communities', 'total_communities',
+                    'created_count', 'skipped_count', 'failed_count', 'created_at', 'finished_at']
+    list_filter = ['status', 'billing_period']
+    readonly_fields = ['status', 'total_communities', 'completed_communities', 'created_count',
+                       'skipped_count', 'failed_count', 'error_message', 'created_at',
+                       'started_at', 'finished_at']
+    inlines = [BillingRunItemInline]
+    ordering = ['-created_at']
@@ -8,3 +8,6 @@ class PaymentConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.payment'
     verbose_name = '缴费管理'
+
+    def ready(self):
+        import apps.payment.signals
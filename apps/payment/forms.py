@@ -3,6 +3,7 @@ Payment Forms
 """
 from django import forms
 from .models import PaymentBill, FeeStandard, PaymentRecord
+from .periods import normalize_billing_period
 
 
 class FeeStandardForm(forms.ModelForm):
@@ -63,7 +64,7 @@ class PaymentBillForm(forms.ModelForm):
             }),
             'billing_period': forms.TextInput(attrs={
                 'class': 'form-control',
-                'placeholder': '如：2026-01'
+                'placeholder': '如：2026-01、2026-Q1'
             }),
             'amount': forms.NumberInput(attrs={
                 'class': 'form-control',
@@ -104,6 +105,13 @@ class PaymentBillForm(forms.ModelForm):
 
         self.fields['owner'].queryset = self.fields['owner'].queryset.order_by('name')
 
+    def clean_billing_period(self):
+        """账期规范化（如 2026-1 → 2026-01）"""
+        try:
+            return normalize_billing_period(self.cleaned_data.get('billing_period'))
+        except ValueError as e:
+            raise forms.ValidationError(str(e))
+
     def clean(self):
         """表单验证：处理特殊场景"""
         cleaned_data = super().clean()
@@ -164,4 +172,4 @@ class PaymentRecordForm(forms.ModelForm):
         super().__init__(*args, **kwargs)
         self.fields['bill'].queryset = self.fields['bill'].queryset.select_related(
             'community', 'property_unit', 'owner'
-        ).order_by('-billing_period')
+        ).order_by('-period_start')
@@ -0,0 +1,248 @@
+"""
+应缴费用单Excel导入
+
+对整张表做向量化解析：房号用 pandas 字符串操作拆分，楼栋、房产、业主关系各一次查询载入内存，
+账单通过 bulk_create / bulk_update 批量写入，失败行仍逐行记录到 failed_records
+"""
+from datetime import date, timedelta
+from decimal import Decimal, ROUND_HALF_UP
+
+import pandas as pd
+from django.db import transaction
+from django.utils import timezone
+
+from .models import PaymentBill
+from .periods import format_billing_period, parse_billing_period
+from .services import create_bills, generate_bill_numbers
+from .snapshots import schedule_refresh
+
+ROOM_FORMAT_ERROR = '房号格式错误'
+OWNER_NAME_PATTERN = r'[\u4e00-\u9fa5]+'
+
+
+def _split_floor_room(floor_room):
+    """
+    拆分楼层房号列：三位及以下取首位为楼层（501 -> 5, 01），否则末两位为房号（1201 -> 12, 01）
+    """
+    short = floor_room.str.len() <= 3
+    floor_text = floor_room.str[:-2].where(~short, floor_room.str[:1])
+    room_number = floor_room.str[-2:].where(~short, floor_room.str[1:].str.zfill(2))
+    floor = pd.to_numeric(floor_text.where(floor_text.str.fullmatch(r'\d+', na=False)), errors='coerce')
+    return floor, room_number
+
+
+def parse_room_numbers(raw):
+    """
+    解析房号列
+
+    支持格式：无单元 1号楼-501、2-601；有单元 1号楼1单元-201、1-2-201
+
+    Returns:
+        DataFrame: building_name, unit, floor, room_number, valid
+    """
+    cleaned = (
+        raw.str.replace(r'[号楼栋]', '-', regex=True)
+        .str.replace(r'-+', '-', regex=True)
+        .str.strip('-')
+    )
+    parts = cleaned.str.split('-')
+    part_count = parts.str.len()
+    has_unit = part_count == 3
+
+    unit_part = parts.str[1].where(has_unit)
+    unit = unit_part.where(unit_part.str.contains('单元', na=False), unit_part + '单元').where(has_unit)
+    floor_room = parts.str[2].where(has_unit, parts.str[1]).fillna('')
+    floor, room_number = _split_floor_room(floor_room)
+
+    valid = part_count.isin([2, 3]) & (floor_room != '') & floor.notna()
+    return pd.DataFrame({
+        'building_name': parts.str[0] + '号楼',
+        'unit': unit,
+        'floor': floor,
+        'room_number': room_number,
+        'valid': valid,
+    })
+
+
+def _match_owner(excel_names, owners):
+    """按姓名包含关系匹配业主，返回业主ID"""
+    for owner_id, owner_name in owners:
+        for excel_name in excel_names:
+            if excel_name in owner_name or owner_name in excel_name:
+                return owner_id
+    return None
+
+
+def _cell(value):
+    """失败记录中的原始单元格值（空值转为空字符串）"""
+    return '' if pd.isna(value) else value
+
+
+def import_bills(df, community, fee_type, billing_period):
+    """
+    导入应缴费用单
+
+    Args:
+        df: 含 房号、业主、应缴金额 列的 DataFrame
+        community: 所属小区
+
+    Returns:
+        dict: 与逐行导入相同格式的统计信息
+
+    Raises:
+        ValueError: 账期无法解析
+    """
+    from apps.community.models import Building
+    from apps.property.models import Property, OwnerProperty
+
+    period_start, period_cycle = parse_billing_period(billing_period)
+    billing_period = format_billing_period(period_start, period_cycle)
+
+    df = df.reset_index(drop=True)
+    stats = {
+        'total_rows': len(df),
+        'success_count': 0,
+        'skip_count': 0,
+        'error_count': 0,
+        'errors': [],
+        'failed_records': []
+    }
+    if df.empty:
+        return stats
+
+    room_raw = df['房号'].astype(str).str.strip().str.replace(r'\.0$', '', regex=True)
+    owner_raw = df['业主'].astype(str).str.strip()
+    amounts = pd.to_numeric(df['应缴金额'], errors='coerce')
+    rooms = parse_room_numbers(room_raw)
+    owner_names = owner_raw.str.findall(OWNER_NAME_PATTERN)
+
+    # 楼栋、房产一次性载入内存
+    buildings = dict(Building.objects.filter(community=community).values_list('name', 'id'))
+    property_map = {
+        (row['building_id'], row['unit'], row['floor'], row['room_number']): row['id']
+        for row in Property.objects.filter(building_id__in=buildings.values()).values(
+            'id', 'building_id', 'unit', 'floor', 'room_number'
+        )
+    }
+
+    building_ids = rooms['building_name'].map(buildings)
+    property_ids = pd.Series([
+        property_map.get((building_id, None if pd.isna(unit) else unit, int(floor), room_number))
+        if valid and not pd.isna(building_id) else None
+        for building_id, unit, floor, room_number, valid in zip(
+            building_ids, rooms['unit'], rooms['floor'], rooms['room_number'], rooms['valid']
+        )
+    ], dtype=object)
+
+    # 房产的业主关系一次查询
+    owners_by_property = {}
+    for property_id, owner_id, owner_name in OwnerProperty.objects.filter(
+        property_id__in=[pid for pid in property_ids if pid is not None]
+    ).values_list('property_id', 'owner_id', 'owner__name'):
+        owners_by_property.setdefault(property_id, []).append((owner_id, owner_name))
+
+    # 按原逐行导入的校验顺序确定每行的失败原因
+    failures = {}
+    matched_rows = []
+    for idx in range(len(df)):
+        if not rooms['valid'].iat[idx]:
+            failures[idx] = (
+                f'房号格式错误 "{room_raw.iat[idx]}" (支持的格式: 1号楼-501, 1-2-201)',
+                ROOM_FORMAT_ERROR
+            )
+            continue
+        if pd.isna(building_ids.iat[idx]):
+            message = f'未找到楼栋 {rooms["building_name"].iat[idx]}'
+            failures[idx] = (message, message)
+            continue
+        property_id = property_ids.iat[idx]
+        if property_id is None:
+            message = f'未找到房产 {room_raw.iat[idx]}'
+            failures[idx] = (message, message)
+            continue
+        names = owner_names.iat[idx]
+        if not names:
+            failures[idx] = ('业主姓名为空', '业主姓名为空')
+            continue
+        owners = owners_by_property.get(property_id, [])
+        owner_id = _match_owner(names, owners)
+        if owner_id is None:
+            system_owners = [name for _, name in owners]
+            failures[idx] = (
+                f'业主不匹配。Excel: {owner_raw.iat[idx]}, 系统: {system_owners}',
+                f'业主不匹配 (系统业主: {", ".join(system_owners)})'
+            )
+            continue
+        amount = amounts.iat[idx]
+        if pd.isna(amount) or amount < 0:
+            # 注意：允许金额为0，因为有些业主可能预缴了费用
+            failures[idx] = ('金额格式错误', '金额格式错误')
+            continue
+        matched_rows.append((property_id, owner_id, Decimal(str(amount)).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)))
+
+    for idx, (message, reason) in failures.items():
+        stats['errors'].append(f'第{idx+2}行: {message}')
+        stats['failed_records'].append({
+            'row': idx + 2,
+            '房号': room_raw.iat[idx],
+            '业主': owner_raw.iat[idx],
+            '应缴金额': _cell(df['应缴金额'].iat[idx]),
+            '失败原因': reason
+        })
+    stats['error_count'] = len(failures)
+    stats['success_count'] = len(matched_rows)
+
+    if not matched_rows:
+        return stats
+
+    # 同一房产出现多行时以最后一行为准（与逐行覆盖更新的结果一致）
+    latest = {property_id: (owner_id, amount) for property_id, owner_id, amount in matched_rows}
+
+    existing = {
+        bill.property_unit_id: bill
+        for bill in PaymentBill.objects.filter(
+            property_unit_id__in=latest.keys(),
+            fee_type=fee_type,
+            billing_period=billing_period
+        )
+    }
+
+    now = timezone.now()
+    to_update = []
+    for property_id, bill in existing.items():
+        bill.owner_id, bill.amount = latest[property_id]
+        bill.updated_at = now
+        to_update.append(bill)
+
+    new_keys = [property_id for property_id in latest if property_id not in existing]
+    due_date = date.today() + timedelta(days=30)
+    to_create = [
+        PaymentBill(
+            bill_number=bill_number,
+            community=community,
+            property_unit_id=property_id,
+            owner_id=latest[property_id][0],
+            fee_type=fee_type,
+            billing_period=billing_period,
+            period_start=period_start,
+            period_cycle=period_cycle,
+            amount=latest[property_id][1],
+            due_date=due_date,
+            status='unpaid'
+        )
+        for bill_number, property_id in zip(generate_bill_numbers(billing_period, len(new_keys)), new_keys)
+    ]
+
+    with transaction.atomic():
+        PaymentBill.objects.bulk_update(to_update, ['owner', 'amount', 'updated_at'], batch_size=500)
+        conflicts = create_bills(to_create, batch_size=500)
+        # 批量写入不触发信号，手动刷新收缴快照
+        schedule_refresh((community.id, billing_period, fee_type))
+
+    # 读取已有账单之后被其他进程创建的账单，本次未写入
+    for bill in conflicts:
+        stats['errors'].append(f'房产 {bill.property_unit_id}: 账单已被其他操作创建，请重新导入以更新金额')
+    stats['success_count'] -= len(conflicts)
+    stats['error_count'] += len(conflicts)
+
+    return stats
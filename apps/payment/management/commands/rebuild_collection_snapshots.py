@@ -0,0 +1,25 @@
+"""
+Django管理命令：全量重建收缴快照
+
+使用方法：
+    python manage.py rebuild_collection_snapshots
+
+逾期统计依赖当天日期，建议每天凌晨执行一次：
+    0 1 * * * cd /path/to/project && python manage.py rebuild_collection_snapshots
+"""
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+
+class Command(BaseCommand):
+    help = '根据账单和缴费记录全量重建收缴快照'
+
+    def handle(self, *args, **options):
+        """执行命令"""
+        from apps.payment.snapshots import rebuild_snapshots
+
+        started = timezone.now()
+        count = rebuild_snapshots()
+        elapsed = (timezone.now() - started).total_seconds()
+
+        self.stdout.write(self.style.SUCCESS(f'✓ 收缴快照重建完成，共 {count} 条，耗时 {elapsed:.2f} 秒'))
@@ -0,0 +1,47 @@
+"""
+Django管理命令：微信支付对账
+
+使用方法：
+    python manage.py reconcile_wechat_payments
+    python manage.py reconcile_wechat_payments --workers 16 --max-age-days 3
+
+补查支付回调丢失的订单，建议每晚执行一次：
+    0 2 * * * cd /path/to/project && python manage.py reconcile_wechat_payments
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = '向微信查询待支付订单的状态，补入账已支付的订单并报告差异'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=16, help='并发查询的线程数（默认16）')
+        parser.add_argument('--batch-size', type=int, default=500, help='每批查询、入账的订单数（默认500）')
+        parser.add_argument('--min-age-minutes', type=int, default=10, help='只对账下单超过该分钟数的订单（默认10）')
+        parser.add_argument('--max-age-days', type=int, default=3, help='下单超过该天数的订单不再查询（默认3）')
+
+    def handle(self, *args, **options):
+        """执行命令"""
+        from apps.payment.reconciliation import reconcile_wechat_orders
+
+        try:
+            report = reconcile_wechat_orders(
+                workers=options['workers'],
+                batch_size=options['batch_size'],
+                min_age_minutes=options['min_age_minutes'],
+                max_age_days=options['max_age_days'],
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✓ 对账完成，查询 {report['checked']} 笔，耗时 {report['elapsed']:.2f} 秒"
+        ))
+        self.stdout.write(
+            f"  补入账 {report['applied']} 笔，已入账 {report['duplicate']} 笔，"
+            f"仍待支付 {report['pending']} 笔，已关闭 {report['closed']} 笔，查询失败 {report['failed']} 笔"
+        )
+        if report['mismatch_count']:
+            self.stdout.write(self.style.WARNING(f"⚠️  差异 {report['mismatch_count']} 笔："))
+            for item in report['mismatches']:
+                self.stdout.write(f"  {item['out_trade_no']}: {item['reason']}")
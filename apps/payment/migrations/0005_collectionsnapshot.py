@@ -0,0 +1,175 @@
+# Generated by Django 4.2.7 on 2026-10-18 05:44
+
+from django.db import migrations, models
+from django.db.models import Count, F, Q, Sum
+from django.utils import timezone
+import django.db.models.deletion
+
+
+def build_snapshots(apps, schema_editor):
+    """根据已有账单生成初始快照"""
+    PaymentBill = apps.get_model("payment", "PaymentBill")
+    PaymentRecord = apps.get_model("payment", "PaymentRecord")
+    CollectionSnapshot = apps.get_model("payment", "CollectionSnapshot")
+
+    overdue_q = Q(
+        due_date__lt=timezone.localdate(),
+        status__in=["unpaid", "partial", "overdue"],
+    )
+    collected = {
+        (row["bill__community_id"], row["bill__billing_period"], row["bill__fee_type"]): row["total"]
+        for row in PaymentRecord.objects.filter(status="success")
+        .values("bill__community_id", "bill__billing_period", "bill__fee_type")
+        .annotate(total=Sum("amount"))
+        .order_by()
+    }
+    rows = (
+        PaymentBill.objects.values("community_id", "billing_period", "fee_type")
+        .annotate(
+            bill_count=Count("id"),
+            paid_count=Count("id", filter=Q(status="paid")),
+            unpaid_count=Count("id", filter=Q(status="unpaid")),
+            billed_amount=Sum("amount"),
+            paid_sum=Sum("paid_amount"),
+            overdue_count=Count("id", filter=overdue_q),
+            overdue_amount=Sum(F("amount") - F("paid_amount"), filter=overdue_q),
+        )
+        .order_by()
+    )
+    CollectionSnapshot.objects.bulk_create(
+        [
+            CollectionSnapshot(
+                community_id=row["community_id"],
+                billing_period=row["billing_period"],
+                fee_type=row["fee_type"],
+                bill_count=row["bill_count"],
+                paid_count=row["paid_count"],
+                unpaid_count=row["unpaid_count"],
+                billed_amount=row["billed_amount"] or 0,
+                paid_amount=row["paid_sum"] or 0,
+                collected_amount=collected.get(
+                    (row["community_id"], row["billing_period"], row["fee_type"])
+                ) or 0,
+                overdue_count=row["overdue_count"],
+                overdue_amount=row["overdue_amount"] or 0,
+            )
+            for row in rows
+        ],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        (
+            "community",
+            "0002_community_construction_area_community_contact_person_and_more",
+        ),
+        ("payment", "0004_paymentrecord_operator"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CollectionSnapshot",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("billing_period", models.CharField(max_length=20, verbose_name="账期")),
+                (
+                    "fee_type",
+                    models.CharField(
+                        choices=[
+                            ("property", "物业费"),
+                            ("public_electric", "公摊电费"),
+                            ("water", "水费"),
+                            ("parking", "停车费"),
+                            ("payable", "应缴费用"),
+                            ("other", "其他"),
+                        ],
+                        max_length=20,
+                        verbose_name="费用类型",
+                    ),
+                ),
+                (
+                    "bill_count",
+                    models.PositiveIntegerField(default=0, verbose_name="账单数"),
+                ),
+                (
+                    "paid_count",
+                    models.PositiveIntegerField(default=0, verbose_name="已缴账单数"),
+                ),
+                (
+                    "unpaid_count",
+                    models.PositiveIntegerField(default=0, verbose_name="未缴账单数"),
+                ),
+                (
+                    "billed_amount",
+                    models.DecimalField(
+                        decimal_places=2,
+                        default=0,
+                        max_digits=14,
+                        verbose_name="应缴金额(元)",
+                    ),
+                ),
+                (
+                    "paid_amount",
+                    models.DecimalField(
+                        decimal_places=2,
+                        default=0,
+                        max_digits=14,
+                        verbose_name="已缴金额(元)",
+                    ),
+                ),
+                (
+                    "collected_amount",
+                    models.DecimalField(
+                        decimal_places=2,
+                        default=0,
+                        max_digits=14,
+                        verbose_name="实收金额(元)",
+                    ),
+                ),
+                (
+                    "overdue_count",
+                    models.PositiveIntegerField(default=0, verbose_name="逾期账单数"),
+                ),
+                (
+                    "overdue_amount",
+                    models.DecimalField(
+                        decimal_places=2,
+                        default=0,
+                        max_digits=14,
+                        verbose_name="逾期金额(元)",
+                    ),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(auto_now=True, verbose_name="更新时间"),
+                ),
+                (
+                    "community",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="collection_snapshots",
+                        to="community.community",
+                        verbose_name="所属小区",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "收缴快照",
+                "verbose_name_plural": "收缴快照",
+                "db_table": "payment_collection_snapshot",
+                "ordering": ["-billing_period", "community", "fee_type"],
+                "unique_together": {("community", "billing_period", "fee_type")},
+            },
+        ),
+        migrations.RunPython(build_snapshots, migrations.RunPython.noop),
+    ]
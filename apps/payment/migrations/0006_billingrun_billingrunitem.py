@@ -0,0 +1,193 @@
+# Generated by Django 4.2.7 on 2026-10-18 05:47
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        (
+            "community",
+            "0002_community_construction_area_community_contact_person_and_more",
+        ),
+        ("payment", "0005_collectionsnapshot"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="BillingRun",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                (
+                    "billing_period",
+                    models.CharField(max_length=20, verbose_name="账期（如：2026-01）"),
+                ),
+                ("due_date", models.DateField(verbose_name="应缴日期")),
+                (
+                    "fee_types",
+                    models.JSONField(
+                        blank=True, default=list, verbose_name="费用类型（为空表示全部启用的费用标准）"
+                    ),
+                ),
+                (
+                    "description",
+                    models.TextField(blank=True, null=True, verbose_name="备注"),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("pending", "等待中"),
+                            ("running", "执行中"),
+                            ("completed", "已完成"),
+                            ("failed", "失败"),
+                        ],
+                        default="pending",
+                        max_length=20,
+                        verbose_name="状态",
+                    ),
+                ),
+                (
+                    "total_communities",
+                    models.PositiveIntegerField(default=0, verbose_name="小区数"),
+                ),
+                (
+                    "completed_communities",
+                    models.PositiveIntegerField(default=0, verbose_name="已完成小区数"),
+                ),
+                (
+                    "created_count",
+                    models.PositiveIntegerField(default=0, verbose_name="生成账单数"),
+                ),
+                (
+                    "skipped_count",
+                    models.PositiveIntegerField(default=0, verbose_name="已存在跳过数"),
+                ),
+                (
+                    "failed_count",
+                    models.PositiveIntegerField(default=0, verbose_name="失败数"),
+                ),
+                (
+                    "error_message",
+                    models.TextField(blank=True, null=True, verbose_name="错误信息"),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(auto_now_add=True, verbose_name="创建时间"),
+                ),
+                (
+                    "started_at",
+                    models.DateTimeField(blank=True, null=True, verbose_name="开始时间"),
+                ),
+                (
+                    "finished_at",
+                    models.DateTimeField(blank=True, null=True, verbose_name="完成时间"),
+                ),
+                (
+                    "created_by",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="billing_runs",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="发起人",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "批量出账任务",
+                "verbose_name_plural": "批量出账任务",
+                "db_table": "payment_billing_run",
+                "ordering": ["-created_at"],
+            },
+        ),
+        migrations.CreateModel(
+            name="BillingRunItem",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("pending", "等待中"),
+                            ("running", "执行中"),
+                            ("completed", "已完成"),
+                            ("failed", "失败"),
+                        ],
+                        default="pending",
+                        max_length=20,
+                        verbose_name="状态",
+                    ),
+                ),
+                (
+                    "created_count",
+                    models.PositiveIntegerField(default=0, verbose_name="生成账单数"),
+                ),
+                (
+                    "skipped_count",
+                    models.PositiveIntegerField(default=0, verbose_name="已存在跳过数"),
+                ),
+                (
+                    "failed_count",
+                    models.PositiveIntegerField(default=0, verbose_name="失败数"),
+                ),
+                (
+                    "errors",
+                    models.JSONField(blank=True, default=list, verbose_name="错误明细"),
+                ),
+                (
+                    "started_at",
+                    models.DateTimeField(blank=True, null=True, verbose_name="开始时间"),
+                ),
+                (
+                    "finished_at",
+                    models.DateTimeField(blank=True, null=True, verbose_name="完成时间"),
+                ),
+                (
+                    "community",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="billing_run_items",
+                        to="community.community",
+                        verbose_name="小区",
+                    ),
+                ),
+                (
+                    "run",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="items",
+                        to="payment.billingrun",
+                        verbose_name="出账任务",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "批量出账明细",
+                "verbose_name_plural": "批量出账明细",
+                "db_table": "payment_billing_run_item",
+                "ordering": ["community__name"],
+                "unique_together": {("run", "community")},
+            },
+        ),
+    ]
@@ -0,0 +1,84 @@
+# Generated by Django 4.2.7 on 2026-10-18 06:05
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("payment", "0006_billingrun_billingrunitem"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="WeChatPayOrder",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "out_trade_no",
+                    models.CharField(max_length=64, unique=True, verbose_name="商户订单号"),
+                ),
+                ("total_fee", models.PositiveIntegerField(verbose_name="下单金额(分)")),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("pending", "待支付"),
+                            ("paid", "已支付"),
+                            ("closed", "已关闭"),
+                        ],
+                        default="pending",
+                        max_length=20,
+                        verbose_name="状态",
+                    ),
+                ),
+                (
+                    "trade_state",
+                    models.CharField(
+                        blank=True, default="", max_length=32, verbose_name="微信交易状态"
+                    ),
+                ),
+                (
+                    "checked_at",
+                    models.DateTimeField(blank=True, null=True, verbose_name="最近对账时间"),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(auto_now_add=True, verbose_name="创建时间"),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(auto_now=True, verbose_name="更新时间"),
+                ),
+                (
+                    "bill",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="wechat_orders",
+                        to="payment.paymentbill",
+                        verbose_name="关联账单",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "微信支付订单",
+                "verbose_name_plural": "微信支付订单",
+                "db_table": "payment_wechat_order",
+                "ordering": ["-created_at"],
+                "indexes": [
+                    models.Index(
+                        fields=["status", "created_at"],
+                        name="payment_wec_status_2bbbc0_idx",
+                    )
+                ],
+            },
+        ),
+    ]
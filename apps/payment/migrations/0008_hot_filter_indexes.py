@@ -0,0 +1,54 @@
+# Generated by Django 4.2.7 on 2026-10-18 06:32
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        (
+            "community",
+            "0002_community_construction_area_community_contact_person_and_more",
+        ),
+        ("payment", "0007_wechatpayorder"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="paymentbill",
+            index=models.Index(
+                fields=["status", "due_date"], name="bill_status_due_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="paymentbill",
+            index=models.Index(
+                condition=models.Q(("status__in", ["unpaid", "partial", "overdue"])),
+                fields=["due_date", "owner"],
+                name="bill_open_due_owner_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="paymentbill",
+            index=models.Index(
+                fields=["community", "billing_period", "fee_type"],
+                name="bill_community_period_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="paymentbill",
+            index=models.Index(fields=["-created_at", "-id"], name="bill_created_idx"),
+        ),
+        # 复合索引建好后再删除小区的单列索引
+        migrations.AlterField(
+            model_name="paymentbill",
+            name="community",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="bills",
+                to="community.community",
+                verbose_name="所属小区",
+            ),
+        ),
+    ]
@@ -0,0 +1,123 @@
+# Generated by Django 4.2.7 on 2026-10-18 06:50
+
+import re
+from datetime import date
+
+from django.db import migrations, models
+from django.db.models import Min, OuterRef, Subquery
+from django.db.models.functions import TruncMonth
+
+MONTH = re.compile(r'^(\d{4})\s*(?:[-/.年]\s*)?(\d{1,2})\s*月?$')
+QUARTER = re.compile(r'^(\d{4})\s*[-/年]?\s*[Qq]([1-4])$')
+YEAR = re.compile(r'^(\d{4})\s*年?$')
+
+
+def parse_period(text):
+    """解析账期文本，无法解析时返回 None（与 apps.payment.periods.parse_billing_period 规则一致）"""
+    text = str(text or '').strip()
+    match = QUARTER.match(text)
+    if match:
+        return date(int(match.group(1)), (int(match.group(2)) - 1) * 3 + 1, 1), 'quarter'
+    match = MONTH.match(text)
+    if match and 1 <= int(match.group(2)) <= 12:
+        return date(int(match.group(1)), int(match.group(2)), 1), 'month'
+    match = YEAR.match(text)
+    if match:
+        return date(int(match.group(1)), 1, 1), 'year'
+    return None
+
+
+def fill_period_start(apps, schema_editor):
+    """
+    按账期文本回填账期首日（每个不同的账期文本一条 UPDATE）；
+    无法解析的账期按应缴日期所在月份处理，账期文本保持不变
+    """
+    PaymentBill = apps.get_model('payment', 'PaymentBill')
+    CollectionSnapshot = apps.get_model('payment', 'CollectionSnapshot')
+
+    periods = PaymentBill.objects.values_list('billing_period', flat=True).distinct().order_by()
+    for text in list(periods):
+        parsed = parse_period(text)
+        bills = PaymentBill.objects.filter(billing_period=text)
+        if parsed:
+            bills.update(period_start=parsed[0], period_cycle=parsed[1])
+        else:
+            bills.update(period_start=TruncMonth('due_date'), period_cycle='month')
+
+    CollectionSnapshot.objects.update(period_start=Subquery(
+        PaymentBill.objects.filter(
+            community_id=OuterRef('community_id'),
+            billing_period=OuterRef('billing_period'),
+            fee_type=OuterRef('fee_type'),
+        ).values('billing_period').annotate(start=Min('period_start')).values('start')[:1]
+    ))
+    # 已没有账单的快照（rebuild_collection_snapshots 也会删除）
+    CollectionSnapshot.objects.filter(period_start__isnull=True).delete()
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("payment", "0008_hot_filter_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="paymentbill",
+            name="period_start",
+            field=models.DateField(null=True, verbose_name="账期首日"),
+        ),
+        migrations.AddField(
+            model_name="paymentbill",
+            name="period_cycle",
+            field=models.CharField(
+                choices=[("month", "月"), ("quarter", "季度"), ("year", "年")],
+                default="month",
+                max_length=10,
+                verbose_name="账期周期",
+            ),
+        ),
+        migrations.AddField(
+            model_name="collectionsnapshot",
+            name="period_start",
+            field=models.DateField(null=True, verbose_name="账期首日"),
+        ),
+        migrations.RunPython(fill_period_start, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name="paymentbill",
+            name="period_start",
+            field=models.DateField(verbose_name="账期首日"),
+        ),
+        migrations.AlterField(
+            model_name="collectionsnapshot",
+            name="period_start",
+            field=models.DateField(verbose_name="账期首日"),
+        ),
+        migrations.AlterModelOptions(
+            name="paymentbill",
+            options={
+                "ordering": ["-period_start", "-created_at"],
+                "verbose_name": "缴费账单",
+                "verbose_name_plural": "缴费账单",
+            },
+        ),
+        migrations.AlterModelOptions(
+            name="collectionsnapshot",
+            options={
+                "ordering": ["-period_start", "community", "fee_type"],
+                "verbose_name": "收缴快照",
+                "verbose_name_plural": "收缴快照",
+            },
+        ),
+        migrations.AddIndex(
+            model_name="paymentbill",
+            index=models.Index(
+                fields=["period_start", "community"], name="bill_period_start_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="collectionsnapshot",
+            index=models.Index(
+                fields=["period_start"], name="snapshot_period_start_idx"
+            ),
+        ),
+    ]
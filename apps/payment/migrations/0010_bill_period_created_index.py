@@ -0,0 +1,19 @@
+# Generated by Django 4.2.7 on 2026-10-18 07:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("payment", "0009_billing_period_start"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="paymentbill",
+            index=models.Index(
+                fields=["-period_start", "-created_at", "-id"],
+                name="bill_period_created_idx",
+            ),
+        ),
+    ]
@@ -5,6 +5,7 @@ import uuid
 from django.db import models
 from apps.community.models import Community
 from apps.property.models import Property, Owner
+from .periods import PERIOD_CYCLE_CHOICES, format_billing_period, parse_billing_period
 
 
 class FeeStandard(models.Model):
@@ -76,11 +77,15 @@ class PaymentBill(models.Model):
 
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     bill_number = models.CharField(max_length=50, unique=True, verbose_name='账单编号')
-    community = models.ForeignKey(Community, on_delete=models.CASCADE, related_name='bills', verbose_name='所属小区')
+    # 小区的单列索引被 (community, billing_period, fee_type) 复合索引覆盖
+    community = models.ForeignKey(Community, on_delete=models.CASCADE, related_name='bills', verbose_name='所属小区', db_index=False)
     property_unit = models.ForeignKey(Property, on_delete=models.CASCADE, related_name='bills', verbose_name='房产')
     owner = models.ForeignKey(Owner, on_delete=models.CASCADE, related_name='bills', verbose_name='业主')
     fee_type = models.CharField(max_length=20, choices=FEE_TYPE_CHOICES, verbose_name='费用类型')
     billing_period = models.CharField(max_length=20, verbose_name='账期（如：2026-01）')
+    # 由 billing_period 解析得到，按账期的区间查询使用
+    period_start = models.DateField(verbose_name='账期首日')
+    period_cycle = models.CharField(max_length=10, choices=PERIOD_CYCLE_CHOICES, default='month', verbose_name='账期周期')
     amount = models.DecimalField(max_digits=10, decimal_places=2, verbose_name='应缴金额(元)')
     paid_amount = models.DecimalField(max_digits=10, decimal_places=2, default=0, verbose_name='已缴金额(元)')
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='unpaid', verbose_name='状态')
@@ -95,12 +100,74 @@ class PaymentBill(models.Model):
         db_table = 'payment_bill'
         verbose_name = '缴费账单'
         verbose_name_plural = verbose_name
-        ordering = ['-billing_period', '-created_at']
+        ordering = ['-period_start', '-created_at']
         unique_together = [['property_unit', 'fee_type', 'billing_period']]
+        indexes = [
+            # 按账期区间查询（近12个月、本季度等）
+            models.Index(fields=['period_start', 'community'], name='bill_period_start_idx'),
+            # 列表、接口按状态筛选，按应缴日期筛选/排序
+            models.Index(fields=['status', 'due_date'], name='bill_status_due_idx'),
+            # 缴费提醒、逾期催缴、仪表盘逾期户数只扫描未结清的账单（部分索引，带业主用于去重计数）
+            models.Index(
+                fields=['due_date', 'owner'], name='bill_open_due_owner_idx',
+                condition=models.Q(status__in=['unpaid', 'partial', 'overdue']),
+            ),
+            # 收缴快照刷新、按小区和账期筛选
+            models.Index(fields=['community', 'billing_period', 'fee_type'], name='bill_community_period_idx'),
+            # 管理端账单列表的键集分页：默认按账期倒序，按创建时间排序时使用 bill_created_idx
+            models.Index(fields=['-period_start', '-created_at', '-id'], name='bill_period_created_idx'),
+            models.Index(fields=['-created_at', '-id'], name='bill_created_idx'),
+        ]
 
     def __str__(self):
         return f"{self.bill_number} - {self.amount}元"
 
+    def sync_period(self):
+        """
+        根据 billing_period 设置 period_start、period_cycle 并规范化账期文本（批量写入前需手动调用）
+
+        Raises:
+            ValueError: 账期无法解析
+        """
+        self.period_start, self.period_cycle = parse_billing_period(self.billing_period)
+        self.billing_period = self.period_label
+
+    @property
+    def period_label(self):
+        """规范化的账期文本"""
+        return format_billing_period(self.period_start, self.period_cycle)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # 记录读取时的账期文本，保存时只在账期文本变化后重新解析
+        instance._loaded_billing_period = instance.__dict__.get('billing_period')
+        return instance
+
+    def _billing_period_changed(self):
+        """
+        账期文本是否需要重新解析
+
+        迁移保留的无法解析的历史账期（如“2026上半年”，账期首日按应缴日期回填）和未规范化的账期（如 2026-1），
+        在账期文本未修改时保持原样，更新状态、支付方式等字段不受影响
+        """
+        if self._state.adding or self.period_start is None:
+            return True
+        if 'billing_period' not in self.__dict__:
+            # 延迟加载且未赋值
+            return False
+        return self.billing_period != getattr(self, '_loaded_billing_period', None)
+
+    def save(self, *args, **kwargs):
+        """保存时根据账期文本同步账期首日和周期（账期文本未修改时保留已有的账期首日）"""
+        update_fields = kwargs.get('update_fields')
+        if (update_fields is None or 'billing_period' in update_fields) and self._billing_period_changed():
+            self.sync_period()
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'period_start', 'period_cycle'}
+        super().save(*args, **kwargs)
+        self._loaded_billing_period = self.billing_period
+
     @property
     def unpaid_amount(self):
         """未缴金额"""
@@ -145,3 +212,151 @@ class PaymentRecord(models.Model):
 
     def __str__(self):
         return f"{self.out_trade_no} - {self.amount}元"
+
+
+class CollectionSnapshot(models.Model):
+    """
+    收缴快照模型
+    按（小区, 账期, 费用类型）汇总账单与缴费数据，供仪表盘和统计接口直接读取；
+    由账单/缴费记录的信号增量刷新，可通过 rebuild_collection_snapshots 命令全量重建
+    """
+    community = models.ForeignKey(Community, on_delete=models.CASCADE, related_name='collection_snapshots', verbose_name='所属小区')
+    billing_period = models.CharField(max_length=20, verbose_name='账期')
+    period_start = models.DateField(verbose_name='账期首日')
+    fee_type = models.CharField(max_length=20, choices=PaymentBill.FEE_TYPE_CHOICES, verbose_name='费用类型')
+    bill_count = models.PositiveIntegerField(default=0, verbose_name='账单数')
+    paid_count = models.PositiveIntegerField(default=0, verbose_name='已缴账单数')
+    unpaid_count = models.PositiveIntegerField(default=0, verbose_name='未缴账单数')
+    billed_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name='应缴金额(元)')
+    paid_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name='已缴金额(元)')
+    collected_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name='实收金额(元)')
+    overdue_count = models.PositiveIntegerField(default=0, verbose_name='逾期账单数')
+    overdue_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name='逾期金额(元)')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='更新时间')
+
+    class Meta:
+        db_table = 'payment_collection_snapshot'
+        verbose_name = '收缴快照'
+        verbose_name_plural = verbose_name
+        ordering = ['-period_start', 'community', 'fee_type']
+        unique_together = [['community', 'billing_period', 'fee_type']]
+        indexes = [
+            models.Index(fields=['period_start'], name='snapshot_period_start_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.community.name} - {self.billing_period} - {self.get_fee_type_display()}"
+
+    @property
+    def collection_rate(self):
+        """收缴率（百分比）"""
+        if not self.billed_amount:
+            return 0
+        return round(self.collected_amount / self.billed_amount * 100, 1)
+
+
+class BillingRun(models.Model):
+    """
+    批量出账任务模型
+    一次出账覆盖多个小区的全部启用费用标准，按小区拆分为后台任务执行
+    """
+    STATUS_CHOICES = [
+        ('pending', '等待中'),
+        ('running', '执行中'),
+        ('completed', '已完成'),
+        ('failed', '失败'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    billing_period = models.CharField(max_length=20, verbose_name='账期（如：2026-01）')
+    due_date = models.DateField(verbose_name='应缴日期')
+    fee_types = models.JSONField(default=list, blank=True, verbose_name='费用类型（为空表示全部启用的费用标准）')
+    description = models.TextField(blank=True, null=True, verbose_name='备注')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending', verbose_name='状态')
+    total_communities = models.PositiveIntegerField(default=0, verbose_name='小区数')
+    completed_communities = models.PositiveIntegerField(default=0, verbose_name='已完成小区数')
+    created_count = models.PositiveIntegerField(default=0, verbose_name='生成账单数')
+    skipped_count = models.PositiveIntegerField(default=0, verbose_name='已存在跳过数')
+    failed_count = models.PositiveIntegerField(default=0, verbose_name='失败数')
+    error_message = models.TextField(blank=True, null=True, verbose_name='错误信息')
+    created_by = models.ForeignKey('core.User', on_delete=models.SET_NULL, blank=True, null=True, related_name='billing_runs', verbose_name='发起人')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='创建时间')
+    started_at = models.DateTimeField(blank=True, null=True, verbose_name='开始时间')
+    finished_at = models.DateTimeField(blank=True, null=True, verbose_name='完成时间')
+
+    class Meta:
+        db_table = 'payment_billing_run'
+        verbose_name = '批量出账任务'
+        verbose_name_plural = verbose_name
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.billing_period} 出账 - {self.get_status_display()}"
+
+    @property
+    def progress(self):
+        """完成进度（百分比）"""
+        if not self.total_communities:
+            return 100 if self.status == 'completed' else 0
+        return round(self.completed_communities / self.total_communities * 100, 1)
+
+
+class BillingRunItem(models.Model):
+    """
+    批量出账任务明细
+    记录单个小区的出账进度和结果
+    """
+    STATUS_CHOICES = BillingRun.STATUS_CHOICES
+
+    run = models.ForeignKey(BillingRun, on_delete=models.CASCADE, related_name='items', verbose_name='出账任务')
+    community = models.ForeignKey(Community, on_delete=models.CASCADE, related_name='billing_run_items', verbose_name='小区')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending', verbose_name='状态')
+    created_count = models.PositiveIntegerField(default=0, verbose_name='生成账单数')
+    skipped_count = models.PositiveIntegerField(default=0, verbose_name='已存在跳过数')
+    failed_count = models.PositiveIntegerField(default=0, verbose_name='失败数')
+    errors = models.JSONField(default=list, blank=True, verbose_name='错误明细')
+    started_at = models.DateTimeField(blank=True, null=True, verbose_name='开始时间')
+    finished_at = models.DateTimeField(blank=True, null=True, verbose_name='完成时间')
+
+    class Meta:
+        db_table = 'payment_billing_run_item'
+        verbose_name = '批量出账明细'
+        verbose_name_plural = verbose_name
+        ordering = ['community__name']
+        unique_together = [['run', 'community']]
+
+    def __str__(self):
+        return f"{self.community.name} - {self.get_status_display()}"
+
+
+class WeChatPayOrder(models.Model):
+    """
+    微信支付订单
+    统一下单成功后记录商户订单号；支付回调丢失时，对账任务按订单号向微信查询并补入账
+    """
+    STATUS_CHOICES = [
+        ('pending', '待支付'),
+        ('paid', '已支付'),
+        ('closed', '已关闭'),
+    ]
+
+    bill = models.ForeignKey(PaymentBill, on_delete=models.CASCADE, related_name='wechat_orders', verbose_name='关联账单')
+    out_trade_no = models.CharField(max_length=64, unique=True, verbose_name='商户订单号')
+    total_fee = models.PositiveIntegerField(verbose_name='下单金额(分)')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending', verbose_name='状态')
+    trade_state = models.CharField(max_length=32, blank=True, default='', verbose_name='微信交易状态')
+    checked_at = models.DateTimeField(blank=True, null=True, verbose_name='最近对账时间')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='创建时间')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='更新时间')
+
+    class Meta:
+        db_table = 'payment_wechat_order'
+        verbose_name = '微信支付订单'
+        verbose_name_plural = verbose_name
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.out_trade_no} - {self.get_status_display()}"
@@ -0,0 +1,128 @@
+"""
+账期解析与区间查询
+
+账单的 billing_period 保留为展示用的文本（2026-01、2026-Q1、2026），
+同时保存日期类型的 period_start（账期首日）和 period_cycle（月/季/年），
+按账期的区间查询（近12个月、本季度等）都走 period_start 的索引范围扫描，不再做字符串前缀匹配。
+"""
+import re
+from datetime import date
+
+from django.db.models import Q
+
+PERIOD_CYCLE_CHOICES = [
+    ('month', '月'),
+    ('quarter', '季度'),
+    ('year', '年'),
+]
+
+CYCLE_MONTHS = {'month': 1, 'quarter': 3, 'year': 12}
+
+_MONTH = re.compile(r'^(\d{4})\s*(?:[-/.年]\s*)?(\d{1,2})\s*月?$')
+_QUARTER = re.compile(r'^(\d{4})\s*[-/年]?\s*[Qq]([1-4])$')
+_YEAR = re.compile(r'^(\d{4})\s*年?$')
+
+
+def add_months(day, months):
+    """day 所在月份加 months 个月后的月初"""
+    index = day.year * 12 + day.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def month_start(day):
+    return day.replace(day=1)
+
+
+def parse_billing_period(text):
+    """
+    解析账期文本
+
+    支持 2026-01、2026-1、202601、2026年1月（月）、2026-Q1（季度）、2026（年）
+
+    Returns:
+        tuple: (账期首日, 周期)
+
+    Raises:
+        ValueError: 无法解析
+    """
+    text = str(text or '').strip()
+    match = _QUARTER.match(text)
+    if match:
+        return date(int(match.group(1)), (int(match.group(2)) - 1) * 3 + 1, 1), 'quarter'
+    match = _MONTH.match(text)
+    if match and 1 <= int(match.group(2)) <= 12:
+        return date(int(match.group(1)), int(match.group(2)), 1), 'month'
+    match = _YEAR.match(text)
+    if match:
+        return date(int(match.group(1)), 1, 1), 'year'
+    raise ValueError(f'无效的账期: {text}（应为 2026-01、2026-Q1 或 2026）')
+
+
+def format_billing_period(start, cycle='month'):
+    """账期首日和周期转换为账期文本"""
+    if cycle == 'quarter':
+        return f'{start.year}-Q{(start.month - 1) // 3 + 1}'
+    if cycle == 'year':
+        return str(start.year)
+    return start.strftime('%Y-%m')
+
+
+def normalize_billing_period(text):
+    """账期文本规范化（如 2026-1 → 2026-01）"""
+    return format_billing_period(*parse_billing_period(text))
+
+
+def period_end(start, cycle='month'):
+    """账期结束后的第一天（不含）"""
+    return add_months(start, CYCLE_MONTHS[cycle])
+
+
+def last_months(count, today):
+    """包含当月在内的最近 count 个月 [start, end)"""
+    end = add_months(today, 1)
+    return add_months(end, -count), end
+
+
+def quarter_range(today):
+    """当前季度 [start, end)"""
+    start = date(today.year, (today.month - 1) // 3 * 3 + 1, 1)
+    return start, add_months(start, 3)
+
+
+def period_range_q(start=None, end=None, prefix=''):
+    """
+    账期首日落在 [start, end) 内的查询条件
+
+    Args:
+        prefix: 关联路径前缀，如 'bill__'
+    """
+    condition = Q()
+    if start:
+        condition &= Q(**{f'{prefix}period_start__gte': start})
+    if end:
+        condition &= Q(**{f'{prefix}period_start__lt': end})
+    return condition
+
+
+def parse_period_range(period_from=None, period_to=None, months=None, today=None):
+    """
+    解析接口的账期区间参数
+
+    Args:
+        period_from / period_to: 起止账期文本（含两端），如 2026-01、2026-Q1
+        months: 最近 N 个月（含当月），与 period_from / period_to 同时提供时忽略
+
+    Returns:
+        tuple: (start, end)，未指定的一端为 None
+
+    Raises:
+        ValueError: 参数无法解析
+    """
+    if months and not (period_from or period_to):
+        count = int(months)
+        if count < 1:
+            raise ValueError('months 应为正整数')
+        return last_months(count, today or date.today())
+    start = parse_billing_period(period_from)[0] if period_from else None
+    end = period_end(*parse_billing_period(period_to)) if period_to else None
+    return start, end
@@ -0,0 +1,129 @@
+"""
+微信支付对账
+
+支付回调可能因网络故障、服务重启等原因丢失，对应订单会一直停留在待支付。
+对账找出下单超过一定时间仍待支付的订单，用固定大小的线程池并发调用微信订单查询接口：
+- 已支付：批量入账
+- 已关闭、已撤销、支付失败或微信侧不存在：订单标记为已关闭
+- 未支付、支付中：记录对账时间，下次继续查询
+- 已退款、金额与下单不一致、找不到账单等：计入差异，由人工核对
+
+线程池中只发 HTTP 请求，数据库读写都在调用线程中按批完成。
+"""
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.utils import timezone
+
+from .models import WeChatPayOrder
+from .services import apply_wechat_payments
+
+logger = logging.getLogger(__name__)
+
+PENDING_STATES = {'NOTPAY', 'USERPAYING'}
+CLOSED_STATES = {'CLOSED', 'REVOKED', 'PAYERROR'}
+
+# 报告中保留的差异明细上限
+MAX_REPORTED_MISMATCHES = 500
+
+
+def reconcile_wechat_orders(service=None, workers=16, batch_size=500, min_age_minutes=10, max_age_days=3):
+    """
+    对账待支付的微信支付订单
+
+    Args:
+        service: WeChatPayService 实例，默认使用默认商户配置
+        workers: 并发查询的线程数，不宜超过 HTTP 连接池大小（HTTP_CLIENT['POOL_MAXSIZE']）
+        batch_size: 每批查询、入账的订单数
+        min_age_minutes: 只对账下单超过该分钟数的订单，不干扰正在支付的用户
+        max_age_days: 下单超过该天数的订单不再查询
+
+    Returns:
+        dict: checked, applied, duplicate, pending, closed, failed（查询失败）,
+              mismatch_count, mismatches（差异明细）, elapsed（秒）
+    """
+    if service is None:
+        from apps.core.wechat_pay import WeChatPayService
+        service = WeChatPayService()
+    if not service.config:
+        raise ValueError('微信支付未配置')
+
+    now = timezone.now()
+    orders = WeChatPayOrder.objects.filter(
+        status='pending',
+        created_at__lte=now - timedelta(minutes=min_age_minutes),
+        created_at__gte=now - timedelta(days=max_age_days),
+    ).order_by('pk')
+
+    report = {
+        'checked': 0, 'applied': 0, 'duplicate': 0, 'pending': 0, 'closed': 0, 'failed': 0,
+        'mismatch_count': 0, 'mismatches': [],
+    }
+
+    def mismatch(out_trade_no, reason):
+        report['mismatch_count'] += 1
+        if len(report['mismatches']) < MAX_REPORTED_MISMATCHES:
+            report['mismatches'].append({'out_trade_no': out_trade_no, 'reason': reason})
+        logger.warning(f'微信支付对账差异: {out_trade_no} {reason}')
+
+    started = time.monotonic()
+    last_pk = 0
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='wechat-reconcile') as executor:
+        while True:
+            batch = list(orders.filter(pk__gt=last_pk).values('pk', 'out_trade_no', 'total_fee')[:batch_size])
+            if not batch:
+                break
+            last_pk = batch[-1]['pk']
+
+            results = executor.map(service.query_payment_status, [order['out_trade_no'] for order in batch])
+
+            confirmed = []
+            checked_pks = []
+            closed = {}
+            for order, result in zip(batch, results):
+                report['checked'] += 1
+                data = result.get('data', {})
+                if data.get('result_code') == 'FAIL' and data.get('err_code') == 'ORDERNOTEXIST':
+                    # 下单未成功，微信侧没有该订单
+                    closed.setdefault('ORDERNOTEXIST', []).append(order['pk'])
+                    continue
+                # 查询失败、签名未通过校验（success 为 False）或业务结果不是 SUCCESS 的都不入账
+                if not result['success'] or data.get('result_code') != 'SUCCESS':
+                    report['failed'] += 1
+                    error = result.get('error') or data.get('err_code_des') or data.get('err_code')
+                    logger.warning(f"微信支付订单查询失败: {order['out_trade_no']} {error}")
+                    continue
+
+                trade_state = result['trade_state']
+                if trade_state == 'SUCCESS':
+                    total_fee = int(result['total_fee'] or 0)
+                    if total_fee != order['total_fee']:
+                        mismatch(order['out_trade_no'], f"下单 {order['total_fee']} 分，实付 {total_fee} 分")
+                    confirmed.append((order['out_trade_no'], result['transaction_id'], total_fee))
+                elif trade_state in CLOSED_STATES:
+                    closed.setdefault(trade_state, []).append(order['pk'])
+                else:
+                    if trade_state in PENDING_STATES:
+                        report['pending'] += 1
+                    else:
+                        mismatch(order['out_trade_no'], f'微信交易状态 {trade_state or "未知"}')
+                    checked_pks.append(order['pk'])
+
+            outcome = apply_wechat_payments(confirmed)
+            report['applied'] += len(outcome['applied'])
+            report['duplicate'] += len(outcome['duplicate'])
+            for out_trade_no in outcome['bill_not_found']:
+                mismatch(out_trade_no, '已支付但未找到账单')
+
+            checked_at = timezone.now()
+            WeChatPayOrder.objects.filter(pk__in=checked_pks).update(checked_at=checked_at)
+            for trade_state, pks in closed.items():
+                report['closed'] += len(pks)
+                WeChatPayOrder.objects.filter(pk__in=pks).update(
+                    status='closed', trade_state=trade_state, checked_at=checked_at, updated_at=checked_at
+                )
+
+    report['elapsed'] = round(time.monotonic() - started, 2)
+    return report
@@ -2,7 +2,16 @@
 Payment Serializers
 """
 from rest_framework import serializers
-from .models import FeeStandard, PaymentBill, PaymentRecord
+from .models import FeeStandard, PaymentBill, PaymentRecord, BillingRun, BillingRunItem
+from .periods import normalize_billing_period
+
+
+def validate_billing_period(value):
+    """校验并规范化账期（2026-01、2026-Q1、2026）"""
+    try:
+        return normalize_billing_period(value)
+    except ValueError as e:
+        raise serializers.ValidationError(str(e))
 
 
 class FeeStandardSerializer(serializers.ModelSerializer):
@@ -37,10 +46,13 @@ class PaymentBillSerializer(serializers.ModelSerializer):
     class Meta:
         model = PaymentBill
         fields = ['id', 'bill_number', 'community', 'community_name', 'property_unit', 'property_address',
-                  'owner', 'owner_name', 'fee_type', 'billing_period', 'amount', 'paid_amount',
-                  'unpaid_amount', 'status', 'due_date', 'paid_at', 'description', 'payment_records',
-                  'created_at', 'updated_at']
-        read_only_fields = ['id', 'bill_number', 'created_at', 'updated_at']
+                  'owner', 'owner_name', 'fee_type', 'billing_period', 'period_start', 'period_cycle',
+                  'amount', 'paid_amount', 'unpaid_amount', 'status', 'due_date', 'paid_at', 'description',
+                  'payment_records', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'bill_number', 'period_start', 'period_cycle', 'created_at', 'updated_at']
+
+    def validate_billing_period(self, value):
+        return validate_billing_period(value)
 
 
 class PaymentBillListSerializer(serializers.ModelSerializer):
@@ -67,11 +79,56 @@ class BatchCreateBillsSerializer(serializers.Serializer):
         ('parking', '停车费'),
         ('other', '其他'),
     ])
-    billing_period = serializers.CharField(max_length=20, help_text='账期，如：2026-01')
+    billing_period = serializers.CharField(max_length=20, help_text='账期，如：2026-01、2026-Q1、2026')
     due_date = serializers.DateField(help_text='应缴日期')
     description = serializers.CharField(required=False, allow_blank=True)
 
+    def validate_billing_period(self, value):
+        return validate_billing_period(value)
+
 
 class WeChatPaymentSerializer(serializers.Serializer):
     """微信支付序列化器"""
     bill_ids = serializers.ListField(child=serializers.UUIDField(), help_text='账单ID列表')
+
+
+class BillingRunItemSerializer(serializers.ModelSerializer):
+    """批量出账明细序列化器"""
+    community_name = serializers.CharField(source='community.name', read_only=True)
+
+    class Meta:
+        model = BillingRunItem
+        fields = ['id', 'community', 'community_name', 'status', 'created_count', 'skipped_count',
+                  'failed_count', 'errors', 'started_at', 'finished_at']
+        read_only_fields = fields
+
+
+class BillingRunSerializer(serializers.ModelSerializer):
+    """批量出账任务序列化器"""
+    fee_types = serializers.ListField(
+        child=serializers.ChoiceField(choices=PaymentBill.FEE_TYPE_CHOICES),
+        required=False,
+        help_text='费用类型，为空表示全部启用的费用标准'
+    )
+    progress = serializers.FloatField(read_only=True)
+    created_by_name = serializers.CharField(source='created_by.username', read_only=True, default=None)
+
+    class Meta:
+        model = BillingRun
+        fields = ['id', 'billing_period', 'due_date', 'fee_types', 'description', 'status', 'progress',
+                  'total_communities', 'completed_communities', 'created_count', 'skipped_count',
+                  'failed_count', 'error_message', 'created_by_name', 'created_at', 'started_at', 'finished_at']
+        read_only_fields = ['id', 'status', 'total_communities', 'completed_communities', 'created_count',
+                            'skipped_count', 'failed_count', 'error_message', 'created_at',
+                            'started_at', 'finished_at']
+
+    def validate_billing_period(self, value):
+        return validate_billing_period(value)
+
+
+class BillingRunDetailSerializer(BillingRunSerializer):
+    """批量出账任务详情序列化器（含各小区进度）"""
+    items = BillingRunItemSerializer(many=True, read_only=True)
+
+    class Meta(BillingRunSerializer.Meta):
+        fields = BillingRunSerializer.Meta.fields + ['items']
@@ -0,0 +1,405 @@
+"""
+Payment Services - 缴费业务服务
+"""
+import logging
+import random
+import time
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.db import IntegrityError, transaction
+from django.db.models import Case, F, Q, Value, When
+from django.utils import timezone
+
+from .models import FeeStandard, PaymentBill, PaymentRecord, WeChatPayOrder
+from .periods import format_billing_period, parse_billing_period
+from .snapshots import schedule_refresh
+
+logger = logging.getLogger(__name__)
+
+BILL_NUMBER_SUFFIX_SPACE = 10 ** 6
+
+# 写入冲突（编号撞号或账单已被其他进程创建）时每批次的最多尝试次数
+BILL_INSERT_ATTEMPTS = 5
+
+
+def generate_bill_numbers(billing_period, count):
+    """
+    批量生成账单编号
+
+    编号格式沿用 账期数字 + 6位随机数（如 202601123456），
+    一次性读取该账期已用编号，保证本批次编号互不重复且不与已有编号冲突；
+    与并行写入的其他进程撞号由 create_bills 重新分配
+    """
+    prefix = billing_period.replace('-', '')
+    used = set(
+        PaymentBill.objects.filter(bill_number__startswith=prefix).values_list('bill_number', flat=True)
+    )
+    available = BILL_NUMBER_SUFFIX_SPACE - len(used)
+    if count > available:
+        raise ValueError(f'账期 {billing_period} 可用账单编号不足')
+
+    numbers = []
+    for suffix in random.sample(range(BILL_NUMBER_SUFFIX_SPACE), min(count + len(used), BILL_NUMBER_SUFFIX_SPACE)):
+        number = f"{prefix}{suffix:06d}"
+        if number in used:
+            continue
+        numbers.append(number)
+        if len(numbers) == count:
+            break
+    return numbers
+
+
+def create_bills(bills, batch_size=500):
+    """
+    分批写入新账单（在调用方的事务中执行，每批使用一个保存点）
+
+    并行出账的 Worker 读取已用编号时互相不可见，可能为同一账期抽到相同的随机编号，
+    或同时为同一房产出账（(房产, 费用类型, 账期) 唯一）。写入冲突时只回滚该批次的保存点，
+    剔除已被其他进程创建的账单，其余账单重新分配编号后重试
+
+    Returns:
+        list: 因账单已存在而未写入的账单
+    """
+    skipped = []
+    for start in range(0, len(bills), batch_size):
+        batch = bills[start:start + batch_size]
+        for attempt in range(BILL_INSERT_ATTEMPTS):
+            try:
+                with transaction.atomic():
+                    PaymentBill.objects.bulk_create(batch)
+                break
+            except IntegrityError:
+                if attempt == BILL_INSERT_ATTEMPTS - 1:
+                    raise
+                existing = set(PaymentBill.objects.filter(
+                    property_unit_id__in={bill.property_unit_id for bill in batch},
+                    fee_type__in={bill.fee_type for bill in batch},
+                    billing_period__in={bill.billing_period for bill in batch},
+                ).values_list('property_unit_id', 'fee_type', 'billing_period'))
+                skipped.extend(
+                    bill for bill in batch if (bill.property_unit_id, bill.fee_type, bill.billing_period) in existing
+                )
+                batch = [
+                    bill for bill in batch
+                    if (bill.property_unit_id, bill.fee_type, bill.billing_period) not in existing
+                ]
+                logger.warning(f'账单写入冲突，剔除已存在的账单 {len(existing)} 张，重新分配编号后重试')
+                if not batch:
+                    break
+                numbers = generate_bill_numbers(batch[0].billing_period, len(batch))
+                for bill, number in zip(batch, numbers):
+                    bill.bill_number = number
+    return skipped
+
+
+def primary_owner_map(property_ids):
+    """
+    批量获取房产的主要业主
+
+    优先取标记为主要房产的关联，其次取最早建立的关联
+
+    Returns:
+        dict: {property_id: owner_id}
+    """
+    from apps.property.models import OwnerProperty
+
+    owners = {}
+    relations = OwnerProperty.objects.filter(property_id__in=property_ids).order_by(
+        'property_id', '-is_primary', 'created_at'
+    ).values_list('property_id', 'owner_id')
+    for property_id, owner_id in relations:
+        owners.setdefault(property_id, owner_id)
+    return owners
+
+
+def generate_bills(community_id, fee_type, billing_period, due_date, description='',
+                   batch_size=500, skip_existing=False):
+    """
+    按小区批量生成账单
+
+    费率标准只查询一次，业主和已存在账单批量预取，
+    账单在同一事务中分批 bulk_create 写入
+
+    Args:
+        skip_existing: 已存在的账单计入 skipped_count 而非失败（用于可重复执行的批量出账）
+
+    Returns:
+        dict: created_count, failed_count, errors（skip_existing 时另含 skipped_count）
+
+    Raises:
+        ValueError: 账期无法解析
+    """
+    from apps.property.models import Property
+
+    period_start, period_cycle = parse_billing_period(billing_period)
+    billing_period = format_billing_period(period_start, period_cycle)
+
+    properties = list(
+        Property.objects.filter(community_id=community_id).select_related('community', 'building')
+    )
+
+    fee_standard = FeeStandard.objects.filter(
+        community_id=community_id,
+        fee_type=fee_type,
+        is_active=True
+    ).first()
+
+    owners = primary_owner_map([prop.id for prop in properties])
+    existing = set(
+        PaymentBill.objects.filter(
+            community_id=community_id,
+            fee_type=fee_type,
+            billing_period=billing_period
+        ).values_list('property_unit_id', flat=True)
+    )
+
+    failed_count = 0
+    skipped_count = 0
+    errors = []
+    pending = []
+
+    for prop in properties:
+        owner_id = owners.get(prop.id)
+        if not owner_id:
+            failed_count += 1
+            errors.append(f"{prop.full_address}: 未找到业主")
+            continue
+
+        if prop.id in existing:
+            if skip_existing:
+                skipped_count += 1
+                continue
+            failed_count += 1
+            errors.append(f"{prop.full_address}: 账单已存在")
+            continue
+
+        if not fee_standard:
+            failed_count += 1
+            errors.append(f"{prop.full_address}: 未找到费率标准")
+            continue
+
+        amount = (prop.area * fee_standard.price_per_square).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+        pending.append((prop, owner_id, amount))
+
+    def report(created_count):
+        result = {'created_count': created_count, 'failed_count': failed_count, 'errors': errors}
+        if skip_existing:
+            result['skipped_count'] = skipped_count
+        return result
+
+    if not pending:
+        return report(0)
+
+    bill_numbers = generate_bill_numbers(billing_period, len(pending))
+    bills = [
+        PaymentBill(
+            bill_number=bill_number,
+            community_id=community_id,
+            property_unit=prop,
+            owner_id=owner_id,
+            fee_type=fee_type,
+            billing_period=billing_period,
+            period_start=period_start,
+            period_cycle=period_cycle,
+            amount=amount,
+            due_date=due_date,
+            description=description
+        )
+        for bill_number, (prop, owner_id, amount) in zip(bill_numbers, pending)
+    ]
+
+    with transaction.atomic():
+        conflicts = create_bills(bills, batch_size)
+        # bulk_create 不触发信号，手动刷新收缴快照
+        schedule_refresh((community_id, billing_period, fee_type))
+
+    # 预检之后被其他进程（如重复投递的出账任务）创建的账单
+    for bill in conflicts:
+        if skip_existing:
+            skipped_count += 1
+        else:
+            failed_count += 1
+            errors.append(f"{bill.property_unit.full_address}: 账单已存在")
+
+    return report(len(bills) - len(conflicts))
+
+
+def wechat_out_trade_no(bill):
+    """
+    生成微信支付商户订单号：账单编号_时间戳
+
+    微信要求商户订单号不超过32位，账单编号（12位）加时间戳满足要求，
+    回调时可从订单号中直接取回账单编号
+    """
+    return f"{bill.bill_number}_{int(time.time())}"
+
+
+def apply_wechat_payment(out_trade_no, transaction_id, total_fee):
+    """
+    入账一笔微信支付
+
+    以 transaction_id / out_trade_no 的唯一约束去重，重复回调不会重复入账；
+    账单行加锁后以一条条件 UPDATE 累加已缴金额并更新状态，
+    快照刷新和缴费成功通知在事务提交后交给后台任务
+
+    Args:
+        total_fee: 支付金额（分）
+
+    Returns:
+        tuple: (结果, 缴费记录)，结果为 applied / duplicate / bill_not_found
+    """
+    if PaymentRecord.objects.filter(Q(transaction_id=transaction_id) | Q(out_trade_no=out_trade_no)).exists():
+        return 'duplicate', None
+
+    amount = (Decimal(total_fee) / 100).quantize(Decimal('0.01'))
+    bill_number = out_trade_no.rsplit('_', 1)[0]
+    now = timezone.now()
+
+    with transaction.atomic():
+        bill = PaymentBill.objects.select_related('owner').select_for_update(of=('self',)).filter(
+            bill_number=bill_number
+        ).first()
+        if bill is None:
+            return 'bill_not_found', None
+
+        record = PaymentRecord(
+            bill=bill,
+            transaction_id=transaction_id,
+            out_trade_no=out_trade_no,
+            payer=bill.owner.name,
+            amount=amount,
+            payment_method='wechat',
+            payment_time=now,
+            operator='系统'
+        )
+        try:
+            with transaction.atomic():
+                # bulk_create 不触发信号，快照刷新由后台任务完成
+                PaymentRecord.objects.bulk_create([record])
+        except IntegrityError:
+            # 并发的重复回调已先一步入账
+            return 'duplicate', None
+
+        paid_amount = F('paid_amount') + amount
+        PaymentBill.objects.filter(pk=bill.pk).update(
+            paid_amount=paid_amount,
+            status=Case(When(amount__lte=paid_amount, then=Value('paid')), default=Value('partial')),
+            payment_method='wechat',
+            paid_at=now,
+            updated_at=now
+        )
+        WeChatPayOrder.objects.filter(out_trade_no=out_trade_no).update(
+            status='paid', trade_state='SUCCESS', updated_at=now
+        )
+
+        record_ids = [str(record.id)]
+        transaction.on_commit(lambda: _dispatch_payment_tasks(record_ids))
+
+    return 'applied', record
+
+
+def apply_wechat_payments(payments):
+    """
+    批量入账微信支付（对账补单）
+
+    一次查询排除已入账的订单，相关账单一次加锁读取，
+    缴费记录 bulk_create、账单 bulk_update、订单状态一条 UPDATE；
+    期间有支付回调抢先入账导致唯一约束冲突时，整批回滚后逐笔入账
+
+    Args:
+        payments: [(商户订单号, 微信支付交易号, 支付金额（分）), ...]
+
+    Returns:
+        dict: applied（缴费记录列表）、duplicate、bill_not_found（商户订单号列表）
+    """
+    result = {'applied': [], 'duplicate': [], 'bill_not_found': []}
+    if not payments:
+        return result
+
+    recorded = set()
+    for transaction_id, out_trade_no in PaymentRecord.objects.filter(
+        Q(transaction_id__in=[payment[1] for payment in payments]) |
+        Q(out_trade_no__in=[payment[0] for payment in payments])
+    ).values_list('transaction_id', 'out_trade_no'):
+        recorded.update((transaction_id, out_trade_no))
+
+    pending = []
+    for out_trade_no, transaction_id, total_fee in payments:
+        if out_trade_no in recorded or transaction_id in recorded:
+            result['duplicate'].append(out_trade_no)
+            continue
+        recorded.update((out_trade_no, transaction_id))
+        pending.append((out_trade_no, transaction_id, total_fee))
+
+    now = timezone.now()
+    try:
+        with transaction.atomic():
+            bills = {
+                bill.bill_number: bill
+                for bill in PaymentBill.objects.select_related('owner').select_for_update(of=('self',)).filter(
+                    bill_number__in={out_trade_no.rsplit('_', 1)[0] for out_trade_no, _, _ in pending}
+                )
+            }
+            records = []
+            touched = {}
+            for out_trade_no, transaction_id, total_fee in pending:
+                bill = bills.get(out_trade_no.rsplit('_', 1)[0])
+                if bill is None:
+                    result['bill_not_found'].append(out_trade_no)
+                    continue
+                amount = (Decimal(total_fee) / 100).quantize(Decimal('0.01'))
+                bill.paid_amount += amount
+                touched[bill.pk] = bill
+                records.append(PaymentRecord(
+                    bill=bill,
+                    transaction_id=transaction_id,
+                    out_trade_no=out_trade_no,
+                    payer=bill.owner.name,
+                    amount=amount,
+                    payment_method='wechat',
+                    payment_time=now,
+                    operator='系统'
+                ))
+
+            for bill in touched.values():
+                bill.status = 'paid' if bill.paid_amount >= bill.amount else 'partial'
+                bill.payment_method = 'wechat'
+                bill.paid_at = now
+                bill.updated_at = now
+
+            # bulk_create / bulk_update 不触发信号，快照刷新由后台任务完成
+            PaymentRecord.objects.bulk_create(records)
+            PaymentBill.objects.bulk_update(
+                touched.values(), ['paid_amount', 'status', 'payment_method', 'paid_at', 'updated_at']
+            )
+            WeChatPayOrder.objects.filter(
+                out_trade_no__in=[record.out_trade_no for record in records] + result['duplicate']
+            ).update(status='paid', trade_state='SUCCESS', updated_at=now)
+
+            record_ids = [str(record.id) for record in records]
+            if record_ids:
+                transaction.on_commit(lambda: _dispatch_payment_tasks(record_ids))
+    except IntegrityError:
+        logger.warning('批量入账与支付回调冲突，改为逐笔入账')
+        result = {'applied': [], 'duplicate': [], 'bill_not_found': []}
+        for out_trade_no, transaction_id, total_fee in payments:
+            outcome, record = apply_wechat_payment(out_trade_no, transaction_id, total_fee)
+            result[outcome].append(record if outcome == 'applied' else out_trade_no)
+        WeChatPayOrder.objects.filter(out_trade_no__in=result['duplicate']).update(
+            status='paid', trade_state='SUCCESS', updated_at=timezone.now()
+        )
+        return result
+
+    result['applied'] = records
+    return result
+
+
+def _dispatch_payment_tasks(record_ids):
+    """提交后台任务；消息队列不可用时在当前进程执行，保证快照得到刷新"""
+    from .tasks import process_wechat_payments
+
+    try:
+        process_wechat_payments.delay(record_ids)
+    except Exception as e:
+        logger.error(f'提交缴费后续任务失败，改为同步执行: {str(e)}')
+        process_wechat_payments(record_ids)
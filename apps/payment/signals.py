@@ -0,0 +1,66 @@
+"""
+Payment Signals
+账单与缴费记录变更时增量刷新收缴快照，新增缴费记录时推送本月到账金额变化
+"""
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from apps.core.dashboard import publish_revenue_delta
+
+from .models import PaymentBill, PaymentRecord
+from .snapshots import schedule_refresh, snapshot_key
+
+SNAPSHOT_KEY_FIELDS = {'community', 'community_id', 'billing_period', 'fee_type'}
+
+
+@receiver(pre_save, sender=PaymentBill)
+def remember_bill_snapshot_key(sender, instance, raw=False, update_fields=None, **kwargs):
+    """
+    记录账单修改前的快照键
+    账单更换小区/账期/费用类型时，旧键的快照也需要刷新
+    """
+    instance._previous_snapshot_key = None
+    if raw or instance._state.adding:
+        return
+    if update_fields is not None and not set(update_fields) & SNAPSHOT_KEY_FIELDS:
+        return
+    instance._previous_snapshot_key = sender.objects.filter(pk=instance.pk).values_list(
+        'community_id', 'billing_period', 'fee_type'
+    ).first()
+
+
+@receiver(post_save, sender=PaymentBill)
+def refresh_bill_snapshot(sender, instance, raw=False, **kwargs):
+    """账单保存后刷新快照"""
+    if raw:
+        return
+    key = snapshot_key(instance)
+    schedule_refresh(key)
+    previous = getattr(instance, '_previous_snapshot_key', None)
+    if previous and previous != key:
+        schedule_refresh(previous)
+
+
+@receiver(post_delete, sender=PaymentBill)
+def refresh_deleted_bill_snapshot(sender, instance, **kwargs):
+    """账单删除后刷新快照"""
+    schedule_refresh(snapshot_key(instance))
+
+
+@receiver([post_save, post_delete], sender=PaymentRecord)
+def refresh_record_snapshot(sender, instance, raw=False, **kwargs):
+    """缴费记录变更后刷新所属账单的快照"""
+    if raw:
+        return
+    bill = PaymentBill.objects.filter(pk=instance.bill_id).values_list(
+        'community_id', 'billing_period', 'fee_type'
+    ).first()
+    if bill:
+        schedule_refresh(bill)
+
+
+@receiver(post_save, sender=PaymentRecord)
+def publish_record_revenue(sender, instance, created=False, raw=False, **kwargs):
+    """新增缴费记录后推送本月到账金额变化（bulk_create 的记录由 process_wechat_payments 推送）"""
+    if created and not raw:
+        publish_revenue_delta([instance])
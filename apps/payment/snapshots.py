@@ -0,0 +1,155 @@
+"""
+收缴快照维护
+快照按（小区, 账期, 费用类型）汇总，单个键的刷新只聚合该键下的账单，
+全量重建使用分组聚合一次性生成全部快照
+"""
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, F, Min, Q, Sum
+from django.utils import timezone
+
+from .models import CollectionSnapshot, PaymentBill, PaymentRecord
+
+
+def _overdue_q(today):
+    """逾期条件：已过应缴日期且未缴清"""
+    return Q(due_date__lt=today, status__in=['unpaid', 'partial', 'overdue'])
+
+
+def _bill_aggregates(today):
+    """账单维度的聚合表达式"""
+    overdue_q = _overdue_q(today)
+    return {
+        'bill_count': Count('id'),
+        # 同一账期文本的账期首日相同，取 Min 只为参与聚合
+        'period_start': Min('period_start'),
+        'paid_count': Count('id', filter=Q(status='paid')),
+        'unpaid_count': Count('id', filter=Q(status='unpaid')),
+        'billed_amount': Sum('amount'),
+        'paid_sum': Sum('paid_amount'),
+        'overdue_count': Count('id', filter=overdue_q),
+        'overdue_amount': Sum(F('amount') - F('paid_amount'), filter=overdue_q),
+    }
+
+
+def _snapshot_values(row, collected):
+    """聚合结果转换为快照字段"""
+    return {
+        'period_start': row['period_start'],
+        'bill_count': row['bill_count'],
+        'paid_count': row['paid_count'],
+        'unpaid_count': row['unpaid_count'],
+        'billed_amount': row['billed_amount'] or Decimal('0'),
+        'paid_amount': row['paid_sum'] or Decimal('0'),
+        'collected_amount': collected or Decimal('0'),
+        'overdue_count': row['overdue_count'],
+        'overdue_amount': row['overdue_amount'] or Decimal('0'),
+    }
+
+
+def snapshot_key(bill):
+    """账单对应的快照键"""
+    return (bill.community_id, bill.billing_period, bill.fee_type)
+
+
+def refresh_snapshot(community_id, billing_period, fee_type, today=None):
+    """
+    刷新单个快照
+
+    该键下已无账单时删除快照
+    """
+    today = today or timezone.localdate()
+    lookup = {
+        'community_id': community_id,
+        'billing_period': billing_period,
+        'fee_type': fee_type,
+    }
+
+    row = PaymentBill.objects.filter(**lookup).aggregate(**_bill_aggregates(today))
+    if not row['bill_count']:
+        CollectionSnapshot.objects.filter(**lookup).delete()
+        return None
+
+    collected = PaymentRecord.objects.filter(
+        status='success',
+        bill__community_id=community_id,
+        bill__billing_period=billing_period,
+        bill__fee_type=fee_type,
+    ).aggregate(total=Sum('amount'))['total']
+
+    snapshot, _ = CollectionSnapshot.objects.update_or_create(
+        defaults=_snapshot_values(row, collected), **lookup
+    )
+    return snapshot
+
+
+def refresh_snapshots(keys, today=None):
+    """批量刷新快照（键去重）"""
+    for key in set(keys):
+        refresh_snapshot(*key, today=today)
+
+
+class _PendingRefresh:
+    """同一事务内待刷新的快照键，提交后一次批量刷新"""
+
+    def __init__(self):
+        self.keys = set()
+        self.done = False
+
+    def __call__(self):
+        self.done = True
+        refresh_snapshots(self.keys)
+
+
+def schedule_refresh(key):
+    """
+    在当前事务提交后刷新快照；不在事务中时立即刷新
+
+    同一事务内只登记一个提交回调，各次保存/删除的键合并去重后一起刷新
+    """
+    connection = transaction.get_connection()
+    if connection.in_atomic_block:
+        for _, callback, *_ in connection.run_on_commit:
+            # 已执行的回调可能仍留在列表中（如测试中 captureOnCommitCallbacks 执行后），不再追加
+            if isinstance(callback, _PendingRefresh) and not callback.done:
+                callback.keys.add(key)
+                return
+    pending = _PendingRefresh()
+    pending.keys.add(key)
+    transaction.on_commit(pending)
+
+
+def rebuild_snapshots(today=None):
+    """
+    全量重建快照
+
+    Returns:
+        int: 重建后的快照数量
+    """
+    today = today or timezone.localdate()
+
+    collected = {
+        (row['bill__community_id'], row['bill__billing_period'], row['bill__fee_type']): row['total']
+        for row in PaymentRecord.objects.filter(status='success').values(
+            'bill__community_id', 'bill__billing_period', 'bill__fee_type'
+        ).annotate(total=Sum('amount')).order_by()
+    }
+
+    snapshots = []
+    for row in PaymentBill.objects.values(
+        'community_id', 'billing_period', 'fee_type'
+    ).annotate(**_bill_aggregates(today)).order_by():
+        key = (row['community_id'], row['billing_period'], row['fee_type'])
+        snapshots.append(CollectionSnapshot(
+            community_id=row['community_id'],
+            billing_period=row['billing_period'],
+            fee_type=row['fee_type'],
+            **_snapshot_values(row, collected.get(key)),
+        ))
+
+    with transaction.atomic():
+        CollectionSnapshot.objects.all().delete()
+        CollectionSnapshot.objects.bulk_create(snapshots, batch_size=500)
+
+    return len(snapshots)
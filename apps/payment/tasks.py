@@ -0,0 +1,181 @@
+"""
+Payment Tasks - 缴费后台任务
+"""
+import logging
+
+from celery import group, shared_task
+from django.db.models import F
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# 单个小区记录的错误明细上限，避免明细字段过大
+MAX_ITEM_ERRORS = 200
+
+
+@shared_task
+def start_billing_run(run_id):
+    """
+    启动批量出账任务
+
+    为每个需要出账的小区创建明细，再按小区分发到各个 Worker 并行生成账单
+    """
+    from .models import BillingRun, BillingRunItem, FeeStandard
+
+    # 条件更新认领任务，重复投递时只有一个 Worker 能启动
+    claimed = BillingRun.objects.filter(pk=run_id, status='pending').update(
+        status='running', started_at=timezone.now()
+    )
+    if not claimed:
+        logger.info(f'出账任务 {run_id} 已启动，跳过')
+        return
+    run = BillingRun.objects.get(pk=run_id)
+
+    standards = FeeStandard.objects.filter(is_active=True)
+    if run.fee_types:
+        standards = standards.filter(fee_type__in=run.fee_types)
+    community_ids = set(standards.values_list('community_id', flat=True))
+
+    BillingRunItem.objects.bulk_create(
+        [BillingRunItem(run=run, community_id=community_id) for community_id in community_ids],
+        ignore_conflicts=True
+    )
+    item_ids = list(run.items.values_list('id', flat=True))
+
+    if item_ids:
+        BillingRun.objects.filter(pk=run.pk).update(total_communities=len(item_ids))
+    else:
+        BillingRun.objects.filter(pk=run.pk).update(status='completed', finished_at=timezone.now())
+
+    if item_ids:
+        group(generate_community_bills.s(item_id) for item_id in item_ids).apply_async()
+
+
+@shared_task(bind=True, max_retries=3, default_retry_delay=30)
+def generate_community_bills(self, item_id):
+    """
+    为单个小区生成本次出账的全部账单
+
+    账单按 (房产, 费用类型, 账期) 去重，已存在的计入跳过数，
+    因此任务重试或重复执行不会产生重复账单
+    """
+    from .models import BillingRunItem, FeeStandard
+    from .services import generate_bills
+
+    # 条件更新认领明细，重复投递或并发执行时只有一个 Worker 生成账单
+    claimed = BillingRunItem.objects.filter(pk=item_id, status='pending').update(
+        status='running', started_at=timezone.now()
+    )
+    if not claimed:
+        logger.info(f'出账明细 {item_id} 已被认领，跳过')
+        return
+    item = BillingRunItem.objects.select_related('run').get(pk=item_id)
+    run = item.run
+
+    fee_types = FeeStandard.objects.filter(
+        community_id=item.community_id, is_active=True
+    ).values_list('fee_type', flat=True).distinct()
+    if run.fee_types:
+        fee_types = fee_types.filter(fee_type__in=run.fee_types)
+
+    created_count = skipped_count = failed_count = 0
+    errors = []
+    try:
+        for fee_type in fee_types:
+            result = generate_bills(
+                community_id=item.community_id,
+                fee_type=fee_type,
+                billing_period=run.billing_period,
+                due_date=run.due_date,
+                description=run.description or '',
+                skip_existing=True
+            )
+            created_count += result['created_count']
+            skipped_count += result['skipped_count']
+            failed_count += result['failed_count']
+            errors.extend(result['errors'])
+    except Exception as exc:
+        logger.error(f'出账任务 {run.id} 小区 {item.community_id} 生成账单失败: {str(exc)}')
+        if self.request.retries < self.max_retries:
+            BillingRunItem.objects.filter(pk=item.pk).update(status='pending')
+            raise self.retry(exc=exc)
+        BillingRunItem.objects.filter(pk=item.pk).update(
+            status='failed',
+            errors=[str(exc)],
+            finished_at=timezone.now()
+        )
+        _finish_item(run.id, failed=True)
+        return
+
+    BillingRunItem.objects.filter(pk=item.pk).update(
+        status='completed',
+        created_count=created_count,
+        skipped_count=skipped_count,
+        failed_count=failed_count,
+        errors=errors[:MAX_ITEM_ERRORS],
+        finished_at=timezone.now()
+    )
+    _finish_item(run.id, created_count, skipped_count, failed_count)
+
+
+def _finish_item(run_id, created_count=0, skipped_count=0, failed_count=0, failed=False):
+    """累加出账任务的进度，所有小区完成后结束任务"""
+    from .models import BillingRun
+
+    updates = {
+        'completed_communities': F('completed_communities') + 1,
+        'created_count': F('created_count') + created_count,
+        'skipped_count': F('skipped_count') + skipped_count,
+        'failed_count': F('failed_count') + failed_count,
+    }
+    if failed:
+        updates['error_message'] = '部分小区出账失败，请查看明细'
+    BillingRun.objects.filter(pk=run_id).update(**updates)
+
+    BillingRun.objects.filter(
+        pk=run_id,
+        status='running',
+        completed_communities__gte=F('total_communities')
+    ).update(status='completed', finished_at=timezone.now())
+
+
+@shared_task
+def process_wechat_payment(record_id):
+    """单笔微信支付入账后的后续处理（见 process_wechat_payments）"""
+    process_wechat_payments([record_id])
+
+
+@shared_task
+def process_wechat_payments(record_ids):
+    """
+    微信支付入账后的后续处理：刷新收缴快照、推送到账金额变化、发送缴费成功通知
+
+    同一批入账涉及的快照只刷新一次
+    """
+    from apps.core.dashboard import publish_revenue_delta
+    from apps.core.notification_service import NotificationService
+    from .models import PaymentRecord
+    from .snapshots import refresh_snapshots, snapshot_key
+
+    records = list(PaymentRecord.objects.select_related('bill__owner').filter(pk__in=record_ids))
+    refresh_snapshots(snapshot_key(record.bill) for record in records)
+    publish_revenue_delta(records)
+    for record in records:
+        NotificationService.send_payment_success(record)
+
+
+@shared_task
+def reconcile_wechat_payments(**options):
+    """
+    微信支付对账（建议每晚执行）
+
+    参数同 reconcile_wechat_orders
+    """
+    from .reconciliation import reconcile_wechat_orders
+
+    report = reconcile_wechat_orders(**options)
+    logger.info(
+        f"微信支付对账完成: 查询 {report['checked']} 笔，补入账 {report['applied']} 笔，"
+        f"差异 {report['mismatch_count']} 笔，查询失败 {report['failed']} 笔，耗时 {report['elapsed']} 秒"
+    )
+    return report
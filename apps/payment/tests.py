@@ -0,0 +1,821 @@
+"""
+缴费管理模块单元测试
+"""
+import threading
+import time
+from datetime import timedelta
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pandas as pd
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from .models import FeeStandard, PaymentBill, PaymentRecord, CollectionSnapshot, WeChatPayOrder
+from .importers import import_bills, parse_room_numbers
+from .services import generate_bills
+from .snapshots import rebuild_snapshots
+from apps.community.models import Community, Building
+from apps.property.models import Property, Owner, OwnerProperty
+
+User = get_user_model()
+
+
+class PaymentTestMixin:
+    """缴费测试数据准备"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123',
+            role='admin'
+        )
+        self.community = Community.objects.create(name='测试小区', address='测试地址')
+        self.building = Building.objects.create(community=self.community, name='1号楼')
+        self.owner = Owner.objects.create(name='张三', phone='13800138000')
+        self.properties = [
+            Property.objects.create(
+                community=self.community,
+                building=self.building,
+                floor=1,
+                room_number=f'0{i}',
+                area=Decimal('100.00')
+            )
+            for i in range(1, 4)
+        ]
+
+    def create_bill(self, property_obj, amount='100.00', billing_period='2026-01', **kwargs):
+        """创建账单"""
+        defaults = {
+            'bill_number': f'{billing_period}-{property_obj.room_number}-{kwargs.get("fee_type", "property")}',
+            'community': self.community,
+            'property_unit': property_obj,
+            'owner': self.owner,
+            'fee_type': 'property',
+            'billing_period': billing_period,
+            'amount': Decimal(amount),
+            'due_date': timezone.localdate() + timedelta(days=10),
+        }
+        defaults.update(kwargs)
+        return PaymentBill.objects.create(**defaults)
+
+    def pay(self, bill, amount, suffix='1'):
+        """为账单创建一条缴费记录"""
+        return PaymentRecord.objects.create(
+            bill=bill,
+            transaction_id=f'TXN-{bill.bill_number}-{suffix}',
+            out_trade_no=f'ORD-{bill.bill_number}-{suffix}',
+            payer=self.owner.name,
+            amount=Decimal(amount),
+            payment_time=timezone.now(),
+        )
+
+
+class CollectionSnapshotTest(PaymentTestMixin, TestCase):
+    """收缴快照测试"""
+
+    def snapshot(self, billing_period='2026-01', fee_type='property'):
+        return CollectionSnapshot.objects.get(
+            community=self.community, billing_period=billing_period, fee_type=fee_type
+        )
+
+    def test_refresh_once_per_transaction(self):
+        """测试同一事务内多次保存只登记一个提交回调，相同的键只刷新一次"""
+        from unittest import mock
+
+        with mock.patch('apps.payment.snapshots.refresh_snapshot') as refresh:
+            with self.captureOnCommitCallbacks(execute=True) as callbacks:
+                bill = self.create_bill(self.properties[0])
+                self.create_bill(self.properties[1], amount='50.00')
+                bill.fee_type = 'water'
+                bill.save()
+
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(sorted(call.args for call in refresh.call_args_list), [
+            (self.community.id, '2026-01', 'property'),
+            (self.community.id, '2026-01', 'water'),
+        ])
+
+    def test_incremental_refresh(self):
+        """测试账单和缴费记录变更后快照增量刷新"""
+        with self.captureOnCommitCallbacks(execute=True):
+            bill = self.create_bill(self.properties[0])
+            self.create_bill(self.properties[1], amount='50.00')
+
+        snapshot = self.snapshot()
+        self.assertEqual(snapshot.bill_count, 2)
+        self.assertEqual(snapshot.billed_amount, Decimal('150.00'))
+        self.assertEqual(snapshot.collected_amount, Decimal('0'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.pay(bill, '100.00')
+            bill.paid_amount = Decimal('100.00')
+            bill.status = 'paid'
+            bill.save()
+
+        snapshot = self.snapshot()
+        self.assertEqual(snapshot.collected_amount, Decimal('100.00'))
+        self.assertEqual(snapshot.paid_amount, Decimal('100.00'))
+        self.assertEqual(snapshot.paid_count, 1)
+        self.assertEqual(snapshot.unpaid_count, 1)
+        self.assertEqual(snapshot.collection_rate, Decimal('66.7'))
+
+    def test_key_change_and_delete(self):
+        """测试账单更换账期及删除后新旧快照均被刷新"""
+        with self.captureOnCommitCallbacks(execute=True):
+            bill = self.create_bill(self.properties[0])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            bill.billing_period = '2026-02'
+            bill.save()
+
+        self.assertFalse(CollectionSnapshot.objects.filter(billing_period='2026-01').exists())
+        self.assertEqual(self.snapshot('2026-02').bill_count, 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            bill.delete()
+
+        self.assertFalse(CollectionSnapshot.objects.exists())
+
+    def test_overdue_totals(self):
+        """测试逾期金额统计"""
+        with self.captureOnCommitCallbacks(execute=True):
+            self.create_bill(
+                self.properties[0],
+                paid_amount=Decimal('30.00'),
+                status='partial',
+                due_date=timezone.localdate() - timedelta(days=1)
+            )
+
+        snapshot = self.snapshot()
+        self.assertEqual(snapshot.overdue_count, 1)
+        self.assertEqual(snapshot.overdue_amount, Decimal('70.00'))
+
+    def test_rebuild_matches_incremental(self):
+        """测试全量重建结果与增量刷新一致"""
+        with self.captureOnCommitCallbacks(execute=True):
+            bill = self.create_bill(self.properties[0])
+            self.create_bill(self.properties[1], fee_type='water')
+            self.create_bill(self.properties[2], billing_period='2026-02')
+            self.pay(bill, '40.00')
+
+        fields = ['community_id', 'billing_period', 'fee_type', 'bill_count', 'billed_amount',
+                  'collected_amount', 'overdue_amount']
+        incremental = sorted(CollectionSnapshot.objects.values_list(*fields))
+
+        self.assertEqual(rebuild_snapshots(), 3)
+        self.assertEqual(sorted(CollectionSnapshot.objects.values_list(*fields)), incremental)
+
+
+class PaymentBillStatisticsAPITest(PaymentTestMixin, APITestCase):
+    """缴费统计API测试"""
+
+    def test_statistics_reads_snapshots(self):
+        """测试缴费统计接口读取快照"""
+        with self.captureOnCommitCallbacks(execute=True):
+            self.create_bill(self.properties[0], paid_amount=Decimal('100.00'), status='paid')
+            self.create_bill(self.properties[1])
+            self.create_bill(self.properties[2], fee_type='water', billing_period='2026-02')
+
+        self.client.force_authenticate(user=self.user)
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/payment/bills/statistics/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['total_bills'], 3)
+        self.assertEqual(response.data['total_amount'], Decimal('300.00'))
+        self.assertEqual(response.data['total_unpaid'], Decimal('200.00'))
+        self.assertEqual(response.data['paid_count'], 1)
+        self.assertEqual(response.data['unpaid_count'], 2)
+
+    def test_statistics_period_range(self):
+        """测试按账期区间统计"""
+        with self.captureOnCommitCallbacks(execute=True):
+            self.create_bill(self.properties[0], billing_period='2025-12')
+            self.create_bill(self.properties[1], billing_period='2026-01')
+            self.create_bill(self.properties[2], billing_period='2026-Q1', fee_type='water')
+
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get('/api/payment/bills/statistics/', {'period_from': '2026-01', 'period_to': '2026-03'})
+        self.assertEqual(response.data['total_bills'], 2)
+        response = self.client.get('/api/payment/bills/statistics/', {'period_to': '2025-12'})
+        self.assertEqual(response.data['total_bills'], 1)
+        response = self.client.get('/api/payment/bills/statistics/', {'period_from': '2026-13'})
+        self.assertEqual(response.status_code, 400)
+
+
+class BillingPeriodTest(PaymentTestMixin, APITestCase):
+    """账期解析与区间查询测试"""
+
+    def test_parse_and_sync(self):
+        """测试账期文本解析，保存时同步账期首日和周期"""
+        from datetime import date
+        from .periods import last_months, parse_billing_period, quarter_range
+
+        self.assertEqual(parse_billing_period('2026-1'), (date(2026, 1, 1), 'month'))
+        self.assertEqual(parse_billing_period('202611'), (date(2026, 11, 1), 'month'))
+        self.assertEqual(parse_billing_period('2026年3月'), (date(2026, 3, 1), 'month'))
+        self.assertEqual(parse_billing_period('2026-Q3'), (date(2026, 7, 1), 'quarter'))
+        self.assertEqual(parse_billing_period('2026'), (date(2026, 1, 1), 'year'))
+        with self.assertRaises(ValueError):
+            parse_billing_period('2026-13')
+        self.assertEqual(last_months(12, date(2026, 3, 15)), (date(2025, 4, 1), date(2026, 4, 1)))
+        self.assertEqual(quarter_range(date(2026, 11, 2)), (date(2026, 10, 1), date(2027, 1, 1)))
+
+        bill = self.create_bill(self.properties[0], billing_period='2026-2')
+        self.assertEqual((bill.billing_period, bill.period_start, bill.period_cycle), ('2026-02', date(2026, 2, 1), 'month'))
+        bill.billing_period = '2026-q2'
+        bill.save(update_fields=['billing_period'])
+        bill.refresh_from_db()
+        self.assertEqual((bill.billing_period, bill.period_start, bill.period_cycle), ('2026-Q2', date(2026, 4, 1), 'quarter'))
+
+    def test_legacy_labels_survive_unrelated_saves(self):
+        """测试迁移保留的历史账期文本：修改其他字段时不重新解析，不改写账期文本"""
+        from datetime import date
+
+        legacy = self.create_bill(self.properties[0], billing_period='2026-01')
+        unnormalized = self.create_bill(self.properties[1], billing_period='2026-02')
+        PaymentBill.objects.filter(pk=legacy.pk).update(billing_period='2026上半年')
+        PaymentBill.objects.filter(pk=unnormalized.pk).update(billing_period='2026-2')
+
+        for bill in PaymentBill.objects.filter(pk__in=[legacy.pk, unnormalized.pk]):
+            bill.status = 'paid'
+            bill.save()
+        bill = PaymentBill.objects.get(pk=legacy.pk)
+        bill.payment_method = 'cash'
+        bill.save(update_fields=['payment_method'])
+
+        self.assertEqual(
+            list(PaymentBill.objects.order_by('period_start').values_list('billing_period', 'period_start', 'status')),
+            [('2026上半年', date(2026, 1, 1), 'paid'), ('2026-2', date(2026, 2, 1), 'paid')]
+        )
+
+    def test_api_period_range_filter(self):
+        """测试接口按账期首日区间过滤，无效账期返回400"""
+        for index, period in enumerate(['2025-11', '2025-12', '2026-01']):
+            self.create_bill(self.properties[index], billing_period=period)
+
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get('/api/payment/bills/', {'period_start__gte': '2025-12-01', 'period_start__lt': '2026-02-01'})
+        self.assertEqual([row['billing_period'] for row in response.data['results']], ['2026-01', '2025-12'])
+
+        response = self.client.post('/api/payment/bills/batch_create/', {
+            'community_id': str(self.community.id), 'fee_type': 'property',
+            'billing_period': '26年1月', 'due_date': '2026-01-31',
+        })
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('billing_period', response.json())
+
+
+class PaymentBillExportAPITest(PaymentTestMixin, APITestCase):
+    """账单导出API测试"""
+
+    def setUp(self):
+        """测试前准备"""
+        super().setUp()
+        self.create_bill(self.properties[0], paid_amount=Decimal('100.00'), status='paid')
+        self.create_bill(self.properties[1], fee_type='water')
+        self.client.force_authenticate(user=self.user)
+
+    def test_export_xlsx(self):
+        """测试流式导出Excel"""
+        from io import BytesIO
+        from openpyxl import load_workbook
+
+        response = self.client.get('/api/payment/bills/export_excel/', {'fee_type': 'property'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        rows = list(load_workbook(BytesIO(b''.join(response.streaming_content))).active.values)
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[1][2], '1号楼-101')
+        self.assertEqual(rows[1][4], '物业费')
+        self.assertEqual(rows[1][8], '已缴')
+
+    def test_export_csv(self):
+        """测试CSV快速通道"""
+        response = self.client.get('/api/payment/bills/export_excel/', {'file_format': 'csv'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('.csv', response['Content-Disposition'])
+        lines = b''.join(response.streaming_content).decode('utf-8-sig').splitlines()
+        self.assertEqual(len(lines), 3)
+        self.assertTrue(lines[0].startswith('账单编号,小区,房号'))
+
+
+class GenerateBillsTest(PaymentTestMixin, TestCase):
+    """批量生成账单测试"""
+
+    def setUp(self):
+        super().setUp()
+        FeeStandard.objects.create(
+            community=self.community,
+            name='物业费',
+            fee_type='property',
+            price_per_square=Decimal('1.55')
+        )
+
+    def add_properties(self, count, start=10):
+        """批量添加带业主的房产"""
+        for i in range(start, start + count):
+            prop = Property.objects.create(
+                community=self.community,
+                building=self.building,
+                floor=2,
+                room_number=f'{i:02d}',
+                area=Decimal('88.88')
+            )
+            OwnerProperty.objects.create(owner=self.owner, property=prop)
+
+    def test_report(self):
+        """测试生成结果报告"""
+        OwnerProperty.objects.create(owner=self.owner, property=self.properties[0])
+        OwnerProperty.objects.create(owner=self.owner, property=self.properties[1])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.create_bill(self.properties[1], billing_period='2026-03')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            result = generate_bills(self.community.id, 'property', '2026-03', timezone.localdate())
+
+        self.assertEqual(result['created_count'], 1)
+        self.assertEqual(result['failed_count'], 2)
+        self.assertTrue(any('账单已存在' in error for error in result['errors']))
+        self.assertTrue(any('未找到业主' in error for error in result['errors']))
+
+        bill = PaymentBill.objects.get(property_unit=self.properties[0], billing_period='2026-03')
+        self.assertEqual(bill.amount, Decimal('155.00'))
+        self.assertTrue(bill.bill_number.startswith('202603'))
+        self.assertEqual(CollectionSnapshot.objects.get(billing_period='2026-03').bill_count, 2)
+
+    def test_missing_fee_standard(self):
+        """测试未配置费率标准"""
+        self.add_properties(2)
+        result = generate_bills(self.community.id, 'water', '2026-03', timezone.localdate())
+
+        self.assertEqual(result['created_count'], 0)
+        self.assertEqual(result['failed_count'], 5)
+
+    def test_query_count_is_constant(self):
+        """测试查询次数不随房产数量增长"""
+        self.add_properties(3)
+        with CaptureQueriesContext(connection) as small:
+            generate_bills(self.community.id, 'property', '2026-03', timezone.localdate())
+
+        self.add_properties(30, start=40)
+        with CaptureQueriesContext(connection) as large:
+            result = generate_bills(self.community.id, 'property', '2026-04', timezone.localdate())
+
+        self.assertEqual(result['created_count'], 33)
+        self.assertEqual(len(small), len(large))
+        self.assertEqual(len(set(PaymentBill.objects.values_list('bill_number', flat=True))), 36)
+
+    def test_concurrent_worker_conflicts_are_retried(self):
+        """测试编号撞号、房产已被其他 Worker 出账时重新分配编号并跳过，不回滚整个小区"""
+        from unittest import mock
+        from . import services
+
+        self.add_properties(3)
+        first, second = Property.objects.filter(floor=2).order_by('room_number')[:2]
+        original = services.generate_bill_numbers
+        calls = []
+
+        def racing_numbers(billing_period, count):
+            numbers = original(billing_period, count)
+            if not calls:
+                # 模拟并行的 Worker：在预检之后为第一个房产出账，并占用本批次第二个编号
+                self.create_bill(first, billing_period='2026-03', bill_number=numbers[1])
+            calls.append(count)
+            return numbers
+
+        with mock.patch.object(services, 'generate_bill_numbers', side_effect=racing_numbers):
+            result = generate_bills(self.community.id, 'property', '2026-03', timezone.localdate(), skip_existing=True)
+
+        self.assertEqual((result['created_count'], result['skipped_count']), (2, 1))
+        self.assertEqual(calls, [3, 2])
+        self.assertEqual(PaymentBill.objects.filter(billing_period='2026-03').count(), 3)
+        self.assertTrue(PaymentBill.objects.filter(property_unit=second, billing_period='2026-03').exists())
+
+    def test_batch_create_api(self):
+        """测试批量生成账单接口"""
+        self.add_properties(2)
+        self.client.force_login(self.user)
+
+        response = self.client.post('/api/payment/bills/batch_create/', {
+            'community_id': str(self.community.id),
+            'fee_type': 'property',
+            'billing_period': '2026-03',
+            'due_date': '2026-03-31',
+        })
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['created_count'], 2)
+        self.assertEqual(response.json()['failed_count'], 3)
+
+    def test_batch_create_api_write_conflict(self):
+        """测试重试后仍写入冲突时返回400及错误明细"""
+        from unittest import mock
+        from django.db import IntegrityError
+
+        self.add_properties(2)
+        self.client.force_login(self.user)
+
+        with mock.patch('apps.payment.services.create_bills', side_effect=IntegrityError('账单编号重复')):
+            response = self.client.post('/api/payment/bills/batch_create/', {
+                'community_id': str(self.community.id),
+                'fee_type': 'property',
+                'billing_period': '2026-03',
+                'due_date': '2026-03-31',
+            })
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['errors'], ['账单编号重复'])
+
+
+class BillingRunAPITest(PaymentTestMixin, APITestCase):
+    """批量出账任务测试"""
+
+    def setUp(self):
+        super().setUp()
+        self.other_community = Community.objects.create(name='第二小区', address='测试地址')
+        other_building = Building.objects.create(community=self.other_community, name='2号楼')
+        for community, building, properties in [
+            (self.community, self.building, self.properties),
+            (self.other_community, other_building, None),
+        ]:
+            FeeStandard.objects.create(
+                community=community, name='物业费', fee_type='property', price_per_square=Decimal('2.00')
+            )
+            if properties is None:
+                properties = [
+                    Property.objects.create(
+                        community=community, building=building, floor=3, room_number='01', area=Decimal('50.00')
+                    )
+                ]
+            for prop in properties:
+                OwnerProperty.objects.create(owner=self.owner, property=prop)
+        FeeStandard.objects.create(
+            community=self.community, name='水费', fee_type='water', price_per_square=Decimal('0.50')
+        )
+        self.client.force_authenticate(user=self.user)
+
+    def start_run(self, **data):
+        """创建出账任务并执行提交后投递的后台任务"""
+        payload = {'billing_period': '2026-05', 'due_date': '2026-05-31'}
+        payload.update(data)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/payment/billing-runs/', payload, format='json')
+        self.assertEqual(response.status_code, 201)
+        return self.client.get(f"/api/payment/billing-runs/{response.data['id']}/").data
+
+    def test_run_all_communities(self):
+        """测试按小区并行出账并记录进度"""
+        run = self.start_run()
+
+        self.assertEqual(run['status'], 'completed')
+        self.assertEqual(run['progress'], 100)
+        self.assertEqual(run['total_communities'], 2)
+        self.assertEqual(run['created_count'], 7)
+        self.assertEqual(len(run['items']), 2)
+        counts = {item['community_name']: item['created_count'] for item in run['items']}
+        self.assertEqual(counts, {'测试小区': 6, '第二小区': 1})
+        self.assertEqual(PaymentBill.objects.filter(billing_period='2026-05').count(), 7)
+
+    def test_rerun_is_idempotent(self):
+        """测试重复出账不会生成重复账单"""
+        self.start_run(fee_types=['property'])
+        run = self.start_run()
+
+        self.assertEqual(run['created_count'], 3)
+        self.assertEqual(run['skipped_count'], 4)
+        self.assertEqual(run['failed_count'], 0)
+        self.assertEqual(PaymentBill.objects.filter(billing_period='2026-05').count(), 7)
+
+    def test_duplicate_delivery_is_skipped(self):
+        """测试重复投递的启动和明细任务认领失败后直接返回，进度不重复累加"""
+        from unittest import mock
+        from .models import BillingRun, BillingRunItem
+        from .tasks import generate_community_bills, start_billing_run
+
+        run = self.start_run(fee_types=['property'])
+        with mock.patch('apps.payment.services.generate_bills') as generate:
+            start_billing_run(run['id'])
+            for item in BillingRunItem.objects.filter(run_id=run['id']):
+                generate_community_bills(item.id)
+
+        generate.assert_not_called()
+        run = BillingRun.objects.get(pk=run['id'])
+        self.assertEqual(run.completed_communities, 2)
+        self.assertEqual(run.items.count(), 2)
+
+
+class ImportBillsTest(PaymentTestMixin, TestCase):
+    """应缴费用单导入测试"""
+
+    def setUp(self):
+        super().setUp()
+        for prop in self.properties:
+            OwnerProperty.objects.create(owner=self.owner, property=prop)
+        self.unit_property = Property.objects.create(
+            community=self.community, building=self.building, unit='2单元',
+            floor=12, room_number='03', area=Decimal('90.00')
+        )
+        OwnerProperty.objects.create(
+            owner=Owner.objects.create(name='李四', phone='13900139000'), property=self.unit_property
+        )
+
+    def test_parse_room_numbers(self):
+        """测试房号解析"""
+        rooms = parse_room_numbers(pd.Series(['1号楼-101', '1-2-1203', '1号楼2单元-1203', '1-2-3-4', '1号楼']))
+
+        self.assertEqual(list(rooms['valid']), [True, True, True, False, False])
+        self.assertEqual(list(rooms['building_name'][:3]), ['1号楼'] * 3)
+        self.assertEqual(list(rooms['floor'][:3]), [1, 12, 12])
+        self.assertEqual(list(rooms['room_number'][:3]), ['01', '03', '03'])
+        self.assertEqual(list(rooms['unit'][1:3]), ['2单元', '2单元'])
+
+    def test_import_report(self):
+        """测试导入结果及失败记录"""
+        with self.captureOnCommitCallbacks(execute=True):
+            self.create_bill(self.properties[1], billing_period='2026-06', fee_type='other')
+        df = pd.DataFrame({
+            '房号': ['1号楼-101', '1-102', '1-2-1203', '2号楼-101', '1-109', '1-103', '1-103', 'abc'],
+            '业主': ['张三', '张三、王五', '李四', '张三', '张三', '赵六', '张三', '张三'],
+            '应缴金额': [120.5, 80, 300, 10, 10, 10, -1, 10],
+        })
+
+        with self.captureOnCommitCallbacks(execute=True):
+            stats = import_bills(df, self.community, 'other', '2026-06')
+
+        self.assertEqual(stats['total_rows'], 8)
+        self.assertEqual(stats['success_count'], 3)
+        self.assertEqual(stats['error_count'], 5)
+        reasons = {record['row']: record['失败原因'] for record in stats['failed_records']}
+        self.assertEqual(reasons[5], '未找到楼栋 2号楼')
+        self.assertEqual(reasons[6], '未找到房产 1-109')
+        self.assertTrue(reasons[7].startswith('业主不匹配'))
+        self.assertEqual(reasons[8], '金额格式错误')
+        self.assertEqual(reasons[9], '房号格式错误')
+
+        bills = {
+            bill.property_unit_id: bill.amount
+            for bill in PaymentBill.objects.filter(billing_period='2026-06', fee_type='other')
+        }
+        self.assertEqual(bills, {
+            self.properties[0].id: Decimal('120.50'),
+            self.properties[1].id: Decimal('80.00'),
+            self.unit_property.id: Decimal('300.00'),
+        })
+        self.assertEqual(CollectionSnapshot.objects.get(billing_period='2026-06').bill_count, 3)
+
+    def test_query_count_is_constant(self):
+        """测试查询次数不随行数增长"""
+        small = pd.DataFrame({'房号': ['1-101'], '业主': ['张三'], '应缴金额': [1]})
+        large = pd.DataFrame({
+            '房号': ['1-101', '1-102', '1-103', '1-2-1203'] * 5,
+            '业主': ['张三', '张三', '张三', '李四'] * 5,
+            '应缴金额': list(range(20)),
+        })
+
+        with CaptureQueriesContext(connection) as small_queries:
+            import_bills(small, self.community, 'water', '2026-07')
+        with CaptureQueriesContext(connection) as large_queries:
+            stats = import_bills(large, self.community, 'water', '2026-08')
+
+        self.assertEqual(stats['success_count'], 20)
+        self.assertEqual(len(small_queries), len(large_queries))
+        self.assertEqual(
+            PaymentBill.objects.get(property_unit=self.unit_property, billing_period='2026-08').amount,
+            Decimal('19.00')
+        )
+
+
+class WeChatPayNotifyTest(PaymentTestMixin, TestCase):
+    """微信支付回调测试"""
+
+    def setUp(self):
+        """测试前准备"""
+        from apps.core.models import WeChatPayConfig
+        from apps.core.wechat_pay import WeChatPayService
+
+        super().setUp()
+        config = WeChatPayConfig.objects.create(
+            name='测试商户', account_type='enterprise', app_id='wx-test', mch_id='1900000001', api_key='test-key'
+        )
+        self.service = WeChatPayService(config)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.bill = self.create_bill(self.properties[0], amount='100.00', bill_number='202601000001')
+
+    def notify(self, total_fee, transaction_id='4200000001', out_trade_no='202601000001_1767225600', **extra):
+        """发送一次签名后的回调"""
+        params = {
+            'return_code': 'SUCCESS', 'result_code': 'SUCCESS', 'appid': 'wx-test', 'mch_id': '1900000001',
+            'out_trade_no': out_trade_no, 'transaction_id': transaction_id, 'total_fee': str(total_fee),
+            **extra,
+        }
+        params['sign'] = self.service._generate_sign(params)
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(
+                '/api/wechat/pay/notify/', self.service._dict_to_xml(params), content_type='application/xml'
+            )
+
+    def test_payment_applied_once(self):
+        """测试重复回调只入账一次"""
+        first = self.notify(6000)
+        second = self.notify(6000)
+
+        self.assertEqual(first.status_code, 200)
+        self.assertIn(b'SUCCESS', second.content)
+        self.bill.refresh_from_db()
+        self.assertEqual(self.bill.paid_amount, Decimal('60.00'))
+        self.assertEqual(self.bill.status, 'partial')
+        self.assertEqual(PaymentRecord.objects.filter(bill=self.bill).count(), 1)
+
+        snapshot = CollectionSnapshot.objects.get(community=self.community, billing_period='2026-01', fee_type='property')
+        self.assertEqual(snapshot.paid_amount, Decimal('60.00'))
+
+    def test_second_payment_completes_bill(self):
+        """测试累计缴清后账单变为已缴并发送通知"""
+        from apps.core.models import Notification
+
+        self.notify(6000)
+        self.notify(4000, transaction_id='4200000002', out_trade_no='202601000001_1767225700')
+
+        self.bill.refresh_from_db()
+        self.assertEqual(self.bill.paid_amount, Decimal('100.00'))
+        self.assertEqual(self.bill.status, 'paid')
+        self.assertEqual(Notification.objects.filter(related_bill=self.bill, notification_type='payment_success').count(), 2)
+
+    def test_failed_payment_and_bad_signature(self):
+        """测试支付失败的通知直接应答，签名错误返回失败"""
+        response = self.notify(6000, result_code='FAIL')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(PaymentRecord.objects.exists())
+
+        response = self.client.post(
+            '/api/wechat/pay/notify/', '<xml><return_code>SUCCESS</return_code><sign>bad</sign></xml>',
+            content_type='application/xml'
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+class FakeWeChatPayServer:
+    """本地模拟的微信支付订单查询接口，记录并发查询数的峰值"""
+
+    def __init__(self, service):
+        self.trades = {}
+        # 返回错误签名的订单号
+        self.forged = set()
+        self.calls = 0
+        self.active = 0
+        self.peak = 0
+        self.lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                request = service._parse_xml_response(self.rfile.read(int(self.headers['Content-Length'])))
+                with server.lock:
+                    server.calls += 1
+                    server.active += 1
+                    server.peak = max(server.peak, server.active)
+                time.sleep(0.02)
+                trade = server.trades.get(request['out_trade_no'])
+                if trade is None:
+                    body = {'return_code': 'SUCCESS', 'result_code': 'FAIL', 'err_code': 'ORDERNOTEXIST'}
+                else:
+                    body = {'return_code': 'SUCCESS', 'result_code': 'SUCCESS', **trade}
+                body['sign'] = 'forged' if request['out_trade_no'] in server.forged else service._generate_sign(body)
+                content = service._dict_to_xml(body).encode('utf-8')
+                with server.lock:
+                    server.active -= 1
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/xml')
+                self.send_header('Content-Length', str(len(content)))
+                self.end_headers()
+                self.wfile.write(content)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f'http://127.0.0.1:{self.httpd.server_port}'
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class WeChatPayReconciliationTest(PaymentTestMixin, TestCase):
+    """微信支付对账测试"""
+
+    def setUp(self):
+        """测试前准备"""
+        from apps.core.models import WeChatPayConfig
+        from apps.core.wechat_pay import WeChatPayService
+
+        super().setUp()
+        config = WeChatPayConfig.objects.create(
+            name='测试商户', account_type='enterprise', app_id='wx-test', mch_id='1900000001', api_key='test-key'
+        )
+        self.service = WeChatPayService(config)
+        self.server = FakeWeChatPayServer(self.service)
+        self.addCleanup(self.server.close)
+        self.service.api_url = self.server.url
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.bills = [
+                self.create_bill(prop, amount='100.00', bill_number=f'20260100000{i}')
+                for i, prop in enumerate(self.properties, start=1)
+            ]
+
+    def order(self, bill, suffix, total_fee=10000, trade_state=None, minutes_ago=30, paid_fee=None):
+        """创建一笔待支付订单，并设置模拟微信侧的交易状态"""
+        out_trade_no = f'{bill.bill_number}_{suffix}'
+        order = WeChatPayOrder.objects.create(bill=bill, out_trade_no=out_trade_no, total_fee=total_fee)
+        WeChatPayOrder.objects.filter(pk=order.pk).update(created_at=timezone.now() - timedelta(minutes=minutes_ago))
+        if trade_state:
+            self.server.trades[out_trade_no] = {
+                'trade_state': trade_state,
+                'transaction_id': f'42000{suffix}' if trade_state == 'SUCCESS' else '',
+                'total_fee': str(paid_fee if paid_fee is not None else total_fee),
+            }
+        return out_trade_no
+
+    def reconcile(self, **options):
+        from .reconciliation import reconcile_wechat_orders
+
+        with self.captureOnCommitCallbacks(execute=True):
+            return reconcile_wechat_orders(service=self.service, **options)
+
+    def test_reconcile(self):
+        """测试补入账已支付订单、关闭失效订单并报告差异"""
+        from apps.core.models import Notification
+
+        paid = self.order(self.bills[0], '1001', trade_state='SUCCESS')
+        underpaid = self.order(self.bills[1], '1002', total_fee=6000, trade_state='SUCCESS', paid_fee=5000)
+        waiting = self.order(self.bills[2], '1003', trade_state='NOTPAY')
+        closed = self.order(self.bills[2], '1004', trade_state='CLOSED')
+        missing = self.order(self.bills[2], '1005')
+        recent = self.order(self.bills[2], '1006', trade_state='SUCCESS', minutes_ago=1)
+
+        report = self.reconcile(workers=4, batch_size=4)
+
+        self.assertEqual(report['checked'], 5)
+        self.assertEqual(self.server.calls, 5)
+        self.assertLessEqual(self.server.peak, 4)
+        self.assertEqual((report['applied'], report['pending'], report['closed'], report['failed']), (2, 1, 2, 0))
+        self.assertEqual(report['mismatches'], [{'out_trade_no': underpaid, 'reason': '下单 6000 分，实付 5000 分'}])
+
+        statuses = dict(WeChatPayOrder.objects.values_list('out_trade_no', 'status'))
+        self.assertEqual(statuses, {
+            paid: 'paid', underpaid: 'paid', waiting: 'pending', closed: 'closed', missing: 'closed', recent: 'pending'
+        })
+        for bill in self.bills:
+            bill.refresh_from_db()
+        self.assertEqual((self.bills[0].status, self.bills[0].paid_amount), ('paid', Decimal('100.00')))
+        self.assertEqual((self.bills[1].status, self.bills[1].paid_amount), ('partial', Decimal('50.00')))
+        self.assertEqual(self.bills[2].status, 'unpaid')
+
+        snapshot = CollectionSnapshot.objects.get(community=self.community, billing_period='2026-01', fee_type='property')
+        self.assertEqual(snapshot.paid_amount, Decimal('150.00'))
+        self.assertEqual(Notification.objects.filter(notification_type='payment_success').count(), 2)
+
+    def test_reconcile_after_notify(self):
+        """测试回调已入账的订单不会重复入账，重复对账只查询仍待支付的订单"""
+        paid = self.order(self.bills[0], '2001', total_fee=4000, trade_state='SUCCESS')
+        self.order(self.bills[1], '2002', trade_state='USERPAYING')
+        with self.captureOnCommitCallbacks(execute=True):
+            PaymentRecord.objects.create(
+                bill=self.bills[0], transaction_id='420002001', out_trade_no=paid, payer=self.owner.name,
+                amount=Decimal('40.00'), payment_time=timezone.now()
+            )
+
+        first = self.reconcile()
+        second = self.reconcile()
+
+        self.assertEqual((first['checked'], first['applied'], first['duplicate']), (2, 0, 1))
+        self.assertEqual((second['checked'], second['pending']), (1, 1))
+        self.assertEqual(PaymentRecord.objects.filter(bill=self.bills[0]).count(), 1)
+        self.assertEqual(WeChatPayOrder.objects.get(out_trade_no=paid).status, 'paid')
+
+    def test_unsigned_query_response_is_not_applied(self):
+        """测试订单查询响应签名错误或缺少业务结果时不入账、不关闭订单"""
+        forged = self.order(self.bills[0], '3001', trade_state='SUCCESS')
+        no_result = self.order(self.bills[1], '3002', trade_state='SUCCESS')
+        self.server.forged.add(forged)
+        self.server.forged.add(self.order(self.bills[2], '3003'))
+
+        # 响应签名正确但没有业务结果
+        self.server.trades[no_result]['result_code'] = ''
+
+        report = self.reconcile()
+
+        self.assertEqual((report['checked'], report['applied'], report['closed'], report['failed']), (3, 0, 0, 3))
+        self.assertFalse(PaymentRecord.objects.exists())
+        self.assertEqual(set(WeChatPayOrder.objects.values_list('status', flat=True)), {'pending'})
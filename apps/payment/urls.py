@@ -3,12 +3,13 @@ Payment URL Configuration
 """
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import FeeStandardViewSet, PaymentBillViewSet, PaymentRecordViewSet
+from .views import FeeStandardViewSet, PaymentBillViewSet, PaymentRecordViewSet, BillingRunViewSet
 
 router = DefaultRouter()
 router.register(r'fee-standards', FeeStandardViewSet, basename='feestandard')
 router.register(r'bills', PaymentBillViewSet, basename='paymentbill')
 router.register(r'records', PaymentRecordViewSet, basename='paymentrecord')
+router.register(r'billing-runs', BillingRunViewSet, basename='billingrun')
 
 urlpatterns = [
     path('', include(router.urls)),
@@ -3,7 +3,7 @@ Payment Views
 """
 import uuid
 from decimal import Decimal
-from rest_framework import viewsets, filters, status
+from rest_framework import viewsets, filters, status, mixins
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
@@ -16,13 +16,18 @@ from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.contrib.auth.decorators import login_required
 import pandas as pd
-from django.db import transaction
-import re
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
 
-from .models import FeeStandard, PaymentBill, PaymentRecord
+from .models import FeeStandard, PaymentBill, PaymentRecord, CollectionSnapshot, BillingRun
+from .periods import normalize_billing_period, parse_period_range, period_range_q
 from .serializers import (FeeStandardSerializer, PaymentBillSerializer, PaymentBillListSerializer,
-                           PaymentRecordSerializer, BatchCreateBillsSerializer, WeChatPaymentSerializer)
+                           PaymentRecordSerializer, BatchCreateBillsSerializer, WeChatPaymentSerializer,
+                           BillingRunSerializer, BillingRunDetailSerializer)
+from apps.core.pagination import KeysetPagination
 from apps.core.permissions import IsFinanceUser, IsAdminUser
+from apps.core.relations import SerializerRelationsMixin
+from apps.property.search import PropertySearchFilter
 
 
 class FeeStandardViewSet(viewsets.ModelViewSet):
@@ -80,15 +85,36 @@ class FeeStandardViewSet(viewsets.ModelViewSet):
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
-class PaymentBillViewSet(viewsets.ModelViewSet):
+# 账单序列化器的 property_address 读取房产的小区和楼栋
+BILL_SELECT_RELATED = ['community', 'owner', 'property_unit__community', 'property_unit__building']
+
+
+class PaymentBillViewSet(SerializerRelationsMixin, viewsets.ModelViewSet):
     """缴费账单管理视图集"""
     queryset = PaymentBill.objects.select_related('community', 'property_unit', 'owner').all()
     permission_classes = [IsAuthenticated]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
-    filterset_fields = ['community', 'property_unit', 'owner', 'fee_type', 'status', 'billing_period']
-    search_fields = ['bill_number', 'property_unit__room_number', 'owner__name']
-    ordering_fields = ['billing_period', 'due_date', 'created_at']
-    ordering = ['-billing_period', '-created_at']
+    filter_backends = [DjangoFilterBackend, PropertySearchFilter, filters.OrderingFilter]
+    # 账期区间用 period_start__gte / period_start__lt 过滤（日期，如 2026-01-01），走账期首日索引
+    filterset_fields = {
+        'community': ['exact'],
+        'property_unit': ['exact'],
+        'owner': ['exact'],
+        'fee_type': ['exact'],
+        'status': ['exact'],
+        'billing_period': ['exact'],
+        'period_cycle': ['exact'],
+        'period_start': ['exact', 'gte', 'lt'],
+    }
+    # 房号、楼栋、业主姓名和电话通过房产搜索索引匹配
+    search_fields = ['^bill_number']
+    property_search_field = 'property_unit'
+    ordering_fields = ['period_start', 'due_date', 'created_at']
+    ordering = ['-period_start', '-created_at', '-id']
+    pagination_class = KeysetPagination
+    serializer_relations = {
+        PaymentBillListSerializer: {'select_related': BILL_SELECT_RELATED},
+        PaymentBillSerializer: {'select_related': BILL_SELECT_RELATED, 'prefetch_related': ['payment_records']},
+    }
 
     def get_serializer_class(self):
         if self.action == 'list':
@@ -97,7 +123,8 @@ class PaymentBillViewSet(viewsets.ModelViewSet):
 
     def get_permissions(self):
         """只有管理员和财务可以创建/修改/删除"""
-        if self.action in ['create', 'update', 'partial_update', 'destroy', 'batch_create', 'batch_delete', 'import_excel']:
+        if self.action in ['create', 'update', 'partial_update', 'destroy', 'batch_create', 'batch_delete', 'import_excel',
+                           'export_excel']:
             return [IsFinanceUser()]
         return [IsAuthenticated()]
 
@@ -116,75 +143,28 @@ class PaymentBillViewSet(viewsets.ModelViewSet):
         due_date = serializer.validated_data['due_date']
         description = serializer.validated_data.get('description', '')
 
-        # 获取小区所有房产
-        from apps.property.models import Property
-        properties = Property.objects.filter(community_id=community_id)
+        from .services import generate_bills
 
-        created_count = 0
-        failed_count = 0
-        errors = []
-
-        for prop in properties:
-            try:
-                # 获取业主
-                owner_relation = prop.owners.first()
-                if not owner_relation:
-                    failed_count += 1
-                    errors.append(f"{prop.full_address}: 未找到业主")
-                    continue
-
-                owner = owner_relation.owner
-
-                # 检查是否已存在账单
-                if PaymentBill.objects.filter(
-                    property=prop,
-                    fee_type=fee_type,
-                    billing_period=billing_period
-                ).exists():
-                    failed_count += 1
-                    errors.append(f"{prop.full_address}: 账单已存在")
-                    continue
-
-                # 计算金额（这里简化处理，实际应根据费率标准计算）
-                fee_standard = FeeStandard.objects.filter(
-                    community_id=community_id,
-                    fee_type=fee_type,
-                    is_active=True
-                ).first()
-
-                if not fee_standard:
-                    failed_count += 1
-                    errors.append(f"{prop.full_address}: 未找到费率标准")
-                    continue
-
-                amount = prop.area * fee_standard.price_per_square
-
-                # 生成账单编号
-                bill_number = f"{billing_period.replace('-', '')}{str(uuid.uuid4().int)[:6]}"
-
-                # 创建账单
-                PaymentBill.objects.create(
-                    bill_number=bill_number,
-                    community_id=community_id,
-                    property=prop,
-                    owner=owner,
-                    fee_type=fee_type,
-                    billing_period=billing_period,
-                    amount=amount,
-                    due_date=due_date,
-                    description=description
-                )
-                created_count += 1
-
-            except Exception as e:
-                failed_count += 1
-                errors.append(f"{prop.full_address}: {str(e)}")
+        try:
+            result = generate_bills(
+                community_id=community_id,
+                fee_type=fee_type,
+                billing_period=billing_period,
+                due_date=due_date,
+                description=description
+            )
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except (IntegrityError, ValidationError) as e:
+            errors = e.messages if isinstance(e, ValidationError) else [str(e)]
+            return Response({
+                'error': '批量创建失败',
+                'errors': errors
+            }, status=status.HTTP_400_BAD_REQUEST)
 
         return Response({
             'message': '批量创建完成',
-            'created_count': created_count,
-            'failed_count': failed_count,
-            'errors': errors
+            **result
         })
 
     @action(detail=False, methods=['get'])
@@ -198,7 +178,9 @@ class PaymentBillViewSet(viewsets.ModelViewSet):
                 owner = Owner.objects.get(user=user)
                 # 获取业主所有房产的账单
                 properties = [op.property for op in owner.owners.all()]
-                bills = PaymentBill.objects.filter(property_unit__in=properties)
+                bills = self.with_relations(
+                    PaymentBill.objects.filter(property_unit__in=properties), PaymentBillListSerializer
+                )
                 serializer = PaymentBillListSerializer(bills, many=True)
                 return Response(serializer.data)
             except Owner.DoesNotExist:
@@ -208,14 +190,35 @@ class PaymentBillViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=['get'])
     def statistics(self, request):
-        """缴费统计"""
-        total_bills = PaymentBill.objects.count()
-        total_amount = PaymentBill.objects.aggregate(Sum('amount'))['amount__sum'] or 0
-        total_paid = PaymentBill.objects.aggregate(Sum('paid_amount'))['paid_amount__sum'] or 0
+        """
+        缴费统计（读取收缴快照）
+
+        可选参数：period_from、period_to 起止账期（含两端，如 2026-01、2026-Q1），months 最近N个月（含当月）
+        """
+        try:
+            start, end = parse_period_range(
+                request.query_params.get('period_from'),
+                request.query_params.get('period_to'),
+                request.query_params.get('months'),
+                today=timezone.localdate(),
+            )
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        totals = CollectionSnapshot.objects.filter(period_range_q(start, end)).aggregate(
+            total_bills=Sum('bill_count'),
+            total_amount=Sum('billed_amount'),
+            total_paid=Sum('paid_amount'),
+            unpaid_count=Sum('unpaid_count'),
+            paid_count=Sum('paid_count'),
+        )
+        total_bills = totals['total_bills'] or 0
+        total_amount = totals['total_amount'] or 0
+        total_paid = totals['total_paid'] or 0
         total_unpaid = total_amount - total_paid
 
-        unpaid_count = PaymentBill.objects.filter(status='unpaid').count()
-        paid_count = PaymentBill.objects.filter(status='paid').count()
+        unpaid_count = totals['unpaid_count'] or 0
+        paid_count = totals['paid_count'] or 0
 
         return Response({
             'total_bills': total_bills,
@@ -226,6 +229,38 @@ class PaymentBillViewSet(viewsets.ModelViewSet):
             'paid_count': paid_count,
         })
 
+    @action(detail=False, methods=['get'])
+    def export_excel(self, request):
+        """导出账单到Excel（支持与列表相同的筛选、搜索条件）"""
+        from apps.core.exports import EXPORT_CHUNK_SIZE, export_response, format_datetime, property_label
+
+        queryset = self.filter_queryset(self.get_queryset()).values_list(
+            'bill_number', 'community__name', 'property_unit__building__name', 'property_unit__unit',
+            'property_unit__floor', 'property_unit__room_number', 'owner__name', 'fee_type', 'billing_period',
+            'amount', 'paid_amount', 'status', 'payment_method', 'due_date', 'paid_at'
+        ).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+
+        fee_type_map = dict(PaymentBill.FEE_TYPE_CHOICES)
+        status_map = dict(PaymentBill.STATUS_CHOICES)
+        payment_method_map = dict(PaymentBill.PAYMENT_METHOD_CHOICES)
+        rows = (
+            [
+                bill_number, community_name, property_label(building_name, unit, floor, room_number),
+                owner_name, fee_type_map.get(fee_type, fee_type), billing_period,
+                float(amount), float(paid_amount), status_map.get(bill_status, bill_status),
+                payment_method_map.get(payment_method, payment_method or ''),
+                due_date.strftime('%Y-%m-%d'), format_datetime(paid_at),
+            ]
+            for (bill_number, community_name, building_name, unit, floor, room_number, owner_name, fee_type,
+                 billing_period, amount, paid_amount, bill_status, payment_method, due_date, paid_at) in queryset
+        )
+
+        columns = [
+            ('账单编号', 18), ('小区', 15), ('房号', 15), ('业主', 12), ('费用类型', 12), ('账期', 10),
+            ('应缴金额', 12), ('已缴金额', 12), ('状态', 10), ('支付方式', 12), ('应缴日期', 12), ('缴费时间', 20),
+        ]
+        return export_response(request, '缴费账单', '缴费账单', columns, rows)
+
     @action(detail=False, methods=['delete'])
     def batch_delete(self, request):
         """
@@ -285,6 +320,11 @@ class PaymentBillViewSet(viewsets.ModelViewSet):
         if not community_id:
             return Response({'error': '请选择小区'}, status=status.HTTP_400_BAD_REQUEST)
 
+        try:
+            billing_period = normalize_billing_period(billing_period)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
         try:
             # 读取Excel文件
             # 根据文件扩展名选择引擎
@@ -308,295 +348,9 @@ class PaymentBillViewSet(viewsets.ModelViewSet):
             except Community.DoesNotExist:
                 return Response({'error': '小区不存在'}, status=status.HTTP_400_BAD_REQUEST)
 
-            # 统计信息
-            stats = {
-                'total_rows': len(df),
-                'success_count': 0,
-                'skip_count': 0,
-                'error_count': 0,
-                'errors': [],
-                'failed_records': []  # 新增：保存失败记录的完整数据
-            }
-
-            # 处理每一行数据（不使用外层事务，每行独立处理）
-            for idx, row in df.iterrows():
-                    try:
-                        # 提取数据
-                        room_number_raw = str(row['房号']).strip()
-                        owner_names_raw = str(row['业主']).strip()
-                        amount = row['应缴金额']
-
-                        # 清理房号（去除可能的.0）
-                        if room_number_raw.endswith('.0'):
-                            room_number_raw = room_number_raw[:-2]
-
-                        # 解析房号 - 支持多种格式:
-                        # 无单元: 1号楼-501、2-601
-                        # 有单元: 1号楼1单元-201、1-2-201
-
-                        # 移除"号楼"或"栋"
-                        room_cleaned = re.sub(r'[号楼栋]', '-', room_number_raw)
-                        # 合并多个连字符
-                        room_cleaned = re.sub(r'-+', '-', room_cleaned)
-                        # 去除首尾连字符
-                        room_cleaned = room_cleaned.strip('-')
-
-                        # 分割并判断格式
-                        parts = room_cleaned.split('-')
-
-                        if len(parts) == 2:
-                            # 无单元号格式: 楼栋-房号 (例如: 1-501)
-                            building_num = parts[0]
-                            floor_room = parts[1]
-
-                            # 从楼层房号中提取楼层和房号
-                            if len(floor_room) <= 3:
-                                floor = int(floor_room[0])
-                                room_number = floor_room[1:].zfill(2)
-                            else:
-                                floor = int(floor_room[:-2])
-                                room_number = floor_room[-2:]
-
-                            # 获取楼栋
-                            from apps.community.models import Building
-                            building = Building.objects.filter(
-                                community=community,
-                                name=f'{building_num}号楼'
-                            ).first()
-
-                            if not building:
-                                error_msg = f'未找到楼栋 {building_num}号楼'
-                                stats['errors'].append(f'第{idx+2}行: {error_msg}')
-                                stats['error_count'] += 1
-                                # 保存失败记录
-                                stats['failed_records'].append({
-                                    'row': idx + 2,
-                                    '房号': room_number_raw,
-                                    '业主': owner_names_raw,
-                                    '应缴金额': amount,
-                                    '失败原因': error_msg
-                                })
-                                continue
-
-                            # 获取房产（无单元号，unit为空）
-                            from apps.property.models import Property
-                            property_obj = Property.objects.filter(
-                                building=building,
-                                unit__isnull=True,  # 无单元号
-                                floor=floor,
-                                room_number=room_number
-                            ).first()
-
-                            if not property_obj:
-                                error_msg = f'未找到房产 {room_number_raw}'
-                                stats['errors'].append(f'第{idx+2}行: {error_msg}')
-                                stats['error_count'] += 1
-                                # 保存失败记录
-                                stats['failed_records'].append({
-                                    'row': idx + 2,
-                                    '房号': room_number_raw,
-                                    '业主': owner_names_raw,
-                                    '应缴金额': amount,
-                                    '失败原因': error_msg
-                                })
-                                continue
-
-                        elif len(parts) == 3:
-                            # 有单元号格式: 楼栋-单元-房号 (例如: 1-2-201 或 1号楼1单元-201处理后的结果)
-                            building_num = parts[0]
-                            unit_part = parts[1]  # 可能是 "1" 或 "1单元"
-                            floor_room = parts[2]
-
-                            # 数据库中unit字段格式为"1单元"、"2单元"等
-                            # 检查unit_part是否已包含"单元"文字
-                            if '单元' in unit_part:
-                                unit_str = unit_part
-                            else:
-                                unit_str = f"{unit_part}单元"
-
-                            # 从楼层房号中提取楼层和房号
-                            if len(floor_room) <= 3:
-                                floor = int(floor_room[0])
-                                room_number = floor_room[1:].zfill(2)
-                            else:
-                                floor = int(floor_room[:-2])
-                                room_number = floor_room[-2:]
-
-                            # 获取楼栋
-                            from apps.community.models import Building
-                            building = Building.objects.filter(
-                                community=community,
-                                name=f'{building_num}号楼'
-                            ).first()
-
-                            if not building:
-                                error_msg = f'未找到楼栋 {building_num}号楼'
-                                stats['errors'].append(f'第{idx+2}行: {error_msg}')
-                                stats['error_count'] += 1
-                                # 保存失败记录
-                                stats['failed_records'].append({
-                                    'row': idx + 2,
-                                    '房号': room_number_raw,
-                                    '业主': owner_names_raw,
-                                    '应缴金额': amount,
-                                    '失败原因': error_msg
-                                })
-                                continue
-
-                            # 获取房产（包含单元号）
-                            from apps.property.models import Property
-                            property_obj = Property.objects.filter(
-                                building=building,
-                                unit=unit_str,
-                                floor=floor,
-                                room_number=room_number
-                            ).first()
-
-                            if not property_obj:
-                                error_msg = f'未找到房产 {room_number_raw}'
-                                stats['errors'].append(f'第{idx+2}行: {error_msg}')
-                                stats['error_count'] += 1
-                                # 保存失败记录
-                                stats['failed_records'].append({
-                                    'row': idx + 2,
-                                    '房号': room_number_raw,
-                                    '业主': owner_names_raw,
-                                    '应缴金额': amount,
-                                    '失败原因': error_msg
-                                })
-                                continue
-                        else:
-                            error_msg = f'房号格式错误 "{room_number_raw}" (支持的格式: 1号楼-501, 1-2-201)'
-                            stats['errors'].append(f'第{idx+2}行: {error_msg}')
-                            stats['error_count'] += 1
-                            # 保存失败记录
-                            stats['failed_records'].append({
-                                'row': idx + 2,
-                                '房号': room_number_raw,
-                                '业主': owner_names_raw,
-                                '应缴金额': amount,
-                                '失败原因': '房号格式错误'
-                            })
-                            continue
-
-                        # 解析业主姓名（可能包含多个姓名）
-                        # 提取所有中文姓名
-                        owner_names = re.findall(r'[\u4e00-\u9fa5]+', owner_names_raw)
-
-                        if not owner_names:
-                            error_msg = '业主姓名为空'
-                            stats['errors'].append(f'第{idx+2}行: {error_msg}')
-                            stats['error_count'] += 1
-                            # 保存失败记录
-                            stats['failed_records'].append({
-                                'row': idx + 2,
-                                '房号': room_number_raw,
-                                '业主': owner_names_raw,
-                                '应缴金额': amount,
-                                '失败原因': error_msg
-                            })
-                            continue
-
-                        # 获取房产的所有业主
-                        from apps.property.models import OwnerProperty
-                        owner_properties = OwnerProperty.objects.filter(
-                            property=property_obj
-                        ).select_related('owner')
-
-                        # 检查是否有业主匹配
-                        matched_owner = None
-                        for op in owner_properties:
-                            for excel_owner_name in owner_names:
-                                if excel_owner_name in op.owner.name or op.owner.name in excel_owner_name:
-                                    matched_owner = op.owner
-                                    break
-                            if matched_owner:
-                                break
-
-                        if not matched_owner:
-                            system_owners = [op.owner.name for op in owner_properties]
-                            error_msg = f'业主不匹配。Excel: {owner_names_raw}, 系统: {system_owners}'
-                            stats['errors'].append(f'第{idx+2}行: {error_msg}')
-                            stats['error_count'] += 1
-                            # 保存失败记录
-                            stats['failed_records'].append({
-                                'row': idx + 2,
-                                '房号': room_number_raw,
-                                '业主': owner_names_raw,
-                                '应缴金额': amount,
-                                '失败原因': f'业主不匹配 (系统业主: {", ".join(system_owners)})'
-                            })
-                            continue
-
-                        # 验证金额
-                        try:
-                            amount = float(amount)
-                            if amount < 0:
-                                raise ValueError('金额不能为负数')
-                            # 注意：允许金额为0，因为有些业主可能预缴了费用
-                        except (ValueError, TypeError):
-                            error_msg = '金额格式错误'
-                            stats['errors'].append(f'第{idx+2}行: {error_msg}')
-                            stats['error_count'] += 1
-                            # 保存失败记录
-                            stats['failed_records'].append({
-                                'row': idx + 2,
-                                '房号': room_number_raw,
-                                '业主': owner_names_raw,
-                                '应缴金额': amount,
-                                '失败原因': error_msg
-                            })
-                            continue
-
-                        # 检查是否已存在相同的账单
-                        existing_bill = PaymentBill.objects.filter(
-                            property_unit=property_obj,
-                            fee_type=fee_type,
-                            billing_period=billing_period
-                        ).first()
-
-                        if existing_bill:
-                            # 更新已存在的账单（使用独立事务确保立即提交）
-                            with transaction.atomic():
-                                existing_bill.amount = amount
-                                existing_bill.owner = matched_owner
-                                existing_bill.save()
-                            stats['success_count'] += 1
-                        else:
-                            # 生成账单编号
-                            bill_number = f"{billing_period.replace('-', '')}{str(uuid.uuid4().int)[:6]}"
-
-                            # 创建新账单（使用独立事务确保立即提交）
-                            from datetime import date, timedelta
-                            due_date = date.today() + timedelta(days=30)
-
-                            with transaction.atomic():
-                                PaymentBill.objects.create(
-                                    bill_number=bill_number,
-                                    community=community,
-                                    property_unit=property_obj,
-                                    owner=matched_owner,
-                                    fee_type=fee_type,
-                                    billing_period=billing_period,
-                                    amount=amount,
-                                    due_date=due_date,
-                                    status='unpaid'
-                                )
-                            stats['success_count'] += 1
-
-                    except Exception as e:
-                        error_msg = str(e)
-                        stats['errors'].append(f'第{idx+2}行: {error_msg}')
-                        stats['error_count'] += 1
-                        # 保存失败记录
-                        stats['failed_records'].append({
-                            'row': idx + 2,
-                            '房号': row.get('房号', ''),
-                            '业主': row.get('业主', ''),
-                            '应缴金额': row.get('应缴金额', ''),
-                            '失败原因': f'系统错误: {error_msg}'
-                        })
-
+            # 向量化解析并批量写入
+            from .importers import import_bills
+            stats = import_bills(df, community, fee_type, billing_period)
 
             return Response({
                 'message': '导入完成',
@@ -609,14 +363,45 @@ class PaymentBillViewSet(viewsets.ModelViewSet):
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+class BillingRunViewSet(mixins.CreateModelMixin, viewsets.ReadOnlyModelViewSet):
+    """
+    批量出账任务视图集
+    创建后由后台任务按小区并行出账，前端通过详情接口轮询进度
+    """
+    queryset = BillingRun.objects.select_related('created_by').all()
+    permission_classes = [IsFinanceUser]
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
+    filterset_fields = ['billing_period', 'status']
+    ordering = ['-created_at']
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action == 'retrieve':
+            queryset = queryset.prefetch_related('items__community')
+        return queryset
+
+    def get_serializer_class(self):
+        if self.action == 'retrieve':
+            return BillingRunDetailSerializer
+        return BillingRunSerializer
+
+    def perform_create(self, serializer):
+        from .tasks import start_billing_run
+
+        run = serializer.save(created_by=self.request.user)
+        # 事务提交后再投递任务，避免 Worker 读不到刚创建的记录
+        transaction.on_commit(lambda: start_billing_run.delay(str(run.id)))
+
+
 class PaymentRecordViewSet(viewsets.ReadOnlyModelViewSet):
     """缴费记录管理视图集"""
     queryset = PaymentRecord.objects.select_related('bill').all()
     serializer_class = PaymentRecordSerializer
     permission_classes = [IsAuthenticated]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, PropertySearchFilter, filters.OrderingFilter]
     filterset_fields = ['bill', 'status', 'payment_method']
     search_fields = ['transaction_id', 'out_trade_no', 'payer']
+    property_search_field = 'bill__property_unit'
     ordering_fields = ['payment_time', 'created_at']
     ordering = ['-payment_time']
 
@@ -830,7 +615,6 @@ def payment_bill_form(request, pk=None):
                     old_status = PaymentBill.objects.filter(id=bill.id).values_list('status', flat=True).first()
 
                     # 自动生成交易号和订单号
-                    import uuid
                     transaction_id = f"TXN{timezone.now().strftime('%Y%m%d%H%M%S')}{str(uuid.uuid4().int)[:6]}"
                     out_trade_no = f"ORD{timezone.now().strftime('%Y%m%d%H%M%S')}{str(uuid.uuid4().int)[:6]}"
 
@@ -926,7 +710,6 @@ def update_bill_status(request, bill_id):
             # 创建缴费记录（仅当状态从未缴/逾期变为已缴/部分缴时）
             if old_status not in ['paid', 'partial']:
                 # 自动生成交易号和订单号
-                import uuid
                 transaction_id = f"TXN{timezone.now().strftime('%Y%m%d%H%M%S')}{str(uuid.uuid4().int)[:6]}"
                 out_trade_no = f"ORD{timezone.now().strftime('%Y%m%d%H%M%S')}{str(uuid.uuid4().int)[:6]}"
 
@@ -1010,7 +793,6 @@ def update_bill_payment_method(request, bill_id):
                 operator_name = current_user.get_role_display() if current_user.is_authenticated else '系统'
 
                 # 自动生成交易号和订单号
-                import uuid
                 transaction_id = f"TXN{timezone.now().strftime('%Y%m%d%H%M%S')}{str(uuid.uuid4().int)[:6]}"
                 out_trade_no = f"ORD{timezone.now().strftime('%Y%m%d%H%M%S')}{str(uuid.uuid4().int)[:6]}"
 
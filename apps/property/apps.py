@@ -8,3 +8,6 @@ class PropertyConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.property'
     verbose_name = '房产管理'
+
+    def ready(self):
+        import apps.property.signals
@@ -0,0 +1,462 @@
+"""
+房产/业主Excel导入
+
+使用 openpyxl 只读模式逐行读取工作表，按批次（chunk）解析并批量写入：
+- 楼栋、业主在导入过程中维护内存映射，已解析过的不再查询
+- 每个批次在独立事务中用 bulk_create / bulk_update 提交，批量写入不触发信号，批次末尾重建搜索索引
+内存占用只与批次大小有关，与工作簿行数无关
+"""
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+
+from django.db import transaction
+from openpyxl import load_workbook
+
+from apps.community.models import Building
+from .models import Property, Owner, OwnerProperty
+from .search import rebuild_search_keys
+
+DEFAULT_CHUNK_SIZE = 500
+
+# 旧格式：第一行为表头，包含 房号、姓名、面积、电话号码（或电话）
+OLD_FORMAT_COLUMNS = ['房号', '姓名', '面积', '电话号码']
+# 新格式：第二行为表头，按列位置读取
+NEW_FORMAT_MIN_COLUMNS = 8
+NEW_FORMAT_WIDTH = 10
+
+
+def _text(value):
+    """单元格转为去除首尾空白的字符串，空值返回 None"""
+    if value is None:
+        return None
+    if isinstance(value, float) and value != value:
+        return None
+    text = str(value).strip()
+    if not text or text == 'nan':
+        return None
+    return text
+
+
+def _clean_phone(value):
+    """清理电话号码（Excel 中的数字电话会被读成 13800138000.0）"""
+    phone = _text(value)
+    if phone is None:
+        return None
+    try:
+        if isinstance(value, float) or '.' in phone:
+            phone = str(int(float(phone)))
+    except (TypeError, ValueError):
+        pass
+    return phone
+
+
+def _area(value):
+    """面积转为两位小数的 Decimal"""
+    if _text(value) is None:
+        return None
+    return Decimal(str(float(value))).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+
+
+def _split_floor_room(floor_room):
+    """楼层房号拆分：501 -> (5, '01')，1203 -> (12, '03')"""
+    if len(floor_room) == 3:
+        return int(floor_room[0]), floor_room[1:3]
+    if len(floor_room) >= 4:
+        return int(floor_room[:-2]), floor_room[-2:]
+    return None, None
+
+
+class ImportRow:
+    """一行解析后的房产/业主数据"""
+    __slots__ = ('row_no', 'building_name', 'unit', 'floor', 'room_number', 'area', 'owner_name', 'owner_phone')
+
+    def __init__(self, row_no, building_name, unit, floor, room_number, area, owner_name=None, owner_phone=None):
+        self.row_no = row_no
+        self.building_name = building_name
+        self.unit = unit
+        self.floor = floor
+        self.room_number = room_number
+        self.area = area
+        self.owner_name = owner_name
+        self.owner_phone = owner_phone
+
+    @property
+    def property_key(self):
+        return (self.building_name, self.unit, self.floor, self.room_number)
+
+
+class PropertyWorkbookImporter:
+    """
+    房产/业主工作簿导入器
+
+    用法：
+        importer = PropertyWorkbookImporter(community, chunk_size=500)
+        stats = importer.import_file(uploaded_file)
+    """
+
+    def __init__(self, community, chunk_size=DEFAULT_CHUNK_SIZE):
+        self.community = community
+        self.chunk_size = chunk_size
+        # 楼栋名称 -> 楼栋ID
+        self.buildings = dict(
+            Building.objects.filter(community=community).values_list('name', 'id')
+        )
+        # 电话 -> [业主ID, 姓名]
+        self.owners = {}
+
+    # ------------------------------------------------------------------
+    # 读取
+    # ------------------------------------------------------------------
+
+    def import_file(self, excel_file):
+        """导入上传的文件，返回总体统计"""
+        if excel_file.name.endswith('.xls'):
+            sheets = self._iter_xls_sheets(excel_file)
+        else:
+            sheets = self._iter_xlsx_sheets(excel_file)
+
+        total_stats = {
+            'sheets_processed': 0,
+            'total_sheets': 0,
+            'created_properties': 0,
+            'updated_properties': 0,
+            'created_owners': 0,
+            'linked_owners': 0,
+            'errors': [],
+            'sheet_details': []
+        }
+
+        for sheet_name, rows in sheets:
+            total_stats['total_sheets'] += 1
+            sheet_stats = self.import_sheet(sheet_name, rows)
+            if sheet_stats is None:
+                continue
+
+            for key in ['created_properties', 'updated_properties', 'created_owners', 'linked_owners']:
+                total_stats[key] += sheet_stats[key]
+            total_stats['errors'].extend([f"[{sheet_name}] {err}" for err in sheet_stats['errors']])
+            total_stats['sheets_processed'] += 1
+            total_stats['sheet_details'].append(sheet_stats)
+
+        return total_stats
+
+    def _iter_xlsx_sheets(self, excel_file):
+        """openpyxl 只读模式逐行读取 .xlsx"""
+        workbook = load_workbook(excel_file, read_only=True, data_only=True)
+        try:
+            for worksheet in workbook.worksheets:
+                yield worksheet.title, worksheet.iter_rows(values_only=True)
+        finally:
+            workbook.close()
+
+    def _iter_xls_sheets(self, excel_file):
+        """
+        旧版 .xls 无法流式读取，按工作表用 pandas 读入后逐行交给同一处理流程
+        """
+        import pandas as pd
+
+        excel_file_obj = pd.ExcelFile(excel_file, engine='xlrd')
+        for sheet_name in excel_file_obj.sheet_names:
+            df = pd.read_excel(excel_file_obj, sheet_name=sheet_name, header=None, engine='xlrd')
+            df = df.astype(object).where(df.notna(), None)
+            yield sheet_name, df.itertuples(index=False, name=None)
+
+    # ------------------------------------------------------------------
+    # 解析
+    # ------------------------------------------------------------------
+
+    def import_sheet(self, sheet_name, rows):
+        """
+        导入单个工作表
+
+        Returns:
+            dict: 工作表统计；无法识别格式时返回 None
+        """
+        rows = iter(rows)
+        first = next(rows, None)
+        if first is None:
+            return None
+
+        sheet_stats = {
+            'sheet_name': sheet_name,
+            'rows_total': 0,
+            'created_properties': 0,
+            'updated_properties': 0,
+            'created_owners': 0,
+            'linked_owners': 0,
+            'errors': []
+        }
+
+        header = [_text(cell) for cell in first]
+        if '房号' in header and '姓名' in header:
+            if '电话' in header and '电话号码' not in header:
+                header[header.index('电话')] = '电话号码'
+            parsed = self._parse_old_format(header, rows, sheet_stats)
+        else:
+            second = next(rows, None)
+            if second is None or len(second) < NEW_FORMAT_MIN_COLUMNS:
+                return None
+            parsed = self._parse_new_format(rows, sheet_stats)
+
+        chunk = []
+        for item in parsed:
+            chunk.append(item)
+            if len(chunk) >= self.chunk_size:
+                self._flush(chunk, sheet_stats)
+                chunk = []
+        if chunk:
+            self._flush(chunk, sheet_stats)
+
+        return sheet_stats
+
+    def _parse_old_format(self, header, rows, sheet_stats):
+        """
+        旧格式：房号 1-501，房号为空的行表示同一房产的其他业主
+        """
+        columns = {name: header.index(name) for name in OLD_FORMAT_COLUMNS if name in header}
+
+        def cell(values, name):
+            index = columns.get(name)
+            if index is None or index >= len(values):
+                return None
+            return values[index]
+
+        current_room_number = None
+        current_area = None
+
+        for row_no, values in enumerate(rows, start=2):
+            sheet_stats['rows_total'] += 1
+            try:
+                room_str = _text(cell(values, '房号'))
+                if room_str:
+                    current_room_number = room_str
+                    current_area = _area(cell(values, '面积'))
+
+                if not current_room_number:
+                    sheet_stats['errors'].append(f'第{row_no}行: 缺少房号信息')
+                    continue
+
+                parts = current_room_number.split('-')
+                if len(parts) != 2 or not parts[1]:
+                    sheet_stats['errors'].append(f'第{row_no}行: 房号格式错误 {current_room_number}')
+                    continue
+
+                floor, room_number = _split_floor_room(parts[1])
+                if floor is None:
+                    sheet_stats['errors'].append(f'第{row_no}行: 房号格式错误 {current_room_number}')
+                    continue
+
+                area = _area(cell(values, '面积')) or current_area
+                if not area:
+                    sheet_stats['errors'].append(f'第{row_no}行: 缺少面积信息')
+                    continue
+
+                owner_name = _text(cell(values, '姓名'))
+                owner_phone = _clean_phone(cell(values, '电话号码')) if owner_name else None
+                if owner_name and not owner_phone:
+                    sheet_stats['errors'].append(f'第{row_no}行: 缺少电话号码')
+                    owner_name = None
+
+                yield ImportRow(row_no, f'{parts[0]}号楼', None, floor, room_number, area, owner_name, owner_phone)
+
+            except (ValueError, InvalidOperation) as e:
+                sheet_stats['errors'].append(f'第{row_no}行: {str(e)}')
+
+    def _parse_new_format(self, rows, sheet_stats):
+        """
+        新格式：第二行为表头，列依次为 序号、小区、楼栋、单元、楼层、房号、-、业主姓名、联系电话、面积
+        """
+        for row_no, values in enumerate(rows, start=3):
+            sheet_stats['rows_total'] += 1
+            values = tuple(values) + (None,) * (NEW_FORMAT_WIDTH - len(values))
+
+            community_name = _text(values[1])
+            building_full_name = _text(values[2])
+            unit = _text(values[3])
+            floor = values[4]
+            room_number_raw = values[5]
+            owner_name = _text(values[7])
+            owner_phone = _clean_phone(values[8])
+            area = values[9]
+
+            # 跳过空行、标题行或缺少必需字段的行
+            if not all([community_name, building_full_name, owner_name, owner_phone]):
+                continue
+            if _text(floor) is None or _text(room_number_raw) is None or _text(area) is None:
+                continue
+
+            try:
+                floor = int(floor)
+                area = _area(area)
+            except (TypeError, ValueError, InvalidOperation):
+                sheet_stats['errors'].append(f'第{row_no}行: 数据格式错误')
+                continue
+
+            # 清理房号：数字类型（如 3007、3007.0、7）转为字符串，至少两位
+            if isinstance(room_number_raw, (int, float)):
+                room_number = str(int(room_number_raw)).zfill(2)
+            else:
+                room_number = str(room_number_raw).strip().split('.')[0]
+
+            # 从完整楼栋名称中提取楼栋号，例如: "锦尚名都-1号楼" -> "1号楼"
+            if '-' in building_full_name:
+                building_name = building_full_name.split('-')[-1]
+                if not building_name.endswith('号楼'):
+                    building_name = f'{building_name}号楼'
+            else:
+                building_name = building_full_name
+
+            yield ImportRow(row_no, building_name, unit, floor, room_number, area, owner_name, owner_phone)
+
+    # ------------------------------------------------------------------
+    # 写入
+    # ------------------------------------------------------------------
+
+    def _flush(self, chunk, sheet_stats):
+        """在独立事务中批量写入一个批次"""
+        try:
+            with transaction.atomic():
+                self._resolve_buildings(chunk)
+                properties = self._resolve_properties(chunk, sheet_stats)
+                self._resolve_owners(chunk, sheet_stats)
+                self._link_owners(chunk, properties, sheet_stats)
+                self._reindex(chunk, properties)
+        except Exception as e:
+            # 批次回滚后，本批次新建的楼栋/业主不能留在缓存中
+            self.buildings = dict(
+                Building.objects.filter(community=self.community).values_list('name', 'id')
+            )
+            self.owners = {}
+            sheet_stats['errors'].append(
+                f'第{chunk[0].row_no}-{chunk[-1].row_no}行: 批量写入失败 {str(e)}'
+            )
+
+    def _resolve_buildings(self, chunk):
+        """创建缓存中不存在的楼栋"""
+        missing = {row.building_name for row in chunk} - set(self.buildings)
+        if not missing:
+            return
+        created = Building.objects.bulk_create([
+            Building(community=self.community, name=name, description=name)
+            for name in sorted(missing)
+        ])
+        self.buildings.update({building.name: building.id for building in created})
+
+    def _resolve_properties(self, chunk, sheet_stats):
+        """
+        查询本批次涉及的房产，新建缺失的房产并更新面积变化的房产
+
+        Returns:
+            dict: {(楼栋名称, 单元, 楼层, 房号): 房产ID}
+        """
+        # 同一房产多行时以最后一行的面积为准
+        areas = {row.property_key: row.area for row in chunk}
+        building_names = {building_id: name for name, building_id in self.buildings.items()}
+
+        existing = {}
+        # 未填写单元的行（旧格式）按 楼栋+楼层+房号 匹配任意单元的房产
+        without_unit = {}
+        for prop in Property.objects.filter(
+            building_id__in={self.buildings[key[0]] for key in areas},
+            floor__in={key[2] for key in areas},
+            room_number__in={key[3] for key in areas},
+        ).only('id', 'building_id', 'unit', 'floor', 'room_number', 'area').order_by('created_at'):
+            building_name = building_names.get(prop.building_id)
+            key = (building_name, prop.unit, prop.floor, prop.room_number)
+            if key in areas:
+                existing[key] = prop
+            without_unit.setdefault((building_name, None, prop.floor, prop.room_number), prop)
+        for key in areas:
+            if key[1] is None and key not in existing and key in without_unit:
+                existing[key] = without_unit[key]
+
+        to_update = {}
+        for key, prop in existing.items():
+            if prop.area != areas[key]:
+                prop.area = areas[key]
+                to_update[prop.id] = prop
+        if to_update:
+            Property.objects.bulk_update(to_update.values(), ['area'])
+            sheet_stats['updated_properties'] += len(to_update)
+
+        to_create = [
+            Property(
+                community=self.community,
+                building_id=self.buildings[key[0]],
+                unit=key[1],
+                floor=key[2],
+                room_number=key[3],
+                area=area,
+                property_type='residential',
+                status='occupied'
+            )
+            for key, area in areas.items() if key not in existing
+        ]
+        if to_create:
+            Property.objects.bulk_create(to_create)
+            sheet_stats['created_properties'] += len(to_create)
+
+        properties = {key: prop.id for key, prop in existing.items()}
+        properties.update({
+            (building_names[prop.building_id], prop.unit, prop.floor, prop.room_number): prop.id
+            for prop in to_create
+        })
+        return properties
+
+    def _resolve_owners(self, chunk, sheet_stats):
+        """按电话解析业主：缓存 -> 数据库 -> 新建，并同步最新姓名"""
+        names = {row.owner_phone: row.owner_name for row in chunk if row.owner_phone}
+        missing = set(names) - set(self.owners)
+
+        if missing:
+            for owner_id, phone, name in Owner.objects.filter(phone__in=missing).order_by(
+                'created_at'
+            ).values_list('id', 'phone', 'name'):
+                self.owners.setdefault(phone, [owner_id, name])
+
+            new_owners = [
+                Owner(phone=phone, name=names[phone], is_verified=True)
+                for phone in missing if phone not in self.owners
+            ]
+            if new_owners:
+                Owner.objects.bulk_create(new_owners)
+                sheet_stats['created_owners'] += len(new_owners)
+                for owner in new_owners:
+                    self.owners[owner.phone] = [owner.id, owner.name]
+
+        renamed = []
+        for phone, name in names.items():
+            cached = self.owners[phone]
+            if cached[1] != name:
+                cached[1] = name
+                renamed.append(Owner(id=cached[0], name=name))
+        if renamed:
+            Owner.objects.bulk_update(renamed, ['name'])
+
+    def _link_owners(self, chunk, properties, sheet_stats):
+        """关联业主和房产"""
+        pairs = {
+            (properties[row.property_key], self.owners[row.owner_phone][0])
+            for row in chunk if row.owner_phone
+        }
+        if not pairs:
+            return
+
+        existing = set(OwnerProperty.objects.filter(
+            property_id__in={pair[0] for pair in pairs},
+            owner_id__in={pair[1] for pair in pairs},
+        ).values_list('property_id', 'owner_id'))
+
+        new_links = [
+            OwnerProperty(property_id=property_id, owner_id=owner_id, is_primary=True)
+            for property_id, owner_id in pairs - existing
+        ]
+        if new_links:
+            OwnerProperty.objects.bulk_create(new_links)
+            sheet_stats['linked_owners'] += len(new_links)
+
+    def _reindex(self, chunk, properties):
+        """重建本批次房产及本批次业主名下房产的搜索索引（业主可能已改名）"""
+        owner_ids = {self.owners[row.owner_phone][0] for row in chunk if row.owner_phone}
+        property_ids = set(properties.values())
+        property_ids.update(OwnerProperty.objects.filter(owner_id__in=owner_ids).values_list('property_id', flat=True))
+        rebuild_search_keys(property_ids)
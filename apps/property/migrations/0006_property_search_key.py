@@ -0,0 +1,102 @@
+# Generated by Django 4.2.7 on 2026-10-18 06:25
+
+import re
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def build_search_keys(apps, schema_editor):
+    """为已有房产生成检索词（规则同 apps.property.search）"""
+    Property = apps.get_model("property", "Property")
+    OwnerProperty = apps.get_model("property", "OwnerProperty")
+    PropertySearchKey = apps.get_model("property", "PropertySearchKey")
+
+    def normalize(text):
+        return re.sub(r"[\s\-_/]+", "", str(text or "")).lower()
+
+    keys = []
+    for property_id, building_name, unit, floor, room_number in Property.objects.values_list(
+        "id", "building__name", "unit", "floor", "room_number"
+    ).iterator():
+        room = f"{floor}{room_number}"
+        terms = [room, room_number, f"{building_name}{room}"]
+        if unit:
+            terms.append(f"{building_name}{unit}{room}")
+        keys.extend(
+            PropertySearchKey(property_id=property_id, kind="room", term=term)
+            for term in {normalize(term) for term in terms} - {""}
+        )
+    for property_id, owner_id, name, phone in OwnerProperty.objects.values_list(
+        "property_id", "owner_id", "owner__name", "owner__phone"
+    ).iterator():
+        keys.extend(
+            PropertySearchKey(property_id=property_id, owner_id=owner_id, kind="owner", term=term)
+            for term in {normalize(name), normalize(phone)} - {""}
+        )
+    PropertySearchKey.objects.bulk_create(keys, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("property", "0005_update_property_unique_constraint"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PropertySearchKey",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[("room", "房号"), ("owner", "业主")],
+                        max_length=10,
+                        verbose_name="类型",
+                    ),
+                ),
+                ("term", models.CharField(max_length=100, verbose_name="检索词")),
+                (
+                    "owner",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="search_keys",
+                        to="property.owner",
+                        verbose_name="业主",
+                    ),
+                ),
+                (
+                    "property",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="search_keys",
+                        to="property.property",
+                        verbose_name="房产",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "房产搜索索引",
+                "verbose_name_plural": "房产搜索索引",
+                "db_table": "property_search_key",
+                "indexes": [
+                    models.Index(
+                        fields=["term"],
+                        name="property_search_term_idx",
+                        opclasses=["varchar_pattern_ops"],
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(build_search_keys, migrations.RunPython.noop),
+    ]
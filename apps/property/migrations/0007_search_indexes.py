@@ -0,0 +1,16 @@
+# Generated by Django 4.2.7 on 2026-10-18 15:10
+
+from django.db import migrations
+
+from apps.core.search import CreateSearchIndex
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0008_search_indexes"),
+        ("property", "0006_property_search_key"),
+    ]
+
+    operations = [
+        CreateSearchIndex("Owner", ["name", "phone"]),
+    ]
@@ -0,0 +1,69 @@
+# Generated by Django 4.2.7 on 2026-10-18 07:21
+
+import re
+
+from django.db import migrations, models
+
+
+def rebuild_search_keys(apps, schema_editor):
+    """按新规则重建全部检索词：负楼层保留负号，增加电话尾号（规则同 apps.property.search）"""
+    Property = apps.get_model("property", "Property")
+    OwnerProperty = apps.get_model("property", "OwnerProperty")
+    PropertySearchKey = apps.get_model("property", "PropertySearchKey")
+
+    separators = re.compile(r"[\s\-_/]+")
+
+    def separator(match):
+        run = match.group()
+        signed = run.endswith("-") and (match.start() == 0 or len(run) > 1)
+        return "-" if signed and match.string[match.end():match.end() + 1].isdigit() else ""
+
+    def normalize(text):
+        return separators.sub(separator, str(text or "")).lower()
+
+    keys = []
+    for property_id, building_name, unit, floor, room_number in Property.objects.values_list(
+        "id", "building__name", "unit", "floor", "room_number"
+    ).iterator():
+        room = normalize(f"{floor}{room_number}")
+        building_name, unit = normalize(building_name), normalize(unit)
+        terms = [room, normalize(room_number), f"{building_name}{room}"]
+        if unit:
+            terms.append(f"{building_name}{unit}{room}")
+        keys.extend(
+            PropertySearchKey(property_id=property_id, kind="room", term=term)
+            for term in set(terms) - {""}
+        )
+    for property_id, owner_id, name, phone in OwnerProperty.objects.values_list(
+        "property_id", "owner_id", "owner__name", "owner__phone"
+    ).iterator():
+        terms = {("owner", normalize(name)), ("owner", normalize(phone))}
+        digits = re.sub(r"\D", "", str(phone or ""))
+        if digits:
+            terms.add(("phone_tail", digits[::-1]))
+        keys.extend(
+            PropertySearchKey(property_id=property_id, owner_id=owner_id, kind=kind, term=term)
+            for kind, term in terms
+            if term
+        )
+    PropertySearchKey.objects.all().delete()
+    PropertySearchKey.objects.bulk_create(keys, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("property", "0007_search_indexes"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="propertysearchkey",
+            name="kind",
+            field=models.CharField(
+                choices=[("room", "房号"), ("owner", "业主"), ("phone_tail", "电话尾号")],
+                max_length=10,
+                verbose_name="类型",
+            ),
+        ),
+        migrations.RunPython(rebuild_search_keys, migrations.RunPython.noop),
+    ]
@@ -202,3 +202,35 @@ class Tenant(models.Model):
 
     def __str__(self):
         return f"{self.name} - {self.property.full_address}"
+
+
+class PropertySearchKey(models.Model):
+    """
+    房产搜索索引
+
+    每套房产按完整房号（楼栋+单元+楼层+房号）和业主姓名、电话（另存倒序的电话用于尾号搜索）生成若干规范化的检索词，
+    房号、业主搜索都按检索词前缀匹配走索引；由 apps.property.search 维护，不要直接修改
+    """
+    KIND_CHOICES = [
+        ('room', '房号'),
+        ('owner', '业主'),
+        ('phone_tail', '电话尾号'),
+    ]
+
+    property = models.ForeignKey(Property, on_delete=models.CASCADE, related_name='search_keys', verbose_name='房产')
+    owner = models.ForeignKey(Owner, on_delete=models.CASCADE, null=True, blank=True, related_name='search_keys',
+                              verbose_name='业主')
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES, verbose_name='类型')
+    term = models.CharField(max_length=100, verbose_name='检索词')
+
+    class Meta:
+        db_table = 'property_search_key'
+        verbose_name = '房产搜索索引'
+        verbose_name_plural = verbose_name
+        indexes = [
+            # varchar_pattern_ops 使 PostgreSQL 的 LIKE 'xxx%' 前缀查询可以使用索引（其他数据库忽略）
+            models.Index(fields=['term'], name='property_search_term_idx', opclasses=['varchar_pattern_ops']),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} - {self.term}"
@@ -0,0 +1,147 @@
+"""
+房产搜索索引
+
+房号、业主搜索不再在各个列表里解析房号并跨表 icontains，而是查询 PropertySearchKey：
+- 房号检索词：楼层+房号（2704）、房号（04）、楼栋+楼层+房号（1号楼2704）、楼栋+单元+楼层+房号（1号楼1单元2704）
+- 业主检索词：业主姓名、电话，另存倒序的电话（phone_tail）用于按尾号搜索
+检索词去除空白和连字符并转为小写，搜索词做同样处理后按前缀匹配（term LIKE 'xxx%'），
+因此“2704”“1号楼27”“1号楼-2704”“张三”“1380013”都只需一次索引查询；
+纯数字的搜索词同时倒序匹配 phone_tail（电话尾号“8000”），姓名另按包含匹配（经 apps.core.search 的搜索后端）。
+负楼层保留负号：房号显示为“1号楼--101”（见 Property.__str__），开头或紧跟在分隔符后、位于数字前的连字符视为负号，
+“-101”“1号楼--101”匹配 -1 层 01 室，“1号楼-101”仍匹配 1 层 01 室。
+
+房产、楼栋、业主及其关联变更时由 signals 重建相关房产的检索词；批量导入在每个批次末尾显式重建。
+"""
+import re
+
+from django.db import transaction
+from django.db.models import Q
+
+from apps.core.search import IndexedSearchFilter, search_q
+from .models import Owner, OwnerProperty, Property, PropertySearchKey
+
+_SEPARATORS = re.compile(r'[\s\-_/]+')
+
+
+def _separator(match):
+    """分隔符串在数字前以连字符结尾，且位于开头或不止一个字符时保留为负号"""
+    run = match.group()
+    signed = run.endswith('-') and (match.start() == 0 or len(run) > 1)
+    return '-' if signed and match.string[match.end():match.end() + 1].isdigit() else ''
+
+
+def normalize(text):
+    """规范化检索词：去除空白和连字符（保留负楼层的负号），转为小写"""
+    return _SEPARATORS.sub(_separator, str(text or '')).lower()
+
+
+def room_terms(building_name, unit, floor, room_number):
+    """房产的房号检索词（各部分分别规范化后拼接，负楼层的负号不被当作分隔符去掉）"""
+    room = normalize(f'{floor}{room_number}')
+    building_name, unit = normalize(building_name), normalize(unit)
+    terms = [room, normalize(room_number), f'{building_name}{room}']
+    if unit:
+        terms.append(f'{building_name}{unit}{room}')
+    return set(terms) - {''}
+
+
+def owner_terms(name, phone):
+    """业主的检索词：[(类型, 检索词)]"""
+    terms = {('owner', normalize(name)), ('owner', normalize(phone))}
+    digits = re.sub(r'\D', '', str(phone or ''))
+    if digits:
+        terms.add(('phone_tail', digits[::-1]))
+    return {(kind, term) for kind, term in terms if term}
+
+
+def rebuild_search_keys(property_ids):
+    """重建指定房产的检索词"""
+    property_ids = set(property_ids)
+    if not property_ids:
+        return
+
+    keys = []
+    for property_id, building_name, unit, floor, room_number in Property.objects.filter(
+        pk__in=property_ids
+    ).values_list('id', 'building__name', 'unit', 'floor', 'room_number'):
+        keys.extend(
+            PropertySearchKey(property_id=property_id, kind='room', term=term)
+            for term in room_terms(building_name, unit, floor, room_number)
+        )
+    for property_id, owner_id, name, phone in OwnerProperty.objects.filter(
+        property_id__in=property_ids
+    ).values_list('property_id', 'owner_id', 'owner__name', 'owner__phone'):
+        keys.extend(
+            PropertySearchKey(property_id=property_id, owner_id=owner_id, kind=kind, term=term)
+            for kind, term in owner_terms(name, phone)
+        )
+
+    with transaction.atomic():
+        PropertySearchKey.objects.filter(property_id__in=property_ids).delete()
+        PropertySearchKey.objects.bulk_create(keys)
+
+
+def _matching_keys(query, kind=None):
+    """
+    匹配搜索词的检索词
+
+    kind 为 None 或 'owner' 时另外匹配电话尾号（纯数字的搜索词）和包含搜索词的业主姓名
+    """
+    term = normalize(query)
+    if kind == 'room':
+        return PropertySearchKey.objects.filter(kind='room', term__startswith=term)
+
+    # 倒序存放的 phone_tail 只按倒序的搜索词匹配
+    condition = Q(kind__in=[kind] if kind else ['room', 'owner'], term__startswith=term)
+    if term.isdigit():
+        condition |= Q(kind='phone_tail', term__startswith=term[::-1])
+    names = Owner.objects.filter(search_q(Owner, ['name'], str(query).strip())).values('id')
+    condition |= Q(kind='owner', owner_id__in=names)
+    return PropertySearchKey.objects.filter(condition)
+
+
+def matching_property_ids(query, kind=None):
+    """
+    检索词前缀匹配搜索词的房产ID（子查询，可直接用于 property_id__in=...）
+
+    Args:
+        kind: 'room' 只匹配房号，'owner' 只匹配业主，None 都匹配
+    """
+    return _matching_keys(query, kind).values('property_id')
+
+
+def matching_owner_ids(query):
+    """姓名/电话/电话尾号匹配或名下房产的房号匹配的业主ID（子查询）"""
+    return OwnerProperty.objects.filter(
+        Q(property_id__in=matching_property_ids(query, 'room')) |
+        Q(owner_id__in=_matching_keys(query, 'owner').values('owner_id'))
+    ).values('owner_id')
+
+
+class PropertySearchFilter(IndexedSearchFilter):
+    """
+    REST 接口搜索：在 search_fields（经搜索后端匹配）之外按房产搜索索引匹配
+
+    视图通过 property_search_field 指定房产字段（如 'id'、'property_unit'），
+    或设置 owner_search_field 按业主匹配（如 'id'）
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        property_field = getattr(view, 'property_search_field', None)
+        owner_field = getattr(view, 'owner_search_field', None)
+        search_terms = self.get_search_terms(request)
+        if not search_terms or not (property_field or owner_field):
+            return super().filter_queryset(request, queryset, view)
+
+        search_fields = self.get_search_fields(view, request) or []
+        base = queryset
+        for term in search_terms:
+            condition = self.search_condition(base, search_fields, term)
+            if property_field:
+                condition |= Q(**{f'{property_field}__in': matching_property_ids(term)})
+            if owner_field:
+                condition |= Q(**{f'{owner_field}__in': matching_owner_ids(term)})
+            queryset = queryset.filter(condition)
+        if self.must_call_distinct(base, search_fields):
+            queryset = queryset.distinct()
+        return queryset
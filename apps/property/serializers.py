@@ -5,6 +5,19 @@ from rest_framework import serializers
 from .models import Property, Owner, Tenant
 
 
+def first_owner_name(property_obj):
+    """
+    房产第一位业主的姓名
+
+    视图集已按主键顺序预加载 owners（及 owner）时直接取缓存，否则查询 owners.first()
+    """
+    if 'owners' in getattr(property_obj, '_prefetched_objects_cache', {}):
+        owner_relation = next(iter(property_obj.owners.all()), None)
+    else:
+        owner_relation = property_obj.owners.first()
+    return owner_relation.owner.name if owner_relation else None
+
+
 class PropertySerializer(serializers.ModelSerializer):
     """房产序列化器"""
     community_name = serializers.CharField(source='community.name', read_only=True)
@@ -21,8 +34,7 @@ class PropertySerializer(serializers.ModelSerializer):
 
     def get_owner_name(self, obj):
         """获取业主姓名"""
-        owner_relation = obj.owners.first()
-        return owner_relation.owner.name if owner_relation else None
+        return first_owner_name(obj)
 
 
 class PropertyListSerializer(serializers.ModelSerializer):
@@ -41,8 +53,7 @@ class PropertyListSerializer(serializers.ModelSerializer):
                   'status', 'owner_name', 'community_id', 'community_name', 'building_name', 'room_number']
 
     def get_owner_name(self, obj):
-        owner_relation = obj.owners.first()
-        return owner_relation.owner.name if owner_relation else None
+        return first_owner_name(obj)
 
 
 class OwnerSerializer(serializers.ModelSerializer):
@@ -78,7 +89,9 @@ class OwnerListSerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'phone', 'is_verified', 'property_count', 'created_at']
 
     def get_property_count(self, obj):
-        return obj.owners.count()
+        # 列表接口由视图集 annotate(property_count=Count('owners'))
+        count = getattr(obj, 'property_count', None)
+        return obj.owners.count() if count is None else count
 
 
 class TenantSerializer(serializers.ModelSerializer):
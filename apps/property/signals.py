@@ -0,0 +1,51 @@
+"""
+Property Signals
+房产、楼栋、业主及业主房产关联变更时重建相关房产的搜索索引
+"""
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.community.models import Building
+
+from .models import Owner, OwnerProperty, Property
+from .search import rebuild_search_keys
+
+BUILDING_NAME_FIELDS = {'name'}
+PROPERTY_ROOM_FIELDS = {'building', 'building_id', 'unit', 'floor', 'room_number'}
+OWNER_SEARCH_FIELDS = {'name', 'phone'}
+
+
+def _touches(update_fields, fields):
+    return update_fields is None or bool(set(update_fields) & fields)
+
+
+@receiver(post_save, sender=Property)
+def reindex_property(sender, instance, raw=False, update_fields=None, **kwargs):
+    """房产保存后重建检索词"""
+    if raw or not _touches(update_fields, PROPERTY_ROOM_FIELDS):
+        return
+    rebuild_search_keys([instance.pk])
+
+
+@receiver(post_save, sender=Building)
+def reindex_building(sender, instance, created=False, raw=False, update_fields=None, **kwargs):
+    """楼栋改名后重建楼栋下房产的检索词"""
+    if raw or created or not _touches(update_fields, BUILDING_NAME_FIELDS):
+        return
+    rebuild_search_keys(Property.objects.filter(building=instance).values_list('pk', flat=True))
+
+
+@receiver(post_save, sender=Owner)
+def reindex_owner(sender, instance, created=False, raw=False, update_fields=None, **kwargs):
+    """业主姓名、电话变更后重建名下房产的检索词"""
+    if raw or created or not _touches(update_fields, OWNER_SEARCH_FIELDS):
+        return
+    rebuild_search_keys(instance.owners.values_list('property_id', flat=True))
+
+
+@receiver([post_save, post_delete], sender=OwnerProperty)
+def reindex_owner_property(sender, instance, raw=False, **kwargs):
+    """业主与房产关联变更后重建房产的检索词"""
+    if raw:
+        return
+    rebuild_search_keys([instance.property_id])
@@ -0,0 +1,245 @@
+"""
+房产管理模块单元测试
+"""
+from decimal import Decimal
+from io import BytesIO
+
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase
+from openpyxl import Workbook
+from rest_framework.test import APITestCase
+
+from .importers import PropertyWorkbookImporter
+from .models import Property, Owner, OwnerProperty
+from apps.community.models import Community, Building
+
+User = get_user_model()
+
+
+def build_workbook(sheets):
+    """生成测试用 Excel 文件，sheets 为 {工作表名: 行列表}"""
+    workbook = Workbook()
+    workbook.remove(workbook.active)
+    for title, rows in sheets.items():
+        worksheet = workbook.create_sheet(title)
+        for row in rows:
+            worksheet.append(row)
+    output = BytesIO()
+    workbook.save(output)
+    return SimpleUploadedFile(
+        'import.xlsx', output.getvalue(),
+        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    )
+
+
+OLD_FORMAT_ROWS = [
+    ['房号', '姓名', '面积', '电话'],
+    ['1-501', '张三', 100.5, 13800138000],
+    [None, '李四', None, '13900139000'],
+    ['1-1203', '王五', 88, 13700137000.0],
+    ['2-601', '赵六', 90, None],
+    ['3-7', '孙七', 90, '13600136000'],
+]
+
+NEW_FORMAT_ROWS = [
+    ['业主信息表'],
+    ['序号', '小区', '楼栋', '单元', '楼层', '房号', '备注', '业主姓名', '联系电话', '面积'],
+    [1, '测试小区', '测试小区-1号楼', '2单元', 3, 301, None, '张三', '13800138000', 95],
+    [2, '测试小区', '测试小区-5', '1单元', 1, 7, None, '钱八', '13500135000', 60.25],
+    [None, None, None, None, None, None, None, None, None, None],
+    [3, '测试小区', '测试小区-5', '1单元', 'abc', 8, None, '钱八', '13500135000', 60],
+]
+
+
+class PropertyWorkbookImporterTest(TestCase):
+    """房产/业主工作簿导入测试"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.community = Community.objects.create(name='测试小区', address='测试地址')
+        building = Building.objects.create(community=self.community, name='1号楼')
+        self.existing = Property.objects.create(
+            community=self.community, building=building, floor=5, room_number='01', area=Decimal('90.00')
+        )
+
+    def test_old_and_new_formats(self):
+        """测试两种表格格式的导入结果"""
+        upload = build_workbook({'旧格式': OLD_FORMAT_ROWS, '新格式': NEW_FORMAT_ROWS, '空表': []})
+
+        stats = PropertyWorkbookImporter(self.community, chunk_size=2).import_file(upload)
+
+        self.assertEqual(stats['total_sheets'], 3)
+        self.assertEqual(stats['sheets_processed'], 2)
+        old, new = stats['sheet_details']
+        self.assertEqual(old['rows_total'], 5)
+        self.assertEqual(old['created_properties'], 2)
+        self.assertEqual(old['updated_properties'], 1)
+        self.assertEqual(old['linked_owners'], 3)
+        self.assertEqual(len(old['errors']), 2)
+        self.assertEqual(new['created_properties'], 2)
+        self.assertEqual(new['created_owners'], 1)
+        self.assertEqual(new['errors'], ['第6行: 数据格式错误'])
+
+        self.existing.refresh_from_db()
+        self.assertEqual(self.existing.area, Decimal('100.50'))
+        self.assertEqual(
+            set(self.existing.owners.values_list('owner__name', flat=True)), {'张三', '李四'}
+        )
+        self.assertTrue(Property.objects.filter(floor=12, room_number='03', area=Decimal('88.00')).exists())
+        self.assertTrue(Property.objects.filter(building__name='5号楼', unit='1单元', room_number='07').exists())
+        # 同一电话的业主在多个工作表间只创建一次
+        self.assertEqual(Owner.objects.filter(phone='13800138000').count(), 1)
+        self.assertEqual(Owner.objects.get(phone='13700137000').name, '王五')
+
+    def test_reimport_is_idempotent(self):
+        """测试重复导入不会产生重复数据"""
+        PropertyWorkbookImporter(self.community).import_file(build_workbook({'旧格式': OLD_FORMAT_ROWS}))
+        counts = (Property.objects.count(), Owner.objects.count(), OwnerProperty.objects.count())
+
+        stats = PropertyWorkbookImporter(self.community, chunk_size=1).import_file(
+            build_workbook({'旧格式': OLD_FORMAT_ROWS})
+        )
+
+        self.assertEqual(stats['created_properties'], 0)
+        self.assertEqual(stats['created_owners'], 0)
+        self.assertEqual(stats['linked_owners'], 0)
+        self.assertEqual((Property.objects.count(), Owner.objects.count(), OwnerProperty.objects.count()), counts)
+
+    def test_query_count_per_chunk(self):
+        """测试每个批次的查询次数固定，不随批次行数增长"""
+        rows = [['房号', '姓名', '面积', '电话号码']]
+        rows += [[f'1-{floor}01', f'业主{floor}', 80, f'138{floor:08d}'] for floor in range(1, 41)]
+        importer = PropertyWorkbookImporter(self.community, chunk_size=100)
+
+        # 含重建搜索索引的 5 条查询及其保存点
+        with self.assertNumQueries(16):
+            importer.import_file(build_workbook({'旧格式': rows}))
+
+        self.assertEqual(Property.objects.count(), 40)
+
+
+class PropertyImportAPITest(APITestCase):
+    """房产导入API测试"""
+
+    def test_import_excel(self):
+        """测试通过接口导入"""
+        community = Community.objects.create(name='测试小区', address='测试地址')
+        user = User.objects.create_user(username='admin', password='admin123', role='admin')
+        self.client.force_authenticate(user=user)
+
+        response = self.client.post('/api/property/properties/import_excel/', {
+            'file': build_workbook({'旧格式': OLD_FORMAT_ROWS}),
+            'community_id': str(community.id),
+        }, format='multipart')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['stats']['created_properties'], 3)
+
+    def test_export_excel(self):
+        """测试流式导出房产列表（业主按块批量查询）"""
+        from openpyxl import load_workbook
+
+        community = Community.objects.create(name='测试小区', address='测试地址')
+        building = Building.objects.create(community=community, name='1号楼')
+        owner = Owner.objects.create(name='张三', phone='13800138000')
+        for floor in range(1, 4):
+            prop = Property.objects.create(
+                community=community, building=building, unit='1单元', floor=floor,
+                room_number='01', area=Decimal('90.50'), status='occupied'
+            )
+            OwnerProperty.objects.create(owner=owner, property=prop)
+        user = User.objects.create_user(username='admin', password='admin123', role='admin')
+        self.client.force_authenticate(user=user)
+
+        response = self.client.get('/api/property/properties/export_excel/', {'search': '张三'})
+        with self.assertNumQueries(2):
+            content = b''.join(response.streaming_content)
+
+        rows = list(load_workbook(BytesIO(content)).active.values)
+        self.assertEqual(len(rows), 4)
+        self.assertEqual(rows[1], ('1号楼1单元-101', '测试小区', 1, 90.5, '住宅', '张三', '13800138000', '自住'))
+
+
+class PropertySearchIndexTest(APITestCase):
+    """房产搜索索引测试"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.community = Community.objects.create(name='测试小区', address='测试地址')
+        self.building = Building.objects.create(community=self.community, name='1号楼')
+        self.room = Property.objects.create(
+            community=self.community, building=self.building, unit='1单元', floor=27,
+            room_number='04', area=Decimal('90.00')
+        )
+        self.other = Property.objects.create(
+            community=self.community, building=self.building, unit='1单元', floor=5,
+            room_number='01', area=Decimal('90.00')
+        )
+        self.owner = Owner.objects.create(name='张三', phone='13800138000')
+        OwnerProperty.objects.create(owner=self.owner, property=self.room)
+
+    def search(self, query):
+        from .search import matching_property_ids
+
+        return set(Property.objects.filter(id__in=matching_property_ids(query)))
+
+    def test_room_and_owner_queries(self):
+        """测试房号、楼栋、业主姓名和电话的前缀匹配"""
+        for query in ['2704', '270', '1号楼2704', '1号楼-2704', '1号楼1单元27', '张三', '1380013']:
+            self.assertEqual(self.search(query), {self.room}, query)
+        self.assertEqual(self.search('1号楼'), {self.room, self.other})
+        self.assertEqual(self.search('3800'), set())
+
+    def test_phone_tail_and_name_infix(self):
+        """测试按电话尾号和姓名中间的字搜索业主"""
+        from .search import matching_owner_ids
+
+        self.assertEqual(self.search('8000'), {self.room})
+        self.assertEqual(self.search('38000'), {self.room})
+        self.assertEqual(self.search('三'), {self.room})
+        self.assertEqual(set(Owner.objects.filter(id__in=matching_owner_ids('8000'))), {self.owner})
+        self.assertEqual(set(Owner.objects.filter(id__in=matching_owner_ids('三'))), {self.owner})
+        # 倒序的尾号检索词不参与正序前缀匹配
+        self.assertEqual(self.search('0008'), set())
+
+    def test_negative_floor(self):
+        """测试负楼层与同房号的正楼层互不混淆"""
+        basement = Property.objects.create(
+            community=self.community, building=self.building, floor=-1, room_number='01', area=Decimal('30.00')
+        )
+        ground = Property.objects.create(
+            community=self.community, building=self.building, floor=1, room_number='01', area=Decimal('30.00')
+        )
+
+        self.assertEqual(str(basement), '1号楼--101')
+        for query in ['-101', str(basement), '1号楼 -101']:
+            self.assertEqual(self.search(query), {basement}, query)
+        for query in ['101', str(ground)]:
+            self.assertEqual(self.search(query), {ground}, query)
+
+    def test_index_follows_changes(self):
+        """测试业主改名、楼栋改名、解除关联后索引同步更新"""
+        self.owner.name = '张四'
+        self.owner.save()
+        self.assertEqual(self.search('张四'), {self.room})
+        self.assertEqual(self.search('张三'), set())
+
+        self.building.name = '2号楼'
+        self.building.save()
+        self.assertEqual(self.search('2号楼2704'), {self.room})
+
+        OwnerProperty.objects.filter(owner=self.owner).delete()
+        self.assertEqual(self.search('张四'), set())
+
+    def test_import_and_api_search(self):
+        """测试批量导入后可搜索，REST 接口按索引搜索"""
+        PropertyWorkbookImporter(self.community).import_file(build_workbook({'旧格式': OLD_FORMAT_ROWS}))
+        self.assertEqual({str(p) for p in self.search('李四')}, {'1号楼1单元-501'})
+
+        user = User.objects.create_user(username='admin', password='admin123', role='admin')
+        self.client.force_authenticate(user=user)
+        response = self.client.get('/api/property/properties/', {'search': '2704'})
+        self.assertEqual([row['id'] for row in response.data['results']], [str(self.room.id)])
+        response = self.client.get('/api/property/owners/', {'search': '1号楼27'})
+        self.assertEqual([row['id'] for row in response.data['results']], [str(self.owner.id)])
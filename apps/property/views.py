@@ -10,25 +10,45 @@ from django.shortcuts import get_object_or_404
 from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.contrib.auth.decorators import login_required
-import pandas as pd
 from django.db import transaction
+from django.db.models import Count, Prefetch
 
 from .models import Property, Owner, Tenant, OwnerProperty
+from .search import PropertySearchFilter, matching_property_ids
 from .serializers import (PropertySerializer, PropertyListSerializer, OwnerSerializer,
                            OwnerListSerializer, TenantSerializer, OwnerPropertyRelationSerializer)
 from apps.core.permissions import IsAdminUser, IsReceptionistUser
-from apps.community.models import Community, Building
+from apps.core.relations import SerializerRelationsMixin
+from apps.community.models import Community
 
 
-class PropertyViewSet(viewsets.ModelViewSet):
+def owner_name_prefetch(prefix=''):
+    """按主键顺序预加载房产的业主关联（first_owner_name 取第一条，与 owners.first() 一致）"""
+    return Prefetch(f'{prefix}owners', queryset=OwnerProperty.objects.select_related('owner').order_by('pk'))
+
+
+# 房产序列化器（列表/详情）读取小区、楼栋名称和第一位业主姓名
+PROPERTY_RELATIONS = {
+    'select_related': ['community', 'building'],
+    'prefetch_related': [owner_name_prefetch()],
+}
+
+
+class PropertyViewSet(SerializerRelationsMixin, viewsets.ModelViewSet):
     """房产管理视图集"""
     queryset = Property.objects.select_related('community', 'building').all()
     permission_classes = [IsAuthenticated]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, PropertySearchFilter, filters.OrderingFilter]
     filterset_fields = ['community', 'building', 'property_type', 'status']
-    search_fields = ['room_number']
+    # 房号、楼栋、业主姓名和电话通过房产搜索索引匹配
+    search_fields = []
+    property_search_field = 'id'
     ordering_fields = ['community', 'building', 'floor', 'room_number']
     ordering = ['community', 'building', 'floor', 'room_number']
+    serializer_relations = {
+        PropertyListSerializer: PROPERTY_RELATIONS,
+        PropertySerializer: PROPERTY_RELATIONS,
+    }
 
     def get_serializer_class(self):
         if self.action == 'list':
@@ -107,347 +127,10 @@ class PropertyViewSet(viewsets.ModelViewSet):
 
                 community = matched_community
 
-            # 读取Excel文件的所有工作表
-            excel_file_obj = pd.ExcelFile(excel_file)
-            sheet_names = excel_file_obj.sheet_names
-
-            # 总体统计
-            total_stats = {
-                'sheets_processed': 0,
-                'total_sheets': len(sheet_names),
-                'created_properties': 0,
-                'updated_properties': 0,
-                'created_owners': 0,
-                'linked_owners': 0,
-                'errors': [],
-                'sheet_details': []
-            }
-
-            # 遍历所有工作表
-            for sheet_name in sheet_names:
-                # 读取当前工作表
-                # 根据文件扩展名选择引擎
-                if excel_file.name.endswith('.xls'):
-                    df = pd.read_excel(excel_file_obj, sheet_name=sheet_name, engine='xlrd')
-                else:
-                    df = pd.read_excel(excel_file_obj, sheet_name=sheet_name)
-
-                # 检测Excel格式
-                # 格式1: 旧格式 - 列名直接包含'房号', '姓名', '面积', '电话号码'
-                # 格式2: 新格式 - 列名在第二行(header=1)，包含'小区', '楼栋', '单元', '楼层', '房号', '业主姓名', '联系电话'
-
-                is_old_format = '房号' in df.columns and '姓名' in df.columns
-
-                if not is_old_format:
-                    # 尝试新格式：读取第二行作为表头
-                    try:
-                        # 根据文件扩展名选择引擎
-                        if excel_file.name.endswith('.xls'):
-                            df_new = pd.read_excel(excel_file_obj, sheet_name=sheet_name, header=1, engine='xlrd')
-                        else:
-                            df_new = pd.read_excel(excel_file_obj, sheet_name=sheet_name, header=1)
-                        # 检查是否包含新格式的列
-                        # 新格式的列可能是Unnamed，但数据中包含小区、楼栋等信息
-                        if len(df_new.columns) >= 8:
-                            # 使用新格式
-                            df = df_new
-                            is_old_format = False
-                        else:
-                            continue
-                    except:
-                        continue
-                else:
-                    # 旧格式，支持两种列名：电话号码/电话
-                    if '电话' in df.columns and '电话号码' not in df.columns:
-                        df.rename(columns={'电话': '电话号码'}, inplace=True)
-
-                # 处理这个工作表
-                sheet_stats = {
-                    'sheet_name': sheet_name,
-                    'rows_total': len(df),
-                    'created_properties': 0,
-                    'updated_properties': 0,
-                    'created_owners': 0,
-                    'linked_owners': 0,
-                    'errors': []
-                }
-
-                with transaction.atomic():
-                    if is_old_format:
-                        # 旧格式处理逻辑
-                        current_room_number = None
-                        current_area = None
-                        current_property = None
-
-                        for idx, row in df.iterrows():
-                            try:
-                                # 处理房号（空房号表示多业主情况）
-                                room_str = str(row['房号']).strip() if pd.notna(row['房号']) else None
-
-                                if room_str and room_str != 'nan':
-                                    current_room_number = room_str
-                                    current_area = float(row['面积']) if pd.notna(row['面积']) else None
-
-                                # 如果房号为空且没有当前房产，跳过
-                                if not current_room_number:
-                                    sheet_stats['errors'].append(f'第{idx+2}行: 缺少房号信息')
-                                    continue
-
-                                # 解析房号 (1-501 -> 1栋, 5层, 01号房)
-                                parts = current_room_number.split('-')
-                                if len(parts) != 2:
-                                    sheet_stats['errors'].append(f'第{idx+2}行: 房号格式错误 {current_room_number}')
-                                    continue
-
-                                building_num = parts[0]
-                                floor_room = parts[1]
-
-                                if not floor_room:
-                                    sheet_stats['errors'].append(f'第{idx+2}行: 房号格式错误 {current_room_number}')
-                                    continue
-
-                                # 解析楼层和房号
-                                if len(floor_room) == 3:
-                                    floor = int(floor_room[0])
-                                    room_number = floor_room[1:3]
-                                elif len(floor_room) >= 4:
-                                    floor = int(floor_room[:-2])
-                                    room_number = floor_room[-2:]
-                                else:
-                                    sheet_stats['errors'].append(f'第{idx+2}行: 房号格式错误 {current_room_number}')
-                                    continue
-
-                                # 获取或创建楼栋
-                                building, _ = Building.objects.get_or_create(
-                                    community=community,
-                                    name=f'{building_num}号楼',
-                                    defaults={'description': f'{building_num}号楼'}
-                                )
-
-                                # 获取或创建房产
-                                area = float(row['面积']) if pd.notna(row['面积']) else current_area
-                                if not area:
-                                    sheet_stats['errors'].append(f'第{idx+2}行: 缺少面积信息')
-                                    continue
-
-                                property_obj, created = Property.objects.get_or_create(
-                                    building=building,
-                                    floor=floor,
-                                    room_number=room_number,
-                                    defaults={
-                                        'community': community,
-                                        'area': area,
-                                        'property_type': 'residential',
-                                        'status': 'occupied'
-                                    }
-                                )
-
-                                if created:
-                                    sheet_stats['created_properties'] += 1
-                                else:
-                                    if property_obj.area != area:
-                                        property_obj.area = area
-                                        property_obj.save()
-                                        sheet_stats['updated_properties'] += 1
-
-                                current_property = property_obj
-
-                                # 处理业主信息
-                                owner_name = str(row['姓名']).strip() if pd.notna(row['姓名']) else None
-                                if not owner_name or owner_name == 'nan':
-                                    continue
-
-                                owner_phone = str(row['电话号码']).strip() if pd.notna(row['电话号码']) else None
-                                if not owner_phone or owner_phone == 'nan':
-                                    sheet_stats['errors'].append(f'第{idx+2}行: 缺少电话号码')
-                                    continue
-
-                                # 清理电话号码
-                                try:
-                                    if isinstance(owner_phone, float) or '.' in owner_phone:
-                                        owner_phone = str(int(float(owner_phone)))
-                                except:
-                                    pass
-
-                                # 获取或创建业主
-                                owner, owner_created = Owner.objects.get_or_create(
-                                    phone=owner_phone,
-                                    defaults={
-                                        'name': owner_name,
-                                        'is_verified': True
-                                    }
-                                )
-
-                                if owner_created:
-                                    sheet_stats['created_owners'] += 1
-                                else:
-                                    # 更新姓名
-                                    if owner.name != owner_name:
-                                        owner.name = owner_name
-                                        owner.save()
-
-                                # 关联业主和房产
-                                owner_property, rel_created = OwnerProperty.objects.get_or_create(
-                                    property=property_obj,
-                                    owner=owner,
-                                    defaults={'is_primary': True}
-                                )
-
-                                if rel_created:
-                                    sheet_stats['linked_owners'] += 1
-
-                            except Exception as e:
-                                sheet_stats['errors'].append(f'第{idx+2}行: {str(e)}')
-
-                    else:
-                        # 新格式处理逻辑
-                        # 列映射: 根据实际Excel结构调整
-                        for idx, row in df.iterrows():
-                            try:
-                                # 跳过空行或标题行
-                                if pd.isna(row.iloc[1]):  # 小区列为空
-                                    continue
-
-                                # 提取数据
-                                community_name = str(row.iloc[1]).strip() if pd.notna(row.iloc[1]) else None
-                                building_full_name = str(row.iloc[2]).strip() if pd.notna(row.iloc[2]) else None
-                                unit = str(row.iloc[3]).strip() if pd.notna(row.iloc[3]) else None
-                                floor = row.iloc[4]
-                                room_number_raw = row.iloc[5]
-                                owner_name = str(row.iloc[7]).strip() if pd.notna(row.iloc[7]) else None
-                                owner_phone = str(row.iloc[8]).strip() if pd.notna(row.iloc[8]) else None
-                                area = row.iloc[9]
-
-                                # 验证必需字段
-                                if not community_name or community_name == 'nan':
-                                    continue
-                                if not building_full_name or building_full_name == 'nan':
-                                    continue
-                                if not owner_name or owner_name == 'nan':
-                                    continue
-                                if not owner_phone or owner_phone == 'nan':
-                                    continue
-                                if pd.isna(floor) or floor == 'nan':
-                                    continue
-                                if pd.isna(room_number_raw):
-                                    continue
-                                if pd.isna(area):
-                                    continue
-
-                                # 清理数据
-                                try:
-                                    floor = int(floor)
-                                    area = float(area)
-                                except:
-                                    sheet_stats['errors'].append(f'第{idx+2}行: 数据格式错误')
-                                    continue
-
-                                # 清理房号：处理数字类型（如3007、3007.0）
-                                if isinstance(room_number_raw, (int, float)):
-                                    # 如果是整数或浮点数，转换为整数再转字符串
-                                    try:
-                                        room_number = str(int(room_number_raw))
-                                        # 确保至少有2位（例如：7 -> "07"）
-                                        if len(room_number) == 1:
-                                            room_number = '0' + room_number
-                                    except:
-                                        room_number = str(room_number_raw).strip()
-                                else:
-                                    room_number = str(room_number_raw).strip()
-
-                                # 移除房号中的小数点（如果有的话）
-                                if '.' in room_number:
-                                    room_number = room_number.split('.')[0]
-
-                                # 清理电话号码
-                                try:
-                                    if isinstance(owner_phone, float) or '.' in str(owner_phone):
-                                        owner_phone = str(int(float(owner_phone)))
-                                except:
-                                    pass
-
-                                # 从完整楼栋名称中提取楼栋号
-                                # 例如: "锦尚名都-1号楼" -> "1号楼"
-                                if '-' in building_full_name:
-                                    building_name = building_full_name.split('-')[-1]
-                                    if not building_name.endswith('号楼'):
-                                        building_name = f'{building_name}号楼'
-                                else:
-                                    building_name = building_full_name
-
-                                # 获取或创建楼栋
-                                building, _ = Building.objects.get_or_create(
-                                    community=community,
-                                    name=building_name,
-                                    defaults={'description': building_name}
-                                )
-
-                                # 获取或创建房产（包含单元作为唯一键）
-                                property_obj, created = Property.objects.get_or_create(
-                                    building=building,
-                                    unit=unit,
-                                    floor=floor,
-                                    room_number=room_number,
-                                    defaults={
-                                        'community': community,
-                                        'area': area,
-                                        'property_type': 'residential',
-                                        'status': 'occupied'
-                                    }
-                                )
-
-                                if created:
-                                    sheet_stats['created_properties'] += 1
-                                else:
-                                    # 更新字段（unit已在查找条件中，无需更新）
-                                    updated = False
-                                    if property_obj.area != area:
-                                        property_obj.area = area
-                                        updated = True
-                                    if updated:
-                                        property_obj.save()
-                                        sheet_stats['updated_properties'] += 1
-
-                                # 获取或创建业主
-                                owner, owner_created = Owner.objects.get_or_create(
-                                    phone=owner_phone,
-                                    defaults={
-                                        'name': owner_name,
-                                        'is_verified': True
-                                    }
-                                )
-
-                                if owner_created:
-                                    sheet_stats['created_owners'] += 1
-                                else:
-                                    # 更新姓名
-                                    if owner.name != owner_name:
-                                        owner.name = owner_name
-                                        owner.save()
-
-                                # 关联业主和房产
-                                owner_property, rel_created = OwnerProperty.objects.get_or_create(
-                                    property=property_obj,
-                                    owner=owner,
-                                    defaults={'is_primary': True}
-                                )
-
-                                if rel_created:
-                                    sheet_stats['linked_owners'] += 1
-
-                            except Exception as e:
-                                sheet_stats['errors'].append(f'第{idx+2}行: {str(e)}')
-                                continue
-
-
-                # 累加到总统计
-                total_stats['created_properties'] += sheet_stats['created_properties']
-                total_stats['updated_properties'] += sheet_stats['updated_properties']
-                total_stats['created_owners'] += sheet_stats['created_owners']
-                total_stats['linked_owners'] += sheet_stats['linked_owners']
-                total_stats['errors'].extend([f"[{sheet_name}] {err}" for err in sheet_stats['errors']])
-                total_stats['sheets_processed'] += 1
-                total_stats['sheet_details'].append(sheet_stats)
+            # 流式读取所有工作表，按批次写入
+            from .importers import PropertyWorkbookImporter
+            chunk_size = int(request.data.get('chunk_size') or 500)
+            total_stats = PropertyWorkbookImporter(community, chunk_size=chunk_size).import_file(excel_file)
 
             return Response({
                 'message': f'Excel导入完成，共处理 {total_stats["sheets_processed"]} 个工作表',
@@ -462,12 +145,7 @@ class PropertyViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'], permission_classes=[IsAdminUser])
     def export_excel(self, request):
         """导出房产列表到Excel（支持筛选）"""
-        from django.http import HttpResponse
-        from django.db.models import Q, Prefetch
-        import openpyxl
-        from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
-        from openpyxl.utils import get_column_letter
-        from datetime import datetime
+        from apps.core.exports import EXPORT_CHUNK_SIZE, export_response
 
         try:
             # 获取筛选参数
@@ -477,14 +155,7 @@ class PropertyViewSet(viewsets.ModelViewSet):
             search_query = request.query_params.get('search', '')
 
             # 构建查询集
-            queryset = Property.objects.select_related(
-                'community', 'building'
-            ).prefetch_related(
-                Prefetch(
-                    'owners',
-                    queryset=OwnerProperty.objects.select_related('owner').order_by('-is_primary', '-created_at')
-                )
-            )
+            queryset = Property.objects.all()
 
             # 应用筛选条件
             if community_id:
@@ -494,147 +165,61 @@ class PropertyViewSet(viewsets.ModelViewSet):
             if status_filter:
                 queryset = queryset.filter(status=status_filter)
 
-            # 应用搜索逻辑
+            # 应用搜索逻辑：按房产搜索索引匹配房号、楼栋、业主姓名和电话
             if search_query:
-                # 尝试解析数字房号
-                floor_room_match = None
-                if search_query.isdigit() and len(search_query) >= 3:
-                    query_len = len(search_query)
-                    if query_len == 3:
-                        floor_num = int(search_query[0])
-                        room_suffix = search_query[1:]
-                        floor_room_match = (floor_num, room_suffix)
-                    elif query_len == 4:
-                        floor_num = int(search_query[:2])
-                        room_suffix = search_query[2:]
-                        floor_room_match = (floor_num, room_suffix)
-                    elif query_len == 5:
-                        floor_num = int(search_query[:3])
-                        room_suffix = search_query[3:]
-                        floor_room_match = (floor_num, room_suffix)
-
-                queries = Q(building__name__icontains=search_query) | Q(room_number__icontains=search_query)
-                if floor_room_match:
-                    floor_num, room_suffix = floor_room_match
-                    queries |= Q(floor=floor_num, room_number__startswith=room_suffix)
-
-                queryset = queryset.filter(queries)
-
-                # 搜索业主
-                owner_ids = Owner.objects.filter(
-                    Q(name__icontains=search_query) | Q(phone__icontains=search_query)
-                ).values_list('id', flat=True)
-
-                if owner_ids:
-                    property_ids_from_owners = OwnerProperty.objects.filter(
-                        owner_id__in=owner_ids
-                    ).values_list('property_id', flat=True)
-
-                    queryset = queryset | Property.objects.filter(
-                        id__in=property_ids_from_owners
-                    ).select_related(
-                        'community', 'building'
-                    ).prefetch_related(
-                        Prefetch(
-                            'owners',
-                            queryset=OwnerProperty.objects.select_related('owner').order_by('-is_primary', '-created_at')
-                        )
-                    )
+                queryset = queryset.filter(id__in=matching_property_ids(search_query))
 
-            queryset = queryset.order_by('building', 'floor', 'room_number').distinct()
-
-            # 创建Excel工作簿
-            wb = openpyxl.Workbook()
-            ws = wb.active
-            ws.title = "房产列表"
-
-            # 定义样式
-            header_font = Font(name='微软雅黑', size=11, bold=True, color='FFFFFFFF')
-            header_fill = PatternFill(start_color='4472C4', end_color='4472C4', fill_type='solid')
-            header_alignment = Alignment(horizontal='center', vertical='center')
-            border_style = Border(
-                left=Side(style='thin'),
-                right=Side(style='thin'),
-                top=Side(style='thin'),
-                bottom=Side(style='thin')
-            )
-            cell_alignment = Alignment(horizontal='left', vertical='center', wrap_text=True)
-
-            # 设置列宽
-            ws.column_dimensions['A'].width = 15  # 房号
-            ws.column_dimensions['B'].width = 20  # 小区
-            ws.column_dimensions['C'].width = 10  # 楼层
-            ws.column_dimensions['D'].width = 10  # 面积
-            ws.column_dimensions['E'].width = 10  # 类型
-            ws.column_dimensions['F'].width = 15  # 业主
-            ws.column_dimensions['G'].width = 15  # 联系电话
-            ws.column_dimensions['H'].width = 10  # 状态
-
-            # 写入表头
-            headers = ['房号', '所属小区', '楼层', '面积(㎡)', '类型', '业主', '联系电话', '状态']
-            for col, header in enumerate(headers, 1):
-                cell = ws.cell(row=1, column=col)
-                cell.value = header
-                cell.font = header_font
-                cell.fill = header_fill
-                cell.alignment = header_alignment
-                cell.border = border_style
-
-            # 写入数据
-            row_num = 2
-            for property_obj in queryset:
-                # 获取业主信息
-                owners_list = property_obj.owners.all()[:2]  # 最多显示2个业主
-                owner_names = '、'.join([op.owner.name for op in owners_list])
-                owner_phones = '、'.join([op.owner.phone for op in owners_list])
-
-                # 房号
-                ws.cell(row=row_num, column=1, value=str(property_obj))
-                # 小区
-                ws.cell(row=row_num, column=2, value=property_obj.community.name)
-                # 楼层
-                ws.cell(row=row_num, column=3, value=property_obj.floor)
-                # 面积
-                ws.cell(row=row_num, column=4, value=float(property_obj.area))
-                # 类型
-                property_type_map = {'residential': '住宅', 'commercial': '商业', 'garage': '车库', 'storage': '储藏室'}
-                ws.cell(row=row_num, column=5, value=property_type_map.get(property_obj.property_type, property_obj.property_type))
-                # 业主
-                ws.cell(row=row_num, column=6, value=owner_names)
-                # 联系电话
-                ws.cell(row=row_num, column=7, value=owner_phones)
-                # 状态
-                status_map = {'occupied': '自住', 'rented': '出租', 'vacant': '空置', 'renovation': '装修中'}
-                ws.cell(row=row_num, column=8, value=status_map.get(property_obj.status, property_obj.status))
-
-                # 设置单元格样式和边框
-                for col in range(1, 9):
-                    cell = ws.cell(row=row_num, column=col)
-                    cell.alignment = cell_alignment
-                    cell.border = border_style
-
-                row_num += 1
-
-            # 准备响应
-            response = HttpResponse(
-                content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-            )
-            response['Content-Disposition'] = f'attachment; filename="房产列表_{datetime.now().strftime("%Y%m%d%H%M%S")}.xlsx"'
-
-            # 保存到BytesIO
-            from io import BytesIO
-            output = BytesIO()
-            wb.save(output)
-            output.seek(0)
-            response.write(output.read())
-
-            return response
+            queryset = queryset.order_by('building', 'floor', 'room_number')
+
+            rows = queryset.values(
+                'id', 'community__name', 'building__name', 'unit', 'floor', 'room_number',
+                'area', 'property_type', 'status'
+            ).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+
+            columns = [
+                ('房号', 15), ('所属小区', 20), ('楼层', 10), ('面积(㎡)', 10),
+                ('类型', 10), ('业主', 15), ('联系电话', 15), ('状态', 10),
+            ]
+            return export_response(request, '房产列表', '房产列表', columns, self._export_rows(rows))
 
         except Exception as e:
             return Response({
                 'error': f'导出失败: {str(e)}'
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+    @staticmethod
+    def _export_rows(rows):
+        """按块补充业主信息，生成导出行"""
+        from apps.core.exports import iter_chunks, property_label
+
+        property_type_map = dict(Property.PROPERTY_TYPE_CHOICES)
+        status_map = dict(Property.STATUS_CHOICES)
+
+        for chunk in iter_chunks(rows):
+            # 每块一次查询获取业主，每个房产最多显示2个业主
+            owners = {}
+            for property_id, name, phone in OwnerProperty.objects.filter(
+                property_id__in=[row['id'] for row in chunk]
+            ).order_by('property_id', '-is_primary', '-created_at').values_list(
+                'property_id', 'owner__name', 'owner__phone'
+            ):
+                property_owners = owners.setdefault(property_id, [])
+                if len(property_owners) < 2:
+                    property_owners.append((name, phone))
+
+            for row in chunk:
+                property_owners = owners.get(row['id'], [])
+                yield [
+                    property_label(row['building__name'], row['unit'], row['floor'], row['room_number']),
+                    row['community__name'],
+                    row['floor'],
+                    float(row['area']),
+                    property_type_map.get(row['property_type'], row['property_type']),
+                    '、'.join(name for name, _ in property_owners),
+                    '、'.join(phone for _, phone in property_owners),
+                    status_map.get(row['status'], row['status']),
+                ]
+
     @action(detail=False, methods=['delete'], permission_classes=[IsAdminUser])
     def batch_delete(self, request):
         """批量删除房产"""
@@ -669,15 +254,29 @@ class PropertyViewSet(viewsets.ModelViewSet):
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
-class OwnerViewSet(viewsets.ModelViewSet):
+class OwnerViewSet(SerializerRelationsMixin, viewsets.ModelViewSet):
     """业主管理视图集"""
     queryset = Owner.objects.all()
     permission_classes = [IsAuthenticated]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, PropertySearchFilter, filters.OrderingFilter]
     filterset_fields = ['is_verified']
-    search_fields = ['name', 'phone', 'id_card']
+    # 姓名、电话经搜索后端包含匹配，名下房产的房号通过房产搜索索引匹配，身份证号精确匹配
+    search_fields = ['name', 'phone', '=id_card']
+    owner_search_field = 'id'
     ordering_fields = ['created_at']
     ordering = ['-created_at']
+    serializer_relations = {
+        OwnerListSerializer: {'annotate': {'property_count': Count('owners')}},
+        OwnerSerializer: {
+            'select_related': ['user'],
+            'prefetch_related': [
+                Prefetch('owners', queryset=OwnerProperty.objects.select_related(
+                    'property__community', 'property__building'
+                ).order_by('pk')),
+                owner_name_prefetch('owners__property__'),
+            ],
+        },
+    }
 
     def get_serializer_class(self):
         if self.action == 'list':
@@ -754,7 +353,7 @@ class OwnerViewSet(viewsets.ModelViewSet):
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
-class TenantViewSet(viewsets.ModelViewSet):
+class TenantViewSet(SerializerRelationsMixin, viewsets.ModelViewSet):
     """租户管理视图集"""
     queryset = Tenant.objects.select_related('property').all()
     serializer_class = TenantSerializer
@@ -764,6 +363,9 @@ class TenantViewSet(viewsets.ModelViewSet):
     search_fields = ['name', 'phone']
     ordering_fields = ['created_at', 'lease_start', 'lease_end']
     ordering = ['-created_at']
+    serializer_relations = {
+        TenantSerializer: {'select_related': ['property__community', 'property__building']},
+    }
 
     def get_permissions(self):
         """只有管理员和前台可以创建/修改/删除"""
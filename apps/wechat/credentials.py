@@ -0,0 +1,100 @@
+"""
+微信凭证缓存
+
+access_token、jsapi_ticket 等有有效期的凭证保存在共享缓存（CACHES['shared']）中，所有工作进程共用：
+- 距过期不足 refresh_margin 秒时刷新
+- 刷新通过缓存锁保证同一时刻只有一个进程请求微信接口，其他进程继续使用旧值；
+  取得锁后重新读取一次，其他进程刚刷新完时直接使用新值
+- 不经过默认的两级缓存，避免各进程的本地副本在刷新后仍返回旧凭证或旧的锁状态
+- 刷新失败时，只要旧值尚未过期就继续使用
+"""
+import logging
+import time
+
+from django.core.cache import caches
+
+logger = logging.getLogger(__name__)
+
+# 凭证和刷新锁所在的缓存
+CREDENTIAL_CACHE_ALIAS = 'shared'
+
+
+class CredentialError(Exception):
+    """凭证获取失败"""
+
+
+class CachedCredential:
+    """
+    共享缓存中的单个凭证
+
+    Args:
+        name: 缓存键，如 wechat:access_token:<appid>
+        fetch: 获取新凭证的函数，返回 (凭证, 有效期秒数)，失败时抛出异常
+        refresh_margin: 提前刷新的秒数
+        lock_timeout: 刷新锁的超时时间（秒），防止刷新进程异常退出后锁无法释放
+        wait_timeout: 没有可用旧值且其他进程正在刷新时，最多等待的秒数
+    """
+
+    def __init__(self, name, fetch, refresh_margin=300, lock_timeout=10, wait_timeout=3):
+        self.name = name
+        self.fetch = fetch
+        self.refresh_margin = refresh_margin
+        self.lock_timeout = lock_timeout
+        self.wait_timeout = wait_timeout
+
+    @property
+    def cache(self):
+        return caches[CREDENTIAL_CACHE_ALIAS]
+
+    @property
+    def lock_key(self):
+        return f'{self.name}:lock'
+
+    def _valid(self, entry, margin=0):
+        return entry is not None and time.time() < entry['expires_at'] - margin
+
+    def get(self):
+        """获取凭证，无可用凭证时返回 None"""
+        entry = self.cache.get(self.name)
+        if self._valid(entry, self.refresh_margin):
+            return entry['value']
+
+        if self.cache.add(self.lock_key, True, timeout=self.lock_timeout):
+            try:
+                # 上一个持锁进程可能刚刷新完
+                entry = self.cache.get(self.name)
+                if self._valid(entry, self.refresh_margin):
+                    return entry['value']
+                return self._refresh(entry)
+            finally:
+                self.cache.delete(self.lock_key)
+
+        # 其他进程正在刷新：旧值仍有效则直接使用，否则等待刷新结果
+        if self._valid(entry):
+            return entry['value']
+        deadline = time.time() + self.wait_timeout
+        while time.time() < deadline:
+            time.sleep(0.1)
+            entry = self.cache.get(self.name)
+            if self._valid(entry):
+                return entry['value']
+        logger.warning(f'等待凭证 {self.name} 刷新超时')
+        return None
+
+    def _refresh(self, previous):
+        try:
+            value, expires_in = self.fetch()
+        except Exception as e:
+            if self._valid(previous):
+                logger.warning(f'刷新凭证 {self.name} 失败，继续使用旧凭证: {str(e)}')
+                return previous['value']
+            logger.error(f'获取凭证 {self.name} 失败: {str(e)}')
+            return None
+
+        # 缓存不设超时，过期判断以 expires_at 为准，保留最后一次成功获取的值
+        self.cache.set(self.name, {'value': value, 'expires_at': time.time() + int(expires_in)}, timeout=None)
+        return value
+
+    def invalidate(self):
+        """凭证被微信判定无效时丢弃，下次使用时重新获取"""
+        self.cache.delete(self.name)
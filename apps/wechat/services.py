@@ -1,11 +1,20 @@
 """
 WeChat Services
 """
-import requests
 import hashlib
+import logging
 import time
 from django.conf import settings
-from typing import Dict, Optional
+from typing import Dict, Optional, Tuple
+
+from apps.core.http_client import get_http_client
+
+from .credentials import CachedCredential, CredentialError
+
+logger = logging.getLogger(__name__)
+
+# 微信判定 access_token 无效或过期的错误码
+INVALID_TOKEN_ERRCODES = {40001, 40014, 42001}
 
 
 class WeChatService:
@@ -17,36 +26,64 @@ class WeChatService:
         self.token = settings.WECHAT.get('TOKEN')
         self.encoding_aes_key = settings.WECHAT.get('ENCODING_AES_KEY')
 
-        # API 端点
-        self.access_token_url = 'https://api.weixin.qq.com/cgi-bin/token'
-        self.user_info_url = 'https://api.weixin.qq.com/cgi-bin/user/info'
+        # API 端点（API_BASE_URL 可指向测试用的本地服务）
+        api_base_url = settings.WECHAT.get('API_BASE_URL') or 'https://api.weixin.qq.com'
+        self.access_token_url = f'{api_base_url}/cgi-bin/token'
+        self.user_info_url = f'{api_base_url}/cgi-bin/user/info'
         self.oauth_code_url = 'https://open.weixin.qq.com/connect/oauth2/authorize'
-        self.oauth_token_url = 'https://api.weixin.qq.com/sns/oauth2/access_token'
-        self.jsapi_ticket_url = 'https://api.weixin.qq.com/cgi-bin/ticket/getticket'
-
-    def get_access_token(self) -> Optional[str]:
-        """
-        获取公众号 access_token
-        注意：生产环境应该使用缓存
-        """
+        self.oauth_token_url = f'{api_base_url}/sns/oauth2/access_token'
+        self.jsapi_ticket_url = f'{api_base_url}/cgi-bin/ticket/getticket'
+
+        # access_token 与 jsapi_ticket 在所有工作进程间共享缓存
+        self.access_token_credential = CachedCredential(
+            f'wechat:access_token:{self.app_id}', self._fetch_access_token
+        )
+        self.jsapi_ticket_credential = CachedCredential(
+            f'wechat:jsapi_ticket:{self.app_id}', self._fetch_jsapi_ticket
+        )
+
+    def _fetch_access_token(self) -> Tuple[str, int]:
+        """请求微信接口获取新的 access_token"""
         params = {
             'grant_type': 'client_credential',
             'appid': self.app_id,
             'secret': self.app_secret,
         }
+        response = get_http_client().get(self.access_token_url, params=params)
+        data = response.json()
+        if 'access_token' not in data:
+            raise CredentialError(f'获取 access_token 失败: {data}')
+        return data['access_token'], data.get('expires_in', 7200)
+
+    def _fetch_jsapi_ticket(self) -> Tuple[str, int]:
+        """请求微信接口获取新的 jsapi_ticket"""
+        access_token = self.get_access_token()
+        if not access_token:
+            raise CredentialError('无可用的 access_token')
 
-        try:
-            response = requests.get(self.access_token_url, params=params, timeout=5)
-            data = response.json()
+        params = {
+            'access_token': access_token,
+            'type': 'jsapi',
+        }
+        response = get_http_client().get(self.jsapi_ticket_url, params=params)
+        data = response.json()
+        if data.get('errcode') != 0:
+            if data.get('errcode') in INVALID_TOKEN_ERRCODES:
+                self.access_token_credential.invalidate()
+            raise CredentialError(f'获取 jsapi_ticket 失败: {data}')
+        return data['ticket'], data.get('expires_in', 7200)
 
-            if 'access_token' in data:
-                return data['access_token']
-            else:
-                print(f"获取 access_token 失败: {data}")
-                return None
-        except Exception as e:
-            print(f"获取 access_token 异常: {e}")
-            return None
+    def get_access_token(self) -> Optional[str]:
+        """
+        获取公众号 access_token（共享缓存，过期前自动刷新）
+        """
+        return self.access_token_credential.get()
+
+    def get_jsapi_ticket(self) -> Optional[str]:
+        """
+        获取 JS-SDK 的 jsapi_ticket（共享缓存，过期前自动刷新）
+        """
+        return self.jsapi_ticket_credential.get()
 
     def get_user_info(self, openid: str, access_token: str = None) -> Optional[Dict]:
         """
@@ -65,10 +102,12 @@ class WeChatService:
         }
 
         try:
-            response = requests.get(self.user_info_url, params=params, timeout=5)
+            response = get_http_client().get(self.user_info_url, params=params)
             data = response.json()
 
             if 'errcode' in data and data['errcode'] != 0:
+                if data['errcode'] in INVALID_TOKEN_ERRCODES:
+                    self.access_token_credential.invalidate()
                 print(f"获取用户信息失败: {data}")
                 return None
 
@@ -105,7 +144,7 @@ class WeChatService:
         }
 
         try:
-            response = requests.get(self.oauth_token_url, params=params, timeout=5)
+            response = get_http_client().get(self.oauth_token_url, params=params)
             data = response.json()
 
             if 'errcode' in data and data['errcode'] != 0:
@@ -149,7 +188,7 @@ class WeChatService:
             message_data['url'] = url
 
         try:
-            response = requests.post(api_url, json=message_data, timeout=5)
+            response = get_http_client().post(api_url, json=message_data)
             result = response.json()
 
             if result.get('errcode') == 0:
@@ -169,42 +208,24 @@ class WeChatService:
         import random
         import string
 
-        # 获取 jsapi_ticket（这里简化处理，生产环境应该缓存）
-        access_token = self.get_access_token()
-        if not access_token:
+        ticket = self.get_jsapi_ticket()
+        if not ticket:
             return {}
 
-        params = {
-            'access_token': access_token,
-            'type': 'jsapi',
-        }
-
-        try:
-            response = requests.get(self.jsapi_ticket_url, params=params, timeout=5)
-            data = response.json()
-
-            if data.get('errcode') != 0:
-                return {}
-
-            ticket = data.get('ticket')
-
-            # 生成随机字符串
-            nonce_str = ''.join(random.choices(string.ascii_letters + string.digits, k=16))
-            timestamp = str(int(time.time()))
-
-            # 生成签名
-            sign_str = f'jsapi_ticket={ticket}&noncestr={nonce_str}&timestamp={timestamp}&url={url}'
-            signature = hashlib.sha1(sign_str.encode('utf-8')).hexdigest()
+        # 生成随机字符串
+        nonce_str = ''.join(random.choices(string.ascii_letters + string.digits, k=16))
+        timestamp = str(int(time.time()))
 
-            return {
-                'appId': self.app_id,
-                'timestamp': timestamp,
-                'nonceStr': nonce_str,
-                'signature': signature,
-            }
-        except Exception as e:
-            print(f"生成 JS-SDK 签名异常: {e}")
-            return {}
+        # 生成签名
+        sign_str = f'jsapi_ticket={ticket}&noncestr={nonce_str}&timestamp={timestamp}&url={url}'
+        signature = hashlib.sha1(sign_str.encode('utf-8')).hexdigest()
+
+        return {
+            'appId': self.app_id,
+            'timestamp': timestamp,
+            'nonceStr': nonce_str,
+            'signature': signature,
+        }
 
 
 class WeChatPayService:
@@ -251,9 +272,8 @@ class WeChatPayService:
         xml_data = self._dict_to_xml(params)
 
         try:
-            response = requests.post(self.order_url, data=xml_data.encode('utf-8'),
-                                    headers={'Content-Type': 'application/xml'},
-                                    timeout=10)
+            response = get_http_client().post(self.order_url, data=xml_data.encode('utf-8'),
+                                              headers={'Content-Type': 'application/xml'})
             result = self._xml_to_dict(response.text)
 
             if result.get('return_code') == 'SUCCESS' and result.get('result_code') == 'SUCCESS':
@@ -0,0 +1,142 @@
+"""
+微信模块单元测试
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+
+from .services import WeChatService
+
+
+class FakeWeChatServer:
+    """本地模拟的微信接口，记录各接口的调用次数"""
+
+    def __init__(self):
+        self.calls = {'token': 0, 'ticket': 0}
+        self.expires_in = 7200
+        self.fail = False
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlparse(self.path)
+                query = parse_qs(url.query)
+                if url.path == '/cgi-bin/token':
+                    server.calls['token'] += 1
+                    body = {'errcode': -1, 'errmsg': 'system error'} if server.fail else {
+                        'access_token': f"token-{server.calls['token']}", 'expires_in': server.expires_in
+                    }
+                elif url.path == '/cgi-bin/ticket/getticket':
+                    server.calls['ticket'] += 1
+                    body = {'errcode': 0, 'ticket': f"ticket-for-{query['access_token'][0]}", 'expires_in': 7200}
+                else:
+                    body = {'errcode': 404}
+                content = json.dumps(body).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(content)))
+                self.end_headers()
+                self.wfile.write(content)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = HTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f'http://127.0.0.1:{self.httpd.server_port}'
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class CachedCredentialTest(TestCase):
+    """access_token / jsapi_ticket 共享缓存测试"""
+
+    def setUp(self):
+        """测试前准备"""
+        caches['shared'].clear()
+        self.server = FakeWeChatServer().__enter__()
+        self.addCleanup(self.server.__exit__)
+        settings_override = override_settings(WECHAT={'APP_ID': 'wx-test', 'APP_SECRET': 'secret', 'API_BASE_URL': self.server.url})
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def test_token_shared_between_instances(self):
+        """测试多个服务实例共用同一个 access_token"""
+        self.assertEqual(WeChatService().get_access_token(), 'token-1')
+        self.assertEqual(WeChatService().get_access_token(), 'token-1')
+        self.assertEqual(self.server.calls['token'], 1)
+
+    def test_refresh_before_expiry(self):
+        """测试进入提前刷新窗口后重新获取"""
+        self.server.expires_in = 200
+        service = WeChatService()
+
+        self.assertEqual(service.get_access_token(), 'token-1')
+        self.assertEqual(service.get_access_token(), 'token-2')
+
+    def test_other_worker_refreshing_serves_old_value(self):
+        """测试其他进程持有刷新锁时继续使用旧值"""
+        self.server.expires_in = 200
+        service = WeChatService()
+        service.get_access_token()
+        caches['shared'].add(service.access_token_credential.lock_key, True, timeout=10)
+
+        self.assertEqual(service.get_access_token(), 'token-1')
+        self.assertEqual(self.server.calls['token'], 1)
+
+    def test_recheck_after_acquiring_lock(self):
+        """测试取得刷新锁前其他进程已刷新完时直接使用新值，不再请求微信接口"""
+        from unittest import mock
+
+        service = WeChatService()
+        shared = caches['shared']
+        credential = service.access_token_credential
+        shared.set(credential.name, {'value': 'old', 'expires_at': time.time() - 1}, timeout=None)
+        add = shared.add
+
+        def refreshed_by_other_worker(*args, **kwargs):
+            shared.set(credential.name, {'value': 'fresh', 'expires_at': time.time() + 7200}, timeout=None)
+            return add(*args, **kwargs)
+
+        with mock.patch.object(shared, 'add', side_effect=refreshed_by_other_worker):
+            self.assertEqual(service.get_access_token(), 'fresh')
+        self.assertEqual(self.server.calls['token'], 0)
+
+    def test_fallback_on_error(self):
+        """测试刷新失败时使用尚未过期的旧值"""
+        self.server.expires_in = 200
+        service = WeChatService()
+        service.get_access_token()
+        self.server.fail = True
+
+        self.assertEqual(service.get_access_token(), 'token-1')
+        self.assertEqual(self.server.calls['token'], 2)
+
+    def test_no_token_after_expiry_and_error(self):
+        """测试旧值已过期且刷新失败时返回 None"""
+        service = WeChatService()
+        caches['shared'].set(service.access_token_credential.name, {'value': 'old', 'expires_at': time.time() - 1}, timeout=None)
+        self.server.fail = True
+
+        self.assertIsNone(service.get_access_token())
+
+    def test_jsapi_signature_uses_cached_ticket(self):
+        """测试 JS-SDK 签名复用缓存的 jsapi_ticket"""
+        service = WeChatService()
+        first = service.create_jsapi_signature('https://example.com/page')
+        second = WeChatService().create_jsapi_signature('https://example.com/page')
+
+        self.assertEqual(first['appId'], 'wx-test')
+        self.assertTrue(second['signature'])
+        self.assertEqual(self.server.calls, {'token': 1, 'ticket': 1})
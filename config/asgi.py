@@ -1,8 +1,18 @@
 """
 ASGI config for Property Management System
+
+只有实时事件流（/admin/api/events/，长连接）以 ASGI 方式部署，其余请求仍走 WSGI（config.wsgi）：
+Django 4.2 在 ASGI 下会把同步迭代器的 StreamingHttpResponse（流式导出 Excel/CSV）整体缓冲后才发送。
+    gunicorn config.asgi:application -k uvicorn.workers.UvicornWorker
+Nginx 将 /admin/api/events/ 转发到该服务，其余路径转发到 WSGI 服务（见 docker-compose.yml）。
 """
 import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings.development')
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# get_asgi_application() 完成 Django 初始化后才能导入应用模块
+from apps.core.events import DisconnectWatcher  # noqa: E402
+
+application = DisconnectWatcher(django_application)
@@ -0,0 +1,16 @@
+"""
+Celery Configuration
+"""
+import os
+
+from celery import Celery
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings.development')
+
+app = Celery('config')
+
+# 读取 Django settings 中以 CELERY_ 开头的配置
+app.config_from_object('django.conf:settings', namespace='CELERY')
+
+# 自动发现各应用下的 tasks.py
+app.autodiscover_tasks()
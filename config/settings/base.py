@@ -64,6 +64,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'apps.core.context_processors.live_events',
             ],
         },
     },
@@ -134,7 +135,7 @@ REST_FRAMEWORK = {
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 20,
     'DEFAULT_FILTER_BACKENDS': [
-        'rest_framework.filters.SearchFilter',
+        'apps.core.search.IndexedSearchFilter',
         'rest_framework.filters.OrderingFilter',
     ],
     'DATETIME_FORMAT': '%Y-%m-%d %H:%M:%S',
@@ -164,18 +165,61 @@ CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = TIME_ZONE
+# 未部署 Redis/Worker 时设置为 True，任务在当前进程内同步执行
+CELERY_TASK_ALWAYS_EAGER = os.getenv('CELERY_TASK_ALWAYS_EAGER', 'False') == 'True'
+CELERY_BEAT_SCHEDULE = {
+    # 补发到期重试的通知
+    'deliver-due-notifications': {
+        'task': 'apps.core.tasks.deliver_due_notifications',
+        'schedule': 60.0,
+    },
+}
 
-# Cache - 使用数据库缓存，无需Redis
+# Cache - 两级缓存：进程内 LRU + Redis 共享缓存
+REDIS_CACHE_URL = os.getenv('REDIS_CACHE_URL', 'redis://localhost:6379/1')
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
-        'LOCATION': 'django_cache_table',
-    }
+        'BACKEND': 'apps.core.cache.TieredCache',
+        'OPTIONS': {
+            'REMOTE': 'shared',
+            # 本地条目上限及有效期（秒），有效期决定跨进程读到旧值的最长时间
+            'LOCAL_MAX_ENTRIES': int(os.getenv('CACHE_LOCAL_MAX_ENTRIES', '1000')),
+            'LOCAL_TIMEOUT': int(os.getenv('CACHE_LOCAL_TIMEOUT', '5')),
+        },
+    },
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': REDIS_CACHE_URL,
+    },
 }
 
-# Session - 使用数据库存储会话
+# Session - 使用共享缓存存储会话（不经过进程内缓存，登出或清除会话后在所有进程立即失效）
 SESSION_ENGINE = 'django.contrib.sessions.backends.cache'
-SESSION_CACHE_ALIAS = 'default'
+SESSION_CACHE_ALIAS = 'shared'
+
+# 操作日志 - 后台线程批量写入
+AUDIT_LOG_ASYNC = os.getenv('AUDIT_LOG_ASYNC', 'True') == 'True'
+AUDIT_LOG_BATCH_SIZE = 100
+AUDIT_LOG_FLUSH_INTERVAL_MS = 500
+AUDIT_LOG_MAX_QUEUE_SIZE = 10000
+
+# 通知发送 - 各渠道的服务商、速率上限（条/秒，按进程）、突发容量和并发数
+NOTIFICATION_CHANNELS = {
+    'sms': {'PROVIDER': 'apps.core.delivery.LogProvider', 'RATE': 20, 'BURST': 20, 'WORKERS': 4},
+    'wechat': {'PROVIDER': 'apps.core.delivery.LogProvider', 'RATE': 50, 'BURST': 50, 'WORKERS': 8},
+    'email': {'PROVIDER': 'apps.core.delivery.LogProvider', 'RATE': 10, 'BURST': 10, 'WORKERS': 2},
+}
+# 未读数计数器的有效期（秒），过期后从数据库重新统计
+NOTIFICATION_UNREAD_COUNTER_TIMEOUT = 600
+
+# 实时事件 - 经 Redis 发布/订阅在 Web、事件服务和 Celery 进程间广播，留空时只在进程内广播
+EVENTS_REDIS_URL = os.getenv('EVENTS_REDIS_URL', 'redis://localhost:6379/2')
+# 页面是否连接事件流，仅在 /admin/api/events/ 由单独的 ASGI 服务处理时开启（见 nginx.conf），
+# 开启后必须配置 EVENTS_REDIS_URL，否则其他进程发布的事件到不了事件服务
+EVENTS_STREAM_ENABLED = os.getenv('EVENTS_STREAM_ENABLED', 'False') == 'True'
+
+# 搜索后端 - 留空时按数据库选择（PostgreSQL 三元组索引、SQLite FTS5），也可填写后端类的路径
+SEARCH_BACKEND = os.getenv('SEARCH_BACKEND', '')
 
 # Logging
 # Ensure logs directory exists
@@ -224,6 +268,7 @@ WECHAT = {
     'APP_SECRET': os.getenv('WECHAT_APP_SECRET', ''),
     'TOKEN': os.getenv('WECHAT_TOKEN', ''),
     'ENCODING_AES_KEY': os.getenv('WECHAT_ENCODING_AES_KEY', ''),
+    'API_BASE_URL': os.getenv('WECHAT_API_BASE_URL', 'https://api.weixin.qq.com'),
 }
 
 WECHAT_PAY = {
@@ -234,6 +279,14 @@ WECHAT_PAY = {
     'NOTIFY_URL': os.getenv('WECHAT_NOTIFY_URL', ''),
 }
 
+# 对外 HTTP 客户端（微信、微信支付接口）
+HTTP_CLIENT = {
+    'CONNECT_TIMEOUT': 3,
+    'READ_TIMEOUT': 10,
+    'RETRIES': 2,
+    'BACKOFF_FACTOR': 0.3,
+}
+
 # Site URLs
 SITE_URL = os.getenv('SITE_URL', 'http://localhost:8000')
 FRONTEND_URL = os.getenv('FRONTEND_URL', 'http://localhost:8080')
@@ -13,6 +13,20 @@ DATABASES = {
     }
 }
 
+# Celery - 开发环境默认同步执行任务，无需启动 Redis 和 Worker
+CELERY_TASK_ALWAYS_EAGER = os.getenv('CELERY_TASK_ALWAYS_EAGER', 'True') == 'True'
+
+# Cache - 未配置 REDIS_CACHE_URL 时共享缓存使用数据库缓存，无需启动 Redis
+if not os.getenv('REDIS_CACHE_URL'):
+    CACHES['shared'] = {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'django_cache_table',
+    }
+
+# 实时事件 - 未配置 EVENTS_REDIS_URL 时只在进程内广播，无需启动 Redis
+if not os.getenv('EVENTS_REDIS_URL'):
+    EVENTS_REDIS_URL = ''
+
 # Email backend for development
 EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 
@@ -14,7 +14,7 @@ from apps.core.views import (
     login_view, logout_view, payment_config_list, account_management_list,
     wechat_pay_config_list, wechat_pay_create_order, wechat_pay_notify,
     notification_list, notification_mark_read, notification_unread_count,
-    notification_mark_all_read, send_test_notification, export_logs
+    notification_mark_all_read, send_test_notification, export_logs, event_stream
 )
 from apps.community.views import community_form, building_form
 from apps.property.views import property_form, owner_form, tenant_form, get_properties_by_community
@@ -62,6 +62,7 @@ urlpatterns = [
     path('admin/api/notifications/unread-count/', notification_unread_count, name='notification_unread_count'),
     path('admin/api/notifications/mark-all-read/', notification_mark_all_read, name='notification_mark_all_read'),
     path('admin/api/notifications/send-test/', send_test_notification, name='send_test_notification'),
+    path('admin/api/events/', event_stream, name='event_stream'),
 
     # WeChat Pay (微信支付)
     path('admin/wechat-pay-config/', wechat_pay_config_list, name='wechat_pay_config'),
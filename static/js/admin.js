@@ -439,10 +439,56 @@ const Format = {
     }
 };
 
+// ============================================
+// 实时事件（Server-Sent Events）
+// ============================================
+const LiveEvents = {
+    source: null,
+
+    start() {
+        // 服务端未部署事件流（页面 body 无 data-live-events）时不连接
+        if (!window.EventSource || this.source || !('liveEvents' in document.body.dataset)) return;
+        // 断线后浏览器按服务端下发的 retry 间隔自动重连
+        this.source = new EventSource('/admin/api/events/');
+        this.source.addEventListener('notification', (e) => this.onNotification(JSON.parse(e.data)));
+        this.source.addEventListener('announcement', (e) => this.onNotification(JSON.parse(e.data)));
+        this.source.addEventListener('dashboard', (e) => this.onDashboard(JSON.parse(e.data)));
+        this.source.addEventListener('maintenance', (e) => {
+            // 页面可监听 live:maintenance 事件自行刷新列表
+            document.dispatchEvent(new CustomEvent('live:maintenance', { detail: JSON.parse(e.data) }));
+        });
+    },
+
+    onNotification(data) {
+        const button = document.querySelector('.ri-notification-3-line')?.closest('button');
+        if (button && !button.querySelector('.notification-badge')) {
+            const badge = document.createElement('span');
+            badge.className = 'notification-badge';
+            button.appendChild(badge);
+        }
+        const title = document.createElement('span');
+        title.textContent = data.title;
+        Toast.info(`新通知：${title.innerHTML}`);
+    },
+
+    onDashboard(deltas) {
+        // 统计卡片用 data-live-stat 标记，值为仪表盘统计的键
+        Object.entries(deltas).forEach(([key, delta]) => {
+            document.querySelectorAll(`[data-live-stat="${key}"]`).forEach((el) => {
+                const value = parseFloat(el.dataset.value || '0') + parseFloat(delta);
+                el.dataset.value = value;
+                el.textContent = (el.dataset.prefix || '') + Math.round(value);
+            });
+        });
+    }
+};
+
 // ============================================
 // 初始化
 // ============================================
 document.addEventListener('DOMContentLoaded', function() {
+    LiveEvents.start();
+
     // 全局点击事件委托
     document.addEventListener('click', async (e) => {
         // 处理删除按钮
@@ -560,3 +606,4 @@ window.confirmDelete = confirmDelete;
 window.showLoading = showLoading;
 window.hideLoading = hideLoading;
 window.Format = Format;
+window.LiveEvents = LiveEvents;
@@ -704,7 +704,7 @@ window.RequestManager = (function() {
             const searchValue = searchInput ? searchInput.value.trim() : '';
 
             const url = new URL(window.location);
-            url.searchParams.set('page', '1');
+            url.searchParams.delete('cursor');
 
             if (community) url.searchParams.set('community', community);
             else url.searchParams.delete('community');
@@ -725,11 +725,11 @@ window.RequestManager = (function() {
         },
 
         /**
-         * 跳转到指定页面
+         * 跳转到游标指定的页面
          */
-        goToPage: function(pageNum) {
+        goToCursor: function(cursor) {
             const url = new URL(window.location);
-            url.searchParams.set('page', pageNum);
+            url.searchParams.set('cursor', cursor);
             window.location.href = url.toString();
         },
 
@@ -739,7 +739,7 @@ window.RequestManager = (function() {
         changePageSize: function(size) {
             const url = new URL(window.location);
             url.searchParams.set('page_size', size);
-            url.searchParams.set('page', '1');
+            url.searchParams.delete('cursor');
             window.location.href = url.toString();
         }
     };
@@ -53,6 +53,7 @@ window.BillManager = {
 
         const url = new URL(window.location);
         url.searchParams.set('page', '1');
+        ['cursor', 'record_cursor'].forEach(name => url.searchParams.delete(name));
         url.searchParams.set('tab', 'bills');
 
         if (community) url.searchParams.set('community', community);
@@ -164,6 +165,7 @@ window.FeeManager = {
 
         const url = new URL(window.location);
         url.searchParams.set('page', '1');
+        ['cursor', 'record_cursor'].forEach(name => url.searchParams.delete(name));
         url.searchParams.set('tab', 'standards');
 
         if (community) url.searchParams.set('community', community);
@@ -253,6 +255,7 @@ window.RecordManager = {
 
         const url = new URL(window.location);
         url.searchParams.set('page', '1');
+        ['cursor', 'record_cursor'].forEach(name => url.searchParams.delete(name));
         url.searchParams.set('tab', 'records');
 
         if (community) url.searchParams.set('community', community);